@@ -0,0 +1,171 @@
+"""
+Local ANN index tradeoffs: recall, latency, memory and update cost per index type.
+
+Generates a synthetic clustered dataset (a Gaussian mixture, closer to real
+embeddings than uniform noise), computes exact top-k neighbours as ground
+truth, then builds each index type with services/ann_index_service.py in its
+own subprocess so memory is measured in isolation. Per type it reports build
+time, file size, open time and RSS with memory-mapping, single-query latency
+percentiles, recall@k, and the cost of an incremental add and delete of 1%.
+
+Usage:
+    python -m benchmarks.ann_indexes --vectors 1000000 --dimension 128 --output ann.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def current_rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024.0 * 1024.0)
+
+
+def make_dataset(workdir, vectors, dimension, queries, top_k, seed=0):
+    """Write base.npy, queries.npy and ground_truth.npy (exact top-k by cosine similarity)."""
+    import numpy as np
+    import faiss
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, vectors // 1000), dimension)).astype(np.float32)
+    base = np.empty((vectors, dimension), dtype=np.float32)
+    for start in range(0, vectors, 100000):
+        count = min(100000, vectors - start)
+        base[start:start + count] = centers[rng.integers(0, len(centers), count)] + 0.35 * rng.standard_normal((count, dimension)).astype(np.float32)
+    query = centers[rng.integers(0, len(centers), queries)] + 0.35 * rng.standard_normal((queries, dimension)).astype(np.float32)
+    faiss.normalize_L2(base)
+    faiss.normalize_L2(query)
+
+    exact = faiss.IndexFlatIP(dimension)
+    exact.add(base)
+    _, ground_truth = exact.search(query, top_k)
+    np.save(os.path.join(workdir, 'base.npy'), base)
+    np.save(os.path.join(workdir, 'queries.npy'), query)
+    np.save(os.path.join(workdir, 'ground_truth.npy'), ground_truth)
+
+
+def run_worker(index_type, workdir, top_k, params):
+    import numpy as np
+    from services.ann_index_service import LocalAnnIndex
+
+    path = os.path.join(workdir, f'rag-{index_type}')
+    base = np.load(os.path.join(workdir, 'base.npy'), mmap_mode='r')
+    queries = np.load(os.path.join(workdir, 'queries.npy'))
+    ground_truth = np.load(os.path.join(workdir, 'ground_truth.npy'))
+    ids = [str(i) for i in range(len(base))]
+
+    # Labels are assigned in insertion order, so label i is base row i
+    started = time.perf_counter()
+    built = LocalAnnIndex.build(path, ids, np.asarray(base), index_type=index_type, params=params)
+    build_s = time.perf_counter() - started
+    effective_params = built.params["params"]
+    del built, base
+
+    rss_before_open = current_rss_mb()
+    started = time.perf_counter()
+    index = LocalAnnIndex.open(path, mmap=True)
+    open_ms = (time.perf_counter() - started) * 1000.0
+    rss_after_open = current_rss_mb()
+
+    index.search(queries[:10], top_k)  # warm-up
+    latencies, hits = [], 0
+    for query, truth in zip(queries, ground_truth):
+        started = time.perf_counter()
+        _, labels = index.search(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        hits += len(set(labels[0].tolist()) & set(truth.tolist()))
+    latencies.sort()
+    rss_after_queries = current_rss_mb()
+
+    # Incremental updates: add and delete 1% without rebuilding (or retraining)
+    count = max(1, len(ids) // 100)
+    writer = LocalAnnIndex.open(path, mmap=False)
+    extra = np.asarray(np.load(os.path.join(workdir, 'base.npy'), mmap_mode='r')[:count])
+    started = time.perf_counter()
+    writer.upsert([f"extra-{i}" for i in range(count)], extra)
+    add_s = time.perf_counter() - started
+    started = time.perf_counter()
+    writer.delete([f"extra-{i}" for i in range(count)])
+    delete_s = time.perf_counter() - started
+
+    return {
+        "index_type": index_type,
+        "factory": index.params["factory"],
+        "params": effective_params,
+        "vectors": len(ids),
+        "build_s": build_s,
+        "index_file_mb": os.path.getsize(os.path.join(path, 'index.faiss')) / (1024.0 * 1024.0),
+        "vectors_file_mb": os.path.getsize(os.path.join(path, 'vectors.f32')) / (1024.0 * 1024.0) if os.path.exists(os.path.join(path, 'vectors.f32')) else 0.0,
+        "open_ms": open_ms,
+        "rss_open_delta_mb": rss_after_open - rss_before_open,
+        "rss_after_queries_mb": rss_after_queries - rss_before_open,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        f"recall_at_{top_k}": hits / float(len(queries) * top_k),
+        "query_ms_p50": latencies[len(latencies) // 2],
+        "query_ms_p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "add_1pct_s": add_s,
+        "delete_1pct_s": delete_s,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall/latency/memory tradeoffs of the local ANN index types.")
+    parser.add_argument('--vectors', type=int, default=1000000)
+    parser.add_argument('--dimension', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--types', nargs='+', default=['flat', 'hnsw', 'ivfpq'], choices=['flat', 'hnsw', 'ivfpq'])
+    parser.add_argument('--params', default='{}', help='JSON of per-type parameter overrides, e.g. \'{"hnsw": {"ef_search": 128}}\'.')
+    parser.add_argument('--workdir', help="Keep the dataset and indexes here (default: a temporary folder).")
+    parser.add_argument('--output', help="Write JSON results to this file (default: stdout).")
+    parser.add_argument('--worker', choices=['flat', 'hnsw', 'ivfpq'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    overrides = json.loads(args.params)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.workdir, args.top_k, overrides.get(args.worker))))
+        return 0
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ann-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    started = time.perf_counter()
+    make_dataset(workdir, args.vectors, args.dimension, args.queries, args.top_k)
+    print(f"📦 Dataset of {args.vectors} x {args.dimension} ready in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+    results = {"vectors": args.vectors, "dimension": args.dimension, "queries": args.queries, "top_k": args.top_k, "types": {}}
+    for index_type in args.types:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.ann_indexes', '--worker', index_type, '--workdir', workdir,
+             '--top-k', str(args.top_k), '--params', args.params],
+            cwd=BASE_DIR, capture_output=True, text=True, env=os.environ.copy()
+        )
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            return completed.returncode
+        results["types"][index_type] = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"✅ {index_type}: {json.dumps(results['types'][index_type])}", file=sys.stderr)
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
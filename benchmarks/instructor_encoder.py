@@ -0,0 +1,128 @@
+"""
+Instructor-XL embedding cost: legacy encoder-decoder path vs the encoder-only path.
+
+Each mode runs in its own subprocess so peak memory is measured in isolation.
+Reports model load time, parameter bytes, peak RSS, and per-text latency for
+single-text calls and for one batched call.
+
+Usage:
+    python -m benchmarks.instructor_encoder --model-path /models/hkunlp/instructor-xl --texts 32 --output instructor.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import statistics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+SAMPLE_TEXT = (
+    "Santosh has eight years of experience building data platforms, including streaming "
+    "ingestion with Kafka, batch pipelines in Spark and retrieval-augmented search services. "
+)
+
+
+def sample_texts(count):
+    return [f"{SAMPLE_TEXT * (1 + i % 4)} Item {i}." for i in range(count)]
+
+
+def run_worker(mode, count, batch_size):
+    import torch
+    from services import embedding_service
+    from config import Config
+
+    texts = sample_texts(count)
+    start = time.perf_counter()
+    if mode == 'legacy':
+        embedding_service.initialize_instructor_model()
+        model = embedding_service.instructor_model
+        embed_one = embedding_service.get_instructor_embeddings
+        embed_batch = None
+    else:
+        embedding_service.initialize_instructor_encoder()
+        model = embedding_service.instructor_encoder
+        embed_one = lambda text: embedding_service.get_instructor_encoder_embeddings([text], Config.INSTRUCTOR_DOCUMENT_INSTRUCTION)[0]
+        embed_batch = lambda batch: embedding_service.get_instructor_encoder_embeddings(batch, Config.INSTRUCTOR_DOCUMENT_INSTRUCTION)
+    load_s = time.perf_counter() - start
+
+    embed_one(texts[0])  # warm-up
+    single_ms = []
+    for text in texts:
+        started = time.perf_counter()
+        vector = embed_one(text)
+        single_ms.append((time.perf_counter() - started) * 1000.0)
+
+    batched_ms_per_text = None
+    if embed_batch is not None:
+        started = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            embed_batch(texts[i:i + batch_size])
+        batched_ms_per_text = (time.perf_counter() - started) * 1000.0 / len(texts)
+
+    return {
+        "mode": mode,
+        "dimension": int(len(vector)),
+        "parameters": int(sum(p.numel() for p in model.parameters())),
+        "parameter_bytes": int(sum(p.numel() * p.element_size() for p in model.parameters())),
+        "load_s": load_s,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "single_ms_p50": statistics.median(single_ms),
+        "single_ms_mean": statistics.fmean(single_ms),
+        "batched_ms_per_text": batched_ms_per_text,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare legacy and encoder-only Instructor-XL embedding cost.")
+    parser.add_argument('--model-path', help="Instructor-XL checkpoint (default: INSTRUCTOR_MODEL_PATH).")
+    parser.add_argument('--texts', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--modes', nargs='+', default=['legacy', 'encoder'], choices=['legacy', 'encoder'])
+    parser.add_argument('--output', help="Write JSON results to this file (default: stdout).")
+    parser.add_argument('--worker', choices=['legacy', 'encoder'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.model_path:
+        os.environ['INSTRUCTOR_MODEL_PATH'] = args.model_path
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.texts, args.batch_size)))
+        return 0
+
+    results = {}
+    for mode in args.modes:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.instructor_encoder', '--worker', mode,
+             '--texts', str(args.texts), '--batch-size', str(args.batch_size)],
+            cwd=BASE_DIR, capture_output=True, text=True, env=os.environ.copy()
+        )
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            return completed.returncode
+        results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    if 'legacy' in results and 'encoder' in results:
+        legacy, encoder = results['legacy'], results['encoder']
+        results['ratios'] = {
+            "parameter_bytes": encoder['parameter_bytes'] / legacy['parameter_bytes'],
+            "peak_rss": encoder['peak_rss_mb'] / legacy['peak_rss_mb'],
+            "single_ms_p50": encoder['single_ms_p50'] / legacy['single_ms_p50'],
+        }
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Per-request logging overhead, before and after the queue-based structured logging setup.
+
+Replays the log calls one /ask request used to make (legacy: synchronous file +
+console handlers, eagerly formatted f-strings with a 500-char context preview and
+embedding values) and the calls it makes now (lazy %-formatting, payload previews
+at sampled DEBUG, records handed to a background writer), and reports the time
+spent in the request thread per request.
+
+Usage:
+    python -m benchmarks.logging_overhead --requests 5000 --output logging.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import contextlib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from utils import setup_logging, _stop_log_listener
+
+QUERY = "What projects has the candidate worked on?"
+CONTEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 200
+EMBEDDING = [0.0123456789] * 1536
+ANSWER = "The candidate has worked on several data platform projects. " * 20
+
+
+def legacy_request():
+    logging.info(f"🧠 Generating embeddings for the query: {QUERY}")
+    logging.info(f"🔍 Generating embeddings using the 'instructor-xl' model")
+    logging.info(f"🧠 Generating Instructor-XL embeddings for the provided text (first 100 chars): {QUERY[:100]}...")
+    logging.info(f"✅ Instructor-XL Embedding generated successfully with length: {len(EMBEDDING)}")
+    logging.info(f"✅ Successfully generated embedding for text: {QUERY[:50]}... Embedding (first 10 values): {EMBEDDING[:10]}")
+    logging.info("✅ Successfully initialized Pinecone with API key.")
+    logging.info(f"📘 Using Pinecone index name: rag-index")
+    logging.info(f"✅ Successfully connected to Pinecone index: 'rag-index'")
+    logging.info(f"🔍 Querying Pinecone with top_k=10, namespace=Santosh.pdf")
+    logging.info(f"🧠 Extracted context from Pinecone (first 500 chars): {CONTEXT[:500]}...")
+    logging.info(f"🧠 Sending context and query to ChatGPT for response generation")
+    logging.info(f"📊 Total tokens used: {1234}")
+    logging.info(f"🧠 ChatGPT response: {ANSWER[:200]}...")
+
+
+def current_request():
+    logging.info("🧠 Generating embeddings for the query (%d chars)", len(QUERY))
+    logging.debug("🔍 Generating embeddings using the 'instructor-xl' model")
+    logging.debug("🧠 Generating Instructor-XL embeddings for the provided text (%d chars)", len(QUERY))
+    logging.debug("✅ Instructor-XL Embedding generated successfully with length: %d", len(EMBEDDING))
+    logging.debug("✅ Successfully generated FastText embedding for text (%d chars), dimension %d", len(QUERY), len(EMBEDDING))
+    logging.debug("✅ Successfully initialized Pinecone with API key.")
+    logging.debug("📘 Using Pinecone index name: %s", 'rag-index')
+    logging.debug("✅ Successfully connected to Pinecone index: '%s'", 'rag-index')
+    logging.info("🔍 Querying Pinecone with top_k=10, namespace=%s", 'Santosh.pdf')
+    logging.info("🧠 Extracted context from Pinecone: %d matches, %d chars", 10, len(CONTEXT))
+    logging.debug("🧠 Context preview: %.500s", CONTEXT, extra={"sample_rate": 0.01})
+    logging.info("🧠 Sending context and query to ChatGPT for response generation")
+    logging.info("📊 Total tokens used: %s", 1234, extra={"total_tokens": 1234, "namespace": 'Santosh.pdf'})
+    logging.debug("🧠 ChatGPT response: %.200s", ANSWER, extra={"sample_rate": 0.01})
+
+
+def configure_legacy(log_file_path, level):
+    """The previous setup: basicConfig file handler plus a console handler, both synchronous."""
+    _stop_log_listener()
+    logging.basicConfig(
+        filename=log_file_path,
+        level=level,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        force=True
+    )
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(level)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logging.getLogger().addHandler(console_handler)
+
+
+def measure(request_fn, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-request logging overhead.")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--output', help="Write JSON results to this file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='rag-logbench-')
+    # Console output goes to /dev/null so the terminal doesn't dominate either measurement
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        for level_name in ('INFO', 'DEBUG', 'WARNING'):
+            level = getattr(logging, level_name)
+
+            configure_legacy(os.path.join(workdir, f'legacy-{level_name}.log'), level)
+            legacy_us = measure(legacy_request, args.requests)
+
+            setup_logging(os.path.join(workdir, f'current-{level_name}.log'), level_name, queue_size=args.requests * 20)
+            current_us = measure(current_request, args.requests)
+            _stop_log_listener()
+
+            results[level_name] = {
+                "legacy_us_per_request": legacy_us,
+                "current_us_per_request": current_us,
+                "speedup": legacy_us / current_us if current_us else None,
+            }
+
+    logging.getLogger().handlers.clear()
+    payload = json.dumps({"requests": args.requests, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload)
+        print(f"✅ Logging overhead results written to {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Local Pinecone stand-in served over HTTP, for offline tests and benchmarks.
+
+Implements the part of the Pinecone REST API this app uses, so the real
+`pinecone` client (and everything built on it) runs unchanged against it:
+
+    control plane   GET /indexes, POST /indexes, GET /indexes/<name>, DELETE /indexes/<name>
+    data plane      POST /vectors/upsert, POST /query, GET /vectors/fetch, POST /vectors/delete,
+                    GET /vectors/list, POST /describe_index_stats
+
+Every index is served under <server URL>/index/<name>, which `describe_index`
+reports as its host. Vectors are held in `InMemoryVectorStore` (a NumPy matrix
+per namespace, exact search, metadata filters). Latency and failures can be
+injected at startup, or changed while it runs through /_stub/faults.
+
+    python -m benchmarks.pinecone_server --port 5081 --latency-ms 20 --jitter-ms 10 --error-rate 0.01
+    PINECONE_HOST=http://localhost:5081 PINECONE_API_KEY=local python main.py
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import threading
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from flask import Flask, request, jsonify
+from benchmarks.stubs import InMemoryVectorStore
+
+# Data-plane and control-plane operations, named after the client methods; faults can target a subset
+OPERATIONS = ('list_indexes', 'create_index', 'describe_index', 'delete_index',
+              'upsert', 'query', 'fetch', 'delete', 'list', 'describe_index_stats')
+
+# gRPC-style codes Pinecone puts in error bodies
+_ERROR_CODES = {400: 3, 404: 5, 409: 6, 429: 8, 500: 13, 503: 14}
+
+
+class FaultInjector:
+    """
+    Latency and failures added to API calls.
+
+    Each call sleeps `latency_ms` plus up to `jitter_ms` (uniform), then
+    fails with `error_status` with probability `error_rate`. `operations`
+    limits both to some operations (None = all).
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, operations=None, seed=None):
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.update(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, error_status=error_status, operations=operations)
+
+    def update(self, **fields):
+        unknown = set(fields) - {'latency_ms', 'jitter_ms', 'error_rate', 'error_status', 'operations'}
+        if unknown:
+            raise ValueError(f"Unknown fault settings: {', '.join(sorted(unknown))}")
+        operations = fields.pop('operations', getattr(self, 'operations', None))
+        if operations is not None and set(operations) - set(OPERATIONS):
+            raise ValueError(f"Unknown operations: {', '.join(sorted(set(operations) - set(OPERATIONS)))}")
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self, name, int(value) if name == 'error_status' else float(value))
+            self.operations = set(operations) if operations is not None else None
+
+    def apply(self, operation):
+        """Sleep for the injected latency; returns the status to fail with, or None."""
+        with self.lock:
+            if self.operations is not None and operation not in self.operations:
+                return None
+            delay = (self.latency_ms + self.random.uniform(0, self.jitter_ms)) / 1000.0
+            fail = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return self.error_status if fail else None
+
+    def to_dict(self):
+        with self.lock:
+            return {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "error_rate": self.error_rate,
+                    "error_status": self.error_status, "operations": sorted(self.operations) if self.operations is not None else None}
+
+
+def _error(status, message):
+    return jsonify({"code": _ERROR_CODES.get(status, 2), "message": message, "details": []}), status
+
+
+def create_app(faults=None):
+    """The stand-in server as a Flask app; indexes live in the app for its lifetime."""
+    app = Flask(__name__)
+    faults = faults or FaultInjector()
+    indexes = {}
+    specs = {}
+    calls = Counter()
+    lock = threading.Lock()
+    app.config.update(faults=faults, indexes=indexes, calls=calls)
+
+    @app.before_request
+    def _inject_faults():
+        operation = request.endpoint
+        if operation not in OPERATIONS:
+            return None
+        with lock:
+            calls[operation] += 1
+        status = faults.apply(operation)
+        if status is not None:
+            return _error(status, f"Injected failure ({operation})")
+        return None
+
+    def index_model(name, store):
+        return {
+            "name": name,
+            "dimension": store.dimension,
+            "metric": store.metric,
+            "host": f"{request.host_url}index/{name}",
+            "spec": specs.get(name) or {"serverless": {"cloud": "aws", "region": "local"}},
+            "status": {"ready": True, "state": "Ready"},
+        }
+
+    def get_store(name):
+        with lock:
+            return indexes.get(name)
+
+    # ---- Control plane ----
+
+    @app.route('/indexes', methods=['GET'], endpoint='list_indexes')
+    def list_indexes():
+        with lock:
+            return jsonify({"indexes": [index_model(name, store) for name, store in indexes.items()]})
+
+    @app.route('/indexes', methods=['POST'], endpoint='create_index')
+    def create_index():
+        body = request.get_json(silent=True) or {}
+        name, dimension, metric = body.get('name'), body.get('dimension'), body.get('metric', 'cosine')
+        if not name or not isinstance(dimension, int) or dimension <= 0:
+            return _error(400, "name and a positive integer dimension are required")
+        if metric not in ('cosine', 'dotproduct', 'euclidean'):
+            return _error(400, f"Unknown metric '{metric}'")
+        with lock:
+            if name in indexes:
+                return _error(409, f"Resource {name} already exists")
+            indexes[name] = InMemoryVectorStore(name, dimension, metric)
+            specs[name] = body.get('spec')
+        logging.info("📦 Created index '%s' (%d dims, %s)", name, dimension, metric)
+        return jsonify(index_model(name, indexes[name])), 201
+
+    @app.route('/indexes/<name>', methods=['GET'], endpoint='describe_index')
+    def describe_index(name):
+        store = get_store(name)
+        if store is None:
+            return _error(404, f"Resource {name} not found")
+        return jsonify(index_model(name, store))
+
+    @app.route('/indexes/<name>', methods=['DELETE'], endpoint='delete_index')
+    def delete_index(name):
+        with lock:
+            if indexes.pop(name, None) is None:
+                return _error(404, f"Resource {name} not found")
+            specs.pop(name, None)
+        return '', 202
+
+    # ---- Data plane ----
+
+    def data_plane(handler):
+        def wrapped(name):
+            store = get_store(name)
+            if store is None:
+                return _error(404, f"Index {name} not found")
+            try:
+                return handler(store)
+            except (ValueError, KeyError) as e:
+                return _error(400, str(e))
+        return wrapped
+
+    @data_plane
+    def upsert(store):
+        body = request.get_json(silent=True) or {}
+        vectors = [{"id": v["id"], "values": v.get("values") or [], "metadata": v.get("metadata")} for v in body.get("vectors", [])]
+        store.upsert(vectors, namespace=body.get("namespace", ''))
+        return jsonify({"upsertedCount": len(vectors)})
+
+    @data_plane
+    def query(store):
+        body = request.get_json(silent=True) or {}
+        if body.get("vector") is None and body.get("id") is None:
+            raise ValueError("Either vector or id is required")
+        result = store.query(vector=body.get("vector"), id=body.get("id"), top_k=int(body.get("topK", 10)),
+                             namespace=body.get("namespace", ''), filter=body.get("filter"),
+                             include_metadata=body.get("includeMetadata", False), include_values=body.get("includeValues", False))
+        matches = [{"values": [], **match} for match in result["matches"]]
+        return jsonify({"matches": matches, "namespace": result["namespace"], "usage": {"readUnits": 5}})
+
+    @data_plane
+    def fetch(store):
+        namespace = request.args.get('namespace', '')
+        result = store.fetch(request.args.getlist('ids'), namespace=namespace)
+        return jsonify({"vectors": result["vectors"], "namespace": namespace, "usage": {"readUnits": 1}})
+
+    @data_plane
+    def delete(store):
+        body = request.get_json(silent=True) or {}
+        store.delete(ids=body.get("ids"), delete_all=body.get("deleteAll", False), namespace=body.get("namespace", ''), filter=body.get("filter"))
+        return jsonify({})
+
+    @data_plane
+    def list_ids(store):
+        namespace = request.args.get('namespace', '')
+        response = store.list_paginated(prefix=request.args.get('prefix', ''), limit=int(request.args.get('limit', 100)),
+                                        pagination_token=request.args.get('paginationToken'), namespace=namespace)
+        body = {"vectors": response.vectors, "namespace": namespace, "usage": {"readUnits": 1}}
+        if response.pagination is not None:
+            body["pagination"] = {"next": response.pagination.next}
+        return jsonify(body)
+
+    @data_plane
+    def describe_index_stats(store):
+        stats = store.describe_index_stats()
+        return jsonify({
+            "namespaces": {namespace: {"vectorCount": summary["vector_count"]} for namespace, summary in stats["namespaces"].items()},
+            "dimension": stats["dimension"],
+            "indexFullness": 0.0,
+            "totalVectorCount": stats["total_vector_count"],
+        })
+
+    for rule, methods, operation, handler in (
+        ('/vectors/upsert', ['POST'], 'upsert', upsert),
+        ('/query', ['POST'], 'query', query),
+        ('/vectors/fetch', ['GET'], 'fetch', fetch),
+        ('/vectors/delete', ['POST'], 'delete', delete),
+        ('/vectors/list', ['GET'], 'list', list_ids),
+        ('/describe_index_stats', ['GET', 'POST'], 'describe_index_stats', describe_index_stats),
+    ):
+        app.add_url_rule(f'/index/<name>{rule}', endpoint=operation, view_func=handler, methods=methods)
+
+    # ---- Test controls (never faulted) ----
+
+    @app.route('/_stub/faults', methods=['GET', 'POST'])
+    def stub_faults():
+        if request.method == 'POST':
+            try:
+                faults.update(**(request.get_json(silent=True) or {}))
+            except (TypeError, ValueError) as e:
+                return _error(400, str(e))
+        return jsonify(faults.to_dict())
+
+    @app.route('/_stub/stats', methods=['GET'])
+    def stub_stats():
+        with lock:
+            return jsonify({"calls": dict(calls), "indexes": {name: store.describe_index_stats()["total_vector_count"] for name, store in indexes.items()}})
+
+    @app.route('/_stub/reset', methods=['POST'])
+    def stub_reset():
+        with lock:
+            indexes.clear()
+            specs.clear()
+            calls.clear()
+        return jsonify({})
+
+    return app
+
+
+def start_pinecone_server(faults=None, host='127.0.0.1', port=0):
+    """Serve a stand-in from a background thread; returns (server, base URL)."""
+    from werkzeug.serving import make_server
+    server = make_server(host, port, create_app(faults), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Pinecone-compatible server (in-memory, exact search).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5081)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latency added to every call.")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Extra uniform random latency, up to this much.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of calls that fail.")
+    parser.add_argument('--error-status', type=int, default=503, help="HTTP status of injected failures (e.g. 429, 500, 503).")
+    parser.add_argument('--operations', help=f"Comma-separated operations faults apply to (default all: {', '.join(OPERATIONS)}).")
+    parser.add_argument('--seed', type=int, help="Seed for jitter and failures, for repeatable runs.")
+    parser.add_argument('--index', action='append', default=[], metavar='NAME:DIMENSION[:METRIC]', help="Index to create at startup (repeatable).")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    operations = [operation.strip() for operation in args.operations.split(',')] if args.operations else None
+    faults = FaultInjector(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, operations, args.seed)
+    app = create_app(faults)
+    for spec in args.index:
+        name, dimension, *metric = spec.split(':')
+        app.config['indexes'][name] = InMemoryVectorStore(name, int(dimension), metric[0] if metric else 'cosine')
+    print(f"🌲 Pinecone stand-in on http://{args.host}:{args.port} (set PINECONE_HOST to this URL); faults: {faults.to_dict()}")
+    app.run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""
+Traffic replay: drive a running instance with the request mix recorded in production.
+
+Reads a sanitized traffic log written by the app with TRAFFIC_LOG_ENABLED=true
+(see utilities/traffic_utility.py) and re-issues its requests:
+
+- at the recorded pace (`--speed 1`), compressed (`--speed 5`), or
+- open-loop at a fixed rate (`--rps 50`), cycling through the recorded mix;
+  arrivals do not wait for earlier responses, so queueing shows up as latency.
+
+The log holds request shapes, not content, so payloads are synthesized: /ask
+queries of the recorded length, /create-new-rag from a sample PDF, /add-file
+uploads of the recorded size. Recorded namespaces (hashed by default) are
+mapped to replay namespaces that are ingested before the measured run.
+Deletions and other destructive requests are counted but not replayed.
+
+Latency is measured from each request's scheduled send time, so a client or
+server that falls behind is charged for it. The report has per-route latency
+percentiles, error rates and status codes, plus throughput over time.
+
+Without `--target`, the app is booted in-process against the stub backends
+(same options as benchmarks/run_benchmarks.py) so capacity can be explored offline.
+
+Usage:
+    python -m benchmarks.replay_traffic logs/traffic.jsonl --speed 1 --output replay.json
+    python -m benchmarks.replay_traffic logs/traffic.jsonl --rps 50 --duration 120 --target http://localhost:5001
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.run_benchmarks import SAMPLE_QUERIES, add_stub_arguments, install_stubs, start_server, summarize, git_revision
+
+# Routes whose replay would delete or reconfigure data on the target
+SKIPPED_ROUTES = ('/delete-rag', '/remove-file', '/set-default-rag', '/add-url')
+
+QUERY_WORDS = ' '.join(SAMPLE_QUERIES).split()
+
+
+def load_log(path, routes=None):
+    """Recorded entries in time order, optionally only those whose route is in `routes`."""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get('route') and (not routes or entry['route'] in routes):
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
+
+
+def schedule(entries, speed=None, rps=None, duration=None, poisson=False, seed=0):
+    """
+    (offset seconds, entry) pairs to send.
+
+    With `rps`, arrivals are evenly spaced (or exponential with `poisson`) and
+    cycle through the entries for `duration` seconds (default: one pass).
+    Otherwise recorded inter-arrival times are divided by `speed`.
+    """
+    if not entries:
+        return []
+    if rps:
+        rng = random.Random(seed)
+        count = int(duration * rps) if duration else len(entries)
+        offsets, offset = [], 0.0
+        for _ in range(count):
+            offsets.append(offset)
+            offset += rng.expovariate(rps) if poisson else 1.0 / rps
+        return [(offset, entries[i % len(entries)]) for i, offset in enumerate(offsets)]
+    start = entries[0]['ts']
+    plan = [((entry['ts'] - start) / speed, entry) for entry in entries]
+    return [item for item in plan if not duration or item[0] <= duration]
+
+
+def synthetic_query(chars, rng):
+    words = []
+    while sum(len(word) + 1 for word in words) < max(chars, 1):
+        words.append(rng.choice(QUERY_WORDS))
+    return ' '.join(words)[:max(chars, 1)] or 'summary'
+
+
+class Workload:
+    """Turns recorded entries into concrete requests against one target."""
+
+    def __init__(self, base_url, workdir, pdf, keep_namespaces=False, seed=0):
+        self.base_url = base_url
+        self.workdir = workdir
+        self.pdf = pdf
+        self.keep_namespaces = keep_namespaces
+        self.rng = random.Random(seed)
+        self.uploads = 0
+        self.lock = threading.Lock()
+        os.makedirs(workdir, exist_ok=True)
+
+    def namespace(self, token):
+        """Replay namespace for a recorded one: a PDF copy named after the token."""
+        if token is None:
+            return None
+        if self.keep_namespaces:
+            return token
+        file_name = f"replay-{token}.pdf"
+        path = os.path.join(self.workdir, file_name)
+        if not os.path.exists(path):
+            shutil.copyfile(self.pdf, path)
+        return file_name
+
+    def setup_namespaces(self, entries):
+        """Recorded namespaces that are queried before (or without) being created in the log."""
+        created, needed = set(), []
+        for entry in entries:
+            token = entry.get('namespace')
+            if not token or entry['route'] in SKIPPED_ROUTES:
+                continue
+            if entry['route'].startswith('/create-new-rag'):
+                created.add(token)
+            elif token not in created and token not in needed:
+                needed.append(token)
+        return needed
+
+    def request(self, entry):
+        """(method, url, requests kwargs), or None when the entry isn't replayed."""
+        route, method = entry['route'], entry.get('method', 'GET')
+        if route.startswith(SKIPPED_ROUTES):
+            return None
+        namespace = self.namespace(entry.get('namespace'))
+        if route.startswith('/create-new-rag'):
+            return 'POST', f"{self.base_url}/create-new-rag", {"json": {
+                "file_path": os.path.join(self.workdir, namespace or self.namespace('default')), "rag_name": namespace}}
+        if route.startswith('/add-file'):
+            with self.lock:
+                self.uploads += 1
+                file_name = f"replay-upload-{self.uploads}.txt"
+            size = max(entry.get('request_bytes', 0) - 200, 64)  # Minus multipart framing
+            text = (synthetic_query(200, self.rng) + '\n') * (size // 200 + 1)
+            return 'POST', f"{self.base_url}/add-file", {
+                "files": {"file": (file_name, text[:size].encode('utf-8'), 'text/plain')},
+                "data": {"namespace": namespace or ''}}
+        if route.startswith('/ask') and method == 'POST':
+            payload = {"namespace": namespace}
+            if entry.get('batch_size'):
+                payload["queries"] = [synthetic_query(entry.get('query_chars', 40), self.rng) for _ in range(entry['batch_size'])]
+            else:
+                payload["query"] = synthetic_query(entry.get('query_chars', 40), self.rng)
+            return 'POST', f"{self.base_url}{route}", {"json": payload}
+        if method == 'GET':
+            path = route
+            for placeholder in ('<namespace>', '<rag_name>', '<string:namespace>', '<string:rag_name>'):
+                path = path.replace(placeholder, os.path.basename(namespace or ''))
+            if '<' in path:
+                path = path[:path.index('<')]
+            return 'GET', f"{self.base_url}{path}", {}
+        return None
+
+
+class Replay:
+    """Sends a schedule open-loop and records per-request outcomes."""
+
+    def __init__(self, session, workload, max_in_flight=256, timeout=120):
+        self.session = session
+        self.workload = workload
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.results = []
+        self.skipped = {}
+        self.lock = threading.Lock()
+
+    def _send(self, route, request, scheduled_at):
+        method, url, kwargs = request
+        sent_at = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        finished = time.perf_counter()
+        with self.lock:
+            self.results.append({
+                "route": route,
+                "scheduled": scheduled_at,
+                "latency": finished - scheduled_at,
+                "service_latency": finished - sent_at,
+                "status": status,
+                "finished": finished,
+            })
+
+    def run(self, plan):
+        """Send every planned request at its offset; returns the wall time in seconds."""
+        started = time.perf_counter()
+        self.max_lag = 0.0
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for offset, entry in plan:
+                request = self.workload.request(entry)
+                if request is None:
+                    self.skipped[entry['route']] = self.skipped.get(entry['route'], 0) + 1
+                    continue
+                scheduled_at = started + offset
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+                pool.submit(self._send, entry['route'], request, scheduled_at)
+        self.started = started
+        return time.perf_counter() - started
+
+
+def is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def report(replay, elapsed, bucket_seconds):
+    """Per-route latency and errors, overall totals and a throughput timeline."""
+    by_route = {}
+    for result in replay.results:
+        by_route.setdefault(result['route'], []).append(result)
+
+    def describe(results, wall):
+        ok = [result for result in results if not is_error(result['status'])]
+        summary = summarize([result['latency'] for result in ok], wall, len(results) - len(ok))
+        summary["error_rate"] = (len(results) - len(ok)) / len(results) if results else 0.0
+        summary["service_p50_ms"] = summarize([result['service_latency'] for result in ok]).get("p50_ms")
+        statuses = {}
+        for result in results:
+            statuses[str(result['status'])] = statuses.get(str(result['status']), 0) + 1
+        summary["statuses"] = statuses
+        return summary
+
+    timeline = []
+    buckets = {}
+    for result in replay.results:
+        buckets.setdefault(int((result['finished'] - replay.started) // bucket_seconds), []).append(result)
+    for bucket in range(max(buckets) + 1 if buckets else 0):
+        results = buckets.get(bucket, [])
+        ok = [result['latency'] for result in results if not is_error(result['status'])]
+        latency = summarize(ok)
+        timeline.append({
+            "t_s": bucket * bucket_seconds,
+            "completed": len(results),
+            "errors": len(results) - len(ok),
+            "throughput_rps": len(results) / bucket_seconds,
+            "p50_ms": latency.get("p50_ms"),
+            "p99_ms": latency.get("p99_ms"),
+        })
+
+    return {
+        "overall": describe(replay.results, elapsed),
+        "routes": {route: describe(results, elapsed) for route, results in sorted(by_route.items())},
+        "skipped": replay.skipped,
+        "max_dispatch_lag_ms": replay.max_lag * 1000.0,
+        "timeline": timeline,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded traffic log against the app.")
+    parser.add_argument('log', help="Traffic log written with TRAFFIC_LOG_ENABLED=true.")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument('--speed', type=float, default=1.0, help="Replay at N x the recorded pace (default 1).")
+    pace.add_argument('--rps', type=float, help="Open-loop target rate, cycling through the recorded mix.")
+    parser.add_argument('--poisson', action='store_true', help="With --rps, use exponential inter-arrival times.")
+    parser.add_argument('--duration', type=float, help="Stop scheduling after this many seconds.")
+    parser.add_argument('--routes', nargs='+', help="Only replay these route templates (e.g. /ask).")
+    parser.add_argument('--target', help="Base URL of a running instance (default: boot the app on stub backends).")
+    parser.add_argument('--workdir', help="Folder for replay PDFs; must be readable by the target (default: temporary).")
+    parser.add_argument('--keep-namespaces', action='store_true', help="Use recorded namespace names as-is (unhashed logs).")
+    parser.add_argument('--skip-setup', action='store_true', help="Don't ingest the namespaces the log queries first.")
+    parser.add_argument('--setup-concurrency', type=int, default=4)
+    parser.add_argument('--max-in-flight', type=int, default=256, help="Concurrent requests the client can keep open.")
+    parser.add_argument('--bucket-seconds', type=float, default=1.0, help="Timeline resolution.")
+    parser.add_argument('--seed', type=int, default=0)
+    add_stub_arguments(parser)
+    parser.add_argument('--output', help="Write JSON results to this file (default: stdout).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    entries = load_log(args.log, args.routes)
+    plan = schedule(entries, speed=args.speed, rps=args.rps, duration=args.duration, poisson=args.poisson, seed=args.seed)
+    if not plan:
+        print(f"❌ No replayable entries in {args.log}", file=sys.stderr)
+        return 1
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='rag-replay-')
+    server, workload = None, None
+    try:
+        base_url = args.target
+        if not base_url:
+            install_stubs(args, workdir)
+            server, base_url = start_server()
+
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=args.max_in_flight, pool_maxsize=args.max_in_flight)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        workload = Workload(base_url.rstrip('/'), os.path.join(workdir, 'replay-docs'), args.pdf, args.keep_namespaces, args.seed)
+        if not args.skip_setup and not args.keep_namespaces:
+            needed = workload.setup_namespaces([entry for _, entry in plan])
+            started = time.perf_counter()
+            setup = [(0.0, {"route": '/create-new-rag', "method": 'POST', "namespace": token}) for token in needed]
+            preparation = Replay(session, workload, args.setup_concurrency)
+            preparation.run(setup)
+            failed = sum(1 for result in preparation.results if is_error(result['status']))
+            print(f"📦 Ingested {len(needed) - failed}/{len(needed)} namespaces for the replay in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+        replay = Replay(session, workload, args.max_in_flight)
+        elapsed = replay.run(plan)
+        results = report(replay, elapsed, args.bucket_seconds)
+    finally:
+        if server is not None:
+            server.shutdown()
+            # /add-file saves uploads under ./data of the serving process, which here is this one
+            for number in range(1, (workload.uploads if workload else 0) + 1):
+                try:
+                    os.remove(os.path.join('data', f"replay-upload-{number}.txt"))
+                except OSError:
+                    pass
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "git_revision": git_revision(),
+        "target": args.target or "stubs",
+        "params": {k: v for k, v in vars(args).items() if k != 'output'},
+        "planned_requests": len(plan),
+        "target_rps": args.rps or (len(plan) / plan[-1][0] if plan[-1][0] else None),
+        "results": results,
+    }
+    payload = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload)
+        print(f"✅ Replay results written to {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
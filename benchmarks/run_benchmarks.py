@@ -0,0 +1,342 @@
+"""
+Offline end-to-end benchmark suite.
+
+Boots the Flask app in-process against local stand-ins (an in-memory vector
+store, a fake chat completion and a hashing embedder) and measures:
+
+- /ask latency and throughput under concurrency
+- /create-new-rag ingestion throughput (docs/sec)
+- listing endpoint latency (/view-rags, /view-namespace-summary, /list-files, /tree-view)
+
+Results are written as JSON so runs can be diffed with `--compare`.
+
+Usage:
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json --output current.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from benchmarks.stubs import StubPinecone, FakeChatCompletion, FakeOpenAIAdapter, HashingEmbedder
+
+STUB_INDEX_NAME = 'rag-index'
+
+SAMPLE_QUERIES = [
+    "What projects has the candidate worked on?",
+    "Summarize the work experience.",
+    "Which programming languages are mentioned?",
+    "What education does the candidate have?",
+    "List notable accomplishments.",
+]
+
+
+def install_stubs(args, workdir):
+    """
+    Point the app's external dependencies at local stand-ins.
+
+    Must run before `main` is imported: route modules create their Pinecone
+    clients and Config reads the environment at import time.
+    """
+    os.environ['PINECONE_API_KEY'] = 'stub'
+    os.environ['PINECONE_INDEX_NAME'] = STUB_INDEX_NAME
+    os.environ['OPENAI_API_KEY'] = 'stub'
+    os.environ['LOGGING_LEVEL'] = args.log_level
+    os.environ['HEALTHCHECK_ENABLED'] = 'false'
+    os.environ['LOG_FILE_PATH'] = os.path.join(workdir, 'logs', 'errors.log')
+    os.environ['FAISS_INDEX_PATH'] = os.path.join(workdir, 'faiss_index')
+    os.environ['DOCUMENT_STORE_PATH'] = os.path.join(workdir, 'doc_store', 'documents.db')
+    os.environ['NAMESPACE_REGISTRY_PATH'] = os.path.join(workdir, 'doc_store', 'namespaces.json')
+    os.environ['EMBEDDING_MODEL'] = 'instructor-xl'
+    os.makedirs(os.path.join(workdir, 'logs'), exist_ok=True)
+    os.makedirs(os.environ['FAISS_INDEX_PATH'], exist_ok=True)
+
+    if args.pinecone_server:
+        # The real pinecone client over HTTP, against the local stand-in
+        from pinecone import Pinecone, ServerlessSpec
+        url = args.pinecone_server
+        if url == 'local':
+            from benchmarks.pinecone_server import start_pinecone_server, FaultInjector
+            _, url = start_pinecone_server(FaultInjector(latency_ms=args.vector_latency_ms))
+        os.environ['PINECONE_HOST'] = url
+        pc = Pinecone(api_key='stub', host=url)
+        if STUB_INDEX_NAME in pc.list_indexes().names():
+            pc.delete_index(STUB_INDEX_NAME)
+        pc.create_index(STUB_INDEX_NAME, dimension=args.dimension, metric='cosine', spec=ServerlessSpec(cloud='aws', region='us-east-1'))
+    else:
+        import pinecone
+        StubPinecone.reset()
+        StubPinecone.query_latency = args.vector_latency_ms / 1000.0
+        StubPinecone().create_index(STUB_INDEX_NAME, dimension=args.dimension, metric='cosine')
+        pinecone.Pinecone = StubPinecone
+
+    chat = FakeChatCompletion(
+        latency=args.llm_latency_ms / 1000.0,
+        completion_tokens=args.completion_tokens,
+        prompt_tokens=args.prompt_tokens
+    )
+    from services.llm_client import get_llm_client
+    get_llm_client().session.mount('https://', FakeOpenAIAdapter(chat, throttle_rate=args.llm_throttle_rate))
+
+    embedder = HashingEmbedder(args.dimension)
+    from services.embedding_backends import EmbeddingBackend, register_backend
+
+    class HashingBackend(EmbeddingBackend):
+        name = 'instructor-xl'
+        _dimension = args.dimension
+
+        def embed(self, text):
+            return embedder.embed(text)
+
+    # Served under the default backend's name so namespaces register exactly as in production
+    register_backend('instructor-xl', HashingBackend)
+
+    return chat
+
+
+def start_server():
+    """Serve the app on an ephemeral localhost port from a background thread."""
+    from werkzeug.serving import make_server
+    from main import app
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    """Latency percentiles in milliseconds, plus throughput when the wall time is known."""
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000.0
+
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": statistics.fmean(ordered) * 1000.0,
+        "min_ms": ordered[0] * 1000.0,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000.0,
+    }
+    if elapsed:
+        summary["elapsed_s"] = elapsed
+        summary["throughput_rps"] = len(ordered) / elapsed
+    return summary
+
+
+def run_load(session, method, url, payloads, concurrency):
+    """Issue one request per payload with `concurrency` workers; return (latencies, errors, elapsed)."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(payload):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, json=payload, timeout=120)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        duration = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(duration)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, payloads))
+    return latencies, errors, time.perf_counter() - start
+
+
+def bench_ingestion(session, base_url, args, workdir):
+    """POST /create-new-rag for copies of the sample PDF, each into its own namespace."""
+    docs_dir = os.path.join(workdir, 'docs')
+    os.makedirs(docs_dir, exist_ok=True)
+    payloads = []
+    for i in range(args.ingest_docs):
+        path = os.path.join(docs_dir, f"bench-doc-{i}.pdf")
+        shutil.copyfile(args.pdf, path)
+        payloads.append({"file_path": path, "rag_name": f"bench-rag-{i}"})
+
+    latencies, errors, elapsed = run_load(session, 'POST', f"{base_url}/create-new-rag", payloads, args.ingest_concurrency)
+    summary = summarize(latencies, elapsed, errors)
+    summary["docs_per_sec"] = len(latencies) / elapsed if elapsed else 0.0
+    summary["concurrency"] = args.ingest_concurrency
+    namespaces = [os.path.basename(p["file_path"]) for p in payloads]
+    return summary, namespaces
+
+
+def bench_ask(session, base_url, args, namespaces):
+    """POST /ask at each configured concurrency level."""
+    results = {}
+    for concurrency in args.ask_concurrency:
+        payloads = [
+            {"query": SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)], "namespace": namespaces[i % len(namespaces)]}
+            for i in range(args.ask_requests)
+        ]
+        latencies, errors, elapsed = run_load(session, 'POST', f"{base_url}/ask", payloads, concurrency)
+        results[f"c{concurrency}"] = summarize(latencies, elapsed, errors)
+    return results
+
+
+def bench_listing(session, base_url, args, namespaces):
+    """GET each listing endpoint sequentially so results reflect per-request cost."""
+    endpoints = {
+        "view_rags": "/view-rags",
+        "namespace_summary": f"/view-namespace-summary/{namespaces[0]}",
+        "list_files": "/list-files",
+        "tree_view": "/tree-view/",
+        "health": "/health",
+    }
+    results = {}
+    for name, path in endpoints.items():
+        latencies, errors, elapsed = run_load(session, 'GET', f"{base_url}{path}", [None] * args.listing_requests, 1)
+        results[name] = summarize(latencies, elapsed, errors)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, current, threshold):
+    """
+    Print per-metric deltas against a baseline run.
+
+    Returns the list of regressions: latency metrics that grew, or throughput
+    metrics that shrank, by more than `threshold` (a fraction).
+    """
+    regressions = []
+
+    def walk(base, cur, path):
+        for key, value in cur.items():
+            if key not in base:
+                continue
+            if isinstance(value, dict):
+                walk(base[key], value, f"{path}.{key}" if path else key)
+                continue
+            if not isinstance(value, (int, float)) or not base[key]:
+                continue
+            delta = (value - base[key]) / base[key]
+            name = f"{path}.{key}"
+            worse = delta > threshold if key.endswith('_ms') else delta < -threshold if key.endswith(('_rps', '_per_sec')) else False
+            if key.endswith(('_ms', '_rps', '_per_sec')):
+                print(f"{'REGRESSION ' if worse else ''}{name}: {base[key]:.2f} -> {value:.2f} ({delta:+.1%})")
+            if worse:
+                regressions.append(name)
+
+    walk(baseline.get("results", {}), current.get("results", {}), "")
+    return regressions
+
+
+def add_stub_arguments(parser):
+    """Options shaping the stub backends (shared with benchmarks/replay_traffic.py)."""
+    parser.add_argument('--pdf', default=os.path.join(BASE_DIR, 'data', 'Santosh.pdf'), help="PDF used for ingestion.")
+    parser.add_argument('--dimension', type=int, default=1536, help="Embedding / stub index dimension.")
+    parser.add_argument('--llm-latency-ms', type=float, default=500.0, help="Fake chat completion latency.")
+    parser.add_argument('--llm-throttle-rate', type=float, default=0.0, help="Fraction of chat calls answered with a 429.")
+    parser.add_argument('--completion-tokens', type=int, default=150, help="Fake completion length in tokens.")
+    parser.add_argument('--prompt-tokens', type=int, default=None, help="Fixed prompt token count (default: estimated).")
+    parser.add_argument('--vector-latency-ms', type=float, default=0.0, help="Injected latency per vector store call.")
+    parser.add_argument('--pinecone-server', metavar='URL',
+                        help="Use the real pinecone client against a benchmarks.pinecone_server at URL ('local' starts one in-process).")
+    parser.add_argument('--log-level', default='WARNING', help="App logging level during the run.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks against stub backends.")
+    add_stub_arguments(parser)
+    parser.add_argument('--ingest-docs', type=int, default=20)
+    parser.add_argument('--ingest-concurrency', type=int, default=4)
+    parser.add_argument('--ask-requests', type=int, default=100)
+    parser.add_argument('--ask-concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--listing-requests', type=int, default=50)
+    parser.add_argument('--output', help="Write JSON results to this file (default: stdout).")
+    parser.add_argument('--compare', help="Baseline JSON results to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative change counted as a regression.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='rag-bench-')
+    try:
+        chat = install_stubs(args, workdir)
+        server, base_url = start_server()
+
+        import requests
+        from utilities.metrics_utility import metrics
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=64)
+        session.mount('http://', adapter)
+
+        ingestion, namespaces = bench_ingestion(session, base_url, args, workdir)
+        ask = bench_ask(session, base_url, args, namespaces)
+        listing = bench_listing(session, base_url, args, namespaces)
+        server.shutdown()
+
+        report = {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+            "results": {
+                "ingestion": ingestion,
+                "ask": ask,
+                "listing": listing,
+                "llm_calls": chat.calls,
+                "llm_throttle_events": metrics.counter('llm_throttle_events_total').get(operation='chat'),
+                "singleflight_collapsed": {
+                    layer: metrics.counter('singleflight_collapsed_total').get(layer=layer)
+                    for layer in ('embedding', 'retrieval', 'llm')
+                },
+            }
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload)
+        print(f"✅ Benchmark results written to {args.output}")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+import re
+import json
+import time
+import zlib
+import random
+import threading
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+from utilities.metadata_filter_utility import matches_filter
+
+
+class InMemoryNamespace:
+    """
+    Vectors and metadata for a single namespace, held in a contiguous NumPy matrix.
+
+    Rows are appended on upsert and swapped out on delete so that an exact
+    similarity search is a single matrix-vector product.
+    """
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.ids = []
+        self.metadata = []
+        self.row_by_id = {}
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.size = 0
+
+    def upsert(self, vector_id, values, metadata):
+        values = np.asarray(values, dtype=np.float32).reshape(-1)
+        if values.shape[0] != self.dimension:
+            raise ValueError(
+                f"Vector dimension {values.shape[0]} does not match the dimension of the index {self.dimension}"
+            )
+
+        row = self.row_by_id.get(vector_id)
+        if row is None:
+            if self.size == self.matrix.shape[0]:
+                grown = np.zeros((max(16, self.size * 2), self.dimension), dtype=np.float32)
+                grown[:self.size] = self.matrix[:self.size]
+                self.matrix = grown
+            row = self.size
+            self.size += 1
+            self.ids.append(vector_id)
+            self.metadata.append(metadata or {})
+            self.row_by_id[vector_id] = row
+        else:
+            self.metadata[row] = metadata or {}
+        self.matrix[row] = values
+
+    def delete(self, vector_id):
+        row = self.row_by_id.pop(vector_id, None)
+        if row is None:
+            return False
+        last = self.size - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved_id
+            self.metadata[row] = self.metadata[last]
+            self.row_by_id[moved_id] = row
+        self.ids.pop()
+        self.metadata.pop()
+        self.size -= 1
+        return True
+
+    def scores(self, vector, metric):
+        matrix = self.matrix[:self.size]
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if metric == 'euclidean':
+            return -np.linalg.norm(matrix - query, axis=1)
+        scores = matrix @ query
+        if metric == 'cosine':
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+            norms[norms == 0] = 1.0
+            scores = scores / norms
+        return scores
+
+
+class InMemoryVectorStore:
+    """
+    Exact-search stand-in for a single Pinecone index.
+
+    Implements the data-plane calls the routes make (upsert, query, delete,
+    fetch, list, describe_index_stats) and returns plain dicts, which support
+    the same `.get(...)` access the routes use on Pinecone responses.
+    """
+
+    def __init__(self, name, dimension, metric='cosine'):
+        self.name = name
+        self.dimension = dimension
+        self.metric = metric
+        self.namespaces = {}
+        self.lock = threading.RLock()
+
+    def _namespace(self, namespace, create=False):
+        namespace = namespace or ''
+        if namespace not in self.namespaces and create:
+            self.namespaces[namespace] = InMemoryNamespace(self.dimension)
+        return self.namespaces.get(namespace)
+
+    def upsert(self, vectors, namespace='', **kwargs):
+        with self.lock:
+            store = self._namespace(namespace, create=True)
+            for vector in vectors:
+                if isinstance(vector, tuple):
+                    vector = {"id": vector[0], "values": vector[1], "metadata": vector[2] if len(vector) > 2 else {}}
+                store.upsert(vector["id"], vector["values"], vector.get("metadata"))
+            return {"upserted_count": len(vectors)}
+
+    def query(self, vector=None, top_k=10, namespace='', filter=None, include_metadata=False,
+              include_values=False, id=None, **kwargs):
+        with self.lock:
+            store = self._namespace(namespace)
+            if store is None or store.size == 0:
+                return {"matches": [], "namespace": namespace or ''}
+            if vector is None and id is not None:
+                vector = store.matrix[store.row_by_id[id]]
+
+            scores = store.scores(vector, self.metric)
+            if filter:
+                allowed = np.array([matches_filter(m, filter) for m in store.metadata[:store.size]], dtype=bool)
+                scores = np.where(allowed, scores, -np.inf)
+
+            top_k = min(top_k, store.size)
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+            candidates = candidates[np.argsort(-scores[candidates])]
+
+            matches = []
+            for row in candidates:
+                if not np.isfinite(scores[row]):
+                    continue
+                match = {"id": store.ids[row], "score": float(scores[row])}
+                if include_metadata:
+                    match["metadata"] = dict(store.metadata[row])
+                if include_values:
+                    match["values"] = store.matrix[row].tolist()
+                matches.append(match)
+            return {"matches": matches, "namespace": namespace or ''}
+
+    def fetch(self, ids, namespace='', **kwargs):
+        with self.lock:
+            store = self._namespace(namespace)
+            vectors = {}
+            for vector_id in ids:
+                row = store.row_by_id.get(vector_id) if store else None
+                if row is not None:
+                    vectors[vector_id] = {
+                        "id": vector_id,
+                        "values": store.matrix[row].tolist(),
+                        "metadata": dict(store.metadata[row])
+                    }
+            return {"vectors": vectors, "namespace": namespace or ''}
+
+    def delete(self, ids=None, delete_all=False, namespace='', filter=None, **kwargs):
+        with self.lock:
+            namespace = namespace or ''
+            if delete_all:
+                self.namespaces.pop(namespace, None)
+                return {}
+            store = self._namespace(namespace)
+            if store is None:
+                return {}
+            if filter:
+                ids = [store.ids[row] for row in range(store.size) if matches_filter(store.metadata[row], filter)]
+            for vector_id in ids or []:
+                store.delete(vector_id)
+            return {}
+
+    def list_paginated(self, prefix='', limit=100, pagination_token=None, namespace='', **kwargs):
+        with self.lock:
+            store = self._namespace(namespace)
+            ids = sorted(i for i in (store.ids if store else []) if i.startswith(prefix or ''))
+            # Like Pinecone, the token is a position in id order (the last id returned), not an offset,
+            # so deleting already-listed ids between pages doesn't skip any
+            if pagination_token:
+                ids = [i for i in ids if i > pagination_token]
+            page = ids[:limit]
+            next_token = page[-1] if len(ids) > limit else None
+            return StubListResponse(page, next_token, namespace or '')
+
+    def list(self, prefix='', limit=100, namespace='', **kwargs):
+        token = None
+        while True:
+            response = self.list_paginated(prefix=prefix, limit=limit, pagination_token=token, namespace=namespace)
+            if response.vectors:
+                yield [v["id"] for v in response.vectors]
+            token = response.pagination.next if response.pagination else None
+            if not token:
+                break
+
+    def describe_index_stats(self, **kwargs):
+        with self.lock:
+            namespaces = {ns: {"vector_count": store.size} for ns, store in self.namespaces.items()}
+            return {
+                "dimension": self.dimension,
+                "namespaces": namespaces,
+                "total_vector_count": sum(s["vector_count"] for s in namespaces.values())
+            }
+
+
+class StubPagination:
+    def __init__(self, next_token):
+        self.next = next_token
+
+
+class StubListResponse:
+    """Mirrors the attribute access of Pinecone's `list_paginated` response."""
+
+    def __init__(self, ids, next_token, namespace):
+        self.vectors = [{"id": vector_id} for vector_id in ids]
+        self.pagination = StubPagination(next_token) if next_token else None
+        self.namespace = namespace
+
+
+class StubIndexList(list):
+    def names(self):
+        return [index["name"] for index in self]
+
+
+class StubPinecone:
+    """
+    Drop-in replacement for `pinecone.Pinecone` backed by `InMemoryVectorStore`.
+
+    Every instance shares the same class-level registry, so the separate
+    clients that route modules create at import time all see the same data.
+    """
+
+    indexes = {}
+    query_latency = 0.0
+    lock = threading.Lock()
+
+    def __init__(self, api_key=None, **kwargs):
+        self.api_key = api_key
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.indexes = {}
+
+    def list_indexes(self):
+        with self.lock:
+            return StubIndexList(
+                {"name": name, "dimension": index.dimension, "metric": index.metric}
+                for name, index in self.indexes.items()
+            )
+
+    def create_index(self, name, dimension, metric='cosine', spec=None, **kwargs):
+        with self.lock:
+            if name not in self.indexes:
+                self.indexes[name] = InMemoryVectorStore(name, dimension, metric)
+
+    def delete_index(self, name, **kwargs):
+        with self.lock:
+            self.indexes.pop(name, None)
+
+    def describe_index(self, name):
+        index = self.indexes[name]
+        return {"name": name, "dimension": index.dimension, "metric": index.metric, "host": f"stub://{name}"}
+
+    def Index(self, name=None, host=None, **kwargs):
+        with self.lock:
+            if name not in self.indexes:
+                raise KeyError(f"Index '{name}' does not exist")
+            index = self.indexes[name]
+        return LatencyInjectingIndex(index, self.query_latency) if self.query_latency else index
+
+
+class LatencyInjectingIndex:
+    """Wraps an index and sleeps before each data-plane call to model network round trips."""
+
+    def __init__(self, index, latency):
+        self._index = index
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attribute = getattr(self._index, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            time.sleep(self._latency)
+            return attribute(*args, **kwargs)
+        return call
+
+
+class AttrDict(dict):
+    """Dict that also exposes keys as attributes, like OpenAI's legacy response objects."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FakeChatCompletion:
+    """
+    Stand-in for `openai.ChatCompletion` with configurable latency and token usage.
+
+    Prompt tokens are estimated at four characters per token unless a fixed
+    count is given; completion length is fixed so runs are reproducible.
+    """
+
+    def __init__(self, latency=0.5, completion_tokens=150, prompt_tokens=None):
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.prompt_tokens = prompt_tokens
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def create(self, model=None, messages=None, max_tokens=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+        prompt_chars = sum(len(message.get("content", "")) for message in messages or [])
+        prompt_tokens = self.prompt_tokens if self.prompt_tokens is not None else max(1, prompt_chars // 4)
+        completion_tokens = min(self.completion_tokens, max_tokens or self.completion_tokens)
+        content = " ".join(["token"] * completion_tokens)
+
+        return AttrDict({
+            "model": model,
+            "choices": [AttrDict({"index": 0, "message": AttrDict({"role": "assistant", "content": content})})],
+            "usage": AttrDict({
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            })
+        })
+
+
+class FakeOpenAIAdapter(BaseAdapter):
+    """
+    requests transport adapter answering OpenAI `/chat/completions` calls from a FakeChatCompletion.
+
+    Mounted on the shared LLM client's session, so the real retry, backoff and
+    concurrency-limit code runs. A `throttle_rate` fraction of calls get a 429
+    with `retry-after-ms` instead.
+    """
+
+    def __init__(self, chat, throttle_rate=0.0, retry_after_ms=50):
+        super().__init__()
+        self.chat = chat
+        self.throttle_rate = throttle_rate
+        self.retry_after_ms = retry_after_ms
+        self.throttled = 0
+
+    def _response(self, request, status_code, body, headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers.update({"Content-Type": "application/json", **(headers or {})})
+        response.url = request.url
+        response.request = request
+        return response
+
+    def send(self, request, **kwargs):
+        if not request.url.endswith('/chat/completions'):
+            return self._response(request, 404, {"error": {"message": f"Unsupported stub endpoint {request.url}"}})
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            self.throttled += 1
+            return self._response(request, 429, {"error": {"message": "Rate limit reached"}}, {"retry-after-ms": str(self.retry_after_ms)})
+        payload = json.loads(request.body)
+        result = self.chat.create(model=payload.get("model"), messages=payload.get("messages"), max_tokens=payload.get("max_tokens"))
+        return self._response(request, 200, result)
+
+    def close(self):
+        pass
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Tiny deterministic local embedding model (signed feature hashing of word unigrams).
+
+    Needs no weights or downloads, so benchmarks measure the service around
+    the model rather than the model itself.
+    """
+
+    def __init__(self, dimension=1536):
+        self.dimension = dimension
+
+    def embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            bucket = zlib.crc32(token.encode('utf-8'))
+            vector[bucket % self.dimension] += 1.0 if bucket & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self.embed(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self.embed(text).tolist()
@@ -14,12 +14,133 @@ class Config:
         FAISS_NEW_RAGS_PATH (str): The directory where new RAGs created by the API are stored.
         LOG_FILE_PATH (str): Path to the log file where error and info logs are written.
         LOGGING_LEVEL (str): The logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL).
+        LOG_MAX_FIELD_CHARS (int): Maximum length of a string field in a structured log record.
+        LOG_QUEUE_SIZE (int): Capacity of the queue feeding the background log writer.
+        LOG_PAYLOAD_SAMPLE_RATE (float): Fraction of large payload debug records that are kept.
+        TRAFFIC_LOG_ENABLED (bool): Record a sanitized log of requests for replay (see benchmarks/replay_traffic.py).
+        TRAFFIC_LOG_PATH (str): File the sanitized request log is appended to.
+        TRAFFIC_LOG_SAMPLE_RATE (float): Fraction of requests recorded in the traffic log.
+        TRAFFIC_LOG_HASH_NAMESPACES (bool): Replace namespace names with stable hashes in the traffic log.
         API_PORT (int): The port on which the Flask API server runs.
         API_HOST (str): The host IP on which the Flask API server runs.
         PINECONE_API_KEY (str): API key for Pinecone.
         PINECONE_INDEX_NAME (str): Name of the Pinecone index.
+        PINECONE_HOST (str): Pinecone control-plane URL override, e.g. a local benchmarks/pinecone_server.py.
+        CONFIG_YAML_PATH (str): Path to config.yaml (health check flags, MongoDB and LLM settings).
+        HEALTHCHECK_ENABLED (bool): Whether background dependency probes run.
+        HEALTHCHECK_INTERVAL_SECONDS (float): Interval between background dependency probes.
+        HEALTHCHECK_TIMEOUT_SECONDS (float): Timeout applied to each dependency probe.
+        DOCUMENT_STORE_BACKEND (str): Backend holding chunk text keyed by vector id ("sqlite" or "mongodb").
+        DOCUMENT_STORE_PATH (str): Path to the SQLite document store.
+        DOCUMENT_STORE_COLLECTION (str): MongoDB collection used by the MongoDB document store.
+        DOCUMENT_STORE_MMAP_BYTES (int): Memory-mapped I/O size for the SQLite document store.
+        DOCUMENT_CACHE_SIZE (int): Number of chunk texts held in the LRU read cache.
+        PROJECTIONS_PATH (str): Directory holding per-RAG PCA projections.
+        PROJECTION_SAMPLE_SIZE (int): Number of vectors sampled to fit a projection.
+        SNAPSHOT_PATH (str): Default directory for namespace snapshots (manage_snapshots.py).
+        SNAPSHOT_PAGE_SIZE (int): Vectors read, written and held in memory per snapshot page.
+        SNAPSHOT_FETCH_BATCH (int): Ids per Pinecone fetch during an export.
+        SNAPSHOT_UPSERT_BATCH (int): Vectors per Pinecone upsert during an import.
+        SNAPSHOT_PARALLELISM (int): Concurrent Pinecone fetches / upserts during an export / import.
+        SNAPSHOT_LOCAL_BUILD_ROWS (int): Vectors per local FAISS build / upsert during an import.
+        SNAPSHOT_COMPRESSION_LEVEL (int): gzip level of the snapshot's records file.
+        MIGRATION_STATE_PATH (str): Directory holding re-embedding migration checkpoints (manage_migrations.py).
+        MIGRATION_BATCH_SIZE (int): Chunks per embedding call during a migration.
+        MIGRATION_MAX_CHUNKS_PER_SECOND (float): Cap on a migration's embedding rate (0 = unthrottled).
+        MIGRATION_LOCAL_WRITE_ROWS (int): Re-embedded vectors buffered per write to a local FAISS shadow index.
+        MIGRATION_VERIFY_QUERIES (int): Sample queries run against old and new vectors before a cutover.
+        MIGRATION_VERIFY_QUERY_WORDS (int): Words of a chunk used as its verification query.
+        MIGRATION_NICE (int): Niceness added to the migration process so live traffic keeps the CPU.
+        MIGRATION_TORCH_THREADS (int): Torch threads for the migration process (0 = torch default).
+        EMBEDDING_MODEL (str): Embedding backend used for new namespaces (see services/embedding_backends.py).
+        NAMESPACE_REGISTRY_PATH (str): JSON file recording each namespace's embedding backend, dimension and index.
+        OPENAI_EMBEDDING_MODEL (str): OpenAI model used by the "openai" embedding backend.
+        MINILM_MODEL_PATH (str): Model path or hub id for the "minilm" embedding backend.
+        MPNET_MODEL_PATH (str): Model path or hub id for the "mpnet" embedding backend.
+        INSTRUCTOR_MODEL_PATH (str): Local Instructor-XL checkpoint used by both Instructor backends.
+        INSTRUCTOR_DOCUMENT_INSTRUCTION (str): Instruction the encoder-only backend prefixes to documents.
+        INSTRUCTOR_QUERY_INSTRUCTION (str): Instruction the encoder-only backend prefixes to queries.
+        DOCUMENT_WINDOW_TOKENS (int): Window size in tokens for sliding-window document embeddings.
+        DOCUMENT_WINDOW_OVERLAP_TOKENS (int): Overlap in tokens between consecutive document windows.
+        DOCUMENT_WINDOW_BATCH_SIZE (int): Document windows embedded per batched model call.
+        DOCUMENT_KEEP_WINDOW_VECTORS (bool): Store the section-tagged window vectors alongside the document vector by default.
+        SECTION_HEADERS (list): Default section headers detected in documents (a RAG can set its own).
+        ANN_INDEX_TYPE (str): Index type of new local FAISS RAGs ('flat', 'hnsw' or 'ivfpq').
+        ANN_MMAP (bool): Memory-map local FAISS indexes when opening them for queries.
+        ANN_HNSW_M (int): HNSW graph degree.
+        ANN_HNSW_EF_CONSTRUCTION (int): HNSW candidate list size while building.
+        ANN_HNSW_EF_SEARCH (int): HNSW candidate list size while searching.
+        ANN_IVF_NLIST (int): IVF-PQ inverted lists (reduced automatically for small RAGs).
+        ANN_IVF_NPROBE (int): IVF-PQ lists visited per query.
+        ANN_PQ_M (int): IVF-PQ sub-quantizers (must divide the dimension).
+        ANN_PQ_NBITS (int): Bits per IVF-PQ sub-quantizer code.
+        ANN_IVF_REFINE_K_FACTOR (int): IVF-PQ candidates per result re-ranked on full vectors (0 disables).
+        ANN_COMPACT_TOMBSTONE_FRACTION (float): Fraction of deleted HNSW entries that triggers a rebuild.
+        ANN_FILTER_OVERFETCH (int): Candidates fetched per requested result when a local query has a metadata filter.
+        EMBEDDING_SERVER_ADDRESS (str): Address of the shared embedding server; empty to run models in each worker.
+        EMBEDDING_SERVER_PRELOAD (list): Embedding backends the server loads at startup.
+        EMBEDDING_SERVER_TIMEOUT_SECONDS (float): Socket timeout for calls to the embedding server.
+        EMBEDDING_SERVER_MAX_BATCH (int): Maximum texts the server embeds in one model call.
+        EMBEDDING_SERVER_MAX_WAIT_MS (float): Maximum time the server waits for a batch to fill.
+        EMBEDDING_SERVER_INTRA_OP_THREADS (int): torch intra-op threads in the embedding server.
+        EMBEDDING_SERVER_INTER_OP_THREADS (int): torch inter-op threads in the embedding server.
+        VIEW_RAGS_CACHE_TTL_SECONDS (float): Cache lifetime for /view-rags index stats and file listings.
+        VIEW_RAGS_MAX_WORKERS (int): Concurrent Pinecone calls used to build /view-rags.
+        VIEW_RAGS_PAGE_SIZE (int): Default number of RAGs per /view-rags page.
+        VIEW_RAGS_MAX_PAGE_SIZE (int): Maximum number of RAGs per /view-rags page.
+        VIEW_RAGS_MAX_IDS_PER_NAMESPACE (int): Vector ids scanned per namespace when listing its files.
+        DELETE_BATCH_SIZE (int): Vector ids per Pinecone delete call.
+        DELETE_PARALLELISM (int): Concurrent Pinecone delete calls.
+        DELETE_SYNC_MAX_VECTORS (int): Namespaces larger than this are deleted in the background.
+        DELETE_JOB_WORKERS (int): Background deletion jobs that run concurrently.
+        DELETE_JOB_HISTORY (int): Finished deletion jobs kept for status polling.
+        UPLOAD_MAX_BYTES (int): Largest file /add-file accepts.
+        UPLOAD_TEMP_DIR (str): Directory uploads stream into before they are ingested.
+        UPLOAD_READ_BLOCK_BYTES (int): Bytes of an uploaded text file read per block during ingestion.
+        UPLOAD_CHUNK_BUFFER_CHARS (int): Characters of upload text buffered before they are cut into windows.
+        UPLOAD_EMBED_BATCH_SIZE (int): Upload windows embedded and upserted per batch.
+        DEDUP_MODE (str): What ingestion does with near-duplicate chunks: "skip", "link" or "off".
+        DEDUP_INDEX_PATH (str): SQLite file holding the per-namespace MinHash LSH index.
+        DEDUP_THRESHOLD (float): Estimated Jaccard similarity at which two chunks are near-duplicates.
+        DEDUP_NUM_PERM (int): MinHash permutations per chunk signature.
+        DEDUP_BANDS (int): LSH bands the signature is cut into (must divide DEDUP_NUM_PERM).
+        DEDUP_SHINGLE_WORDS (int): Words per shingle.
+        DEDUP_MIN_WORDS (int): Chunks with fewer words are never treated as duplicates.
+        FILE_INDEX_RESCAN_SECONDS (float): Interval between mtime checks of the folders in the file index.
+        FILE_INDEX_PAGE_SIZE (int): Default number of entries per /tree-view and /list-files page.
+        FILE_INDEX_MAX_PAGE_SIZE (int): Maximum number of entries per /tree-view and /list-files page.
+        ASK_BATCH_MAX_QUERIES (int): Most queries accepted by one /ask/batch request.
+        ASK_BATCH_MAX_TOP_K (int): Largest `top_k` /ask/batch accepts.
+        ASK_BATCH_EMBED_SIZE (int): /ask/batch queries embedded per batched embedding call.
+        ASK_BATCH_RETRIEVAL_CONCURRENCY (int): Concurrent vector queries across /ask/batch requests.
+        ASK_BATCH_LLM_CONCURRENCY (int): Concurrent ChatGPT calls across /ask/batch requests.
+        ADMISSION_CONTROL_ENABLED (bool): Queue and shed requests per route class when overloaded.
+        ADMISSION_MAX_CONCURRENT (int): Admitted requests running at once across all route classes (0 = no shared limit).
+        ADMISSION_INTERACTIVE_CONCURRENCY / _QUEUE / _MAX_WAIT_SECONDS: Limits for /ask, the highest-priority class.
+        ADMISSION_LISTING_CONCURRENCY / _QUEUE / _MAX_WAIT_SECONDS: Limits for the listing routes.
+        ADMISSION_INGESTION_CONCURRENCY / _QUEUE / _MAX_WAIT_SECONDS: Limits for ingestion, deletion and /ask/batch.
+        ADMISSION_CLIENT_RATE (float): Requests per second allowed per client (0 = no quota).
+        ADMISSION_CLIENT_BURST (int): Burst size of the per-client quota.
+        ADMISSION_CLIENT_HEADER (str): Header identifying the client (else its address).
+        ADMISSION_NAMESPACE_RATE (float): Requests per second allowed per namespace (0 = no quota).
+        ADMISSION_NAMESPACE_BURST (int): Burst size of the per-namespace quota.
+        LLM_CHAT_MODEL (str): Chat model used by /ask.
+        LLM_INITIAL_CONCURRENCY (int): Starting adaptive concurrency limit for OpenAI calls.
+        LLM_MAX_CONCURRENCY (int): Maximum adaptive concurrency limit and HTTP connection pool size.
+        LLM_LATENCY_TARGET_SECONDS (float): OpenAI latency above which the concurrency limit is reduced.
+        LLM_MAX_RETRIES (int): Retries for throttled or transient OpenAI failures.
+        LLM_BACKOFF_BASE_SECONDS (float): Base delay for jittered exponential backoff.
+        LLM_BACKOFF_MAX_SECONDS (float): Maximum backoff delay between retries.
+        LLM_DEADLINE_SECONDS (float): Total time budget for one OpenAI call including retries.
         FASTTEXT_HOME (str): The directory where FastText models are stored.
         FASTTEXT_MODEL_PATH (str): The path to the FastText model file.
+        FASTTEXT_MMAP (bool): Serve FastText from a memory-mapped export of its vectors instead of loading the binary.
+        MODEL_MEMORY_BUDGET_MB (float): Weight memory the loaded embedding models may use together (0 for no limit).
+        MODEL_IDLE_TIMEOUT_SECONDS (float): Unload an embedding model unused for this long (0 keeps models loaded).
+        MODEL_MIN_AVAILABLE_MB (float): Unload idle embedding models when the machine has less memory available (0 disables).
+        MODEL_CHECK_INTERVAL_SECONDS (float): Interval between idle and memory-pressure checks.
+        MODEL_CONVERT_TO_SAFETENSORS (bool): Convert pytorch_model.bin checkpoints to memory-mappable safetensors once.
+        MODEL_SAFETENSORS_CACHE_PATH (str): Directory holding converted safetensors checkpoints.
     """
 
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Path of the directory where the project is located
@@ -33,6 +154,20 @@ class Config:
     LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', os.path.join(BASE_DIR, 'logs/errors.log'))  # Path to the log file
     
     LOGGING_LEVEL = os.getenv('LOGGING_LEVEL', 'DEBUG')  # Set the logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+
+    LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', 1000))  # Longer log message/field values are truncated
+
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # Records buffered for the background log writer before dropping
+
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))  # Fraction of large payload debug records (contexts, summaries) kept
+
+    TRAFFIC_LOG_ENABLED = os.getenv('TRAFFIC_LOG_ENABLED', 'false').lower() == 'true'  # Record request shapes (route, namespace, sizes, timing) for replay
+
+    TRAFFIC_LOG_PATH = os.getenv('TRAFFIC_LOG_PATH', os.path.join(BASE_DIR, 'logs/traffic.jsonl'))  # Sanitized request log, one JSON object per line
+
+    TRAFFIC_LOG_SAMPLE_RATE = float(os.getenv('TRAFFIC_LOG_SAMPLE_RATE', 1.0))  # Fraction of requests recorded
+
+    TRAFFIC_LOG_HASH_NAMESPACES = os.getenv('TRAFFIC_LOG_HASH_NAMESPACES', 'true').lower() == 'true'  # Hash namespace names so logs can be shared
     
     API_PORT = int(os.getenv('API_PORT', 5001))  # Port on which the Flask API server runs
     
@@ -42,7 +177,233 @@ class Config:
     
     PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME')
 
-    EMBEDDING_MODEL = "instructor-xl"  # Options: "openai", "bert", "fasttext", "mpnet", "instructor-xl"
+    PINECONE_HOST = os.getenv('PINECONE_HOST')  # e.g. http://localhost:5081 for the local stand-in; unset = Pinecone's API
+
+    CONFIG_YAML_PATH = os.getenv('CONFIG_YAML_PATH', os.path.join(BASE_DIR, 'config.yaml'))  # Service-level settings (health checks, Mongo, LLM)
+
+    HEALTHCHECK_ENABLED = os.getenv('HEALTHCHECK_ENABLED', 'true').lower() == 'true'  # Run background dependency probes
+
+    HEALTHCHECK_INTERVAL_SECONDS = float(os.getenv('HEALTHCHECK_INTERVAL_SECONDS', 15))  # How often background probes refresh dependency status
+
+    HEALTHCHECK_TIMEOUT_SECONDS = float(os.getenv('HEALTHCHECK_TIMEOUT_SECONDS', 2))  # Hard deadline for a single dependency probe
+
+    DOCUMENT_STORE_BACKEND = os.getenv('DOCUMENT_STORE_BACKEND', 'sqlite')  # Where chunk text lives: "sqlite" (local) or "mongodb"
+
+    DOCUMENT_STORE_PATH = os.getenv('DOCUMENT_STORE_PATH', os.path.join(BASE_DIR, 'doc_store', 'documents.db'))  # SQLite document store file
+
+    DOCUMENT_STORE_COLLECTION = os.getenv('DOCUMENT_STORE_COLLECTION', 'chunk_texts')  # MongoDB collection for chunk text
+
+    DOCUMENT_STORE_MMAP_BYTES = int(os.getenv('DOCUMENT_STORE_MMAP_BYTES', 256 * 1024 * 1024))  # SQLite memory-mapped I/O size
+
+    DOCUMENT_CACHE_SIZE = int(os.getenv('DOCUMENT_CACHE_SIZE', 2048))  # Chunk texts kept in the in-process LRU read cache
+
+    PROJECTIONS_PATH = os.getenv('PROJECTIONS_PATH', os.path.join(BASE_DIR, 'projections'))  # Per-RAG dimensionality-reduction projections (.npz)
+
+    PROJECTION_SAMPLE_SIZE = int(os.getenv('PROJECTION_SAMPLE_SIZE', 5000))  # Vectors sampled from a namespace to fit its projection
+
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(BASE_DIR, 'snapshots'))  # Namespace exports (vectors.npy + records.jsonl.gz)
+
+    SNAPSHOT_PAGE_SIZE = int(os.getenv('SNAPSHOT_PAGE_SIZE', 1000))  # Vectors streamed per page in both directions
+
+    SNAPSHOT_FETCH_BATCH = int(os.getenv('SNAPSHOT_FETCH_BATCH', 100))  # Ids per Pinecone fetch (kept small: ids travel in the URL)
+
+    SNAPSHOT_UPSERT_BATCH = int(os.getenv('SNAPSHOT_UPSERT_BATCH', 100))  # Vectors per Pinecone upsert (well under the 2 MB request limit)
+
+    SNAPSHOT_PARALLELISM = int(os.getenv('SNAPSHOT_PARALLELISM', 8))  # Pinecone calls in flight while exporting / importing
+
+    SNAPSHOT_LOCAL_BUILD_ROWS = int(os.getenv('SNAPSHOT_LOCAL_BUILD_ROWS', 100000))  # Local imports train on the first page and add the rest page by page
+
+    SNAPSHOT_COMPRESSION_LEVEL = int(os.getenv('SNAPSHOT_COMPRESSION_LEVEL', 1))  # Fast gzip; the vectors themselves are stored raw
+
+    MIGRATION_STATE_PATH = os.getenv('MIGRATION_STATE_PATH', os.path.join(BASE_DIR, 'doc_store', 'migrations'))  # One checkpoint JSON per migrated namespace
+
+    MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 32))  # Chunks per embed_batch call while re-embedding
+
+    MIGRATION_MAX_CHUNKS_PER_SECOND = float(os.getenv('MIGRATION_MAX_CHUNKS_PER_SECOND', 0))  # Throttle for migrations sharing cores with live traffic
+
+    MIGRATION_LOCAL_WRITE_ROWS = int(os.getenv('MIGRATION_LOCAL_WRITE_ROWS', 50000))  # Each FAISS write rewrites the index file, so writes are batched
+
+    MIGRATION_VERIFY_QUERIES = int(os.getenv('MIGRATION_VERIFY_QUERIES', 50))  # Dual-read sample size before a cutover
+
+    MIGRATION_VERIFY_QUERY_WORDS = int(os.getenv('MIGRATION_VERIFY_QUERY_WORDS', 12))  # Verification queries are a chunk's opening words
+
+    MIGRATION_NICE = int(os.getenv('MIGRATION_NICE', 10))  # Migrations run at lower CPU priority than the web workers
+
+    MIGRATION_TORCH_THREADS = int(os.getenv('MIGRATION_TORCH_THREADS', 0))  # Cap the cores a migration's model may use (0 = torch default)
+
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', "instructor-xl")  # Default backend for new namespaces. Options: "instructor-xl", "fasttext", "openai", "minilm", "mpnet"
+
+    NAMESPACE_REGISTRY_PATH = os.getenv('NAMESPACE_REGISTRY_PATH', os.path.join(BASE_DIR, 'doc_store', 'namespaces.json'))  # Embedding backend/dimension/index recorded per namespace
+
+    OPENAI_EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')  # Model used by the "openai" embedding backend
+
+    MINILM_MODEL_PATH = os.getenv('MINILM_MODEL_PATH', 'sentence-transformers/all-MiniLM-L6-v2')  # Local path or hub id for the "minilm" backend
+
+    MPNET_MODEL_PATH = os.getenv('MPNET_MODEL_PATH', 'sentence-transformers/all-mpnet-base-v2')  # Local path or hub id for the "mpnet" backend
+
+    INSTRUCTOR_MODEL_PATH = os.getenv('INSTRUCTOR_MODEL_PATH', os.path.join(BASE_DIR, 'models', 'hkunlp', 'instructor-xl'))  # Local Instructor-XL checkpoint
+
+    INSTRUCTOR_DOCUMENT_INSTRUCTION = os.getenv('INSTRUCTOR_DOCUMENT_INSTRUCTION', 'Represent the document for retrieval:')  # Instruction prefixed to ingested text (encoder backend)
+
+    INSTRUCTOR_QUERY_INSTRUCTION = os.getenv('INSTRUCTOR_QUERY_INSTRUCTION', 'Represent the question for retrieving supporting documents:')  # Instruction prefixed to /ask queries (encoder backend)
+
+    DOCUMENT_WINDOW_TOKENS = int(os.getenv('DOCUMENT_WINDOW_TOKENS', 448))  # Tokens per window for whole-document embeddings (leaves room for instructions within 512)
+
+    DOCUMENT_WINDOW_OVERLAP_TOKENS = int(os.getenv('DOCUMENT_WINDOW_OVERLAP_TOKENS', 64))  # Tokens shared by consecutive windows
+
+    DOCUMENT_WINDOW_BATCH_SIZE = int(os.getenv('DOCUMENT_WINDOW_BATCH_SIZE', 16))  # Windows embedded per model forward pass
+
+    DOCUMENT_KEEP_WINDOW_VECTORS = os.getenv('DOCUMENT_KEEP_WINDOW_VECTORS', 'true').lower() == 'true'  # Also store each window as its own vector (needed for section/page filters)
+
+    SECTION_HEADERS = [header.strip() for header in os.getenv(
+        'SECTION_HEADERS', 'Experience,Projects,Education,Career Experience,Notable Accomplishments'
+    ).split(',') if header.strip()]  # Headers that start a new section; windows never cross a section boundary
+
+    ANN_INDEX_TYPE = os.getenv('ANN_INDEX_TYPE', 'hnsw')  # 'flat' (exact), 'hnsw' (fast, all in memory) or 'ivfpq' (compressed)
+
+    ANN_MMAP = os.getenv('ANN_MMAP', 'true').lower() == 'true'  # Memory-map local indexes: instant open, pages shared between workers
+
+    ANN_HNSW_M = int(os.getenv('ANN_HNSW_M', 32))  # Neighbours per HNSW node
+
+    ANN_HNSW_EF_CONSTRUCTION = int(os.getenv('ANN_HNSW_EF_CONSTRUCTION', 200))  # Build-time HNSW candidate list
+
+    ANN_HNSW_EF_SEARCH = int(os.getenv('ANN_HNSW_EF_SEARCH', 64))  # Query-time HNSW candidate list (recall vs latency)
+
+    ANN_IVF_NLIST = int(os.getenv('ANN_IVF_NLIST', 1024))  # IVF-PQ inverted lists
+
+    ANN_IVF_NPROBE = int(os.getenv('ANN_IVF_NPROBE', 32))  # IVF-PQ lists searched per query (recall vs latency)
+
+    ANN_PQ_M = int(os.getenv('ANN_PQ_M', 16))  # IVF-PQ sub-quantizers; must divide the embedding dimension
+
+    ANN_PQ_NBITS = int(os.getenv('ANN_PQ_NBITS', 8))  # Bits per IVF-PQ code
+
+    ANN_IVF_REFINE_K_FACTOR = int(os.getenv('ANN_IVF_REFINE_K_FACTOR', 32))  # Re-rank this many PQ candidates per result on full vectors; 0 = PQ scores only
+
+    ANN_COMPACT_TOMBSTONE_FRACTION = float(os.getenv('ANN_COMPACT_TOMBSTONE_FRACTION', 0.2))  # Rebuild an HNSW index once this share of it is deleted
+
+    ANN_FILTER_OVERFETCH = int(os.getenv('ANN_FILTER_OVERFETCH', 10))  # Extra candidates per result when post-filtering local queries on metadata
+
+    EMBEDDING_SERVER_ADDRESS = os.getenv('EMBEDDING_SERVER_ADDRESS', '')  # e.g. unix:///tmp/rag-embeddings.sock; empty = load models in-process
+
+    EMBEDDING_SERVER_PRELOAD = [name for name in os.getenv('EMBEDDING_SERVER_PRELOAD', '').split(',') if name]  # Backends the server loads at startup
+
+    EMBEDDING_SERVER_TIMEOUT_SECONDS = float(os.getenv('EMBEDDING_SERVER_TIMEOUT_SECONDS', 60))  # Socket timeout for embedding server calls
+
+    EMBEDDING_SERVER_MAX_BATCH = int(os.getenv('EMBEDDING_SERVER_MAX_BATCH', 32))  # Texts per model call across all callers
+
+    EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv('EMBEDDING_SERVER_MAX_WAIT_MS', 5))  # How long a batch waits to fill before running
+
+    EMBEDDING_SERVER_INTRA_OP_THREADS = int(os.getenv('EMBEDDING_SERVER_INTRA_OP_THREADS', max(1, (os.cpu_count() or 2) // 2)))  # torch intra-op threads (0 = torch default)
+
+    EMBEDDING_SERVER_INTER_OP_THREADS = int(os.getenv('EMBEDDING_SERVER_INTER_OP_THREADS', 1))  # torch inter-op threads (0 = torch default)
+
+    VIEW_RAGS_CACHE_TTL_SECONDS = float(os.getenv('VIEW_RAGS_CACHE_TTL_SECONDS', 30))  # How long /view-rags reuses index stats and file listings
+
+    VIEW_RAGS_MAX_WORKERS = int(os.getenv('VIEW_RAGS_MAX_WORKERS', 8))  # Concurrent Pinecone calls while building /view-rags
+
+    VIEW_RAGS_PAGE_SIZE = int(os.getenv('VIEW_RAGS_PAGE_SIZE', 100))  # Default RAGs per /view-rags page
+
+    VIEW_RAGS_MAX_PAGE_SIZE = int(os.getenv('VIEW_RAGS_MAX_PAGE_SIZE', 500))  # Largest `limit` a client may ask for
+
+    VIEW_RAGS_MAX_IDS_PER_NAMESPACE = int(os.getenv('VIEW_RAGS_MAX_IDS_PER_NAMESPACE', 10000))  # Vector ids scanned per namespace to list its files
+
+    DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', 1000))  # Ids per Pinecone delete call (Pinecone's maximum is 1000)
+
+    DELETE_PARALLELISM = int(os.getenv('DELETE_PARALLELISM', 4))  # Concurrent Pinecone delete calls
+
+    DELETE_SYNC_MAX_VECTORS = int(os.getenv('DELETE_SYNC_MAX_VECTORS', 50000))  # Larger namespaces are deleted as background jobs
+
+    DELETE_JOB_WORKERS = int(os.getenv('DELETE_JOB_WORKERS', 2))  # Background deletion jobs run at once
+
+    DELETE_JOB_HISTORY = int(os.getenv('DELETE_JOB_HISTORY', 200))  # Finished deletion jobs kept for status polling
+
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 200 * 1024 * 1024))  # Larger uploads are rejected with 413 (early when Content-Length says so)
+
+    UPLOAD_TEMP_DIR = os.getenv('UPLOAD_TEMP_DIR', os.path.join(BASE_DIR, 'uploads_tmp'))  # Uploads stream here, then move into DATA_FOLDER
+
+    UPLOAD_READ_BLOCK_BYTES = int(os.getenv('UPLOAD_READ_BLOCK_BYTES', 256 * 1024))  # Text files are decoded this many bytes at a time
+
+    UPLOAD_CHUNK_BUFFER_CHARS = int(os.getenv('UPLOAD_CHUNK_BUFFER_CHARS', 64 * 1024))  # Text buffered before windows are cut from it
+
+    UPLOAD_EMBED_BATCH_SIZE = int(os.getenv('UPLOAD_EMBED_BATCH_SIZE', 32))  # Windows per embed_batch call and upsert
+
+    DEDUP_MODE = os.getenv('DEDUP_MODE', 'link').lower()  # skip: drop near-duplicate chunks; link: store them with the kept chunk's vector, unembedded; off
+
+    DEDUP_INDEX_PATH = os.getenv('DEDUP_INDEX_PATH', os.path.join(BASE_DIR, 'doc_store', 'dedup.db'))  # MinHash signatures and LSH buckets per namespace
+
+    DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', 0.8))  # Estimated Jaccard similarity of word shingles that counts as a duplicate
+
+    DEDUP_NUM_PERM = int(os.getenv('DEDUP_NUM_PERM', 64))  # 32-bit MinHash values per signature (256 bytes)
+
+    DEDUP_BANDS = int(os.getenv('DEDUP_BANDS', 16))  # 16 bands of 4 rows: pairs at 0.8 similarity share a bucket 99.98% of the time
+
+    DEDUP_SHINGLE_WORDS = int(os.getenv('DEDUP_SHINGLE_WORDS', 3))  # Words per shingle
+
+    DEDUP_MIN_WORDS = int(os.getenv('DEDUP_MIN_WORDS', 8))  # Shorter chunks (headings, stray lines) are always kept
+
+    FILE_INDEX_RESCAN_SECONDS = float(os.getenv('FILE_INDEX_RESCAN_SECONDS', 2))  # How often indexed folders are checked for changes (mtime)
+
+    FILE_INDEX_PAGE_SIZE = int(os.getenv('FILE_INDEX_PAGE_SIZE', 500))  # Default entries per /tree-view and /list-files page
+
+    FILE_INDEX_MAX_PAGE_SIZE = int(os.getenv('FILE_INDEX_MAX_PAGE_SIZE', 5000))  # Largest `limit` a client may ask for
+
+    ASK_BATCH_MAX_QUERIES = int(os.getenv('ASK_BATCH_MAX_QUERIES', 1000))  # Larger batches are rejected with 400
+
+    ASK_BATCH_MAX_TOP_K = int(os.getenv('ASK_BATCH_MAX_TOP_K', 100))  # Retrieval evaluation may ask for more than /ask's 10 matches
+
+    ASK_BATCH_EMBED_SIZE = int(os.getenv('ASK_BATCH_EMBED_SIZE', 64))  # Queries per embed_query_batch call
+
+    ASK_BATCH_RETRIEVAL_CONCURRENCY = int(os.getenv('ASK_BATCH_RETRIEVAL_CONCURRENCY', 8))  # Vector queries in flight for batches
+
+    ASK_BATCH_LLM_CONCURRENCY = int(os.getenv('ASK_BATCH_LLM_CONCURRENCY', 4))  # ChatGPT calls in flight for batches (within the adaptive LLM limit)
+
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'  # Bounded queues and load shedding per route class
+
+    ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', 24))  # Shared slots; freed ones go to /ask first, then listing, then ingestion
+
+    ADMISSION_INTERACTIVE_CONCURRENCY = int(os.getenv('ADMISSION_INTERACTIVE_CONCURRENCY', 16))  # /ask requests running at once
+
+    ADMISSION_INTERACTIVE_QUEUE = int(os.getenv('ADMISSION_INTERACTIVE_QUEUE', 64))  # /ask requests allowed to wait; more are shed with 503
+
+    ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS = float(os.getenv('ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS', 5))  # Queued longer than this -> 503
+
+    ADMISSION_LISTING_CONCURRENCY = int(os.getenv('ADMISSION_LISTING_CONCURRENCY', 8))
+
+    ADMISSION_LISTING_QUEUE = int(os.getenv('ADMISSION_LISTING_QUEUE', 32))
+
+    ADMISSION_LISTING_MAX_WAIT_SECONDS = float(os.getenv('ADMISSION_LISTING_MAX_WAIT_SECONDS', 5))
+
+    ADMISSION_INGESTION_CONCURRENCY = int(os.getenv('ADMISSION_INGESTION_CONCURRENCY', 2))  # Embedding-heavy; kept low so ingestion can't starve /ask of cores
+
+    ADMISSION_INGESTION_QUEUE = int(os.getenv('ADMISSION_INGESTION_QUEUE', 16))
+
+    ADMISSION_INGESTION_MAX_WAIT_SECONDS = float(os.getenv('ADMISSION_INGESTION_MAX_WAIT_SECONDS', 30))
+
+    ADMISSION_CLIENT_RATE = float(os.getenv('ADMISSION_CLIENT_RATE', 0))  # Token bucket per client; over quota -> 429
+
+    ADMISSION_CLIENT_BURST = int(os.getenv('ADMISSION_CLIENT_BURST', 20))
+
+    ADMISSION_CLIENT_HEADER = os.getenv('ADMISSION_CLIENT_HEADER', 'X-Client-Id')  # Falls back to the remote address
+
+    ADMISSION_NAMESPACE_RATE = float(os.getenv('ADMISSION_NAMESPACE_RATE', 0))  # Token bucket per namespace; over quota -> 429
+
+    ADMISSION_NAMESPACE_BURST = int(os.getenv('ADMISSION_NAMESPACE_BURST', 50))
+
+    LLM_CHAT_MODEL = os.getenv('LLM_CHAT_MODEL', 'gpt-4')  # Chat model used by /ask
+
+    LLM_INITIAL_CONCURRENCY = int(os.getenv('LLM_INITIAL_CONCURRENCY', 8))  # Starting adaptive limit on concurrent OpenAI calls
+
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 32))  # Ceiling for the adaptive limit (and HTTP pool size)
+
+    LLM_LATENCY_TARGET_SECONDS = float(os.getenv('LLM_LATENCY_TARGET_SECONDS', 20))  # Calls slower than this shrink the limit like a throttle
+
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 4))  # Retries for throttled/transient OpenAI failures
+
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv('LLM_BACKOFF_BASE_SECONDS', 0.5))  # First retry waits up to this long (doubling, jittered)
+
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv('LLM_BACKOFF_MAX_SECONDS', 8))  # Cap on a single backoff (Retry-After may exceed it)
+
+    LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', 60))  # Total time budget per OpenAI call, including queueing and retries
     
     # ✅ NEW: FastText Configuration
     #HOME_DIRECTORY = os.path.expanduser('~')  # This will point to /Users/username or /home/username
@@ -50,10 +411,17 @@ class Config:
     FASTTEXT_HOME = os.getenv('FASTTEXT_HOME', os.path.join(BASE_DIR, '.fasttext'))  # Updated to use project directory
     FASTTEXT_MODEL_PATH = os.getenv('FASTTEXT_MODEL_PATH', os.path.join(FASTTEXT_HOME, 'cc.en.300.bin'))  # Path to FastText model
 
-    import logging
+    FASTTEXT_MMAP = os.getenv('FASTTEXT_MMAP', 'true').lower() == 'true'  # Page FastText vectors in from a memory-mapped export instead of loading ~7 GB
+
+    # Embedding model lifecycle (services/model_manager.py)
+    MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', 0))  # Least recently used idle models are unloaded to stay under this (0 = no limit)
+
+    MODEL_IDLE_TIMEOUT_SECONDS = float(os.getenv('MODEL_IDLE_TIMEOUT_SECONDS', 0))  # Unload models unused this long, e.g. 1800 (0 = keep loaded)
+
+    MODEL_MIN_AVAILABLE_MB = float(os.getenv('MODEL_MIN_AVAILABLE_MB', 0))  # Unload idle models when MemAvailable drops below this (0 = off)
+
+    MODEL_CHECK_INTERVAL_SECONDS = float(os.getenv('MODEL_CHECK_INTERVAL_SECONDS', 30))  # How often idle time and memory pressure are checked
+
+    MODEL_CONVERT_TO_SAFETENSORS = os.getenv('MODEL_CONVERT_TO_SAFETENSORS', 'true').lower() == 'true'  # Convert .bin checkpoints once so weights load memory-mapped
 
-    logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-    )
\ No newline at end of file
+    MODEL_SAFETENSORS_CACHE_PATH = os.getenv('MODEL_SAFETENSORS_CACHE_PATH', os.path.join(BASE_DIR, 'models', 'safetensors'))  # Converted checkpoints
@@ -2,23 +2,55 @@ import logging
 from flask import Flask
 from config import Config
 from utils import setup_logging
-from routes import register_blueprints
 
-# 📝 Set up logging first to capture all logs
-setup_logging(Config.LOG_FILE_PATH, Config.LOGGING_LEVEL)
+# 📝 Set up logging first to capture all logs (including those emitted while routes are imported)
+setup_logging(Config.LOG_FILE_PATH, Config.LOGGING_LEVEL, Config.LOG_MAX_FIELD_CHARS, Config.LOG_QUEUE_SIZE)
+
+from routes import register_blueprints
+from utilities.logging_utility import register_request_id_hooks
+from services.health_service import start_health_monitor
+from services.file_index_service import start_file_index
+from services.model_manager import model_manager
+from utilities.traffic_utility import TrafficRecorder, register_traffic_recorder
+from utilities.upload_utility import UploadRequest, register_upload_cleanup
+from utilities.admission_utility import admission_controller_from_config, register_admission_control
 
-# Initialize the Flask app
+# Initialize the Flask app; uploads stream to disk and are hashed as they arrive
 app = Flask(__name__)
+app.request_class = UploadRequest
+register_upload_cleanup(app)
+
+# Tag every log record emitted while handling a request with its request id
+register_request_id_hooks(app)
+
+# 🎙️ Optionally record a sanitized request log for capacity planning (benchmarks/replay_traffic.py)
+if Config.TRAFFIC_LOG_ENABLED:
+    register_traffic_recorder(app, TrafficRecorder(Config.TRAFFIC_LOG_PATH, Config.TRAFFIC_LOG_SAMPLE_RATE, Config.TRAFFIC_LOG_HASH_NAMESPACES, Config.LOG_QUEUE_SIZE))
+
+# 🚦 Bound the work each route class may queue; /ask is admitted ahead of listing and ingestion
+if Config.ADMISSION_CONTROL_ENABLED:
+    register_admission_control(app, admission_controller_from_config(), Config.ADMISSION_CLIENT_HEADER)
 
 # Register routes (Blueprints)
 app = register_blueprints(app)
 
+# 🩺 Probe dependencies in the background so /health answers from cache
+if Config.HEALTHCHECK_ENABLED:
+    start_health_monitor()
+
+# 📂 Index the data and FAISS folders once; /tree-view and /list-files never walk the disk
+start_file_index()
+
+# ♻️ Unload embedding models that sit idle (or under memory pressure) when MODEL_IDLE_TIMEOUT_SECONDS / MODEL_MIN_AVAILABLE_MB are set
+model_manager.start()
+
 # 🔥 Print all routes after they are registered
-with app.app_context():
-    logging.info("🔍 Here are all the registered routes:")
-    for rule in app.url_map.iter_rules():
-        logging.info(f"Endpoint: {rule.endpoint}, Methods: {rule.methods}, URL: {rule.rule}")
+if logging.getLogger().isEnabledFor(logging.DEBUG):
+    with app.app_context():
+        logging.debug("🔍 Here are all the registered routes:")
+        for rule in app.url_map.iter_rules():
+            logging.debug("Endpoint: %s, Methods: %s, URL: %s", rule.endpoint, rule.methods, rule.rule)
 
 if __name__ == "__main__":
     logging.info("📢 Starting Flask server...")
-    app.run(host=Config.API_HOST, port=Config.API_PORT, debug=True)
\ No newline at end of file
+    app.run(host=Config.API_HOST, port=Config.API_PORT, debug=True)
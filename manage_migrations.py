@@ -0,0 +1,114 @@
+"""
+Re-embed a RAG with another embedding model without downtime.
+
+    # Re-embed into the new backend's index, compare old and new retrieval, then switch over
+    python manage_migrations.py start --namespace Santosh.pdf --backend minilm
+
+    # Backfill only (throttled), look at the numbers, switch later
+    python manage_migrations.py start --namespace Santosh.pdf --backend minilm --no-cutover --rate 50
+    python manage_migrations.py verify --namespace Santosh.pdf
+    python manage_migrations.py cutover --namespace Santosh.pdf --min-agreement 0.5
+
+    # After a crash or Ctrl-C, carry on from the last checkpoint
+    python manage_migrations.py resume --namespace Santosh.pdf
+
+    # Go back to the old vectors, or drop them once happy
+    python manage_migrations.py rollback --namespace Santosh.pdf
+    python manage_migrations.py finalize --namespace Santosh.pdf
+
+    python manage_migrations.py status
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from dotenv import load_dotenv
+from config import Config
+from services.migration_service import (
+    MigrationError, plan_migration, run_migration, verify_migration, cutover, rollback, finalize, load_migration, list_migrations
+)
+
+load_dotenv()
+
+
+def lower_priority():
+    """Run below the web workers: raise the niceness and optionally cap torch's threads."""
+    if Config.MIGRATION_NICE:
+        os.nice(Config.MIGRATION_NICE)
+    if Config.MIGRATION_TORCH_THREADS:
+        try:
+            import torch
+            torch.set_num_threads(Config.MIGRATION_TORCH_THREADS)
+        except ImportError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-embed namespaces with another embedding model.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_start = sub.add_parser('start', help="Plan and run a migration.")
+    p_start.add_argument('--namespace', required=True)
+    p_start.add_argument('--backend', required=True, help="Target embedding backend, e.g. minilm, fasttext, openai.")
+    p_start.add_argument('--index-name', help="Pinecone index for the new vectors (default: the backend's index).")
+    p_resume = sub.add_parser('resume', help="Continue a migration from its checkpoint.")
+    p_resume.add_argument('--namespace', required=True)
+    for p in (p_start, p_resume):
+        p.add_argument('--rate', type=float, help="Max chunks embedded per second (default MIGRATION_MAX_CHUNKS_PER_SECOND).")
+        p.add_argument('--no-cutover', action='store_true', help="Stop after the backfill; switch later with `cutover`.")
+        p.add_argument('--min-agreement', type=float, help="Only switch if old/new top-k agreement reaches this.")
+
+    p_verify = sub.add_parser('verify', help="Compare old and new retrieval on sample queries.")
+    p_verify.add_argument('--namespace', required=True)
+    p_verify.add_argument('--queries', type=int, default=Config.MIGRATION_VERIFY_QUERIES)
+    p_verify.add_argument('--top-k', type=int, default=10)
+    p_cutover = sub.add_parser('cutover', help="Switch queries and ingestion to the new vectors.")
+    p_cutover.add_argument('--namespace', required=True)
+    p_cutover.add_argument('--min-agreement', type=float)
+    for name, help_text in (('rollback', "Return to the old vectors (or abandon an unfinished migration)."),
+                            ('finalize', "Delete the old vectors of a switched namespace.")):
+        sub.add_parser(name, help=help_text).add_argument('--namespace', required=True)
+    sub.add_parser('status', help="Show migrations.").add_argument('--namespace')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.command == 'status':
+            states = [load_migration(args.namespace)] if args.namespace else list_migrations()
+            print(json.dumps([state for state in states if state], indent=2, sort_keys=True))
+        elif args.command in ('start', 'resume'):
+            lower_priority()
+            if args.command == 'start':
+                plan_migration(args.namespace, args.backend, args.index_name)
+            try:
+                state = run_migration(args.namespace, args.rate)
+            except KeyboardInterrupt:
+                state = load_migration(args.namespace)
+                print(f"⏸️ Interrupted after {state['processed']} vectors; continue with `resume --namespace {args.namespace}`")
+                return 130
+            print(f"✅ Backfilled '{args.namespace}': {state['embedded']} chunks re-embedded, {state['skipped']} without stored text")
+            if not args.no_cutover:
+                print(json.dumps(verify_migration(args.namespace), indent=2))
+                cutover(args.namespace, args.min_agreement)
+                print(f"🔀 '{args.namespace}' now uses '{state['target']['backend']}'")
+        elif args.command == 'verify':
+            print(json.dumps(verify_migration(args.namespace, args.queries, args.top_k), indent=2))
+        elif args.command == 'cutover':
+            cutover(args.namespace, args.min_agreement)
+            print(f"🔀 '{args.namespace}' switched to its re-embedded vectors")
+        elif args.command == 'rollback':
+            rollback(args.namespace)
+            print(f"↩️ '{args.namespace}' rolled back")
+        else:
+            finalize(args.namespace)
+            print(f"🧹 Old vectors of '{args.namespace}' deleted")
+    except MigrationError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
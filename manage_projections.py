@@ -0,0 +1,197 @@
+"""
+Fit, evaluate and remove per-RAG dimensionality-reduction projections.
+
+    # Report recall@k, index size and query latency for candidate widths
+    python manage_projections.py evaluate --namespace Santosh.pdf --dims 64 128 256 512
+
+    # Fit a 256-dim projection, copy the namespace's vectors (projected) into a
+    # reduced index, then switch ingest and /ask over to it
+    python manage_projections.py fit --namespace Santosh.pdf --dim 256
+
+    # Go back to serving the namespace at full width
+    python manage_projections.py remove --namespace Santosh.pdf
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from config import Config
+from services.pinecone_service import get_pinecone_index, ensure_pinecone_index
+from services.namespace_registry import get_namespace_config
+from services.projection_service import fit_projection, save_projection, delete_projection, get_projection, sample_namespace_vectors, normalise
+
+load_dotenv()
+
+
+def exact_top_k(matrix, queries, k):
+    """Indices of the k highest cosine scores per query (rows are already L2-normalised)."""
+    scores = queries @ matrix.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def time_queries(matrix, queries, k, repeats=3):
+    """Median per-query latency (ms) of exact search over `matrix`, one query at a time."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for query in queries:
+            scores = matrix @ query
+            np.argpartition(-scores, k - 1)[:k]
+        timings.append((time.perf_counter() - start) / len(queries) * 1000.0)
+    return float(np.median(timings))
+
+
+def evaluate(vectors, dims, k, num_queries, seed=0):
+    """
+    Compare exact search at reduced widths against full width on the same corpus.
+
+    A random subset of rows is held out as queries; the projection is fitted on
+    the remaining rows only, so recall reflects unseen queries.
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    num_queries = min(num_queries, len(vectors) // 5)
+    queries_full = normalise(vectors[order[:num_queries]])
+    corpus_full = normalise(vectors[order[num_queries:]])
+    k = min(k, len(corpus_full))
+
+    truth = exact_top_k(corpus_full, queries_full, k)
+    full_width = corpus_full.shape[1]
+    report = {
+        "corpus_vectors": int(len(corpus_full)),
+        "queries": int(num_queries),
+        "k": k,
+        "full": {
+            "dimension": full_width,
+            "index_bytes": int(corpus_full.shape[0] * full_width * 4),
+            "query_ms": time_queries(corpus_full, queries_full, k),
+        },
+        "reduced": []
+    }
+
+    for dim in dims:
+        if dim >= full_width or dim > min(corpus_full.shape):
+            continue
+        projection = fit_projection(corpus_full, dim, index_name=None)
+        corpus = projection.project(corpus_full)
+        queries = projection.project(queries_full)
+        found = exact_top_k(corpus, queries, k)
+        recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+        report["reduced"].append({
+            "dimension": dim,
+            "recall_at_k": float(recall),
+            "explained_variance_ratio": projection.explained_variance_ratio,
+            "index_bytes": int(corpus.shape[0] * dim * 4),
+            "projection_bytes": int(projection.components.nbytes + projection.mean.nbytes),
+            "query_ms": time_queries(corpus, queries, k),
+        })
+    return report
+
+
+def backfill(source_index, target_index, namespace, projection, batch_size=100):
+    """Copy every vector of a namespace into the reduced index, projected. No re-embedding needed."""
+    copied = 0
+    for page in source_index.list(namespace=namespace):
+        for start in range(0, len(page), batch_size):
+            batch = page[start:start + batch_size]
+            fetched = source_index.fetch(ids=batch, namespace=namespace).get('vectors', {})
+            if not fetched:
+                continue
+            ids = list(fetched)
+            reduced = projection.project(np.asarray([fetched[i]['values'] for i in ids], dtype=np.float32))
+            target_index.upsert(
+                vectors=[{"id": i, "values": v.tolist(), "metadata": fetched[i].get('metadata') or {}} for i, v in zip(ids, reduced)],
+                namespace=namespace
+            )
+            copied += len(ids)
+    return copied
+
+
+def missing_full_width_ids(source_index, reduced_index, namespace):
+    """Ids the reduced index holds but the full-width index lacks (written before ingest kept both up to date)."""
+    full = {vector_id for page in source_index.list(namespace=namespace) for vector_id in page}
+    return [vector_id for page in reduced_index.list(namespace=namespace) for vector_id in page if vector_id not in full]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage per-RAG embedding projections.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_eval = sub.add_parser('evaluate', help="Report recall@k, index size and latency for candidate widths.")
+    p_eval.add_argument('--namespace', help="Sample vectors from this Pinecone namespace.")
+    p_eval.add_argument('--vectors-npy', help="Evaluate on vectors from a .npy file instead of Pinecone.")
+    p_eval.add_argument('--dims', type=int, nargs='+', default=[64, 128, 256, 512])
+    p_eval.add_argument('--k', type=int, default=10)
+    p_eval.add_argument('--queries', type=int, default=200)
+    p_eval.add_argument('--sample', type=int, default=Config.PROJECTION_SAMPLE_SIZE)
+
+    p_fit = sub.add_parser('fit', help="Fit a projection, backfill the reduced index and switch the RAG to it.")
+    p_fit.add_argument('--namespace', required=True)
+    p_fit.add_argument('--dim', type=int, required=True)
+    p_fit.add_argument('--index-name', help="Reduced index name (default: <source index>-<dim>).")
+    p_fit.add_argument('--sample', type=int, default=Config.PROJECTION_SAMPLE_SIZE)
+
+    p_remove = sub.add_parser('remove', help="Serve the namespace at full width again.")
+    p_remove.add_argument('--namespace', required=True)
+    p_remove.add_argument('--force', action='store_true', help="Remove even if the full-width index is missing vectors.")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    source_name = os.getenv('PINECONE_INDEX_NAME', 'rag-index')
+    if args.command == 'remove':
+        projection = get_projection(args.namespace)
+        if projection is not None and not args.force:
+            full_name = (get_namespace_config(args.namespace) or {}).get('index_name') or source_name
+            missing = missing_full_width_ids(get_pinecone_index(full_name), get_pinecone_index(projection.index_name), args.namespace)
+            if missing:
+                print(f"❌ '{full_name}' lacks {len(missing)} vectors of '{args.namespace}' that only '{projection.index_name}' holds "
+                      f"(e.g. {missing[0]}); re-ingest those files first, or pass --force to drop them")
+                return 1
+        removed = delete_projection(args.namespace)
+        print(f"{'✅ Removed' if removed else '⚠️ No'} projection for namespace '{args.namespace}'")
+        return 0
+
+    if args.command == 'evaluate':
+        if args.vectors_npy:
+            vectors = np.load(args.vectors_npy, mmap_mode='r')
+            if len(vectors) > args.sample:
+                rows = np.sort(np.random.default_rng().choice(len(vectors), args.sample, replace=False))
+                vectors = vectors[rows]
+            vectors = np.asarray(vectors, dtype=np.float32)
+        else:
+            _, vectors = sample_namespace_vectors(get_pinecone_index(source_name), args.namespace, args.sample)
+        if len(vectors) < 10:
+            print(f"❌ Need at least 10 vectors to evaluate, found {len(vectors)}")
+            return 1
+        print(json.dumps(evaluate(vectors, args.dims, args.k, args.queries), indent=2))
+        return 0
+
+    source_name = (get_namespace_config(args.namespace) or {}).get('index_name') or source_name
+    source_index = get_pinecone_index(source_name)
+    _, sample = sample_namespace_vectors(source_index, args.namespace, args.sample)
+    if len(sample) <= args.dim:
+        print(f"❌ Need more than {args.dim} vectors to fit a {args.dim}-dim projection, found {len(sample)}")
+        return 1
+
+    target_name = args.index_name or f"{source_name}-{args.dim}"
+    projection = fit_projection(sample, args.dim, target_name)
+    print(f"🧮 Fitted {args.dim}-dim projection (explained variance {projection.explained_variance_ratio:.1%})")
+
+    target_index = ensure_pinecone_index(target_name, args.dim)
+    copied = backfill(source_index, target_index, args.namespace, projection)
+    print(f"📤 Copied {copied} projected vectors into '{target_name}'")
+
+    # Saving last makes the switch atomic: ingest and /ask only use the reduced index once it is populated
+    save_projection(args.namespace, projection)
+    print(f"✅ Namespace '{args.namespace}' now served from '{target_name}' at {args.dim} dims")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Back up, migrate and clone RAGs without re-extracting or re-embedding anything.
+
+    # Export a namespace (Pinecone or local FAISS) to snapshots/Santosh.pdf
+    python manage_snapshots.py export --namespace Santosh.pdf
+
+    # Restore it, or clone it under another name / into a local FAISS RAG
+    python manage_snapshots.py import --snapshot snapshots/Santosh.pdf
+    python manage_snapshots.py import --snapshot snapshots/Santosh.pdf --namespace Santosh-copy.pdf --engine faiss
+
+    # Show what a snapshot holds
+    python manage_snapshots.py inspect --snapshot snapshots/Santosh.pdf
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from dotenv import load_dotenv
+from config import Config
+from services.snapshot_service import export_namespace, import_snapshot, read_manifest
+
+load_dotenv()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and import namespace snapshots.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_export = sub.add_parser('export', help="Write a namespace's vectors, metadata and texts to a snapshot folder.")
+    p_export.add_argument('--namespace', required=True)
+    p_export.add_argument('--output', help="Snapshot folder (default: SNAPSHOT_PATH/<namespace>).")
+    p_export.add_argument('--overwrite', action='store_true', help="Replace an existing snapshot folder.")
+
+    p_import = sub.add_parser('import', help="Load a snapshot into a namespace.")
+    p_import.add_argument('--snapshot', required=True)
+    p_import.add_argument('--namespace', help="Target namespace (default: the exported one).")
+    p_import.add_argument('--engine', choices=['pinecone', 'faiss'], help="Target vector store (default: the exported one).")
+    p_import.add_argument('--index-name', help="Pinecone index to import into (default: the index for the RAG's backend).")
+    p_import.add_argument('--local-path', help="FAISS folder to import into (default: FAISS_INDEX_PATH/<namespace>).")
+    p_import.add_argument('--index-type', choices=['flat', 'hnsw', 'ivfpq'], help="FAISS index type (default: the exported one).")
+    p_import.add_argument('--overwrite', action='store_true', help="Replace a namespace that already exists (its current vectors and texts are deleted first).")
+
+    p_inspect = sub.add_parser('inspect', help="Print a snapshot's manifest.")
+    p_inspect.add_argument('--snapshot', required=True)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.command == 'inspect':
+            print(json.dumps(read_manifest(args.snapshot), indent=2, sort_keys=True))
+        elif args.command == 'export':
+            output = args.output or os.path.join(Config.SNAPSHOT_PATH, args.namespace)
+            manifest = export_namespace(args.namespace, output, overwrite=args.overwrite)
+            print(f"✅ Exported {manifest['count']} vectors ({manifest['dimension']} dims) of '{args.namespace}' to {output}")
+        else:
+            result = import_snapshot(args.snapshot, args.namespace, args.engine, args.index_name, args.local_path,
+                                     args.index_type, overwrite=args.overwrite)
+            print(f"✅ Imported {result['count']} vectors into '{result['namespace']}' ({result['engine']}: {result['target']}) in {result['elapsed_s']} s")
+    except (ValueError, FileExistsError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,180 @@
 import os
+import hashlib
 import logging
-from langchain_community.vectorstores import FAISS
-from langchain_openai.embeddings import OpenAIEmbeddings
+from config import Config
+from services.ann_index_service import LocalAnnIndex, get_local_index, forget_local_index
+from services.embedding_backends import get_backend
+from services.document_store import get_document_store
+from services.namespace_registry import register_namespace, update_namespace, get_namespace_config
+from services.rag_catalog_service import source_name_for_vector_id
+from services.dedup_service import ChunkDeduplicator, stored_vectors
+from utilities.pdf_extraction_utility import extract_text_from_pdf, section_spans
 
-def create_rag_system_from_files(folder_path, faiss_index_path):
+
+def read_source_files(folder_path):
+    """Yield (file_name, text) for the TXT and PDF files directly inside a folder."""
+    for file_name in sorted(os.listdir(folder_path)):
+        file_path = os.path.join(folder_path, file_name)
+        if file_name.endswith('.txt'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                yield file_name, f.read()
+        elif file_name.endswith('.pdf'):
+            yield file_name, extract_text_from_pdf(file_path)
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes, read a block at a time."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(Config.UPLOAD_READ_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def embed_file_chunks(backend, file_name, text, rag_name, dedup=None, lookup=None, skipped=None):
+    """
+    Section-aware window chunks of one file: (ids, vectors, metadatas, texts).
+
+    With a ChunkDeduplicator, near-duplicate windows are dropped (skip mode) or
+    reuse the vector of the chunk they duplicate (link mode), which `lookup`
+    returns as `{id: vector}` for ids outside this file; only the rest are embedded.
+    Dropped windows are recorded in `skipped`, if given, as `{id: id of the kept copy}`.
+    """
+    sections = section_spans(text)
+    section_starts = [start for _, start, _ in sections]
+    spans = (backend.split_section_windows(text, sections) if sections else backend.split_windows(text)) or [(0, len(text))]
+    ids, metadatas, texts = [], [], []
+    duplicates = {}
+    for window_number, (start, end) in enumerate(spans):
+        vector_id = f"{file_name}-full-w{window_number}"
+        duplicate_of = dedup.check(vector_id, file_name, text[start:end]) if dedup is not None else None
+        if duplicate_of and dedup.mode == 'skip':
+            dedup.avoided(1)
+            if skipped is not None:
+                skipped[vector_id] = duplicate_of
+            continue
+        section = max(i for i, section_start in enumerate(section_starts) if section_start <= start) if section_starts else 0
+        metadata = {
+            "file_name": file_name,
+            "rag_name": rag_name,
+            "source_type": "pdf" if file_name.endswith('.pdf') else "file",
+            "section_name": sections[section][0] if sections else "Introduction",
+            "window": window_number,
+            "char_start": start,
+            "char_end": end,
+        }
+        if duplicate_of:
+            metadata["duplicate_of"] = duplicate_of
+            duplicates[len(ids)] = duplicate_of
+        ids.append(vector_id)
+        metadatas.append(metadata)
+        texts.append(text[start:end])
+
+    position = {vector_id: i for i, vector_id in enumerate(ids)}
+    copies = lookup({duplicate_of for duplicate_of in duplicates.values() if duplicate_of not in position}) if duplicates and lookup else {}
+    embed = [i for i in range(len(ids)) if i not in duplicates or (duplicates[i] not in copies and duplicates[i] not in position)]
+    vectors = [None] * len(ids)
+    batch_size = Config.DOCUMENT_WINDOW_BATCH_SIZE
+    for batch_start in range(0, len(embed), batch_size):
+        batch = embed[batch_start:batch_start + batch_size]
+        for i, vector in zip(batch, backend.embed_batch([texts[i] for i in batch])):
+            vectors[i] = vector
+    for i, duplicate_of in duplicates.items():
+        if vectors[i] is None:
+            vectors[i] = vectors[position[duplicate_of]] if duplicate_of in position else copies[duplicate_of]
+    if dedup is not None:
+        dedup.avoided(len(ids) - len(embed))
+    return ids, vectors, metadatas, texts
+
+
+def create_rag_system_from_files(folder_path, faiss_index_path, index_type=None, embedding_backend=None):
     """
     Create a RAG system from files located in the specified folder.
-    
-    The files are used to create embeddings and build a FAISS index 
-    that can be used for retrieval-augmented generation (RAG).
+
+    The files are split into section-aware windows, embedded, and stored in a
+    local ANN index at `faiss_index_path` (see services/ann_index_service.py);
+    chunk texts go to the document store. If an index already exists there,
+    the files are added to it incrementally (replacing their earlier chunks)
+    instead of rebuilding it.
 
     Args:
         folder_path (str): Path to the folder containing files (PDF, TXT) to create RAG.
         faiss_index_path (str): Path to store the FAISS index.
+        index_type (str, optional): 'flat', 'hnsw' or 'ivfpq' (default Config.ANN_INDEX_TYPE); new indexes only.
+        embedding_backend (str, optional): Embedding backend for a new RAG (default Config.EMBEDDING_MODEL).
 
     Returns:
-        FAISS: The created FAISS vector store instance.
+        tuple: (LocalAnnIndex, None), or (None, error message).
     """
     try:
-        documents = []  # Extracted content from files
-        for file_name in os.listdir(folder_path):
+        rag_name = os.path.basename(os.path.normpath(faiss_index_path))
+        record = get_namespace_config(rag_name) or {}
+        backend = get_backend(record.get('backend') or embedding_backend)
+
+        # Near-duplicate windows may reuse vectors embedded earlier in this run, or already stored in the index
+        dedup = ChunkDeduplicator(rag_name, [name for name in os.listdir(folder_path) if name.endswith(('.txt', '.pdf'))])
+        existing = LocalAnnIndex.open(faiss_index_path) if LocalAnnIndex.exists(faiss_index_path) else None
+        known = {}
+
+        def lookup(vector_ids):
+            found = {vector_id: known[vector_id] for vector_id in vector_ids if vector_id in known}
+            missing = [vector_id for vector_id in vector_ids if vector_id not in found]
+            if missing and existing is not None:
+                found.update(stored_vectors(existing, rag_name, missing))
+            return found
+
+        ids, vectors, metadatas, texts = [], [], [], []
+        # Per-file registry entries, in the same shape /add-file records: skip mode keeps some windows only in
+        # other files' chunks (`depends_on`), so deleting one of those files re-ingests this one
+        uploads = {}
+        for file_name, text in read_source_files(folder_path):
+            if not text.strip():
+                continue
+            skipped = {}
+            file_ids, file_vectors, file_metadatas, file_texts = embed_file_chunks(backend, file_name, text, rag_name, dedup, lookup, skipped)
             file_path = os.path.join(folder_path, file_name)
-            if file_name.endswith('.txt'):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    documents.append(f.read())
-        
-        embeddings = OpenAIEmbeddings()
-        vector_store = FAISS.from_documents(documents, embeddings)
-        vector_store.save_local(faiss_index_path)
-        return vector_store, None
+            uploads[file_name] = {
+                "sha256": file_sha256(file_path), "bytes": os.path.getsize(file_path),
+                "type": 'pdf' if file_name.endswith('.pdf') else 'text', "chunks": len(file_ids) + len(skipped),
+                "duplicates": sum(1 for metadata in file_metadatas if "duplicate_of" in metadata) + len(skipped),
+                "depends_on": sorted({source_name_for_vector_id(duplicate_of) for duplicate_of in skipped.values()}),
+            }
+            known.update(zip(file_ids, file_vectors))
+            ids += file_ids
+            vectors += file_vectors
+            metadatas += file_metadatas
+            texts += file_texts
+        if not ids:
+            return None, f"No TXT or PDF content found in {folder_path}"
+
+        get_document_store().put_many(rag_name, list(zip(ids, texts)))
+        if LocalAnnIndex.exists(faiss_index_path):
+            index = LocalAnnIndex.open(faiss_index_path, mmap=False)
+            # Chunks a re-ingested file no longer produces (it got shorter) are dropped
+            new_ids, files = set(ids), set(uploads)
+            stale = [vector_id for file_name in files for vector_id in index.ids_with_prefix(file_name)
+                     if source_name_for_vector_id(vector_id) == file_name and vector_id not in new_ids]
+            if stale:
+                index.delete(stale)
+                get_document_store().delete_many(rag_name, stale)
+            index.upsert(ids, vectors, metadatas)
+        else:
+            index = LocalAnnIndex.build(faiss_index_path, ids, vectors, metadatas, index_type=index_type)
+        forget_local_index(faiss_index_path)
+        dedup.finish()
+
+        if not record:
+            register_namespace(rag_name, backend.name, backend.dimension, None)
+        record = get_namespace_config(rag_name) or {}
+        source_files = record.get('source_files', [])
+        update_namespace(
+            rag_name, engine='faiss', local_path=faiss_index_path, index_type=index.params["index_type"],
+            source_folder=os.path.abspath(folder_path),
+            uploads={**record.get('uploads', {}), **uploads},
+            source_files=source_files + sorted(set(uploads) - set(source_files))
+        )
+        logging.info("✅ Local RAG '%s' holds %d vectors (%s)", rag_name, index.count, index.params["factory"])
+        return get_local_index(faiss_index_path), None
     except Exception as e:
         logging.error(f"❌ Failed to create RAG system: {str(e)}", exc_info=True)
-        return None, None
\ No newline at end of file
+        return None, str(e)
@@ -12,6 +12,7 @@ from routes.set_default_rag_route import set_default_rag_blueprint
 from routes.get_default_rag_route import get_default_rag_blueprint
 from routes.healthcheck_route import healthcheck_blueprint
 from routes.namespace_summary import view_namespace_summary_blueprint
+from routes.metrics_route import metrics_blueprint
 
 
 def register_blueprints(app: Flask):
@@ -37,4 +38,5 @@ def register_blueprints(app: Flask):
     app.register_blueprint(get_default_rag_blueprint, url_prefix='/get-default-rag')
     app.register_blueprint(healthcheck_blueprint, url_prefix='/health')
     app.register_blueprint(view_namespace_summary_blueprint, url_prefix='/view-namespace-summary')
+    app.register_blueprint(metrics_blueprint, url_prefix='/metrics')
     return app
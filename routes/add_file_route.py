@@ -1,42 +1,57 @@
 import os
 import logging
 from flask import Blueprint, request, jsonify
-from langchain_community.embeddings import OpenAIEmbeddings
-from pinecone import Pinecone
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from config import Config
+from services.namespace_registry import EmbeddingBackendMismatch
+from services.upload_ingestion_service import ingest_upload, UnsupportedUploadType
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Pinecone
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
-PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME')
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
-
 # Blueprint
 add_file_blueprint = Blueprint('add_file', __name__)
 
+# Room for the multipart framing and form fields around the file itself
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
 @add_file_blueprint.route('', methods=['POST'])
 def add_file():
-    """Add file content to Pinecone."""
-    try:
-        file = request.files['file']
-        filename = file.filename
-        file_path = os.path.join("./data", filename)
-        file.save(file_path)
+    """
+    Add an uploaded PDF or text file to a namespace.
 
-        # Extract text
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-
-        # Generate embeddings
-        embeddings = OpenAIEmbeddings()
-        vector_data = embeddings.embed_documents([text])
+    The upload streams to a temporary file while it is hashed (see
+    utilities/upload_utility.py); its text is then chunked, embedded and
+    upserted in batches. Uploading content the namespace already holds is a
+    no-op that returns `"duplicate": true`.
+    """
+    if request.content_length and request.content_length > Config.UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD_BYTES:
+        return jsonify({"error": f"Upload exceeds the {Config.UPLOAD_MAX_BYTES} byte limit."}), 413
+    # The upload's temporary file is removed at teardown (utilities/upload_utility.py) unless ingestion moved it
+    try:
+        file = request.files.get('file')
+        if file is None or not file.filename:
+            return jsonify({"error": "No file uploaded (expected a 'file' form field)."}), 400
+        upload = file.stream
+        filename = secure_filename(os.path.basename(file.filename))
+        if not filename:
+            return jsonify({"error": "Invalid file name."}), 400
+        namespace = request.form.get('namespace', '')
 
-        # Upload to Pinecone
-        response = index.upsert(vectors=[{"id": filename, "values": vector_data[0]}])
+        result = ingest_upload(upload, filename, namespace, request.form.get('embedding_backend'))
+        if result["duplicate"]:
+            return jsonify({"message": f"File '{filename}' is already in the namespace as '{result['file_name']}'.", **result}), 200
         logging.info(f"✅ File {filename} added to Pinecone.")
-        return jsonify({"message": f"File '{filename}' added successfully."}), 200
+        return jsonify({"message": f"File '{filename}' added successfully.", **result}), 200
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Upload exceeds the {Config.UPLOAD_MAX_BYTES} byte limit."}), 413
+    except UnsupportedUploadType as e:
+        return jsonify({"error": str(e)}), 415
+    except EmbeddingBackendMismatch as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.error(f"❌ Error adding file: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -1,18 +1,15 @@
 import logging
 import requests
 from flask import Blueprint, request, jsonify
-from langchain_community.embeddings import OpenAIEmbeddings
-from pinecone import Pinecone
 from bs4 import BeautifulSoup
+from services.pinecone_service import ensure_pinecone_index
+from services.namespace_registry import resolve_namespace_backend, register_namespace, EmbeddingBackendMismatch
+from services.document_store import get_document_store
+from services.rag_catalog_service import invalidate_rag_catalog
+from services.projection_service import upsert_with_projection
 from dotenv import load_dotenv
-import os
 load_dotenv()
 
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
-PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME')
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
-
 # Blueprint
 add_url_blueprint = Blueprint('add_url', __name__)
 
@@ -22,19 +19,33 @@ def add_url():
     try:
         data = request.get_json()
         url = data.get('url')
+        namespace = data.get('namespace', '')
 
         response = requests.get(url)
         soup = BeautifulSoup(response.text, 'html.parser')
         text = soup.get_text()
 
-        # Generate embeddings
-        embeddings = OpenAIEmbeddings()
-        vector_data = embeddings.embed_documents([text])
+        # Generate embeddings with the backend this namespace uses
+        try:
+            backend, index_name, registered = resolve_namespace_backend(namespace, data.get('embedding_backend'))
+        except EmbeddingBackendMismatch as e:
+            return jsonify({"error": str(e)}), 409
+        vector_data = backend.embed(text)
 
-        # Upload to Pinecone
-        response = index.upsert(vectors=[{"id": url, "values": vector_data[0]}])
+        # Upload to Pinecone; the text itself goes to the document store
+        index = ensure_pinecone_index(index_name, backend.dimension)
+        get_document_store().put_many(namespace, [(url, text)])
+        projection = upsert_with_projection(
+            index, namespace,
+            [{"id": url, "values": vector_data.tolist(), "metadata": {"source_url": url, "source_type": "url", "char_count": len(text)}}]
+        )
+        invalidate_rag_catalog(index_name, namespace)
+        if projection is not None:
+            invalidate_rag_catalog(projection.index_name, namespace)
+        if not registered:
+            register_namespace(namespace, backend.name, backend.dimension, index_name)
         logging.info(f"✅ URL {url} content added to Pinecone.")
         return jsonify({"message": f"URL '{url}' added successfully."}), 200
     except Exception as e:
         logging.error(f"❌ Error adding URL: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
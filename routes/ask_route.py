@@ -1,28 +1,126 @@
+import json
+import math
+import time
 import logging
-import numpy as np
-from flask import Blueprint, request, jsonify
-from services.embedding_service import get_embedding  # Ensure it uses instructor-xl
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, Response, request, jsonify
+from services.namespace_registry import resolve_namespace_backend, get_namespace_config
 from services.pinecone_service import get_pinecone_index
+from services.document_store import get_document_store
+from services.projection_service import get_projection
+from services.llm_client import get_llm_client, LLMRateLimited, LLMDeadlineExceeded
+from utilities.singleflight_utility import SingleFlight, normalize_query
+from utilities.metadata_filter_utility import build_metadata_filter, filter_key, filter_fields, SECTION_FIELDS
 from dotenv import load_dotenv
 import os
-import openai  # ✅ Import OpenAI for ChatGPT integration
+from config import Config
 
 # Load environment variables
 load_dotenv()
 
-# Set OpenAI API Key from .env file
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai.api_key = OPENAI_API_KEY  # ✅ Set the OpenAI API key globally
+ask_blueprint = Blueprint('ask', __name__)
 
-# Configure logging to log token usage in a separate file
-token_log_path = '/Users/santoshtalluri/Documents/MyDevProjects/pinecone-poc/logs/token_usage.log'
-logging.basicConfig(
-    filename=token_log_path,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+TOP_K = 10
 
-ask_blueprint = Blueprint('ask', __name__)
+# Identical concurrent /ask requests share one embedding, one Pinecone query and one ChatGPT call
+_embedding_flight = SingleFlight('embedding')
+_retrieval_flight = SingleFlight('retrieval')
+_llm_flight = SingleFlight('llm')
+
+# /ask/batch runs its vector queries and ChatGPT calls on these pools, so one large batch can't monopolise either
+_batch_retrieval_executor = ThreadPoolExecutor(max_workers=Config.ASK_BATCH_RETRIEVAL_CONCURRENCY, thread_name_prefix='ask-batch-retrieval')
+_batch_llm_executor = ThreadPoolExecutor(max_workers=Config.ASK_BATCH_LLM_CONCURRENCY, thread_name_prefix='ask-batch-llm')
+
+
+def _query_pinecone(index_name, namespace, embedding, metadata_filter=None, top_k=TOP_K):
+    index = get_pinecone_index(index_name)
+    if not index:
+        raise ConnectionError("Failed to connect to Pinecone index.")
+    logging.info("🔍 Querying Pinecone with top_k=%d, namespace=%s, filter=%s", top_k, namespace, metadata_filter)
+    # The filter is applied by the index during the search, so only matching chunks are ranked and returned
+    response = index.query(
+        vector=embedding,
+        top_k=top_k,
+        namespace=namespace,
+        filter=metadata_filter,
+        include_metadata=True
+    )
+    return response.get('matches', [])
+
+
+def _query_local(local_path, embedding, metadata_filter=None, top_k=TOP_K):
+    from services.ann_index_service import get_local_index
+    logging.info("🔍 Querying local index %s with top_k=%d, filter=%s", local_path, top_k, metadata_filter)
+    return get_local_index(local_path).query(embedding, top_k=top_k, filter=metadata_filter)['matches']
+
+
+def _check_section_filter(namespace, metadata_filter):
+    """Reject filters on section fields for RAGs stored only as whole-document vectors (they would match nothing)."""
+    fields = filter_fields(metadata_filter) & set(SECTION_FIELDS)
+    if fields and (get_namespace_config(namespace) or {}).get('section_tagged') is False:
+        raise ValueError(
+            f"Namespace '{namespace}' has no section-tagged chunks, so it can't be filtered on "
+            f"{', '.join(sorted(fields))}. Re-create it without \"keep_window_vectors\": false."
+        )
+
+
+def _retrieve(namespace, index_name, embedding, query_key, metadata_filter=None, top_k=TOP_K):
+    """
+    Nearest chunks for a query embedding: from the RAG's local FAISS index, or from Pinecone
+    (the reduced-width index if the RAG has a projection). Raises ConnectionError if Pinecone is unreachable.
+    """
+    local_path = (get_namespace_config(namespace) or {}).get('local_path')
+    if local_path is not None:
+        return _retrieval_flight.do(
+            (local_path, query_key, top_k, filter_key(metadata_filter)),
+            _query_local, local_path, embedding, metadata_filter, top_k
+        )
+    projection = get_projection(namespace)
+    if projection is not None:
+        embedding = projection.project(embedding)
+        index_name = projection.index_name
+    return _retrieval_flight.do(
+        (index_name, namespace, query_key, top_k, filter_key(metadata_filter)),
+        _query_pinecone, index_name, namespace, embedding.tolist(), metadata_filter, top_k
+    )
+
+
+def _build_context(namespace, matches):
+    # Batch-fetch the matched texts from the document store in one round trip
+    texts = get_document_store().get_many(namespace, [match.get('id') for match in matches])
+    context = ""
+    groups = set()
+    for match in matches:
+        # Linked near-duplicate chunks carry the id of the chunk they duplicate; each group goes into the prompt once
+        group = (match.get('metadata') or {}).get('duplicate_of') or match.get('id')
+        if group in groups:
+            continue
+        groups.add(group)
+        # Vectors written before the document store existed still carry their text in metadata
+        content = texts.get(match.get('id')) or (match.get('metadata') or {}).get('content', '')
+        context += f"{content}\n\n"
+    return context
+
+
+def _generate(namespace, query, query_key, matches, context, top_k=TOP_K):
+    """Ask ChatGPT to answer `query` from `context`; returns the raw chat completion."""
+    prompt = f"""
+You are a smart assistant. The user has asked the following question: '{query}'.
+Here is some context related to the question from the RAG system:
+{context}
+Using this context, provide a clear and natural language response to the user.
+"""
+    # Call ChatGPT through the shared client (pooled connection, adaptive concurrency limit, retries, deadline)
+    llm_key = (namespace, query_key, top_k, tuple(match.get('id') for match in matches))
+    return _llm_flight.do(
+        llm_key,
+        get_llm_client().chat_completion,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=500  # Limit the response length
+    )
 
 @ask_blueprint.route('', methods=['POST'])
 def ask():
@@ -39,72 +137,239 @@ def ask():
             logging.error("❌ No namespace provided.")
             return jsonify({"error": "Namespace is required."}), 400
 
-        # Step 1: Generate embedding for the query
-        logging.info(f"🧠 Generating embeddings for the query: {query}")
-        embedding = get_embedding(query)  # ✅ Ensure this uses Instructor-XL, not MPNet
-        if isinstance(embedding, np.ndarray):
-            embedding = embedding.tolist()
-
-        # Step 2: Query Pinecone for the most relevant context
-        index = get_pinecone_index()
-        if not index:
-            logging.error("❌ Failed to connect to Pinecone index.")
-            return jsonify({"error": "Failed to connect to Pinecone index."}), 500
-
-        logging.info(f"🔍 Querying Pinecone with top_k=10, namespace={namespace}")
-        response = index.query(
-            vector=embedding,  
-            top_k=10,  
-            namespace=namespace,
-            include_metadata=True  
-        )
+        # Optional metadata filter (section_name, file_name, page, source_type...), pushed down into the vector query
+        try:
+            metadata_filter = build_metadata_filter(data.get('filter'))
+            _check_section_filter(namespace, metadata_filter)
+        except ValueError as e:
+            logging.error("❌ Invalid filter: %s", e)
+            return jsonify({"error": str(e)}), 400
+
+        # Step 1: Generate embedding for the query with the backend the namespace was built with
+        backend, index_name, _ = resolve_namespace_backend(namespace)
+        query_key = normalize_query(query)
+        logging.info("🧠 Generating '%s' embeddings for the query (%d chars)", backend.name, len(query))
+        embedding = _embedding_flight.do((backend.name, query_key), backend.embed_query, query)
+
+        # Step 2: Query Pinecone for the most relevant context (reduced-width index if the RAG has a projection);
+        # local FAISS RAGs are searched in their memory-mapped index instead
+        try:
+            matches = _retrieve(namespace, index_name, embedding, query_key, metadata_filter)
+        except ConnectionError as e:
+            logging.error("❌ %s", e)
+            return jsonify({"error": str(e)}), 500
 
-        matches = response.get('matches', [])
         if not matches:
             logging.warning("⚠️ No matches found in Pinecone for the query.")
             return jsonify({"response": "No relevant information found in the RAG system."}), 200
+        logging.info("🔍 %d candidates from Pinecone (filter=%s)", len(matches), metadata_filter)
 
-        # Step 3: Extract relevant content from Pinecone results
-        context = ""
-        for match in matches:
-            metadata = match.get('metadata', {})
-            content = metadata.get('content', '')
-            context += f"{content}\n\n"
+        # Step 3: Batch-fetch the matched texts from the document store in one round trip
+        context = _build_context(namespace, matches)
 
-        logging.info(f"🧠 Extracted context from Pinecone (first 500 chars): {context[:500]}...")
+        logging.info("🧠 Extracted context from Pinecone: %d matches, %d chars", len(matches), len(context))
+        logging.debug("🧠 Context preview: %.500s", context, extra={"sample_rate": Config.LOG_PAYLOAD_SAMPLE_RATE})
 
         # Step 4: Call OpenAI API to generate a natural language response
-        prompt = f"""
-You are a smart assistant. The user has asked the following question: '{query}'.
-Here is some context related to the question from the RAG system:
-{context}
-Using this context, provide a clear and natural language response to the user.
-"""
-        logging.info(f"🧠 Sending context and query to ChatGPT for response generation")
-
-        # Call OpenAI's ChatGPT API (new syntax)
-        chatgpt_response = openai.ChatCompletion.create(
-            model="gpt-4",  # Use gpt-4 or gpt-3.5-turbo
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500  # Limit the response length
-        )
+        logging.info("🧠 Sending context and query to ChatGPT for response generation")
+        try:
+            chatgpt_response = _generate(namespace, query, query_key, matches, context)
+        except LLMRateLimited as e:
+            logging.warning("⚠️ ChatGPT is throttling requests: %s", e)
+            response = jsonify({"error": "The language model is busy. Please retry shortly."})
+            response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after or Config.LLM_BACKOFF_MAX_SECONDS)))
+            return response, 503
+        except LLMDeadlineExceeded as e:
+            logging.warning("⚠️ ChatGPT call timed out: %s", e)
+            return jsonify({"error": "The language model did not respond in time."}), 504
 
-        answer = chatgpt_response.choices[0].message['content']
+        answer = chatgpt_response['choices'][0]['message']['content']
         
         # Extract token usage from the OpenAI response
         total_tokens_used = chatgpt_response['usage']['total_tokens']
-        logging.info(f"📊 Total tokens used: {total_tokens_used}")
+        logging.info("📊 Total tokens used: %s", total_tokens_used, extra={"total_tokens": total_tokens_used, "namespace": namespace})
         
         # Append the message about token usage to the user's response
         response_message = f"{answer}\n\nOur program has used {total_tokens_used} tokens to ChatGPT to generate this message."
         
-        logging.info(f"🧠 ChatGPT response: {response_message[:200]}...")  # Log first 200 characters of the response
+        logging.debug("🧠 ChatGPT response: %.200s", response_message, extra={"sample_rate": Config.LOG_PAYLOAD_SAMPLE_RATE})
 
         return jsonify({"response": response_message}), 200
 
     except Exception as e:
-        logging.error(f"❌ Error processing query: {str(e)}", exc_info=True)
-        return jsonify({"error": "An unexpected error occurred while processing your query."}), 500
\ No newline at end of file
+        logging.error("❌ Error processing query: %s", e, exc_info=True)
+        return jsonify({"error": "An unexpected error occurred while processing your query."}), 500
+
+
+def _parse_batch_queries(data):
+    """Normalize the `queries` of an /ask/batch body into dicts with `query`, `id` and an optional `filter`."""
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("'queries' must be a non-empty list.")
+    if len(queries) > Config.ASK_BATCH_MAX_QUERIES:
+        raise ValueError(f"At most {Config.ASK_BATCH_MAX_QUERIES} queries per batch.")
+    default_filter = build_metadata_filter(data.get('filter'))
+    items = []
+    for position, item in enumerate(queries):
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not isinstance(item.get('query'), str) or not item['query'].strip():
+            raise ValueError(f"Query {position} must be a non-empty string or an object with a 'query'.")
+        items.append({
+            "id": item.get('id', position),
+            "query": item['query'],
+            "filter": build_metadata_filter(item['filter']) if 'filter' in item else default_filter,
+        })
+    return items
+
+
+def _summarize_match(match):
+    metadata = match.get('metadata') or {}
+    summary = {"id": match.get('id'), "score": match.get('score')}
+    for key in ('file_name', 'section_name', 'page'):
+        if key in metadata:
+            summary[key] = metadata[key]
+    return summary
+
+
+def _answer_batch_query(namespace, item, matches, top_k):
+    """Generate the answer for one retrieved batch query, recording the outcome on `item`."""
+    started = time.perf_counter()
+    try:
+        context = _build_context(namespace, matches)
+        chatgpt_response = _generate(namespace, item["query"], item["query_key"], matches, context, top_k)
+        item["response"] = chatgpt_response['choices'][0]['message']['content']
+        item["usage"] = chatgpt_response.get('usage', {})
+    except LLMRateLimited as e:
+        item["error"] = f"The language model is busy: {e}"
+    except LLMDeadlineExceeded as e:
+        item["error"] = f"The language model did not respond in time: {e}"
+    except Exception as e:
+        logging.error("❌ Batch query %s failed during generation: %s", item["id"], e, exc_info=True)
+        item["error"] = str(e)
+    item["timings"]["llm_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+    return item
+
+
+def _run_batch(namespace, backend, index_name, items, top_k, generate):
+    """
+    Answer a batch of queries, yielding each result as soon as it is complete (not in input order).
+
+    The queries are embedded together, ASK_BATCH_EMBED_SIZE at a time; vector
+    queries then run on the retrieval pool and, as each returns, its ChatGPT call
+    is queued on the LLM pool. Failures are reported per query.
+    """
+    for start in range(0, len(items), Config.ASK_BATCH_EMBED_SIZE):
+        chunk = items[start:start + Config.ASK_BATCH_EMBED_SIZE]
+        started = time.perf_counter()
+        embeddings = backend.embed_query_batch([item["query"] for item in chunk])
+        embed_ms = round((time.perf_counter() - started) * 1000.0 / len(chunk), 2)
+        for item, embedding in zip(chunk, embeddings):
+            item["embedding"] = embedding
+            item["timings"] = {"embed_ms": embed_ms}
+
+    def retrieve(item):
+        started = time.perf_counter()
+        try:
+            item["matches"] = _retrieve(namespace, index_name, item.pop("embedding"), item["query_key"], item["filter"], top_k)
+        except Exception as e:
+            logging.error("❌ Batch query %s failed during retrieval: %s", item["id"], e)
+            item["error"] = str(e)
+        item["timings"]["retrieval_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+        return item
+
+    answers = []
+    for future in as_completed([_batch_retrieval_executor.submit(retrieve, item) for item in items]):
+        item = future.result()
+        if generate and "error" not in item and item["matches"]:
+            answers.append(_batch_llm_executor.submit(_answer_batch_query, namespace, item, item["matches"], top_k))
+        else:
+            if "error" not in item and not item["matches"]:
+                item["response"] = "No relevant information found in the RAG system."
+            yield item
+    for future in as_completed(answers):
+        yield future.result()
+
+
+def _batch_result(item):
+    result = {"id": item["id"], "query": item["query"], "timings": item["timings"]}
+    if "matches" in item:
+        result["matches"] = [_summarize_match(match) for match in item["matches"]]
+    for key in ('response', 'usage', 'error'):
+        if key in item:
+            result[key] = item[key]
+    return result
+
+
+@ask_blueprint.route('/batch', methods=['POST'])
+def ask_batch():
+    """
+    Answer a list of queries against one namespace in a single request.
+
+    Body: `namespace`, `queries` (strings, or objects with `query` and optional
+    `id` / `filter`), and optionally `filter` (the default for every query),
+    `top_k`, `generate` (false returns only the retrieved ids and scores) and
+    `stream` (true returns one JSON line per query as it completes, then a
+    summary line). Without streaming, results come back in input order.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        namespace = os.path.basename(data.get('namespace') or '')
+        if not namespace:
+            logging.error("❌ No namespace provided.")
+            return jsonify({"error": "Namespace is required."}), 400
+        try:
+            items = _parse_batch_queries(data)
+            for item in items:
+                _check_section_filter(namespace, item["filter"])
+            top_k = int(data.get('top_k', TOP_K))
+            if not 1 <= top_k <= Config.ASK_BATCH_MAX_TOP_K:
+                raise ValueError(f"'top_k' must be between 1 and {Config.ASK_BATCH_MAX_TOP_K}.")
+        except (TypeError, ValueError) as e:
+            logging.error("❌ Invalid batch request: %s", e)
+            return jsonify({"error": str(e)}), 400
+        generate = bool(data.get('generate', True))
+        for item in items:
+            item["query_key"] = normalize_query(item["query"])
+
+        backend, index_name, _ = resolve_namespace_backend(namespace)
+        logging.info("🧠 Answering a batch of %d queries against '%s' (top_k=%d, generate=%s)", len(items), namespace, top_k, generate)
+        started = time.perf_counter()
+
+        def summary():
+            usage = {}
+            for item in items:
+                for key, value in (item.get('usage') or {}).items():
+                    if isinstance(value, (int, float)):
+                        usage[key] = usage.get(key, 0) + value
+            return {
+                "namespace": namespace,
+                "count": len(items),
+                "errors": sum(1 for item in items if "error" in item),
+                "usage": usage,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2),
+            }
+
+        if data.get('stream'):
+            def generate_lines():
+                try:
+                    for item in _run_batch(namespace, backend, index_name, items, top_k, generate):
+                        yield json.dumps(_batch_result(item)) + '\n'
+                except Exception as e:
+                    logging.error("❌ Batch failed: %s", e, exc_info=True)
+                    yield json.dumps({"error": str(e)}) + '\n'
+                    return
+                yield json.dumps({"summary": summary()}) + '\n'
+            return Response(generate_lines(), mimetype='application/x-ndjson')
+
+        for _ in _run_batch(namespace, backend, index_name, items, top_k, generate):
+            pass
+        result = summary()
+        result["results"] = [_batch_result(item) for item in items]
+        logging.info("📊 Batch of %d queries answered in %.0f ms (%d errors, %s tokens)", len(items), result["elapsed_ms"],
+                     result["errors"], result["usage"].get('total_tokens', 0))
+        return jsonify(result), 200
+
+    except Exception as e:
+        logging.error("❌ Error processing query batch: %s", e, exc_info=True)
+        return jsonify({"error": "An unexpected error occurred while processing the query batch."}), 500
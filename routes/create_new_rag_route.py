@@ -1,46 +1,22 @@
 import os
 import logging
-import re  # ✅ Added re to use clean_text function
 from flask import Blueprint, request, jsonify
-from services.pinecone_service import get_pinecone_index
-from utilities.pdf_extraction_utility import extract_text_from_pdf
-from services.embedding_service import get_embedding  # ✅ Uses dynamic embedding selection
+from services.pinecone_service import ensure_pinecone_index
+from config import Config
+import bisect
+from utilities.pdf_extraction_utility import extract_pages_from_pdf, section_spans, clean_text
+from services.namespace_registry import resolve_namespace_backend, register_namespace, update_namespace, get_namespace_config, EmbeddingBackendMismatch
+from services.document_store import get_document_store
+from services.rag_catalog_service import invalidate_rag_catalog
+from services.projection_service import upsert_with_projection, delete_with_projection
+from services.dedup_service import ChunkDeduplicator
 from dotenv import load_dotenv
-import pinecone  # ✅ Import pinecone to delete/recreate index
 
 # Load environment variables
 load_dotenv()
 
 create_new_rag_blueprint = Blueprint('create_new_rag', __name__)
 
-def clean_text(text):
-    """Clean unwanted headers, footers, and page numbers from the extracted text."""
-    text = re.sub(r'P\s*a\s*g\s*e\s*\d+\s*\|\s*\d+', '', text)  # Remove page numbers
-    text = re.sub(r'\n+', '\n', text)  # Remove extra newlines
-    text = re.sub(r'\s+', ' ', text)  # Remove excessive whitespace
-    return text.strip()
-
-def recreate_pinecone_index(index_name, dimension):
-    """Recreate the Pinecone index with the correct dimension."""
-    try:
-        logging.info(f"🗑️ Deleting existing Pinecone index: {index_name}")
-        pinecone.init(api_key=os.getenv("PINECONE_API_KEY"), environment="us-east1-gcp")
-        
-        # Delete existing index
-        try:
-            pinecone.delete_index(index_name)
-        except Exception as e:
-            logging.warning(f"⚠️ Failed to delete existing index. It may not exist. {str(e)}")
-        
-        logging.info(f"📦 Recreating Pinecone index '{index_name}' with dimension {dimension}")
-        pinecone.create_index(index_name, dimension=dimension, metric="cosine")
-
-        logging.info(f"✅ Successfully created index '{index_name}' with dimension {dimension}")
-    except Exception as e:
-        logging.error(f"❌ Error recreating Pinecone index: {str(e)}", exc_info=True)
-        raise
-
-
 @create_new_rag_blueprint.route('', methods=['POST'])
 def create_new_rag():
     try:
@@ -54,75 +30,125 @@ def create_new_rag():
 
         logging.info(f"📄 Starting to process file: {file_path} for RAG: {rag_name}")
 
-        # Step 1: Extract the full text from the PDF file
-        full_text = extract_text_from_pdf(file_path)
+        # Step 1: Extract the text page by page, so chunks can be tagged with the page they start on
+        pages = extract_pages_from_pdf(file_path)
+
+        # Step 2: Clean each page and join them, remembering where every page starts
+        full_text, page_starts = "", []
+        for page_text in pages:
+            page_text = clean_text(page_text)
+            if not page_text:
+                continue
+            if full_text:
+                full_text += " "
+            page_starts.append((len(full_text), len(page_starts) + 1))
+            full_text += page_text
         if not full_text.strip():
             logging.warning(f"⚠️ No content extracted from {file_path}.")
             return jsonify({"error": "No content extracted from the PDF file."}), 400
+        logging.info("📄 Cleaned text from PDF: %d chars over %d pages", len(full_text), len(page_starts))
+        logging.debug("📄 Cleaned text preview: %.200s", full_text, extra={"sample_rate": Config.LOG_PAYLOAD_SAMPLE_RATE})
 
-        # Step 2: Clean the extracted text
-        full_text = clean_text(full_text)
-        logging.info(f"📄 Cleaned text from PDF (first 200 chars): {full_text[:200]}...")
-
-        # Step 3: Connect to Pinecone
-        index = get_pinecone_index()
-        if not index:
-            logging.error("❌ Pinecone index connection failed.")
-            return jsonify({"error": "Pinecone index connection failed."}), 500
-
-        # Step 4: Generate a single embedding for the entire content
-        logging.info(f"🧠 Generating embeddings for the full content of {file_path}")
-        embedding = get_embedding(full_text)
+        # Step 3: Pick the embedding backend and index for this namespace
+        file_name = os.path.basename(file_path)  # ✅ Use only the file name for namespace
+        try:
+            backend, index_name, registered = resolve_namespace_backend(file_name, data.get('embedding_backend'))
+        except ValueError as e:
+            logging.error("❌ %s", e)
+            return jsonify({"error": str(e)}), 409 if isinstance(e, EmbeddingBackendMismatch) else 400
+
+        # Section headers are configurable per RAG: the request's, else the set recorded for the RAG, else the defaults
+        section_headers = data.get('section_headers') or (get_namespace_config(file_name) or {}).get('section_headers') or Config.SECTION_HEADERS
+        if not isinstance(section_headers, list) or not all(isinstance(header, str) and header.strip() for header in section_headers):
+            return jsonify({"error": "section_headers must be a list of header names."}), 400
+        sections = section_spans(full_text, section_headers)
+
+        # Step 4: Embed the entire content as one vector (overlapping windows cut inside each section, length-weighted pooling).
+        # The section-tagged windows are stored too, for retrieval and section/page filters; the pooled vector routes to the document.
+        keep_windows = data.get('keep_window_vectors', Config.DOCUMENT_KEEP_WINDOW_VECTORS)
+        logging.info("🧠 Generating '%s' embeddings for the full content of %s (%d sections)", backend.name, file_path, len(sections))
+        embedding, windows = backend.embed_document(full_text, keep_windows=keep_windows, sections=sections)
         if embedding is None:
             logging.error(f"❌ Failed to generate embedding for the file: {file_path}")
             return jsonify({"error": "Failed to generate embedding for the file."}), 500
 
-        # Step 5: Create a single vector for the entire file
-        file_name = os.path.basename(file_path)  # ✅ Use only the file name for namespace
+        # Step 5: Connect to Pinecone (the backend's index is created on first use with the right dimension).
+        # RAGs with a fitted projection also get a reduced copy of every vector in the projection's index.
+        index = ensure_pinecone_index(index_name, backend.dimension)
+
+        # Step 6: Create a single vector for the entire file, plus one per window if requested
         vector_id = f"{file_name}-full"
         vectors = [{
             "id": vector_id,
-            "values": embedding,
+            "values": embedding.tolist(),
             "metadata": {
                 "file_name": file_name,
                 "rag_name": rag_name,
-                "content": full_text  # ✅ Store the full content
+                "source_type": "pdf",
+                "page_count": len(page_starts),
+                "char_count": len(full_text)  # Text itself lives in the document store, not in vector metadata
             }
         }]
-
-        try:
-            logging.info(f"📤 Upserting 1 vector to Pinecone for namespace: {file_name}")
-            index.upsert(vectors=vectors, namespace=file_name)
-
-        except pinecone.PineconeApiException as e:
-            if "Vector dimension" in str(e) and "does not match" in str(e):
-                logging.warning("⚠️ Detected vector dimension mismatch with Pinecone index.")
-                
-                # Extract the current and expected dimensions from the error message
-                import re
-                match = re.search(r"Vector dimension (\d+) does not match the dimension of the index (\d+)", str(e))
-                if match:
-                    current_dim = int(match.group(1))
-                    index_dim = int(match.group(2))
-                    logging.warning(f"❌ Current embedding dimension: {current_dim}, Pinecone index dimension: {index_dim}")
-                    
-                    user_input = input(f"⚠️ The current embedding dimension ({current_dim}) does not match the Pinecone index dimension ({index_dim}).\n"
-                                       f"Do you want to recreate the index with dimension {current_dim}? (yes/no): ")
-                    if user_input.lower() in ['yes', 'y']:
-                        recreate_pinecone_index(index_name="rag-index", dimension=current_dim)
-                        logging.info("📤 Retrying upsert after index recreation")
-                        index.upsert(vectors=vectors, namespace=file_name)
-                    else:
-                        logging.error("❌ User chose not to recreate the index.")
-                        return jsonify({"error": "User declined to recreate the Pinecone index."}), 400
-                else:
-                    logging.error(f"❌ Could not extract dimensions from error message: {str(e)}")
-                    raise
+        texts = [(vector_id, full_text)]
+        section_starts = [start for _, start, _ in sections]
+        page_offsets = [start for start, _ in page_starts]
+        # Windows that near-duplicate chunks already in the namespace are dropped or marked (they were embedded for the pooled vector anyway)
+        dedup = ChunkDeduplicator(file_name, [file_name])
+        for window_number, (start, end, window_vector) in enumerate(windows or []):
+            window_id = f"{vector_id}-w{window_number}"
+            duplicate_of = dedup.check(window_id, file_name, full_text[start:end])
+            if duplicate_of and dedup.mode == 'skip':
+                continue
+            metadata = {
+                "file_name": file_name,
+                "rag_name": rag_name,
+                "source_type": "pdf",
+                "section_name": sections[max(0, bisect.bisect_right(section_starts, start) - 1)][0],
+                "page": page_starts[max(0, bisect.bisect_right(page_offsets, start) - 1)][1],
+                "window": window_number,
+                "char_start": start,
+                "char_end": end,
+                "char_count": end - start
+            }
+            if duplicate_of:
+                metadata["duplicate_of"] = duplicate_of
+            vectors.append({"id": window_id, "values": window_vector.tolist(), "metadata": metadata})
+            texts.append((window_id, full_text[start:end]))
+
+        # Step 7: Store the text in the document store, keyed by vector id
+        get_document_store().put_many(file_name, texts)
+
+        logging.info("📤 Upserting %d vectors to Pinecone index '%s' for namespace: %s", len(vectors), index_name, file_name)
+        projection = upsert_with_projection(index, file_name, vectors)
+        # Windows of an earlier ingest that this one didn't rewrite: it has fewer windows, skipped them as duplicates, or kept none
+        window_prefix = f"{vector_id}-w"
+        written = {vector["id"] for vector in vectors}
+        stale = [window_id for page in index.list(prefix=window_prefix, namespace=file_name) for window_id in page
+                 if window_id[len(window_prefix):].isdigit() and window_id not in written]
+        if stale:
+            delete_with_projection(index, file_name, stale)
+            get_document_store().delete_many(file_name, stale)
+            logging.info("🗑️ Removed %d stale window vectors of '%s'", len(stale), file_name)
+        dedup.finish()
+        invalidate_rag_catalog(index_name, file_name)
+        if projection is not None:
+            invalidate_rag_catalog(projection.index_name, file_name)
+
+        # Step 8: Record the backend so queries on this namespace embed with the same model
+        if not registered:
+            register_namespace(file_name, backend.name, backend.dimension, index_name)
+        # Without window vectors the RAG has no section_name/page metadata, and /ask rejects filters on them
+        fields = {"section_tagged": bool(windows)}
+        if data.get('section_headers'):
+            fields["section_headers"] = section_headers
+        update_namespace(file_name, **fields)
 
         return jsonify({
             "message": f"RAG '{rag_name}' created successfully.",
             "file_name": file_name,
-            "total_vectors": 1
+            "embedding_backend": backend.name,
+            "total_vectors": len(vectors),
+            "dedup": dedup.report()
         }), 200
 
     except Exception as e:
@@ -1,6 +1,13 @@
 import os
+import shutil
 import logging
 from flask import Blueprint, request, jsonify
+from config import Config
+from services.file_index_service import file_index
+from services.namespace_registry import get_namespace_config
+from services.deletion_service import (
+    delete_namespace, start_deletion_job, get_deletion_job, should_run_in_background, index_name_for_namespace
+)
 
 delete_rag_blueprint = Blueprint('delete_rag', __name__)
 
@@ -10,24 +17,50 @@ def delete_rag():
     Delete a specific RAG from the system.
 
     Args:
-        rag_name (str): The name of the RAG to delete.
+        rag_name (str): The name of the RAG to delete: a namespace, or `index::namespace`
+            as shown by /view-rags. A local FAISS RAG folder of that name is removed too.
+        background (bool, optional): Run as a background job; large RAGs always do.
 
     Returns:
-        JSON: Success or failure message.
+        JSON: Deleted count and elapsed time (200), a job to poll (202), or an error.
     """
     try:
         data = request.get_json()
         rag_name = data.get('rag_name')
-
-        if rag_name:
-            rag_path = os.path.join(Config.FAISS_NEW_RAGS_PATH, rag_name)
-            if os.path.exists(rag_path):
-                os.rmdir(rag_path)
-                return jsonify({"message": f"RAG {rag_name} deleted successfully."}), 200
-            else:
-                return jsonify({"error": f"RAG {rag_name} not found."}), 404
-        else:
+        if not rag_name:
             return jsonify({"error": "No RAG name provided"}), 400
+
+        index_name, _, namespace = rag_name.rpartition('::')
+        if namespace == 'default':
+            namespace = ''
+        index_name = index_name or data.get('index_name') or index_name_for_namespace(namespace)
+
+        # Registered local FAISS RAGs are removed by delete_namespace; this catches unregistered folders
+        removed_local = False
+        rag_path = os.path.join(Config.FAISS_NEW_RAGS_PATH, os.path.basename(namespace))
+        local_path = (get_namespace_config(namespace) or {}).get('local_path') if namespace else None
+        if namespace and local_path is None and os.path.isdir(rag_path):
+            shutil.rmtree(rag_path)
+            file_index.notify(rag_path)
+            removed_local = True
+
+        if data.get('background') or should_run_in_background(namespace, index_name):
+            job = start_deletion_job('rag', namespace=namespace, index_name=index_name)
+            return jsonify({"message": f"Deletion of RAG {rag_name} started.", "job": job.to_dict()}), 202
+
+        result = delete_namespace(namespace, index_name=index_name)
+        if not result["deleted"] and not removed_local and local_path is None:
+            return jsonify({"error": f"RAG {rag_name} not found."}), 404
+        return jsonify({"message": f"RAG {rag_name} deleted successfully.", **result}), 200
     except Exception as e:
         logging.error(f"❌ Error deleting RAG: {str(e)}", exc_info=True)
-        return jsonify({"error": "An error occurred"}), 500
\ No newline at end of file
+        return jsonify({"error": "An error occurred"}), 500
+
+
+@delete_rag_blueprint.route('/jobs/<job_id>', methods=['GET'])
+def deletion_job_status(job_id):
+    """Progress of a background file or RAG deletion."""
+    job = get_deletion_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found."}), 404
+    return jsonify(job.to_dict()), 200
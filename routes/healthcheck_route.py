@@ -1,16 +1,37 @@
 from flask import Blueprint, jsonify
+from services.health_service import health_monitor
 
 healthcheck_blueprint = Blueprint('healthcheck', __name__)
 
 @healthcheck_blueprint.route('', methods=['GET'])
 def healthcheck():
-    """Check the health of the application services (Pinecone, MongoDB, etc.)"""
+    """
+    Check the health of the application services (Pinecone, MongoDB, etc.)
+
+    Answers from the health monitor's cached probe results; it never calls an
+    external service inline, so it is safe for load balancers to poll often.
+    """
     try:
-        health_status = {
-            "mongo": "Available",
-            "pinecone": "Available",
-            "flask": "Running"
-        }
+        snapshot = health_monitor.snapshot()
+        dependencies = snapshot["dependencies"]
+        health_status = {name: result["status"] for name, result in dependencies.items()}
+        health_status["flask"] = "Running"
+        health_status["checks"] = dependencies
+        health_status["local"] = snapshot["local"]
+        health_status["last_cycle"] = snapshot["last_cycle"]
         return jsonify(health_status), 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@healthcheck_blueprint.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 when every enabled dependency was available at the last check, 503 otherwise."""
+    try:
+        snapshot = health_monitor.snapshot()
+        status_code = 200 if snapshot["ready"] else 503
+        return jsonify({
+            "ready": snapshot["ready"],
+            "dependencies": {name: result["status"] for name, result in snapshot["dependencies"].items()}
+        }), status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -2,23 +2,58 @@ import os
 import logging
 from flask import Blueprint, request, jsonify
 from config import Config
+from services.file_index_service import file_index, rags_by_file, encode_cursor, decode_cursor, page_size, matches, describe_file
 
 list_files_blueprint = Blueprint('list_files', __name__)
 
 @list_files_blueprint.route('', methods=['GET'])
 def list_files():
+    """
+    Entries of a RAG's FAISS folder, served from the in-memory file index.
+
+    Optional `q`/`ext` filter by name; `limit`/`cursor` paginate (the response
+    then carries `next_cursor`); `details=true` returns size, mtime and the
+    RAGs using each file instead of bare names.
+    """
     try:
         rag_name = request.args.get('rag_name', 'default')
         if rag_name == 'default':
-            folder_path = Config.FAISS_INDEX_PATH
+            rel_path = ''
         else:
-            folder_path = os.path.join(Config.FAISS_NEW_RAGS_PATH, rag_name)
-        
-        if not os.path.exists(folder_path):
+            if os.path.basename(rag_name) != rag_name or rag_name in ('.', '..'):
+                return jsonify({"error": f"RAG '{rag_name}' not found."}), 404
+            rel_path = os.path.relpath(os.path.join(Config.FAISS_NEW_RAGS_PATH, rag_name), Config.FAISS_INDEX_PATH)
+
+        entry = file_index.get_dir('faiss', rel_path)
+        if entry is None:
             return jsonify({"error": f"RAG '{rag_name}' not found."}), 404
 
-        files = os.listdir(folder_path)
-        return jsonify({"files": files}), 200
+        query, extension = request.args.get('q'), request.args.get('ext')
+        details = request.args.get('details', 'false').lower() == 'true'
+        names = sorted(name for name in (*entry.subdirs, *entry.files) if matches(name, query, extension))
+
+        next_cursor = None
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = page_size(request.args.get('limit'))
+                after = decode_cursor(request.args['cursor'])[0] if request.args.get('cursor') else None
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if after is not None:
+                names = [name for name in names if name > after]
+            if len(names) > limit:
+                names = names[:limit]
+                next_cursor = encode_cursor(names[-1])
+
+        if details:
+            usage = rags_by_file()
+            files = [describe_file(entry.files[name], usage) if name in entry.files else {"name": name, "directory": True} for name in names]
+        else:
+            files = names
+        response = {"files": files}
+        if next_cursor is not None or 'limit' in request.args or 'cursor' in request.args:
+            response["next_cursor"] = next_cursor
+        return jsonify(response), 200
     except Exception as e:
         logging.error(f"❌ Error listing files: {str(e)}", exc_info=True)
-        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify, request, Response
+from utilities.metrics_utility import metrics
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+@metrics_blueprint.route('', methods=['GET'])
+def get_metrics():
+    """
+    Expose in-process counters and gauges (LLM in-flight requests, throttle events, ...).
+
+    Returns Prometheus text format by default, or JSON with `?format=json`.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot()), 200
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -1,7 +1,9 @@
 import os
 import logging
 from flask import Blueprint, jsonify
-from services.pinecone_service import get_pinecone_index
+from services.pinecone_service import get_pinecone_index, get_index_dimension
+from services.document_store import get_document_store
+from config import Config
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -20,20 +22,22 @@ def view_namespace_summary(namespace):
     - Section names for each vector
     """
     try:
-        logging.info(f"📘 Retrieving summary for namespace: {namespace}")
+        logging.info("📘 Retrieving summary for namespace: %s", namespace)
 
         # Step 1: Connect to Pinecone
         index = get_pinecone_index()
         if not index:
-            logging.error(f"❌ Pinecone index connection failed.")
+            logging.error("❌ Pinecone index connection failed.")
             return jsonify({"error": "Pinecone index connection failed."}), 500
 
-        logging.info(f"✅ Connected to Pinecone index for namespace: {namespace}")
+        logging.debug("✅ Connected to Pinecone index for namespace: %s", namespace)
 
         # Step 2: Query Pinecone for all vectors in the namespace
-        logging.info(f"📡 Querying all vectors in namespace: {namespace}")
+        logging.debug("📡 Querying all vectors in namespace: %s", namespace)
+        # The dummy vector must have the index's dimension; Pinecone rejects any other
+        dimension = get_index_dimension(os.getenv('PINECONE_INDEX_NAME', 'rag-index')) or 1536
         response = index.query(
-            vector=[0.001] * 1536,  # Dummy vector for querying
+            vector=[0.001] * dimension,  # Dummy vector for querying
             top_k=1000,  # Get up to 1000 results
             namespace=namespace,
             include_metadata=True
@@ -41,7 +45,7 @@ def view_namespace_summary(namespace):
 
         matches = response.get('matches', [])
         if not matches:
-            logging.warning(f"⚠️ No vectors found in namespace: {namespace}")
+            logging.warning("⚠️ No vectors found in namespace: %s", namespace)
             return jsonify({"response": "No vectors found in this namespace."}), 200
 
         # Step 3: Extract metadata for all vectors
@@ -57,27 +61,37 @@ def view_namespace_summary(namespace):
             file_names.add(file_name)
             section_names.add(section_name)
 
-            vector_metadata.append({
-                "vector_id": match.get('id', 'No ID'),
-                "file_name": file_name,
-                "section_name": section_name,
-                "rag_name": metadata.get('rag_name', 'Unknown RAG'),
-                "content_preview": metadata.get('content', 'No content')[:100]  # Show only the first 100 characters
-            })
+            if len(vector_metadata) < 5:  # Only the first 5 vector summaries are displayed
+                vector_metadata.append({
+                    "vector_id": match.get('id', 'No ID'),
+                    "file_name": file_name,
+                    "section_name": section_name,
+                    "rag_name": metadata.get('rag_name', 'Unknown RAG'),
+                    "legacy_content": metadata.get('content')
+                })
 
-        # Step 4: Summarize the key details
+        # Step 4: Fetch previews for the sample vectors only, in one document store round trip
+        texts = get_document_store().get_many(namespace, [vector["vector_id"] for vector in vector_metadata])
+        for vector in vector_metadata:
+            content = texts.get(vector["vector_id"]) or vector.pop("legacy_content") or 'No content'
+            vector.pop("legacy_content", None)
+            vector["content_preview"] = content[:100]  # Show only the first 100 characters
+
+        # Step 5: Summarize the key details
         summary = {
             "namespace": namespace,
             "total_vectors": total_vectors,
             "files_used": list(file_names),
             "sections_found": list(section_names),
-            "sample_vectors": vector_metadata[:5]  # Display the first 5 vector summaries
+            "sample_vectors": vector_metadata
         }
 
-        logging.info(f"✅ Summary for namespace {namespace}: {summary}")
+        logging.info("✅ Summary for namespace %s: %d vectors, %d files", namespace, total_vectors, len(file_names))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("📘 Full summary for namespace %s: %s", namespace, summary, extra={"sample_rate": Config.LOG_PAYLOAD_SAMPLE_RATE})
 
         return jsonify(summary), 200
 
     except Exception as e:
-        logging.error(f"❌ Error retrieving namespace summary: {str(e)}", exc_info=True)
+        logging.error("❌ Error retrieving namespace summary: %s", e, exc_info=True)
         return jsonify({"error": "An unexpected error occurred while retrieving the namespace summary."}), 500
\ No newline at end of file
@@ -1,30 +1,43 @@
 import logging
 from flask import Blueprint, request, jsonify
-from pinecone import Pinecone
 from dotenv import load_dotenv
-import os
+from services.deletion_service import delete_file, start_deletion_job, should_run_in_background, index_name_for_namespace
 
 load_dotenv()
 
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
-PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME')
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
-
 # Blueprint
 remove_file_blueprint = Blueprint('remove_file', __name__)
 
 @remove_file_blueprint.route('', methods=['DELETE'])
 def remove_file():
-    """Remove vectors from Pinecone."""
+    """
+    Remove every vector that was created from a file (or URL) from Pinecone.
+
+    Body:
+        file_name (str): File or URL to remove (`file_id` is accepted for older clients).
+        namespace (str, optional): Namespace holding the file; defaults to the default namespace.
+        background (bool, optional): Run as a background job; large namespaces always do.
+
+    Returns 200 with the deleted count and elapsed time, or 202 with a job id
+    to poll at /delete-rag/jobs/<job_id>.
+    """
     try:
         data = request.get_json()
-        file_id = data.get('file_id')
+        file_name = data.get('file_name') or data.get('file_id')
+        namespace = data.get('namespace', '')
+        if not file_name:
+            return jsonify({"error": "file_name is required."}), 400
+
+        index_name = data.get('index_name') or index_name_for_namespace(namespace)
+        if data.get('background') or should_run_in_background(namespace, index_name):
+            job = start_deletion_job('file', namespace=namespace, file_name=file_name, index_name=index_name)
+            return jsonify({"message": f"Removal of '{file_name}' started.", "job": job.to_dict()}), 202
 
-        # Delete vectors
-        response = index.delete(ids=[file_id])
-        logging.info(f"✅ File '{file_id}' removed from Pinecone.")
-        return jsonify({"message": f"File '{file_id}' removed successfully."}), 200
+        result = delete_file(namespace, file_name, index_name=index_name)
+        if not result["deleted"]:
+            return jsonify({"error": f"No vectors found for '{file_name}'."}), 404
+        logging.info(f"✅ File '{file_name}' removed from Pinecone.")
+        return jsonify({"message": f"File '{file_name}' removed successfully.", **result}), 200
     except Exception as e:
         logging.error(f"❌ Error removing file: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
@@ -1,13 +1,61 @@
 import os
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 from config import Config
+from services.file_index_service import file_index, rags_by_file, encode_cursor, decode_cursor, page_size, matches, describe_file
 
 files_list_blueprint = Blueprint('list_view', __name__)
 
 @files_list_blueprint.route('/', methods=['GET'])
 def view_tree():
-    file_tree = {}
-    for root, dirs, files in os.walk(Config.DATA_FOLDER):
-        relative_path = os.path.relpath(root, Config.BASE_DIR)
-        file_tree[relative_path] = files
-    return jsonify(file_tree)
\ No newline at end of file
+    """
+    Files under the data folder, served from the in-memory file index.
+
+    Query params (all optional): `prefix` (sub-folder of the data folder),
+    `q` (substring of the file name), `ext` (file extension). Without `limit`,
+    `cursor` or `details` the response keeps the original shape
+    `{folder: [file names]}`; with any of them it's
+    `{"tree": {folder: [...]}, "next_cursor": str or None}`, paginated over
+    files, and `details=true` lists each file's size, mtime and the RAGs
+    built from it.
+    """
+    prefix = os.path.normpath(request.args.get('prefix', '')).strip(os.sep) if request.args.get('prefix') else ''
+    if prefix.startswith('..'):
+        return jsonify({"error": "Invalid prefix"}), 400
+    query, extension = request.args.get('q'), request.args.get('ext')
+    details = request.args.get('details', 'false').lower() == 'true'
+    paginated = details or 'limit' in request.args or 'cursor' in request.args
+
+    directories = [(rel_path, entry) for rel_path, entry in file_index.list_dirs('data')
+                   if not prefix or rel_path == prefix or rel_path.startswith(prefix + os.sep)]
+
+    def folder_name(rel_path):
+        return os.path.relpath(os.path.join(Config.DATA_FOLDER, rel_path), Config.BASE_DIR)
+
+    if not paginated:
+        return jsonify({
+            folder_name(rel_path): [name for name in entry.files if matches(name, query, extension)]
+            for rel_path, entry in directories
+        })
+
+    try:
+        limit = page_size(request.args.get('limit'))
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    usage = rags_by_file() if details else {}
+    # `last` is the (rel_path, name) of the last file returned; the next page starts after it
+    tree, count, last, next_cursor = {}, 0, None, None
+    for rel_path, entry in directories:
+        for name in sorted(entry.files):
+            if (after is not None and (rel_path, name) <= after) or not matches(name, query, extension):
+                continue
+            if count == limit:
+                next_cursor = encode_cursor(*last) if last is not None else None
+                break
+            tree.setdefault(folder_name(rel_path), []).append(describe_file(entry.files[name], usage) if details else name)
+            last = (rel_path, name)
+            count += 1
+        if next_cursor:
+            break
+    return jsonify({"tree": tree, "next_cursor": next_cursor})
@@ -0,0 +1,409 @@
+"""
+Local approximate-nearest-neighbour indexes for RAGs kept on disk (FAISS).
+
+A RAG folder holds up to four files:
+
+    index.faiss   the FAISS index (Flat or HNSW in an IndexIDMap2, or IVF-PQ), including
+                  any trained state (IVF centroids, PQ codebooks)
+    ann.json      index type, metric, dimension and build/search parameters
+    labels.db     SQLite map from FAISS integer labels to vector ids and metadata
+    vectors.f32   IVF-PQ only: full vectors by label (append-only), used to re-rank
+                  the PQ shortlist exactly
+
+Readers memory-map index.faiss, so opening is instant and the pages are shared
+by every worker process through the OS page cache. Writers add to (or remove
+from) the existing index without retraining, then atomically replace the
+files; readers pick up the new version on their next query.
+"""
+import os
+import json
+import time
+import fcntl
+import sqlite3
+import logging
+import threading
+import numpy as np
+import faiss
+from config import Config
+from utilities.metadata_filter_utility import matches_filter
+
+INDEX_TYPES = ('flat', 'hnsw', 'ivfpq')
+
+INDEX_FILE = 'index.faiss'
+PARAMS_FILE = 'ann.json'
+LABELS_FILE = 'labels.db'
+VECTORS_FILE = 'vectors.f32'
+
+
+def default_params(index_type):
+    """Build and search parameters for an index type, from Config."""
+    if index_type == 'hnsw':
+        return {"m": Config.ANN_HNSW_M, "ef_construction": Config.ANN_HNSW_EF_CONSTRUCTION, "ef_search": Config.ANN_HNSW_EF_SEARCH}
+    if index_type == 'ivfpq':
+        return {"nlist": Config.ANN_IVF_NLIST, "nprobe": Config.ANN_IVF_NPROBE, "pq_m": Config.ANN_PQ_M, "pq_nbits": Config.ANN_PQ_NBITS,
+                "refine_k_factor": Config.ANN_IVF_REFINE_K_FACTOR}
+    return {}
+
+
+def _factory_string(index_type, dimension, params, training_count):
+    if index_type == 'flat':
+        return 'Flat'
+    if index_type == 'hnsw':
+        return f"HNSW{params['m']}"
+    # IVF wants ~39 training points per list and PQ 2**nbits points per codebook; shrink both for small RAGs
+    params['nlist'] = max(1, min(params['nlist'], training_count // 39))
+    params['pq_nbits'] = max(1, min(params['pq_nbits'], int(np.log2(max(2, training_count)))))
+    if dimension % params['pq_m']:
+        raise ValueError(f"pq_m={params['pq_m']} must divide the dimension {dimension}")
+    return f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_nbits']}"
+
+
+def _prepare(vectors, metric):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if metric == 'cosine':
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+class LocalAnnIndex:
+    """
+    One on-disk ANN index. Open with `LocalAnnIndex.open(path)` or create with `LocalAnnIndex.build(...)`.
+
+    Deletes are real removals for Flat and IVF-PQ. HNSW graphs can't drop
+    nodes, so deleted labels are tombstoned (excluded during the search with an
+    IDSelector) and the graph is rebuilt from its own stored vectors once
+    tombstones exceed ANN_COMPACT_TOMBSTONE_FRACTION of it.
+
+    IVF-PQ shortlists `refine_k_factor` x k candidates from its compressed
+    codes and re-ranks them on the full vectors in vectors.f32 (memory-mapped,
+    so only the rows touched are read).
+    """
+
+    def __init__(self, path, index, params):
+        self.path = path
+        self.index = index
+        self.params = params
+        self.version = params.get("version", 0)
+        self.local = threading.local()
+        self.tombstones = self._load_tombstones()
+        self.full_vectors = None
+
+    # ---- Files ----
+
+    @staticmethod
+    def _read_params(path):
+        with open(os.path.join(path, PARAMS_FILE), 'r') as f:
+            return json.load(f)
+
+    def _labels(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.path, LABELS_FILE), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS labels ("
+                " label INTEGER PRIMARY KEY,"
+                " vector_id TEXT NOT NULL UNIQUE,"
+                " metadata TEXT NOT NULL,"
+                " deleted INTEGER NOT NULL DEFAULT 0"
+                ")"
+            )
+            self.local.conn = conn
+        return conn
+
+    def _load_tombstones(self):
+        return np.fromiter((row[0] for row in self._labels().execute("SELECT label FROM labels WHERE deleted = 1")), dtype=np.int64)
+
+    def _write(self):
+        """Atomically replace index.faiss and ann.json (readers holding the old mmap keep working)."""
+        self.version += 1
+        self.params["version"] = self.version
+        self.params["count"] = int(self.index.ntotal) - len(self.tombstones)
+        index_tmp = os.path.join(self.path, f"{INDEX_FILE}.tmp.{os.getpid()}")
+        params_tmp = os.path.join(self.path, f"{PARAMS_FILE}.tmp.{os.getpid()}")
+        faiss.write_index(self.index, index_tmp)
+        with open(params_tmp, 'w') as f:
+            json.dump(self.params, f, indent=2, sort_keys=True)
+        os.replace(index_tmp, os.path.join(self.path, INDEX_FILE))
+        os.replace(params_tmp, os.path.join(self.path, PARAMS_FILE))
+
+    @staticmethod
+    def _lock(path):
+        """Exclusive cross-process lock on a RAG folder while it's being written."""
+        handle = open(os.path.join(path, '.write.lock'), 'w')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    # ---- Create / open ----
+
+    @classmethod
+    def build(cls, path, ids, vectors, metadatas=None, index_type=None, metric='cosine', params=None):
+        """
+        Build a new index at `path` from scratch (training IVF-PQ on `vectors`) and write it.
+
+        Returns:
+            LocalAnnIndex: the index, opened for writing.
+        """
+        index_type = index_type or Config.ANN_INDEX_TYPE
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown ANN index type '{index_type}' (use one of {', '.join(INDEX_TYPES)})")
+        vectors = _prepare(vectors, metric)
+        dimension = vectors.shape[1]
+        params = {**default_params(index_type), **(params or {})}
+        factory = _factory_string(index_type, dimension, params, len(vectors))
+
+        started = time.perf_counter()
+        inner = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT if metric in ('cosine', 'dotproduct') else faiss.METRIC_L2)
+        if index_type == 'hnsw':
+            inner.hnsw.efConstruction = params['ef_construction']
+        if not inner.is_trained:
+            inner.train(vectors)
+        # IVF stores ids itself (and IndexIDMap's removal assumes an order-preserving index, which IVF isn't)
+        index = inner if index_type == 'ivfpq' else faiss.IndexIDMap2(inner)
+
+        os.makedirs(path, exist_ok=True)
+        for name in (INDEX_FILE, PARAMS_FILE, LABELS_FILE, VECTORS_FILE, f"{LABELS_FILE}-wal", f"{LABELS_FILE}-shm"):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+        ann = cls(path, index, {
+            "index_type": index_type, "metric": metric, "dimension": dimension,
+            "factory": factory, "params": params, "trained_on": len(vectors), "next_label": 0
+        })
+        with cls._lock(path):
+            ann._add(ids, vectors, metadatas)
+            ann._write()
+        logging.info("🧭 Built %s index with %d vectors at %s in %.1f s", factory, len(vectors), path, time.perf_counter() - started)
+        return ann
+
+    @classmethod
+    def open(cls, path, mmap=None):
+        """Open an index; memory-mapped and read-only unless `mmap=False`."""
+        mmap = Config.ANN_MMAP if mmap is None else mmap
+        params = cls._read_params(path)
+        flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(os.path.join(path, INDEX_FILE), flags)
+        return cls(path, index, params)
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, INDEX_FILE)) and os.path.isfile(os.path.join(path, PARAMS_FILE))
+
+    @property
+    def removes_in_place(self):
+        return self.params["index_type"] != 'hnsw'
+
+    @property
+    def refines(self):
+        return self.params["index_type"] == 'ivfpq' and bool(self.params["params"].get('refine_k_factor'))
+
+    @property
+    def count(self):
+        return int(self.index.ntotal) - len(self.tombstones)
+
+    # ---- Writes ----
+
+    def _add(self, ids, vectors, metadatas):
+        """Add prepared vectors under fresh labels; ids that already exist are replaced (caller holds the lock)."""
+        self._remove([vector_id for vector_id in ids])
+        labels = np.arange(self.params["next_label"], self.params["next_label"] + len(ids), dtype=np.int64)
+        self.params["next_label"] += len(ids)
+        self.index.add_with_ids(vectors, labels)
+        if self.refines:
+            # Labels only grow, so row `label` of the file is that label's vector; readers map only the rows they know of
+            vectors_path = os.path.join(self.path, VECTORS_FILE)
+            with open(vectors_path, 'r+b' if os.path.exists(vectors_path) else 'wb') as f:
+                f.seek(int(labels[0]) * vectors.shape[1] * 4 if len(labels) else 0)
+                f.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+        with self._labels() as conn:
+            conn.executemany(
+                "INSERT INTO labels (label, vector_id, metadata) VALUES (?, ?, ?)",
+                [(int(label), vector_id, json.dumps(metadata or {})) for label, vector_id, metadata in zip(labels, ids, metadatas or [None] * len(ids))]
+            )
+
+    def _remove(self, ids):
+        """Remove or tombstone ids (caller holds the lock); returns how many existed."""
+        conn = self._labels()
+        labels = []
+        for start in range(0, len(ids), 900):
+            batch = ids[start:start + 900]
+            rows = conn.execute(f"SELECT label FROM labels WHERE deleted = 0 AND vector_id IN ({','.join('?' * len(batch))})", batch)
+            labels.extend(row[0] for row in rows)
+        if not labels:
+            return 0
+        with conn:
+            if not self.removes_in_place:
+                conn.executemany("UPDATE labels SET deleted = 1, vector_id = 'deleted:' || label WHERE label = ?", [(label,) for label in labels])
+                self.tombstones = np.union1d(self.tombstones, np.asarray(labels, dtype=np.int64))
+            else:
+                self.index.remove_ids(np.asarray(labels, dtype=np.int64))
+                conn.executemany("DELETE FROM labels WHERE label = ?", [(label,) for label in labels])
+        return len(labels)
+
+    def _writable(self):
+        """Reload the latest version into memory (mmapped indexes are read-only)."""
+        fresh = LocalAnnIndex.open(self.path, mmap=False)
+        self.index, self.params, self.version, self.tombstones = fresh.index, fresh.params, fresh.version, fresh.tombstones
+        self.full_vectors = None
+
+    def upsert(self, ids, vectors, metadatas=None):
+        """Add or replace vectors, reusing the trained quantizers (no rebuild)."""
+        with self._lock(self.path):
+            self._writable()
+            self._add(list(ids), _prepare(vectors, self.params["metric"]), metadatas)
+            self._compact_if_needed()
+            self._write()
+        return len(ids)
+
+    def delete(self, ids):
+        """Delete vectors by id; returns how many existed."""
+        with self._lock(self.path):
+            self._writable()
+            removed = self._remove(list(ids))
+            if removed:
+                self._compact_if_needed()
+                self._write()
+        return removed
+
+    def _compact_if_needed(self):
+        if not len(self.tombstones) or len(self.tombstones) < Config.ANN_COMPACT_TOMBSTONE_FRACTION * self.index.ntotal:
+            return
+        # Rebuild the HNSW graph from the vectors it stores, without the tombstoned labels
+        conn = self._labels()
+        labels = np.fromiter((row[0] for row in conn.execute("SELECT label FROM labels WHERE deleted = 0 ORDER BY label")), dtype=np.int64)
+        vectors = np.vstack([self.index.reconstruct(int(label)) for label in labels]) if len(labels) else np.zeros((0, self.params["dimension"]), dtype=np.float32)
+        inner = faiss.index_factory(self.params["dimension"], self.params["factory"], self.index.metric_type)
+        inner.hnsw.efConstruction = self.params["params"]["ef_construction"]
+        self.index = faiss.IndexIDMap2(inner)
+        if len(labels):
+            self.index.add_with_ids(vectors, labels)
+        with conn:
+            conn.execute("DELETE FROM labels WHERE deleted = 1")
+        logging.info("🧹 Compacted HNSW index at %s: dropped %d tombstones", self.path, len(self.tombstones))
+        self.tombstones = np.zeros(0, dtype=np.int64)
+
+    # ---- Reads ----
+
+    def ids_with_prefix(self, prefix):
+        """Live vector ids starting with `prefix` (the local equivalent of Pinecone's id listing)."""
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        rows = self._labels().execute("SELECT vector_id FROM labels WHERE deleted = 0 AND vector_id LIKE ? ESCAPE '\\'", (pattern,))
+        return [row[0] for row in rows]
+
+    def search(self, vectors, top_k):
+        """Raw batched search: (scores, labels) arrays; labels of missing results are -1."""
+        vectors = _prepare(np.atleast_2d(vectors), self.params["metric"])
+        options = self.params["params"]
+        selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(self.tombstones)) if len(self.tombstones) else None
+        if self.params["index_type"] == 'hnsw':
+            search_params = faiss.SearchParametersHNSW(efSearch=max(options['ef_search'], top_k), sel=selector)
+        elif self.params["index_type"] == 'ivfpq':
+            search_params = faiss.SearchParametersIVF(nprobe=options['nprobe'])
+            if self.refines:
+                return self._refine(vectors, *self.index.search(vectors, top_k * options['refine_k_factor'], params=search_params), top_k)
+        else:
+            search_params = faiss.SearchParameters(sel=selector) if selector is not None else None
+        return self.index.search(vectors, top_k, params=search_params)
+
+    def _load_full_vectors(self):
+        if self.full_vectors is None:
+            rows = self.params["next_label"]
+            self.full_vectors = np.memmap(os.path.join(self.path, VECTORS_FILE), dtype='<f4', mode='r', shape=(rows, self.params["dimension"])) if rows else np.zeros((0, self.params["dimension"]), dtype=np.float32)
+        return self.full_vectors
+
+    def fetch_vectors(self, ids):
+        """`{id: vector}` of live ids, as stored (normalised for cosine); IVF-PQ indexes without full vectors return nothing."""
+        if self.params["index_type"] == 'ivfpq' and not self.refines:
+            return {}
+        conn = self._labels()
+        found = {}
+        for start in range(0, len(ids), 900):
+            batch = ids[start:start + 900]
+            rows = conn.execute(f"SELECT label, vector_id FROM labels WHERE deleted = 0 AND vector_id IN ({','.join('?' * len(batch))})", batch)
+            for label, vector_id in rows:
+                found[vector_id] = np.array(self._load_full_vectors()[label]) if self.refines else self.index.reconstruct(int(label))
+        return found
+
+    def _refine(self, queries, _, candidates, top_k):
+        """Re-rank PQ candidates with exact scores against the memory-mapped full vectors."""
+        self._load_full_vectors()
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        labels = np.full((len(queries), top_k), -1, dtype=np.int64)
+        for row, (query, shortlist) in enumerate(zip(queries, candidates)):
+            shortlist = shortlist[shortlist >= 0]
+            if not len(shortlist):
+                continue
+            exact = self.full_vectors[shortlist] @ query if self.index.metric_type == faiss.METRIC_INNER_PRODUCT else -np.linalg.norm(self.full_vectors[shortlist] - query, axis=1)
+            best = np.argsort(-exact)[:top_k]
+            scores[row, :len(best)] = exact[best]
+            labels[row, :len(best)] = shortlist[best]
+        return scores, labels
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        """
+        Pinecone-style query: `{"matches": [{"id", "score", "metadata"}]}`.
+
+        A metadata `filter` is applied to candidates from an over-fetched search
+        (ANN_FILTER_OVERFETCH times `top_k`), since FAISS has no metadata.
+        """
+        fetch_k = top_k * Config.ANN_FILTER_OVERFETCH if filter else top_k
+        scores, labels = self.search(vector, min(fetch_k, max(1, self.index.ntotal)))
+        found = [(int(label), float(score)) for label, score in zip(labels[0], scores[0]) if label >= 0]
+        if not found:
+            return {"matches": []}
+        rows = {}
+        conn = self._labels()
+        for start in range(0, len(found), 900):
+            batch = [label for label, _ in found[start:start + 900]]
+            rows.update((label, (vector_id, metadata)) for label, vector_id, metadata in conn.execute(
+                # A writer tombstones rows before publishing the index this handle may still be searching
+                f"SELECT label, vector_id, metadata FROM labels WHERE deleted = 0 AND label IN ({','.join('?' * len(batch))})", batch
+            ))
+        matches = []
+        for label, score in found:
+            if label not in rows:
+                continue
+            vector_id, metadata = rows[label]
+            metadata = json.loads(metadata)
+            if filter and not matches_filter(metadata, filter):
+                continue
+            matches.append({"id": vector_id, "score": score, "metadata": metadata if include_metadata else {}})
+            if len(matches) == top_k:
+                break
+        return {"matches": matches}
+
+    def stats(self):
+        return {
+            "index_type": self.params["index_type"],
+            "factory": self.params["factory"],
+            "dimension": self.params["dimension"],
+            "vector_count": self.count,
+            "tombstones": len(self.tombstones),
+            "version": self.version,
+        }
+
+
+# Open read-only handles, one per RAG folder, reopened when a writer publishes a new version
+_open_indexes = {}
+_open_lock = threading.Lock()
+
+
+def get_local_index(path):
+    """Shared memory-mapped handle for a RAG folder (re-checked against ann.json at most once a second)."""
+    now = time.monotonic()
+    with _open_lock:
+        entry = _open_indexes.get(path)
+        if entry is not None and now - entry[1] < 1.0:
+            return entry[0]
+    version = LocalAnnIndex._read_params(path).get("version", 0)
+    with _open_lock:
+        entry = _open_indexes.get(path)
+        if entry is None or entry[0].version != version:
+            entry = (LocalAnnIndex.open(path), now)
+        _open_indexes[path] = (entry[0], now)
+        return entry[0]
+
+
+def forget_local_index(path):
+    with _open_lock:
+        _open_indexes.pop(path, None)
@@ -0,0 +1,315 @@
+"""
+Near-duplicate chunk detection at ingestion (MinHash + LSH).
+
+Every chunk gets a MinHash signature: DEDUP_NUM_PERM 32-bit minima over the
+hashes of its lower-cased word shingles. The signature is cut into DEDUP_BANDS
+bands, and chunks of the same namespace that share any band bucket are
+candidates. A candidate whose estimated Jaccard similarity (the fraction of
+equal signature values) reaches DEDUP_THRESHOLD is a near-duplicate. This
+stage runs after text extraction/cleaning and before embedding. Depending on
+DEDUP_MODE, a near-duplicate chunk is:
+
+    skip   not embedded and not stored
+    link   stored with a copy of the kept chunk's vector instead of being embedded,
+           with `duplicate_of` metadata; /ask puts one chunk per group in the prompt
+    off    treated like any other chunk
+
+Only kept chunks are indexed, so every candidate is an original. Signatures
+and buckets live in SQLite (DEDUP_INDEX_PATH), per namespace and file.
+"""
+import os
+import re
+import uuid
+import zlib
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+import numpy as np
+from config import Config
+from utilities.metrics_utility import metrics
+
+_chunks_checked = metrics.counter('dedup_chunks_total', "Ingested chunks checked for near-duplicates")
+_duplicates_found = metrics.counter('dedup_duplicates_total', "Ingested chunks found to be near-duplicates, by mode")
+_embeddings_avoided = metrics.counter('dedup_embeddings_avoided_total', "Chunk embeddings not computed because the chunk was a near-duplicate")
+
+MODES = ('skip', 'link', 'off')
+
+_WORD = re.compile(r"\w+")
+# Universal hashing (a * x + b) mod p with a Mersenne prime; a, b and x are below 2**32 so a * x fits in 64 bits
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_permutations = {}
+
+
+def _permutation(num_perm):
+    if num_perm not in _permutations:
+        # Fixed seed: signatures must stay comparable across processes and restarts
+        rng = np.random.RandomState(1)
+        _permutations[num_perm] = (rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64),
+                                   rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64))
+    return _permutations[num_perm]
+
+
+def minhash(text, num_perm=None):
+    """MinHash signature (uint32 array) of a text's word shingles, or None if it has fewer than DEDUP_MIN_WORDS words."""
+    words = _WORD.findall(text.lower())
+    if len(words) < Config.DEDUP_MIN_WORDS:
+        return None
+    size = Config.DEDUP_SHINGLE_WORDS
+    shingles = {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    a, b = _permutation(num_perm or Config.DEDUP_NUM_PERM)
+    return (((hashes[:, None] * a + b) % _MERSENNE_PRIME) & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature, bands=None):
+    """(band, bucket) LSH keys of a signature: one 64-bit hash per band of rows."""
+    bands = bands or Config.DEDUP_BANDS
+    return [(band, int.from_bytes(hashlib.blake2b(rows.tobytes(), digest_size=8).digest(), 'little', signed=True))
+            for band, rows in enumerate(np.split(signature, bands))]
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(a == b))
+
+
+class DedupIndex:
+    """
+    The LSH index of every namespace, in one SQLite file.
+
+    `signatures` holds each kept chunk's signature with its file and the
+    ingestion that wrote it; `buckets` maps (band, bucket) to chunk ids. Like
+    the document store, each thread gets its own connection and the database
+    runs in WAL mode.
+    """
+
+    # SQLite limits the number of host parameters per statement
+    MAX_PARAMS = 900
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.DEDUP_INDEX_PATH
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                " namespace TEXT NOT NULL,"
+                " vector_id TEXT NOT NULL,"
+                " file_name TEXT NOT NULL,"
+                " ingest_id TEXT NOT NULL,"
+                " signature BLOB NOT NULL,"
+                " PRIMARY KEY (namespace, vector_id)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS signatures_by_file ON signatures (namespace, file_name)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " namespace TEXT NOT NULL,"
+                " band INTEGER NOT NULL,"
+                " bucket INTEGER NOT NULL,"
+                " vector_id TEXT NOT NULL,"
+                " PRIMARY KEY (namespace, band, bucket, vector_id)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS buckets_by_id ON buckets (namespace, vector_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # Signatures made with other parameters can't be compared; start over rather than miss every duplicate
+            params = f"{Config.DEDUP_NUM_PERM}/{Config.DEDUP_BANDS}/{Config.DEDUP_SHINGLE_WORDS}"
+            row = conn.execute("SELECT value FROM settings WHERE key = 'params'").fetchone()
+            if row is not None and row[0] != params:
+                logging.warning("⚠️ Dedup parameters changed (%s -> %s); clearing the near-duplicate index", row[0], params)
+                conn.execute("DELETE FROM signatures")
+                conn.execute("DELETE FROM buckets")
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('params', ?)", (params,))
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def candidates(self, namespace, keys):
+        """`{vector_id: (file_name, ingest_id, signature)}` of the chunks sharing any of the LSH `keys`."""
+        clause = ' OR '.join(['(b.band = ? AND b.bucket = ?)'] * len(keys))
+        rows = self._connection().execute(
+            "SELECT DISTINCT s.vector_id, s.file_name, s.ingest_id, s.signature FROM buckets b"
+            " JOIN signatures s ON s.namespace = b.namespace AND s.vector_id = b.vector_id"
+            f" WHERE b.namespace = ? AND ({clause})",
+            [namespace, *(value for key in keys for value in key)]
+        )
+        return {vector_id: (file_name, ingest_id, np.frombuffer(signature, dtype=np.uint32))
+                for vector_id, file_name, ingest_id, signature in rows}
+
+    def add(self, namespace, ingest_id, items):
+        """Index `[(vector_id, file_name, signature, keys), ...]`, replacing earlier entries of the same ids."""
+        if not items:
+            return
+        with self._connection() as conn:
+            self._delete_buckets(conn, namespace, [vector_id for vector_id, _, _, _ in items])
+            conn.executemany(
+                "INSERT OR REPLACE INTO signatures (namespace, vector_id, file_name, ingest_id, signature) VALUES (?, ?, ?, ?, ?)",
+                [(namespace, vector_id, file_name, ingest_id, signature.tobytes()) for vector_id, file_name, signature, _ in items]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO buckets (namespace, band, bucket, vector_id) VALUES (?, ?, ?, ?)",
+                [(namespace, band, bucket, vector_id) for vector_id, _, _, keys in items for band, bucket in keys]
+            )
+
+    def _delete_buckets(self, conn, namespace, vector_ids):
+        for start in range(0, len(vector_ids), self.MAX_PARAMS):
+            batch = vector_ids[start:start + self.MAX_PARAMS]
+            conn.execute(f"DELETE FROM buckets WHERE namespace = ? AND vector_id IN ({','.join('?' * len(batch))})", [namespace, *batch])
+
+    def remove_file(self, namespace, file_name, keep_ingest_id=None):
+        """Forget a file's chunks (except those written by `keep_ingest_id`); returns how many were dropped."""
+        with self._connection() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT vector_id FROM signatures WHERE namespace = ? AND file_name = ? AND ingest_id != ?",
+                (namespace, file_name, keep_ingest_id or ''))]
+            self._delete_buckets(conn, namespace, ids)
+            for start in range(0, len(ids), self.MAX_PARAMS):
+                batch = ids[start:start + self.MAX_PARAMS]
+                conn.execute(f"DELETE FROM signatures WHERE namespace = ? AND vector_id IN ({','.join('?' * len(batch))})", [namespace, *batch])
+        return len(ids)
+
+    def remove_namespace(self, namespace):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM buckets WHERE namespace = ?", (namespace,))
+            return conn.execute("DELETE FROM signatures WHERE namespace = ?", (namespace,)).rowcount
+
+
+_dedup_index = None
+_dedup_index_lock = threading.Lock()
+
+
+def get_dedup_index():
+    """Return the process-wide near-duplicate index."""
+    global _dedup_index
+    if _dedup_index is None:
+        with _dedup_index_lock:
+            if _dedup_index is None:
+                _dedup_index = DedupIndex()
+    return _dedup_index
+
+
+def forget_file(namespace, file_name):
+    """Drop a deleted file's chunks from the near-duplicate index, so later chunks are never matched against them."""
+    if os.path.exists(Config.DEDUP_INDEX_PATH):
+        get_dedup_index().remove_file(namespace, file_name)
+
+
+def forget_namespace(namespace):
+    if os.path.exists(Config.DEDUP_INDEX_PATH):
+        get_dedup_index().remove_namespace(namespace)
+
+
+class ChunkDeduplicator:
+    """
+    Near-duplicate checks for the chunks of the files being ingested into a namespace.
+
+    `check` compares a chunk with the namespace's indexed chunks and with the
+    chunks already checked in this ingestion. Indexed chunks of `file_names`
+    themselves are passed over, since the files are being replaced. Kept chunks
+    are only indexed by `commit`, which callers run once the chunks are stored.
+    `finish` then drops the replaced versions' chunks from the index.
+    """
+
+    def __init__(self, namespace, file_names, mode=None):
+        self.namespace = namespace
+        self.file_names = set(file_names)
+        self.mode = (mode or Config.DEDUP_MODE).lower()
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown dedup mode '{self.mode}' (expected one of {', '.join(MODES)})")
+        self.index = get_dedup_index() if self.mode != 'off' else None
+        self.ingest_id = uuid.uuid4().hex
+        # Kept chunks not yet committed: id -> (file_name, signature, keys), plus their buckets
+        self.pending = {}
+        self.pending_buckets = defaultdict(list)
+        self.chunks = 0
+        self.duplicates = 0
+        self.embeddings_avoided = 0
+
+    @property
+    def enabled(self):
+        return self.index is not None
+
+    def check(self, vector_id, file_name, text):
+        """The id of the chunk `text` near-duplicates, or None if it is kept (and then remembered for later checks)."""
+        if not self.enabled:
+            return None
+        self.chunks += 1
+        _chunks_checked.inc()
+        signature = minhash(text)
+        if signature is None:
+            return None
+        keys = band_keys(signature)
+        candidates = {candidate: self.pending[candidate][1] for key in keys for candidate in self.pending_buckets.get(key, ())}
+        for candidate, (candidate_file, ingest_id, candidate_signature) in self.index.candidates(self.namespace, keys).items():
+            if candidate_file not in self.file_names or ingest_id == self.ingest_id:
+                candidates.setdefault(candidate, candidate_signature)
+        best, best_similarity = None, Config.DEDUP_THRESHOLD
+        for candidate, candidate_signature in candidates.items():
+            score = similarity(signature, candidate_signature)
+            if score >= best_similarity and candidate != vector_id:
+                best, best_similarity = candidate, score
+        if best is not None:
+            self.duplicates += 1
+            _duplicates_found.inc(mode=self.mode)
+            logging.debug("♻️ Chunk '%s' near-duplicates '%s' (similarity %.2f)", vector_id, best, best_similarity)
+            return best
+        self.pending[vector_id] = (file_name, signature, keys)
+        for key in keys:
+            self.pending_buckets[key].append(vector_id)
+        return None
+
+    def avoided(self, count):
+        """Record `count` chunk embeddings that were not computed thanks to deduplication."""
+        if count:
+            self.embeddings_avoided += count
+            _embeddings_avoided.inc(count)
+
+    def commit(self):
+        """Index the kept chunks checked since the last commit (call once they are stored)."""
+        if self.pending:
+            self.index.add(self.namespace, self.ingest_id,
+                           [(vector_id, file_name, signature, keys) for vector_id, (file_name, signature, keys) in self.pending.items()])
+            self.pending.clear()
+            self.pending_buckets.clear()
+
+    def finish(self):
+        """Commit, then forget the chunks of the files' earlier versions that this ingestion didn't rewrite."""
+        if not self.enabled:
+            return
+        self.commit()
+        for file_name in self.file_names:
+            self.index.remove_file(self.namespace, file_name, keep_ingest_id=self.ingest_id)
+        if self.duplicates:
+            logging.info("♻️ %d of %d chunks ingested into '%s' were near-duplicates (%s); %d embeddings avoided",
+                         self.duplicates, self.chunks, self.namespace, self.mode, self.embeddings_avoided)
+
+    def report(self):
+        return {
+            "mode": self.mode,
+            "chunks": self.chunks,
+            "duplicates": self.duplicates,
+            "duplicate_rate": round(self.duplicates / self.chunks, 4) if self.chunks else 0.0,
+            "embeddings_avoided": self.embeddings_avoided,
+        }
+
+
+def stored_vectors(index, namespace, vector_ids):
+    """`{id: vector}` of chunks already stored in `index` (a Pinecone index or a LocalAnnIndex); ids it can't return are left out."""
+    vector_ids = list(vector_ids)
+    if not vector_ids:
+        return {}
+    from services.ann_index_service import LocalAnnIndex
+    if isinstance(index, LocalAnnIndex):
+        return index.fetch_vectors(vector_ids)
+    fetched = index.fetch(ids=vector_ids, namespace=namespace).get('vectors', {})
+    return {vector_id: np.asarray(vector['values'], dtype=np.float32) for vector_id, vector in fetched.items()}
@@ -0,0 +1,300 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import Config
+from services.pinecone_service import get_pinecone_client
+from services.document_store import get_document_store
+from services.namespace_registry import get_namespace_config, update_namespace, remove_namespace
+from services.projection_service import get_projection, delete_projection
+from services.rag_catalog_service import source_name_for_vector_id, invalidate_rag_catalog
+from services.dedup_service import forget_file, forget_namespace
+from services.upload_ingestion_service import reingest_stored_file
+
+# Delete calls in flight across all deletions; background jobs get their own small pool
+_batch_executor = ThreadPoolExecutor(max_workers=Config.DELETE_PARALLELISM, thread_name_prefix='delete-batch')
+_job_executor = ThreadPoolExecutor(max_workers=Config.DELETE_JOB_WORKERS, thread_name_prefix='delete-job')
+
+
+def index_name_for_namespace(namespace):
+    """The index a namespace's vectors live in (from the registry, else the default index)."""
+    return (get_namespace_config(namespace) or {}).get('index_name') or os.getenv('PINECONE_INDEX_NAME', 'rag-index')
+
+
+def _namespace_vector_count(index, namespace):
+    stats = index.describe_index_stats()
+    return ((stats.get('namespaces') or {}).get(namespace) or {}).get('vector_count', 0)
+
+
+def delete_ids_in_batches(index, namespace, id_pages, on_progress=None):
+    """
+    Delete ids from an iterable of id pages, DELETE_BATCH_SIZE ids per call, DELETE_PARALLELISM calls at a time.
+
+    Ids are streamed: listing continues while earlier batches are being deleted.
+    Returns the number of ids deleted.
+    """
+    deleted = 0
+    in_flight = set()
+    batch = []
+
+    def submit(ids):
+        in_flight.add(_batch_executor.submit(index.delete, ids=ids, namespace=namespace))
+
+    def drain(block_until):
+        nonlocal in_flight
+        while len(in_flight) > block_until:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()  # Surface the first failed delete
+
+    for page in id_pages:
+        for vector_id in page:
+            batch.append(vector_id)
+            if len(batch) >= Config.DELETE_BATCH_SIZE:
+                submit(batch)
+                deleted += len(batch)
+                batch = []
+                drain(Config.DELETE_PARALLELISM)
+                if on_progress:
+                    on_progress(deleted)
+    if batch:
+        submit(batch)
+        deleted += len(batch)
+    drain(0)
+    if on_progress:
+        on_progress(deleted)
+    return deleted
+
+
+def delete_file(namespace, file_name, index_name=None, on_progress=None):
+    """
+    Delete every vector created from `file_name` in a namespace (all its chunks and document vectors).
+
+    Ids are enumerated with the id-listing API by prefix and filtered to those
+    whose source is exactly `file_name`; their texts are dropped from the
+    document store as well. Uploads that skipped near-duplicates against the
+    file are re-ingested, since those windows were only stored with it.
+
+    Returns:
+        dict: {"deleted": int, "elapsed_ms": float, "reingested": [file names]}
+    """
+    started = time.perf_counter()
+    local_path = (get_namespace_config(namespace) or {}).get('local_path')
+    if local_path is not None:
+        return _delete_local_file(namespace, file_name, local_path, started, on_progress)
+    index_name = index_name or index_name_for_namespace(namespace)
+    index = get_pinecone_client().Index(index_name)
+    # Texts are dropped only once every vector delete has succeeded, so a failed batch never leaves vectors without text
+    deleted_ids = []
+
+    def matching_pages():
+        for page in index.list(prefix=file_name, namespace=namespace):
+            ids = [vector_id for vector_id in page if source_name_for_vector_id(vector_id) == file_name]
+            if ids:
+                deleted_ids.extend(ids)
+                yield ids
+
+    deleted = delete_ids_in_batches(index, namespace, matching_pages(), on_progress)
+    get_document_store().delete_many(namespace, deleted_ids)
+
+    projection = get_projection(namespace)
+    if projection is not None:
+        projected_index = get_pinecone_client().Index(projection.index_name)
+        pages = ([i for i in page if source_name_for_vector_id(i) == file_name] for page in projected_index.list(prefix=file_name, namespace=namespace))
+        delete_ids_in_batches(projected_index, namespace, pages)
+        invalidate_rag_catalog(projection.index_name, namespace)
+
+    reingested = _forget_source_file(namespace, file_name)
+    invalidate_rag_catalog(index_name, namespace)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    logging.info("🗑️ Deleted %d vectors of '%s' from %s::%s in %.0f ms", deleted, file_name, index_name, namespace, elapsed_ms)
+    return {"deleted": deleted, "elapsed_ms": elapsed_ms, "reingested": reingested}
+
+
+def _forget_source_file(namespace, file_name):
+    """
+    Drop a deleted file from the dedup index and the namespace's registry record,
+    then re-ingest the uploads whose skipped windows were kept only in its chunks.
+
+    Returns the names of the uploads re-ingested.
+    """
+    forget_file(namespace, file_name)
+    record = get_namespace_config(namespace) or {}
+    source_files = record.get('source_files', [])
+    uploads = record.get('uploads', {})
+    if file_name in source_files or file_name in uploads:
+        update_namespace(
+            namespace,
+            source_files=[name for name in source_files if name != file_name],
+            uploads={name: info for name, info in uploads.items() if name != file_name}
+        )
+
+    reingested = []
+    for name, info in uploads.items():
+        if name == file_name or file_name not in info.get('depends_on', ()):
+            continue
+        try:
+            reingest_stored_file(namespace, name)
+            reingested.append(name)
+        except Exception as e:
+            # Its registry entry still names the deleted file, so uploading it again ingests it rather than short-circuiting
+            logging.error("❌ Could not re-ingest '%s' after deleting '%s' from '%s': %s", name, file_name, namespace, e, exc_info=True)
+    if reingested:
+        logging.info("♻️ Re-ingested %s, which had skipped near-duplicates of '%s'", ", ".join(reingested), file_name)
+    return reingested
+
+
+def _delete_local_file(namespace, file_name, local_path, started, on_progress=None):
+    """`delete_file` for a local FAISS RAG: one in-place removal from its index, no rebuild."""
+    from services.ann_index_service import LocalAnnIndex
+    index = LocalAnnIndex.open(local_path, mmap=False)
+    ids = [vector_id for vector_id in index.ids_with_prefix(file_name) if source_name_for_vector_id(vector_id) == file_name]
+    deleted = index.delete(ids) if ids else 0
+    get_document_store().delete_many(namespace, ids)
+    reingested = _forget_source_file(namespace, file_name)
+    if on_progress:
+        on_progress(deleted)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    logging.info("🗑️ Deleted %d vectors of '%s' from local RAG %s in %.0f ms", deleted, file_name, local_path, elapsed_ms)
+    return {"deleted": deleted, "elapsed_ms": elapsed_ms, "reingested": reingested}
+
+
+def delete_namespace(namespace, index_name=None, on_progress=None):
+    """
+    Delete a whole RAG: its namespace (one `delete_all` call per index), stored
+    texts, projection and registry record.
+
+    Returns:
+        dict: {"deleted": int, "elapsed_ms": float}
+    """
+    started = time.perf_counter()
+    local_path = (get_namespace_config(namespace) or {}).get('local_path')
+    if local_path is not None:
+        return _delete_local_namespace(namespace, local_path, started, on_progress)
+    index_name = index_name or index_name_for_namespace(namespace)
+    pc = get_pinecone_client()
+    index = pc.Index(index_name)
+
+    deleted = _namespace_vector_count(index, namespace)
+    index.delete(delete_all=True, namespace=namespace)
+    if on_progress:
+        on_progress(deleted)
+
+    projection = get_projection(namespace)
+    if projection is not None:
+        pc.Index(projection.index_name).delete(delete_all=True, namespace=namespace)
+        invalidate_rag_catalog(projection.index_name, namespace)
+        delete_projection(namespace)
+
+    get_document_store().delete_namespace(namespace)
+    forget_namespace(namespace)
+    remove_namespace(namespace)
+    invalidate_rag_catalog(index_name, namespace)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    logging.info("🗑️ Deleted namespace %s::%s (%d vectors) in %.0f ms", index_name, namespace, deleted, elapsed_ms)
+    return {"deleted": deleted, "elapsed_ms": elapsed_ms}
+
+
+def _delete_local_namespace(namespace, local_path, started, on_progress=None):
+    """`delete_namespace` for a local FAISS RAG: remove its folder; Pinecone is never touched."""
+    from services.ann_index_service import LocalAnnIndex, forget_local_index
+    from services.file_index_service import file_index
+    deleted = LocalAnnIndex.open(local_path).count if LocalAnnIndex.exists(local_path) else 0
+    if os.path.isdir(local_path):
+        shutil.rmtree(local_path)
+        file_index.notify(local_path)
+    forget_local_index(local_path)
+    if on_progress:
+        on_progress(deleted)
+
+    get_document_store().delete_namespace(namespace)
+    forget_namespace(namespace)
+    remove_namespace(namespace)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    logging.info("🗑️ Deleted local RAG %s (%d vectors) in %.0f ms", local_path, deleted, elapsed_ms)
+    return {"deleted": deleted, "elapsed_ms": elapsed_ms}
+
+
+class DeletionJob:
+    """A deletion running in the background; polled through /delete-rag/jobs/<job_id>."""
+
+    def __init__(self, kind, target):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.target = target
+        self.state = 'queued'
+        self.deleted = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.elapsed_ms = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "target": self.target,
+            "state": self.state,
+            "deleted": self.deleted,
+            "elapsed_ms": self.elapsed_ms,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# Most recent jobs, oldest first; finished jobs are dropped beyond DELETE_JOB_HISTORY
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _run_job(job, operation, kwargs):
+    job.state = 'running'
+
+    def progress(count):
+        job.deleted = count
+
+    try:
+        result = operation(on_progress=progress, **kwargs)
+        job.deleted = result["deleted"]
+        job.elapsed_ms = result["elapsed_ms"]
+        job.state = 'succeeded'
+    except Exception as e:
+        logging.error("❌ Deletion job %s (%s %s) failed: %s", job.job_id, job.kind, job.target, e, exc_info=True)
+        job.error = str(e)
+        job.state = 'failed'
+    finally:
+        job.finished_at = time.time()
+
+
+def start_deletion_job(kind, **kwargs):
+    """Run `delete_file` (kind='file') or `delete_namespace` (kind='rag') in the background; returns the job."""
+    operation = delete_file if kind == 'file' else delete_namespace
+    target = {key: value for key, value in kwargs.items() if value is not None}
+    job = DeletionJob(kind, target)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        finished = [job_id for job_id, old in _jobs.items() if old.finished_at is not None]
+        for job_id in finished[:max(0, len(_jobs) - Config.DELETE_JOB_HISTORY)]:
+            del _jobs[job_id]
+    _job_executor.submit(_run_job, job, operation, kwargs)
+    return job
+
+
+def get_deletion_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def should_run_in_background(namespace, index_name=None):
+    """Large namespaces are deleted in the background so the request doesn't hold a worker."""
+    if (get_namespace_config(namespace) or {}).get('local_path') is not None:
+        return False  # Removing a local RAG's folder is quick whatever its size
+    index = get_pinecone_client().Index(index_name or index_name_for_namespace(namespace))
+    return _namespace_vector_count(index, namespace) > Config.DELETE_SYNC_MAX_VECTORS
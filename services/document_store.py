@@ -0,0 +1,233 @@
+import os
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from config import Config
+
+
+class LRUCache:
+    """Small thread-safe LRU map used as the read cache in front of a document store."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[key] = self.entries[key]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        if self.capacity <= 0:
+            return
+        with self.lock:
+            for key, value in items:
+                self.entries[key] = value
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def discard_namespace(self, namespace):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == namespace]:
+                del self.entries[key]
+
+
+class DocumentStore:
+    """
+    Stores chunk text outside the vector index, keyed by (namespace, vector id).
+
+    Vectors only carry small metadata; callers batch-fetch the texts for the ids a
+    query returned with `get_many`, which answers from the LRU cache first and
+    fetches all misses from the backend in one round trip.
+    """
+
+    def __init__(self, cache_size=None):
+        self.cache = LRUCache(Config.DOCUMENT_CACHE_SIZE if cache_size is None else cache_size)
+
+    def put_many(self, namespace, items):
+        """Store `[(vector_id, text), ...]` for a namespace, replacing existing texts."""
+        items = list(items)
+        if not items:
+            return 0
+        self._put_many(namespace, items)
+        self.cache.put_many(((namespace, vector_id), text) for vector_id, text in items)
+        return len(items)
+
+    def get_many(self, namespace, vector_ids):
+        """Return `{vector_id: text}` for the ids that have stored text."""
+        keys = [(namespace, vector_id) for vector_id in vector_ids]
+        cached = self.cache.get_many(keys)
+        result = {vector_id: text for (_, vector_id), text in cached.items()}
+
+        missing = [vector_id for vector_id in vector_ids if vector_id not in result]
+        if missing:
+            fetched = self._get_many(namespace, missing)
+            self.cache.put_many(((namespace, vector_id), text) for vector_id, text in fetched.items())
+            result.update(fetched)
+        return result
+
+    def delete_many(self, namespace, vector_ids):
+        vector_ids = list(vector_ids)
+        self.cache.discard([(namespace, vector_id) for vector_id in vector_ids])
+        return self._delete_many(namespace, vector_ids)
+
+    def delete_namespace(self, namespace):
+        self.cache.discard_namespace(namespace)
+        return self._delete_namespace(namespace)
+
+    def stats(self):
+        return {"backend": self.backend, "cache_entries": len(self.cache.entries), "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """
+    Local SQLite-backed document store.
+
+    Each thread gets its own connection; the database runs in WAL mode so readers
+    don't block the ingest writer, and is memory-mapped (`PRAGMA mmap_size`) so
+    hot pages are served from the OS page cache without read syscalls.
+    """
+
+    backend = 'sqlite'
+    # SQLite limits the number of host parameters per statement
+    MAX_PARAMS = 900
+
+    def __init__(self, db_path=None, mmap_bytes=None, cache_size=None):
+        super().__init__(cache_size)
+        self.db_path = db_path or Config.DOCUMENT_STORE_PATH
+        self.mmap_bytes = Config.DOCUMENT_STORE_MMAP_BYTES if mmap_bytes is None else mmap_bytes
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_texts ("
+                " namespace TEXT NOT NULL,"
+                " vector_id TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " PRIMARY KEY (namespace, vector_id)"
+                ") WITHOUT ROWID"
+            )
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _put_many(self, namespace, items):
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_texts (namespace, vector_id, text) VALUES (?, ?, ?)",
+                [(namespace, vector_id, text) for vector_id, text in items]
+            )
+
+    def _get_many(self, namespace, vector_ids):
+        conn = self._connection()
+        result = {}
+        for start in range(0, len(vector_ids), self.MAX_PARAMS):
+            batch = vector_ids[start:start + self.MAX_PARAMS]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f"SELECT vector_id, text FROM chunk_texts WHERE namespace = ? AND vector_id IN ({placeholders})",
+                [namespace, *batch]
+            )
+            result.update(rows)
+        return result
+
+    def _delete_many(self, namespace, vector_ids):
+        deleted = 0
+        with self._connection() as conn:
+            for start in range(0, len(vector_ids), self.MAX_PARAMS):
+                batch = vector_ids[start:start + self.MAX_PARAMS]
+                placeholders = ','.join('?' * len(batch))
+                deleted += conn.execute(
+                    f"DELETE FROM chunk_texts WHERE namespace = ? AND vector_id IN ({placeholders})",
+                    [namespace, *batch]
+                ).rowcount
+        return deleted
+
+    def _delete_namespace(self, namespace):
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM chunk_texts WHERE namespace = ?", (namespace,)).rowcount
+
+
+class MongoDocumentStore(DocumentStore):
+    """Document store backed by the existing MongoDB service (one document per chunk)."""
+
+    backend = 'mongodb'
+
+    def __init__(self, collection_name=None, cache_size=None):
+        super().__init__(cache_size)
+        from services.mongodb_service import get_mongodb_connection
+        self.client, db = get_mongodb_connection()
+        if db is None:
+            raise ConnectionError("MongoDB is not available for the document store")
+        self.collection = db[collection_name or Config.DOCUMENT_STORE_COLLECTION]
+        self.collection.create_index('namespace')
+
+    @staticmethod
+    def _key(namespace, vector_id):
+        return f"{namespace}::{vector_id}"
+
+    def _put_many(self, namespace, items):
+        from pymongo import ReplaceOne
+        self.collection.bulk_write([
+            ReplaceOne(
+                {"_id": self._key(namespace, vector_id)},
+                {"_id": self._key(namespace, vector_id), "namespace": namespace, "vector_id": vector_id, "text": text},
+                upsert=True
+            )
+            for vector_id, text in items
+        ], ordered=False)
+
+    def _get_many(self, namespace, vector_ids):
+        cursor = self.collection.find(
+            {"_id": {"$in": [self._key(namespace, vector_id) for vector_id in vector_ids]}},
+            {"vector_id": 1, "text": 1}
+        )
+        return {doc["vector_id"]: doc["text"] for doc in cursor}
+
+    def _delete_many(self, namespace, vector_ids):
+        return self.collection.delete_many({"_id": {"$in": [self._key(namespace, vector_id) for vector_id in vector_ids]}}).deleted_count
+
+    def _delete_namespace(self, namespace):
+        return self.collection.delete_many({"namespace": namespace}).deleted_count
+
+
+_document_store = None
+_document_store_lock = threading.Lock()
+
+
+def get_document_store():
+    """Return the process-wide document store for the configured backend."""
+    global _document_store
+    if _document_store is None:
+        with _document_store_lock:
+            if _document_store is None:
+                backend = Config.DOCUMENT_STORE_BACKEND.lower()
+                if backend == 'mongodb':
+                    _document_store = MongoDocumentStore()
+                else:
+                    _document_store = SQLiteDocumentStore()
+                logging.info("✅ Document store initialized (backend=%s)", _document_store.backend)
+    return _document_store
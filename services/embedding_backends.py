@@ -0,0 +1,309 @@
+import re
+import logging
+import threading
+import numpy as np
+from config import Config
+
+_WORD = re.compile(r"\S+")
+
+
+class EmbeddingBackend:
+    """
+    Base class for embedding backends.
+
+    Subclasses implement `embed(text)` returning a 1-D float32 array; `embed_batch`
+    defaults to embedding texts one at a time and can be overridden by backends
+    that can batch. `embed_query` is used for search queries and defaults to
+    `embed`; asymmetric models override it. `dimension` is discovered from the
+    first embedding if the backend doesn't know it up front.
+    """
+
+    name = None
+    _dimension = None
+    # True for backends that run a model in this process (served by the embedding server when one is configured)
+    local_model = False
+
+    def embed(self, text):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        return self.embed(text)
+
+    def embed_batch(self, texts):
+        return np.vstack([self.embed(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+    def embed_query_batch(self, texts):
+        return np.vstack([self.embed_query(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+    def window_tokenizer(self):
+        """Fast tokenizer used to cut document windows, or None to count whitespace-separated words."""
+        return None
+
+    def split_windows(self, text, window_tokens=None, overlap_tokens=None):
+        """
+        Split `text` into overlapping windows of at most `window_tokens` tokens.
+
+        Returns a list of `(start_char, end_char)` spans into `text`, so windows
+        are exact substrings and never re-tokenised differently from the source.
+        """
+        window_tokens = window_tokens or Config.DOCUMENT_WINDOW_TOKENS
+        overlap_tokens = Config.DOCUMENT_WINDOW_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        step = max(1, window_tokens - overlap_tokens)
+
+        tokenizer = self.window_tokenizer()
+        if tokenizer is not None:
+            offsets = [span for span in tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping'] if span[1] > span[0]]
+        else:
+            offsets = [match.span() for match in _WORD.finditer(text)]
+        if not offsets:
+            return []
+
+        spans = []
+        for start in range(0, len(offsets), step):
+            window = offsets[start:start + window_tokens]
+            spans.append((window[0][0], window[-1][1]))
+            if start + window_tokens >= len(offsets):
+                break
+        return spans
+
+    def split_section_windows(self, text, sections, window_tokens=None, overlap_tokens=None):
+        """Like `split_windows`, but windows are cut inside each `(name, start, end)` section and never cross one."""
+        spans = []
+        for _, start, end in sections:
+            spans.extend((start + window_start, start + window_end) for window_start, window_end in self.split_windows(text[start:end], window_tokens, overlap_tokens))
+        return spans
+
+    def embed_document(self, text, keep_windows=False, window_tokens=None, overlap_tokens=None, sections=None):
+        """
+        Embed a whole document, however long, as one vector.
+
+        The text is cut into overlapping token windows (inside each of `sections`
+        when given, see `split_section_windows`), all windows are embedded
+        with `embed_batch` (in batches of DOCUMENT_WINDOW_BATCH_SIZE), and the
+        window vectors are averaged weighted by window length, then normalised.
+
+        Returns:
+            tuple: (document_vector, windows) where `windows` is a list of
+            `(start_char, end_char, vector)` when `keep_windows` is set, else None.
+        """
+        if sections:
+            spans = self.split_section_windows(text, sections, window_tokens, overlap_tokens)
+        else:
+            spans = self.split_windows(text, window_tokens, overlap_tokens)
+        if len(spans) <= 1:
+            vector = self.embed(text)
+            start, end = spans[0] if spans else (0, len(text))
+            return vector, ([(start, end, vector)] if keep_windows else None)
+
+        batch_size = Config.DOCUMENT_WINDOW_BATCH_SIZE
+        window_texts = [text[start:end] for start, end in spans]
+        vectors = np.vstack([self.embed_batch(window_texts[i:i + batch_size]) for i in range(0, len(window_texts), batch_size)])
+        weights = np.asarray([end - start for start, end in spans], dtype=np.float32)
+
+        pooled = (vectors * weights[:, None]).sum(axis=0) / weights.sum()
+        norm = np.linalg.norm(pooled)
+        if norm > 0:
+            pooled = pooled / norm
+        logging.debug("🧠 Embedded %d chars as %d windows with '%s'", len(text), len(spans), self.name)
+        windows = [(start, end, vector) for (start, end), vector in zip(spans, vectors)] if keep_windows else None
+        return pooled.astype(np.float32), windows
+
+    @property
+    def dimension(self):
+        if self._dimension is None:
+            self._dimension = int(len(self.embed("dimension probe")))
+        return self._dimension
+
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def load_tokenizer(model_path):
+    """Load (once) just the tokenizer of a local model, without its weights or torch."""
+    tokenizer = _tokenizers.get(model_path)
+    if tokenizer is None:
+        with _tokenizers_lock:
+            tokenizer = _tokenizers.get(model_path)
+            if tokenizer is None:
+                from transformers import AutoTokenizer
+                tokenizer = _tokenizers[model_path] = AutoTokenizer.from_pretrained(model_path)
+    return tokenizer
+
+
+class InstructorXLBackend(EmbeddingBackend):
+    """Instructor-XL loaded from LOCAL_MODEL_PATH (heavy, highest quality)."""
+
+    name = 'instructor-xl'
+    local_model = True
+
+    def embed(self, text):
+        from services import embedding_service
+        return np.asarray(embedding_service.get_embedding(text), dtype=np.float32)
+
+    def embed_batch(self, texts):
+        from services import embedding_service
+        return embedding_service.get_instructor_embeddings_batch(texts)
+
+    def window_tokenizer(self):
+        return load_tokenizer(Config.INSTRUCTOR_MODEL_PATH)
+
+
+class InstructorEncoderBackend(EmbeddingBackend):
+    """
+    Instructor-XL run encoder-only, as INSTRUCTOR intends: instruction-prefixed input,
+    masked mean pooling over encoder states, normalised output. About half the
+    memory and compute of `instructor-xl`, but its vectors are not comparable with it.
+    """
+
+    name = 'instructor-xl-encoder'
+    local_model = True
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts):
+        from services.embedding_service import get_instructor_encoder_embeddings
+        return get_instructor_encoder_embeddings(texts, Config.INSTRUCTOR_DOCUMENT_INSTRUCTION)
+
+    def embed_query(self, text):
+        return self.embed_query_batch([text])[0]
+
+    def embed_query_batch(self, texts):
+        from services.embedding_service import get_instructor_encoder_embeddings
+        return get_instructor_encoder_embeddings(texts, Config.INSTRUCTOR_QUERY_INSTRUCTION)
+
+    def window_tokenizer(self):
+        return load_tokenizer(Config.INSTRUCTOR_MODEL_PATH)
+
+
+class FastTextBackend(EmbeddingBackend):
+    """FastText sentence vectors (cc.en.300): very cheap, for latency-sensitive or low-value corpora."""
+
+    name = 'fasttext'
+    _dimension = 300
+    local_model = True
+
+    def embed(self, text):
+        from services.fasttext_service import get_fasttext_embeddings
+        embeddings = get_fasttext_embeddings(text)
+        if not embeddings:
+            raise ValueError("FastText embedding failed")
+        return np.asarray(embeddings[0], dtype=np.float32)
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """OpenAI embeddings API (text-embedding-ada-002 by default), via the shared rate-limited client."""
+
+    name = 'openai'
+    _dimension = 1536
+
+    def __init__(self):
+        from services.llm_client import get_llm_client
+        self.client = get_llm_client()
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts):
+        return np.asarray(self.client.embeddings(texts), dtype=np.float32)
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Small local sentence model (e.g. all-MiniLM-L6-v2) with masked mean pooling, loaded via transformers."""
+
+    local_model = True
+
+    def __init__(self, name, model_path):
+        from services.model_manager import model_manager, directory_bytes
+        self.name = name
+        self.model_path = model_path
+        # Loaded on first use and evicted when idle or over the model memory budget
+        model_manager.register(name, self._load, estimate=lambda: directory_bytes(model_path))
+
+    def _load(self):
+        from transformers import AutoModel
+        from services.model_manager import ensure_safetensors
+        logging.info("🧠 Loading sentence model '%s' from %s", self.name, self.model_path)
+        model = AutoModel.from_pretrained(ensure_safetensors(self.model_path))
+        model.eval()
+        return load_tokenizer(self.model_path), model
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+    def window_tokenizer(self):
+        return load_tokenizer(self.model_path)
+
+    def embed_batch(self, texts):
+        import torch
+        from services.model_manager import model_manager
+        with model_manager.use(self.name) as (tokenizer, model):
+            inputs = tokenizer(list(texts), return_tensors="pt", truncation=True, max_length=512, padding=True)
+            with torch.no_grad():
+                hidden = model(**inputs).last_hidden_state
+        mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled.numpy().astype(np.float32)
+
+
+# name -> zero-argument factory; instances are created on first use and shared
+_backend_factories = {}
+_local_backends = {}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    """Register (or replace) an embedding backend factory under `name`."""
+    with _backends_lock:
+        _backend_factories[name] = factory
+        _local_backends.pop(name, None)
+        _backends.pop(name, None)
+
+
+def available_backends():
+    return sorted(_backend_factories)
+
+
+def get_local_backend(name=None):
+    """Return the shared in-process backend for `name`, never routed to the embedding server."""
+    name = name or Config.EMBEDDING_MODEL
+    backend = _local_backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _local_backends.get(name)
+            if backend is None:
+                if name not in _backend_factories:
+                    raise ValueError(f"Unknown embedding backend '{name}'. Available: {', '.join(sorted(_backend_factories))}")
+                backend = _local_backends[name] = _backend_factories[name]()
+    return backend
+
+
+def get_backend(name=None):
+    """
+    Return the backend for `name` (default: Config.EMBEDDING_MODEL).
+
+    When EMBEDDING_SERVER_ADDRESS is set, backends that run a local model are
+    proxied to the embedding server, so this process never loads the model.
+    """
+    name = name or Config.EMBEDDING_MODEL
+    backend = _backends.get(name)
+    if backend is None:
+        local = get_local_backend(name)
+        if Config.EMBEDDING_SERVER_ADDRESS and local.local_model:
+            from services.embedding_client import RemoteEmbeddingBackend
+            backend = RemoteEmbeddingBackend(local)
+        else:
+            backend = local
+        with _backends_lock:
+            backend = _backends.setdefault(name, backend)
+    return backend
+
+register_backend('instructor-xl', InstructorXLBackend)
+register_backend('instructor-xl-encoder', InstructorEncoderBackend)
+register_backend('fasttext', FastTextBackend)
+register_backend('openai', OpenAIBackend)
+register_backend('minilm', lambda: SentenceTransformerBackend('minilm', Config.MINILM_MODEL_PATH))
+register_backend('mpnet', lambda: SentenceTransformerBackend('mpnet', Config.MPNET_MODEL_PATH))
@@ -0,0 +1,198 @@
+"""
+Client side of the local embedding server (see services/embedding_server.py).
+
+Wire format, all integers big-endian. A connection carries any number of
+request/response pairs, one at a time:
+
+    request:  b"EMB1" | op:u8 | backend_len:u8 | backend:utf8 | count:u32 | count x (len:u32 | text:utf8)
+    response: status:u8 (0 = ok) | rows:u32 | dim:u32 | rows*dim little-endian float32
+              status:u8 (1 = error) | len:u32 | message:utf8
+
+`op` is OP_EMBED (documents), OP_EMBED_QUERY (search queries) or OP_INFO (no
+texts; answered with zero rows, so `dim` carries the backend's dimension).
+"""
+import socket
+import struct
+import threading
+import numpy as np
+from config import Config
+from services.embedding_backends import EmbeddingBackend
+
+MAGIC = b"EMB1"
+OP_EMBED = 1
+OP_EMBED_QUERY = 2
+OP_INFO = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_U32 = struct.Struct('!I')
+
+
+class EmbeddingServerError(RuntimeError):
+    """The embedding server rejected a request or could not be reached."""
+
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def encode_request(op, backend_name, texts):
+    name = backend_name.encode('utf-8')
+    parts = [MAGIC, struct.pack('!BB', op, len(name)), name, _U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode('utf-8')
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def read_request(sock):
+    """Read one request; returns (op, backend_name, texts), or None if the peer closed the connection."""
+    try:
+        header = recv_exact(sock, 6)
+    except ConnectionError:
+        return None
+    if header[:4] != MAGIC:
+        raise ValueError("Bad request magic")
+    op, name_length = header[4], header[5]
+    backend_name = recv_exact(sock, name_length).decode('utf-8')
+    count = _U32.unpack(recv_exact(sock, 4))[0]
+    texts = []
+    for _ in range(count):
+        length = _U32.unpack(recv_exact(sock, 4))[0]
+        texts.append(recv_exact(sock, length).decode('utf-8'))
+    return op, backend_name, texts
+
+
+def encode_vectors(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype='<f4')
+    rows, dim = vectors.shape
+    return struct.pack('!BII', STATUS_OK, rows, dim) + vectors.tobytes()
+
+
+def encode_error(message):
+    data = message.encode('utf-8')[:65536]
+    return struct.pack('!BI', STATUS_ERROR, len(data)) + data
+
+
+def read_response(sock):
+    status = recv_exact(sock, 1)[0]
+    if status != STATUS_OK:
+        length = _U32.unpack(recv_exact(sock, 4))[0]
+        raise EmbeddingServerError(recv_exact(sock, length).decode('utf-8'))
+    rows, dim = struct.unpack('!II', recv_exact(sock, 8))
+    if rows == 0:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.frombuffer(recv_exact(sock, rows * dim * 4), dtype='<f4').reshape(rows, dim).astype(np.float32, copy=False)
+
+
+def connect(address, timeout):
+    """Open a socket to `unix:///path/to.sock` or `tcp://host:port` (a bare `host:port` also works)."""
+    if address.startswith('unix://'):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address[len('unix://'):])
+        return sock
+    host, _, port = address[len('tcp://'):].rpartition(':') if address.startswith('tcp://') else address.rpartition(':')
+    sock = socket.create_connection((host, int(port)), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class EmbeddingServerClient:
+    """One persistent connection per calling thread to the embedding server."""
+
+    def __init__(self, address=None, timeout=None):
+        self.address = address or Config.EMBEDDING_SERVER_ADDRESS
+        self.timeout = timeout or Config.EMBEDDING_SERVER_TIMEOUT_SECONDS
+        self.local = threading.local()
+
+    def _call(self, op, backend_name, texts):
+        payload = encode_request(op, backend_name, texts)
+        for attempt in range(2):
+            sock = getattr(self.local, 'sock', None)
+            fresh = sock is None
+            try:
+                if fresh:
+                    sock = self.local.sock = connect(self.address, self.timeout)
+                sock.sendall(payload)
+                return read_response(sock)
+            except EmbeddingServerError:
+                raise
+            except OSError as e:
+                self.close()
+                # A pooled connection may have been closed by a server restart; retry once on a new one
+                if fresh or attempt:
+                    raise EmbeddingServerError(f"Embedding server at {self.address} is unavailable: {e}") from e
+
+    def embed(self, backend_name, texts, query=False):
+        return self._call(OP_EMBED_QUERY if query else OP_EMBED, backend_name, list(texts))
+
+    def dimension(self, backend_name):
+        return self._call(OP_INFO, backend_name, []).shape[1]
+
+    def close(self):
+        sock = getattr(self.local, 'sock', None)
+        self.local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_embedding_server_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EmbeddingServerClient()
+    return _client
+
+
+class RemoteEmbeddingBackend(EmbeddingBackend):
+    """
+    Proxy for a local-model backend that runs inside the embedding server.
+
+    Only the backend's tokenizer is loaded in this process (for cutting document
+    windows); the texts go to the server and raw float32 vectors come back.
+    """
+
+    def __init__(self, local_backend, client=None):
+        self.local_backend = local_backend
+        self.name = local_backend.name
+        self._dimension = local_backend._dimension
+        self.client = client or get_embedding_server_client()
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts):
+        return self.client.embed(self.name, texts)
+
+    def embed_query(self, text):
+        return self.embed_query_batch([text])[0]
+
+    def embed_query_batch(self, texts):
+        return self.client.embed(self.name, texts, query=True)
+
+    def window_tokenizer(self):
+        return self.local_backend.window_tokenizer()
+
+    @property
+    def dimension(self):
+        if self._dimension is None:
+            self._dimension = int(self.client.dimension(self.name))
+        return self._dimension
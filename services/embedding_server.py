@@ -0,0 +1,220 @@
+"""
+Embedding server: one process per machine that owns the embedding models.
+
+Web workers reach it through RemoteEmbeddingBackend when EMBEDDING_SERVER_ADDRESS
+is set, so no worker loads a model itself. Requests from all connections are
+queued per (backend, op) and a single inference thread drains them into batches
+of up to EMBEDDING_SERVER_MAX_BATCH texts, waiting at most
+EMBEDDING_SERVER_MAX_WAIT_MS for a batch to fill. torch's intra-op and inter-op
+thread pools are sized explicitly before any model is loaded.
+
+    python -m services.embedding_server --address unix:///tmp/rag-embeddings.sock --preload instructor-xl
+"""
+import os
+import sys
+import time
+import queue
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+from config import Config
+from services.embedding_backends import get_local_backend
+from services.embedding_client import (
+    OP_EMBED, OP_EMBED_QUERY, OP_INFO, read_request, encode_vectors, encode_error
+)
+
+
+class _Job:
+    __slots__ = ('backend_name', 'op', 'texts', 'future')
+
+    def __init__(self, backend_name, op, texts):
+        self.backend_name = backend_name
+        self.op = op
+        self.texts = texts
+        self.future = Future()
+
+
+class EmbeddingBatcher:
+    """
+    Collects jobs from every connection and runs them on one inference thread.
+
+    Jobs for the same backend and op that arrive within `max_wait` of each
+    other are merged into one `embed_batch` / `embed_query_batch` call (up to
+    `max_batch` texts), and each job gets back its own slice of the result.
+    """
+
+    def __init__(self, max_batch, max_wait):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.jobs = queue.Queue()
+        # Jobs taken off the queue that didn't fit the batch being built; only touched by the inference thread
+        self.backlog = deque()
+        self.batches = 0
+        self.texts = 0
+        self.thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, backend_name, op, texts):
+        job = _Job(backend_name, op, texts)
+        self.jobs.put(job)
+        return job.future
+
+    def _next_job(self, timeout=None):
+        if self.backlog:
+            return self.backlog.popleft()
+        return self.jobs.get(timeout=timeout)
+
+    def _collect(self, first):
+        key = (first.backend_name, first.op)
+        batch, size = [first], len(first.texts)
+        skipped = []
+        # Backlogged jobs first (they arrived earlier), then whatever arrives within max_wait
+        while self.backlog and size < self.max_batch:
+            job = self.backlog.popleft()
+            if (job.backend_name, job.op) == key and size + len(job.texts) <= self.max_batch:
+                batch.append(job)
+                size += len(job.texts)
+            else:
+                skipped.append(job)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if (job.backend_name, job.op) == key and size + len(job.texts) <= self.max_batch:
+                batch.append(job)
+                size += len(job.texts)
+            else:
+                skipped.append(job)
+        self.backlog.extendleft(reversed(skipped))
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect(self._next_job())
+            first = batch[0]
+            try:
+                backend = get_local_backend(first.backend_name)
+                texts = [text for job in batch for text in job.texts]
+                if first.op == OP_EMBED_QUERY:
+                    vectors = backend.embed_query_batch(texts)
+                else:
+                    vectors = backend.embed_batch(texts)
+                vectors = np.asarray(vectors, dtype=np.float32)
+                self.batches += 1
+                self.texts += len(texts)
+                offset = 0
+                for job in batch:
+                    job.future.set_result(vectors[offset:offset + len(job.texts)])
+                    offset += len(job.texts)
+            except Exception as e:
+                logging.error("❌ Embedding batch for '%s' failed: %s", first.backend_name, e, exc_info=True)
+                for job in batch:
+                    job.future.set_exception(e)
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batcher = self.server.batcher
+        sock = self.request
+        while True:
+            try:
+                request = read_request(sock)
+            except (ValueError, OSError) as e:
+                logging.warning("⚠️ Dropping embedding client: %s", e)
+                return
+            if request is None:
+                return
+            op, backend_name, texts = request
+            try:
+                if op == OP_INFO or (op in (OP_EMBED, OP_EMBED_QUERY) and not texts):
+                    response = encode_vectors(np.zeros((0, get_local_backend(backend_name).dimension), dtype=np.float32))
+                elif op in (OP_EMBED, OP_EMBED_QUERY):
+                    response = encode_vectors(batcher.submit(backend_name, op, texts).result())
+                else:
+                    response = encode_error(f"Unknown op {op}")
+            except Exception as e:
+                response = encode_error(str(e))
+            try:
+                sock.sendall(response)
+            except OSError:
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def configure_torch_threads(intra_op, inter_op):
+    """Size torch's thread pools explicitly; must run before the first model forward pass."""
+    import torch
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        torch.set_num_interop_threads(inter_op)
+    logging.info("🧵 torch threads: intra-op=%d inter-op=%d", torch.get_num_threads(), torch.get_num_interop_threads())
+
+
+def create_server(address, batcher):
+    """Bind `unix:///path.sock` or `tcp://host:port` (keep TCP on localhost)."""
+    if address.startswith('unix://'):
+        path = address[len('unix://'):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = _UnixServer(path, _ConnectionHandler)
+        os.chmod(path, 0o660)
+    else:
+        host, _, port = address[len('tcp://'):].rpartition(':') if address.startswith('tcp://') else address.rpartition(':')
+        server = _TCPServer((host, int(port)), _ConnectionHandler)
+        server.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    server.batcher = batcher
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve embedding models to local web workers.")
+    parser.add_argument('--address', default=Config.EMBEDDING_SERVER_ADDRESS or 'unix:///tmp/rag-embeddings.sock')
+    parser.add_argument('--preload', nargs='*', default=Config.EMBEDDING_SERVER_PRELOAD, help="Backends to load at startup.")
+    parser.add_argument('--max-batch', type=int, default=Config.EMBEDDING_SERVER_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=Config.EMBEDDING_SERVER_MAX_WAIT_MS)
+    parser.add_argument('--intra-op-threads', type=int, default=Config.EMBEDDING_SERVER_INTRA_OP_THREADS)
+    parser.add_argument('--inter-op-threads', type=int, default=Config.EMBEDDING_SERVER_INTER_OP_THREADS)
+    args = parser.parse_args(argv)
+
+    from utils import setup_logging
+    setup_logging(Config.LOG_FILE_PATH, Config.LOGGING_LEVEL, Config.LOG_MAX_FIELD_CHARS, Config.LOG_QUEUE_SIZE)
+
+    configure_torch_threads(args.intra_op_threads, args.inter_op_threads)
+    from services.model_manager import model_manager
+    model_manager.start()
+    for name in args.preload:
+        backend = get_local_backend(name)
+        logging.info("🧠 Preloaded embedding backend '%s' (dimension %d)", name, backend.dimension)
+
+    server = create_server(args.address, EmbeddingBatcher(args.max_batch, args.max_wait_ms / 1000.0))
+    logging.info("📡 Embedding server listening on %s", args.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,59 +1,199 @@
+import os
+import json
 import logging
 import torch
-from transformers import AutoTokenizer, AutoModel
+from transformers import AutoTokenizer, AutoModel, T5EncoderModel
+from config import Config
+from services.model_manager import model_manager, ensure_safetensors, directory_bytes
 
-# Local path to the model (update this path if needed)
-LOCAL_MODEL_PATH = '/Users/santoshtalluri/Documents/MyDevProjects/models/hkunlp/instructor-xl/'
+# Local path to the model (set INSTRUCTOR_MODEL_PATH to override)
+LOCAL_MODEL_PATH = Config.INSTRUCTOR_MODEL_PATH
 
 # Initialize global variables for models (avoid reloading every time)
 instructor_tokenizer = None
 instructor_model = None
 
-def initialize_instructor_model():
-    """Load Instructor-XL model from local path."""
+# Encoder-only Instructor: T5 encoder weights plus the checkpoint's Dense head, if it has one
+instructor_encoder = None
+instructor_dense = None
+
+def _load_instructor_model():
     global instructor_tokenizer, instructor_model
-    
-    if instructor_tokenizer is None or instructor_model is None:
-        logging.info(f"🧠 Loading Instructor-XL model from {LOCAL_MODEL_PATH}")
-        
-        # Load model from local path
-        try:
-            instructor_tokenizer = AutoTokenizer.from_pretrained(LOCAL_MODEL_PATH)
-            instructor_model = AutoModel.from_pretrained(LOCAL_MODEL_PATH)
-            logging.info(f"✅ Instructor-XL model loaded successfully from {LOCAL_MODEL_PATH}")
-        except Exception as e:
-            logging.error(f"❌ Failed to load Instructor-XL model from {LOCAL_MODEL_PATH}: {str(e)}", exc_info=True)
-            raise
+    logging.info("🧠 Loading Instructor-XL model from %s", LOCAL_MODEL_PATH)
+    try:
+        weights_path = ensure_safetensors(LOCAL_MODEL_PATH)
+        tokenizer = instructor_tokenizer or AutoTokenizer.from_pretrained(LOCAL_MODEL_PATH)
+        model = AutoModel.from_pretrained(weights_path)
+        model.eval()
+        instructor_tokenizer, instructor_model = tokenizer, model
+        logging.info("✅ Instructor-XL model loaded successfully from %s", weights_path)
+        return tokenizer, model
+    except Exception as e:
+        logging.error("❌ Failed to load Instructor-XL model from %s: %s", LOCAL_MODEL_PATH, e, exc_info=True)
+        raise
+
+
+def _unload_instructor_model(value):
+    global instructor_model
+    instructor_model = None
+
+
+def initialize_instructor_model():
+    """Load Instructor-XL model from local path (through the model manager, which may evict it when idle)."""
+    return model_manager.get('instructor-xl')
 
 def get_embedding(text):
     """Dynamically get embeddings based on the selected model."""
     try:
-        logging.info(f"🔍 Generating embeddings using the 'instructor-xl' model")
-        
-        # Ensure model is initialized before generating embeddings
-        initialize_instructor_model()
+        logging.debug("🔍 Generating embeddings using the 'instructor-xl' model")
         
         return get_instructor_embeddings(text)
     except Exception as e:
-        logging.error(f"❌ Error generating embeddings: {str(e)}", exc_info=True)
+        logging.error("❌ Error generating embeddings: %s", e, exc_info=True)
         raise
 
 def get_instructor_embeddings(text):
     """Generate embeddings using the Instructor-XL model."""
     try:
-        logging.info(f"🧠 Generating Instructor-XL embeddings for the provided text (first 100 chars): {text[:100]}...")
-        
-        # Tokenize input text
-        inputs = instructor_tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-        
-        # Pass input_ids as decoder_input_ids to prevent errors
-        outputs = instructor_model(input_ids=inputs['input_ids'], decoder_input_ids=inputs['input_ids'])
+        logging.debug("🧠 Generating Instructor-XL embeddings for the provided text (%d chars)", len(text))
         
-        # Get the embedding from the model's output
-        embedding = torch.mean(outputs.last_hidden_state, dim=1).squeeze().detach().numpy()
+        with model_manager.use('instructor-xl') as (tokenizer, model):
+            # Tokenize input text
+            inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
+
+            # Pass input_ids as decoder_input_ids to prevent errors
+            outputs = model(input_ids=inputs['input_ids'], decoder_input_ids=inputs['input_ids'])
+
+            # Get the embedding from the model's output
+            embedding = torch.mean(outputs.last_hidden_state, dim=1).squeeze().detach().numpy()
         
-        logging.info(f"✅ Instructor-XL Embedding generated successfully with length: {len(embedding)}")
+        logging.debug("✅ Instructor-XL Embedding generated successfully with length: %d", len(embedding))
         return embedding
     except Exception as e:
-        logging.error(f"❌ Instructor-XL embeddings failed: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        logging.error("❌ Instructor-XL embeddings failed: %s", e, exc_info=True)
+        raise
+
+
+def get_instructor_embeddings_batch(texts):
+    """
+    Batched version of `get_instructor_embeddings` (same vectors, one forward pass).
+
+    Inputs are right-padded and both stacks are masked, so padding never changes
+    the states of real tokens; the mean is taken over each text's own positions.
+    """
+    texts = list(texts)
+    logging.debug("🧠 Generating Instructor-XL embeddings for a batch of %d texts", len(texts))
+
+    with model_manager.use('instructor-xl') as (tokenizer, model):
+        inputs = tokenizer(texts, return_tensors="pt", truncation=True, max_length=512, padding=True)
+        mask = inputs['attention_mask']
+        with torch.inference_mode():
+            outputs = model(
+                input_ids=inputs['input_ids'], attention_mask=mask,
+                decoder_input_ids=inputs['input_ids'], decoder_attention_mask=mask
+            )
+            weights = mask.unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            pooled = (outputs.last_hidden_state * weights).sum(dim=1) / weights.sum(dim=1).clamp(min=1e-9)
+    return pooled.float().numpy()
+
+
+def _load_dense_head(model_path):
+    """
+    Load the sentence-transformers `2_Dense` projection shipped with Instructor checkpoints.
+
+    Returns a bias-free Linear layer, or None when the checkpoint has no Dense head
+    (the pooled encoder states are then used as-is).
+    """
+    dense_dir = os.path.join(model_path, '2_Dense')
+    config_path = os.path.join(dense_dir, 'config.json')
+    if not os.path.isfile(config_path):
+        return None
+    with open(config_path) as f:
+        dense_config = json.load(f)
+    safetensors_path = os.path.join(dense_dir, 'model.safetensors')
+    if os.path.isfile(safetensors_path):
+        from safetensors.torch import load_file
+        state = load_file(safetensors_path)
+    else:
+        state = torch.load(os.path.join(dense_dir, 'pytorch_model.bin'), map_location='cpu', weights_only=True)
+    layer = torch.nn.Linear(dense_config['in_features'], dense_config['out_features'], bias=dense_config.get('bias', True))
+    layer.load_state_dict({key.replace('linear.', ''): value for key, value in state.items()})
+    layer.eval()
+    return layer
+
+
+def _load_instructor_encoder():
+    """Load only the encoder half of Instructor-XL (roughly half the weights of the full T5 model)."""
+    global instructor_tokenizer, instructor_encoder, instructor_dense
+    logging.info("🧠 Loading Instructor-XL encoder from %s", LOCAL_MODEL_PATH)
+    try:
+        weights_path = ensure_safetensors(LOCAL_MODEL_PATH)
+        tokenizer = instructor_tokenizer or AutoTokenizer.from_pretrained(LOCAL_MODEL_PATH)
+        dense = _load_dense_head(LOCAL_MODEL_PATH)
+        encoder = T5EncoderModel.from_pretrained(weights_path)
+        encoder.eval()
+        instructor_tokenizer, instructor_encoder, instructor_dense = tokenizer, encoder, dense
+        logging.info("✅ Instructor-XL encoder loaded successfully from %s", weights_path)
+        return tokenizer, encoder, dense
+    except Exception as e:
+        logging.error("❌ Failed to load Instructor-XL encoder from %s: %s", LOCAL_MODEL_PATH, e, exc_info=True)
+        raise
+
+
+def _unload_instructor_encoder(value):
+    global instructor_encoder, instructor_dense
+    instructor_encoder = instructor_dense = None
+
+
+def initialize_instructor_encoder():
+    """Load the encoder-only Instructor-XL (through the model manager, which may evict it when idle)."""
+    return model_manager.get('instructor-xl-encoder')
+
+
+def get_instructor_encoder_embeddings(texts, instruction):
+    """
+    Embed a batch of texts with the encoder only, the way INSTRUCTOR does.
+
+    Each text is prefixed with `instruction`; encoder states are mean-pooled over
+    the text's own tokens (padding and instruction tokens are masked out), passed
+    through the Dense head if present, and L2-normalised.
+
+    Returns:
+        np.ndarray: float32 array of shape (len(texts), dimension).
+    """
+    texts = list(texts)
+    logging.debug("🧠 Generating encoder-only Instructor-XL embeddings for %d texts", len(texts))
+
+    with model_manager.use('instructor-xl-encoder') as (tokenizer, encoder, dense):
+        return _encode(tokenizer, encoder, dense, texts, instruction)
+
+
+def _encode(tokenizer, encoder, dense, texts, instruction):
+    inputs = tokenizer(
+        [f"{instruction} {text}" for text in texts],
+        return_tensors="pt", truncation=True, max_length=512, padding=True
+    )
+    # Instruction length without the trailing </s>, so pooling covers only the text's tokens
+    instruction_tokens = len(tokenizer(instruction)['input_ids']) - 1
+
+    with torch.inference_mode():
+        hidden = encoder(input_ids=inputs['input_ids'], attention_mask=inputs['attention_mask']).last_hidden_state
+        mask = inputs['attention_mask'].clone()
+        if instruction_tokens > 0:
+            # Keep at least one token per row if truncation left nothing after the instruction
+            mask[:, :instruction_tokens] = 0
+            empty = mask.sum(dim=1) == 0
+            mask[empty] = inputs['attention_mask'][empty]
+        mask = mask.unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        if dense is not None:
+            pooled = dense(pooled)
+        pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+    return pooled.float().numpy()
+
+
+# Both variants share the checkpoint; each is loaded on first use and evicted when idle or over budget
+model_manager.register('instructor-xl', _load_instructor_model, _unload_instructor_model,
+                       estimate=lambda: directory_bytes(LOCAL_MODEL_PATH))
+model_manager.register('instructor-xl-encoder', _load_instructor_encoder, _unload_instructor_encoder,
+                       estimate=lambda: directory_bytes(LOCAL_MODEL_PATH) // 2)
@@ -1,13 +1,142 @@
 import fasttext.util
 import os
+import json
+import shutil
 import logging
+import functools
 import numpy as np  # ✅ Import NumPy for embedding validation
 from config import Config  # Import paths from config
+from services.model_manager import model_manager
 
 # Use paths from Config
 FASTTEXT_MODEL_DIR = Config.FASTTEXT_HOME
 FASTTEXT_MODEL_PATH = Config.FASTTEXT_MODEL_PATH
 
+class MappedFastText:
+    """
+    An unsupervised fastText model served from a memory-mapped copy of its input matrix.
+
+    `fasttext.load_model` reads the whole cc.en.300 binary (about 7 GB) into the
+    heap. Here only the vocabulary is held in memory; vector rows are paged in
+    from `vectors.npy` as words are looked up, and reopening after an eviction
+    takes about a second. `get_sentence_vector` reproduces fastText's (subword
+    hashing, per-word normalisation, averaging).
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'args.json')) as f:
+            args = json.load(f)
+        self.dim, self.minn, self.maxn, self.bucket = args['dim'], args['minn'], args['maxn'], args['bucket']
+        with open(os.path.join(directory, 'words.txt'), 'rb') as f:
+            self.words = {word: index for index, word in enumerate(f.read().split(b'\n')[:args['nwords']])}
+        self.nwords = len(self.words)
+        self.vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r')
+        self.weight_bytes = self.vectors.nbytes
+        self._rows = functools.lru_cache(maxsize=100000)(self._subword_rows)
+
+    @staticmethod
+    def _hash(ngram):
+        # 32-bit FNV-1a over the bytes, each sign-extended as fastText does (int8_t -> uint32_t)
+        h = 2166136261
+        for byte in ngram:
+            h = ((h ^ ((byte - 256) & 0xFFFFFFFF if byte > 127 else byte)) * 16777619) & 0xFFFFFFFF
+        return h
+
+    def _subword_rows(self, word):
+        """Matrix rows averaged into a word's vector: the word itself (if known) and its character n-grams."""
+        rows = []
+        index = self.words.get(word)
+        if index is not None:
+            rows.append(index)
+        if word == b'</s>':
+            return tuple(rows)
+        token = b'<' + word + b'>'
+        for i in range(len(token)):
+            if token[i] & 0xC0 == 0x80:
+                continue
+            j, n = i, 1
+            while j < len(token) and n <= self.maxn:
+                j += 1
+                while j < len(token) and token[j] & 0xC0 == 0x80:
+                    j += 1
+                if n >= self.minn and not (n == 1 and (i == 0 or j == len(token))):
+                    rows.append(self.nwords + self._hash(token[i:j]) % self.bucket)
+                n += 1
+        return tuple(rows)
+
+    def get_dimension(self):
+        return self.dim
+
+    def get_word_vector(self, word):
+        rows = self._rows(word.encode('utf-8') if isinstance(word, str) else word)
+        if not rows:
+            return np.zeros(self.dim, dtype=np.float32)
+        return np.asarray(self.vectors[list(rows)], dtype=np.float32).mean(axis=0, dtype=np.float32)
+
+    def get_sentence_vector(self, text):
+        if '\n' in text:
+            raise ValueError("predict processes one line at a time (remove \'\\n\')")
+        total, count = np.zeros(self.dim, dtype=np.float32), 0
+        # bytes.split() separates on the same ASCII whitespace as fastText's `std::istream >> word`
+        for word in text.encode('utf-8').split():
+            vector = self.get_word_vector(word)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                total += vector / norm
+                count += 1
+        return total / count if count else total
+
+
+def export_mapped_fasttext(model_path, directory):
+    """Write `model_path` as the memory-mappable layout MappedFastText reads (one-time; needs the model in memory once)."""
+    model = fasttext.load_model(model_path)
+    args = model.f.getArgs()
+    if model.is_quantized() or str(args.model).endswith('supervised'):
+        raise ValueError("Only unquantized unsupervised fastText models can be memory-mapped")
+    staging = directory + '.tmp'
+    os.makedirs(staging, exist_ok=True)
+    words = model.get_words(on_unicode_error='replace')
+    with open(os.path.join(staging, 'words.txt'), 'wb') as f:
+        f.write(b'\n'.join(word.encode('utf-8') for word in words))
+    np.save(os.path.join(staging, 'vectors.npy'), model.get_input_matrix())
+    with open(os.path.join(staging, 'args.json'), 'w') as f:
+        json.dump({"dim": args.dim, "minn": args.minn, "maxn": args.maxn, "bucket": args.bucket, "nwords": len(words),
+                   "source_mtime": os.path.getmtime(model_path)}, f)
+    del model
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.replace(staging, directory)
+
+
+def _mapped_directory():
+    return FASTTEXT_MODEL_PATH + '.mmap'
+
+
+def _load_fasttext():
+    ensure_fasttext_model()  # Ensure the model exists
+
+    if not os.path.isfile(FASTTEXT_MODEL_PATH):
+        raise FileNotFoundError(f"FastText model not found at {FASTTEXT_MODEL_PATH}")
+
+    if Config.FASTTEXT_MMAP:
+        directory = _mapped_directory()
+        args_path = os.path.join(directory, 'args.json')
+        fresh = False
+        if os.path.isfile(args_path):
+            with open(args_path) as f:
+                fresh = json.load(f).get('source_mtime') == os.path.getmtime(FASTTEXT_MODEL_PATH)
+        try:
+            if not fresh:
+                logging.info(f"📦 Exporting FastText model to a memory-mappable copy in {directory} (one-time)")
+                export_mapped_fasttext(FASTTEXT_MODEL_PATH, directory)
+            logging.info(f"📥 Mapping FastText vectors from {directory}")
+            return MappedFastText(directory)
+        except ValueError as e:
+            logging.warning(f"⚠️ {e}; loading {FASTTEXT_MODEL_PATH} into memory instead")
+
+    logging.info(f"📥 Loading FastText model from {FASTTEXT_MODEL_PATH}")
+    return fasttext.load_model(FASTTEXT_MODEL_PATH)
+
 
 def ensure_fasttext_model():
     """Ensure the FastText model is downloaded and available in the project directory."""
@@ -51,18 +180,11 @@ def ensure_fasttext_model():
 
 
 def load_fasttext_model():
-    """Loads the FastText model from the project-level .fasttext directory."""
+    """Loads the FastText model from the project-level .fasttext directory (through the model manager, which may evict it when idle)."""
     try:
-        ensure_fasttext_model()  # Ensure the model exists
-
-        if not os.path.isfile(FASTTEXT_MODEL_PATH):
-            logging.error(f"❌ FastText model not found at {FASTTEXT_MODEL_PATH}")
-            return None
-
-        logging.info(f"📥 Loading FastText model from {FASTTEXT_MODEL_PATH}")
-        ft = fasttext.load_model(FASTTEXT_MODEL_PATH)
-        logging.info(f"✅ Successfully loaded FastText model from {FASTTEXT_MODEL_PATH}")
-        return ft
+        model = model_manager.get('fasttext')
+        logging.debug(f"✅ FastText model ready from {FASTTEXT_MODEL_PATH}")
+        return model
     except Exception as e:
         logging.error(f"❌ Failed to load FastText model: {str(e)}", exc_info=True)
         return None
@@ -80,14 +202,15 @@ def get_fasttext_embeddings(text):
             logging.warning("⚠️ The input text is empty. Returning an empty embedding.")
             return []
 
-        embedding = ft.get_sentence_vector(text)
+        with model_manager.use('fasttext') as ft:
+            embedding = ft.get_sentence_vector(text)
 
         if embedding is None:
             logging.error("❌ FastText embedding is None. Something went wrong.")
             return []
 
         if not isinstance(embedding, (list, np.ndarray)):
-            logging.error(f"❌ Embedding is not a list or NumPy array. Type: {type(embedding)}")
+            logging.error("❌ Embedding is not a list or NumPy array. Type: %s", type(embedding))
             return []
 
         if isinstance(embedding, np.ndarray):
@@ -97,8 +220,12 @@ def get_fasttext_embeddings(text):
             logging.error("❌ FastText embedding is empty.")
             return []
 
-        logging.info(f"✅ Successfully generated embedding for text: {text[:50]}... Embedding (first 10 values): {embedding[:10]}")
+        logging.debug("✅ Successfully generated FastText embedding for text (%d chars), dimension %d", len(text), len(embedding))
         return [embedding]  # Wrap in a list to maintain consistency for multiple embeddings
     except Exception as e:
-        logging.error(f"❌ Error generating FastText embedding: {str(e)}", exc_info=True)
-        return []
\ No newline at end of file
+        logging.error("❌ Error generating FastText embedding: %s", e, exc_info=True)
+        return []
+
+
+model_manager.register('fasttext', _load_fasttext,
+                       estimate=lambda: os.path.getsize(FASTTEXT_MODEL_PATH) if os.path.isfile(FASTTEXT_MODEL_PATH) else 0)
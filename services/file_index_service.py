@@ -0,0 +1,219 @@
+import os
+import time
+import base64
+import logging
+import threading
+from config import Config
+
+
+class FileEntry:
+    __slots__ = ('name', 'size', 'mtime')
+
+    def __init__(self, name, size, mtime):
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+
+
+class DirEntry:
+    __slots__ = ('mtime', 'files', 'subdirs')
+
+    def __init__(self, mtime, files, subdirs):
+        self.mtime = mtime
+        self.files = files
+        self.subdirs = subdirs
+
+
+class FileIndex:
+    """
+    In-memory index of the files under a few root folders (data, FAISS indexes).
+
+    Built with one walk at startup and kept current by a background thread that
+    stats every known directory each FILE_INDEX_RESCAN_SECONDS and re-lists only
+    those whose mtime changed (a file or folder was added, removed or renamed).
+    Routes that write files call `notify(path)` so overwrites in place show up
+    immediately. Requests read the index and never touch the disk.
+    """
+
+    def __init__(self, roots):
+        self.roots = roots
+        # (root name, relative dir path) -> DirEntry; '' is the root folder itself
+        self.dirs = {}
+        self.lock = threading.Lock()
+        self.built = threading.Event()
+        self.last_refresh = None
+        self.thread = None
+
+    # ---- Scanning (background thread / notify only) ----
+
+    def _scan_dir(self, root, rel_path):
+        """List one directory (one scandir, no recursion); returns None if it's gone."""
+        path = os.path.join(self.roots[root], rel_path)
+        try:
+            mtime = os.stat(path).st_mtime
+            files, subdirs = {}, set()
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.add(entry.name)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = FileEntry(entry.name, stat.st_size, stat.st_mtime)
+                    except OSError:
+                        continue
+            return DirEntry(mtime, files, subdirs)
+        except OSError:
+            return None
+
+    def _scan_tree(self, root, rel_path):
+        """Scan a directory and everything below it that isn't indexed yet."""
+        pending = [rel_path]
+        while pending:
+            current = pending.pop()
+            entry = self._scan_dir(root, current)
+            with self.lock:
+                if entry is None:
+                    self._drop_tree(root, current)
+                    continue
+                previous = self.dirs.get((root, current))
+                self.dirs[(root, current)] = entry
+                for removed in (previous.subdirs - entry.subdirs) if previous else ():
+                    self._drop_tree(root, os.path.join(current, removed))
+            for name in entry.subdirs:
+                child = os.path.join(current, name)
+                if (root, child) not in self.dirs:
+                    pending.append(child)
+
+    def _drop_tree(self, root, rel_path):
+        """Forget a directory and its descendants (caller holds the lock)."""
+        prefix = rel_path + os.sep
+        for key in [key for key in self.dirs if key[0] == root and (key[1] == rel_path or key[1].startswith(prefix))]:
+            del self.dirs[key]
+
+    def build(self):
+        started = time.perf_counter()
+        for root in self.roots:
+            self._scan_tree(root, '')
+        self.last_refresh = time.time()
+        self.built.set()
+        logging.info("📂 File index built: %d directories in %.0f ms", len(self.dirs), (time.perf_counter() - started) * 1000.0)
+
+    def refresh(self):
+        """Re-list only the directories whose mtime changed since they were indexed."""
+        for root in self.roots:
+            with self.lock:
+                known = [(rel_path, entry.mtime) for (root_name, rel_path), entry in self.dirs.items() if root_name == root]
+            if not known:
+                known = [('', None)]  # Root didn't exist at the last scan
+            for rel_path, mtime in known:
+                try:
+                    current = os.stat(os.path.join(self.roots[root], rel_path)).st_mtime
+                except OSError:
+                    with self.lock:
+                        self._drop_tree(root, rel_path)
+                    continue
+                if current != mtime:
+                    self._scan_tree(root, rel_path)
+        self.last_refresh = time.time()
+
+    def notify(self, path):
+        """Update the index for a file or directory that was just written or removed."""
+        path = os.path.abspath(path)
+        for root, root_path in self.roots.items():
+            root_path = os.path.abspath(root_path)
+            if path == root_path or path.startswith(root_path + os.sep):
+                rel_dir = os.path.relpath(os.path.dirname(path), root_path) if path != root_path else ''
+                self._scan_tree(root, '' if rel_dir == '.' else rel_dir)
+                if os.path.isdir(path) and path != root_path:
+                    self._scan_tree(root, os.path.relpath(path, root_path))
+
+    def _run(self):
+        self.build()
+        while True:
+            time.sleep(Config.FILE_INDEX_RESCAN_SECONDS)
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error("❌ File index refresh failed: %s", e, exc_info=True)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='file-index', daemon=True)
+            self.thread.start()
+
+    # ---- Reads (request path) ----
+
+    def _ready(self):
+        if not self.built.is_set():
+            if self.thread is None:
+                self.build()
+            else:
+                self.built.wait(timeout=30)
+
+    def get_dir(self, root, rel_path=''):
+        """Return a directory's DirEntry, or None if it isn't there."""
+        self._ready()
+        rel_path = os.path.normpath(rel_path) if rel_path else ''
+        with self.lock:
+            return self.dirs.get((root, '' if rel_path == '.' else rel_path))
+
+    def list_dirs(self, root, prefix=''):
+        """Sorted (relative path, DirEntry) pairs of a root, optionally under `prefix`."""
+        self._ready()
+        with self.lock:
+            items = [(rel_path, entry) for (root_name, rel_path), entry in self.dirs.items()
+                     if root_name == root and rel_path.startswith(prefix)]
+        items.sort(key=lambda item: item[0])
+        return items
+
+    def stats(self):
+        with self.lock:
+            return {"directories": len(self.dirs), "files": sum(len(entry.files) for entry in self.dirs.values()), "last_refresh": self.last_refresh}
+
+
+file_index = FileIndex({'data': Config.DATA_FOLDER, 'faiss': Config.FAISS_INDEX_PATH})
+
+
+def start_file_index():
+    file_index.start()
+    return file_index
+
+
+def rags_by_file():
+    """Map file name -> namespaces built from it (namespaces named after the file, or listing it in `source_files`)."""
+    from services.namespace_registry import list_namespaces
+    usage = {}
+    for namespace, record in list_namespaces().items():
+        for file_name in {namespace, *record.get('source_files', [])}:
+            usage.setdefault(file_name, []).append(namespace)
+    return usage
+
+
+def encode_cursor(*parts):
+    return base64.urlsafe_b64encode("\x00".join(parts).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        return tuple(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('\x00'))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def page_size(limit):
+    """Clamp a requested page size; None means the default page size."""
+    return max(1, min(int(limit) if limit else Config.FILE_INDEX_PAGE_SIZE, Config.FILE_INDEX_MAX_PAGE_SIZE))
+
+
+def matches(name, query=None, extension=None):
+    """Case-insensitive substring match on the name, and an optional extension (".pdf" or "pdf")."""
+    if query and query.lower() not in name.lower():
+        return False
+    if extension and not name.lower().endswith('.' + extension.lower().lstrip('.')):
+        return False
+    return True
+
+
+def describe_file(entry, usage):
+    return {"name": entry.name, "size": entry.size, "mtime": entry.mtime, "rags": usage.get(entry.name, [])}
@@ -0,0 +1,167 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import requests
+from config import Config
+from utils import load_yaml_config, get_logging_stats
+
+
+class HealthMonitor:
+    """
+    Periodically probes external dependencies in the background and caches the results.
+
+    Each enabled probe (Pinecone, MongoDB, LLM API, Rasa) runs concurrently on a small
+    thread pool under a hard timeout. A probe that is still running from a previous
+    cycle is not started again; it is reported as timed out until it returns. The
+    `/health` routes only read `snapshot()`, so they never call an external service.
+    """
+
+    def __init__(self, interval=None, timeout=None, settings=None):
+        self.interval = interval or Config.HEALTHCHECK_INTERVAL_SECONDS
+        self.timeout = timeout or Config.HEALTHCHECK_TIMEOUT_SECONDS
+        self.settings = settings if settings is not None else load_yaml_config(Config.CONFIG_YAML_PATH)
+        self.results = {}
+        self.last_cycle = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='health-probe')
+        self.http = requests.Session()
+        self.mongo_client = None
+
+        flags = self.settings.get('healthcheck', {})
+        probes = {
+            "pinecone": (flags.get('check_pinecone', True), self.probe_pinecone),
+            "mongo": (flags.get('check_mongodb', True), self.probe_mongodb),
+            "llm": (flags.get('check_llm', True), self.probe_llm),
+            "rasa": (flags.get('check_rasa', False) and self.settings.get('rasa', {}).get('enabled', False), self.probe_rasa),
+        }
+        self.probes = {name: probe for name, (enabled, probe) in probes.items() if enabled}
+
+    # ---- Dependency probes (run on the probe pool, never on a request thread) ----
+
+    def probe_pinecone(self):
+        from pinecone import Pinecone
+        api_key = os.getenv('PINECONE_API_KEY')
+        if not api_key:
+            raise ValueError("PINECONE_API_KEY is not set")
+        index_name = os.getenv('PINECONE_INDEX_NAME', 'rag-index')
+        names = Pinecone(api_key=api_key, host=os.getenv('PINECONE_HOST') or None).list_indexes().names()
+        if index_name not in names:
+            raise ValueError(f"Index '{index_name}' does not exist")
+
+    def probe_mongodb(self):
+        if self.mongo_client is None:
+            from services.mongodb_service import get_mongodb_connection
+            self.mongo_client, _ = get_mongodb_connection(server_selection_timeout_ms=int(self.timeout * 1000))
+            if self.mongo_client is None:
+                raise ConnectionError("Could not create MongoDB client")
+        self.mongo_client.admin.command('ping')
+
+    def probe_llm(self):
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is not set")
+        api_base = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+        response = self.http.get(f"{api_base}/models", headers={"Authorization": f"Bearer {api_key}"}, timeout=self.timeout)
+        response.raise_for_status()
+
+    def probe_rasa(self):
+        endpoint = self.settings.get('rasa', {}).get('endpoint', '')
+        base_url = endpoint.split('/webhooks')[0] if endpoint else 'http://localhost:5005'
+        response = self.http.get(f"{base_url}/status", timeout=self.timeout)
+        response.raise_for_status()
+
+    # ---- Local state (cheap, read on demand) ----
+
+    def local_state(self):
+        from services.llm_client import get_llm_client
+        from services.file_index_service import file_index
+        from utilities.admission_utility import get_admission_stats
+        # The model manager doesn't import torch; web workers using the embedding server never load a model
+        from services.model_manager import model_manager
+        models = model_manager.stats()
+        return {
+            "embedding_model_loaded": any(model["loaded"] for model in models["models"].values()),
+            "models": models,
+            "embedding_server": Config.EMBEDDING_SERVER_ADDRESS or None,
+            "log_queue": get_logging_stats(),
+            "llm_client": get_llm_client().stats(),
+            "file_index": file_index.stats(),
+            "admission": get_admission_stats(),
+        }
+
+    # ---- Probe loop ----
+
+    def _timed(self, name, probe):
+        start = time.perf_counter()
+        try:
+            probe()
+            return {"status": "Available", "latency_ms": (time.perf_counter() - start) * 1000.0, "checked_at": time.time()}
+        except Exception as e:
+            return {"status": "Unavailable", "error": str(e)[:200], "latency_ms": (time.perf_counter() - start) * 1000.0, "checked_at": time.time()}
+
+    def run_cycle(self):
+        """Start every probe that isn't already in flight and wait (bounded) for all of them."""
+        started = time.perf_counter()
+        for name, probe in self.probes.items():
+            if name not in self.pending:
+                self.pending[name] = self.executor.submit(self._timed, name, probe)
+
+        deadline = started + self.timeout
+        results = {}
+        for name, future in list(self.pending.items()):
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                del self.pending[name]
+            except FutureTimeoutError:
+                results[name] = {"status": "Unavailable", "error": f"Probe timed out after {self.timeout}s", "checked_at": time.time()}
+
+        for name, result in results.items():
+            previous = self.results.get(name, {}).get("status")
+            if result["status"] != previous:
+                log = logging.info if result["status"] == "Available" else logging.warning
+                log("🩺 Dependency '%s' is now %s%s", name, result["status"], f": {result['error']}" if "error" in result else "")
+
+        with self.lock:
+            self.results = results
+            self.last_cycle = {"completed_at": time.time(), "duration_ms": (time.perf_counter() - started) * 1000.0}
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logging.error("❌ Health probe cycle failed: %s", e, exc_info=True)
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, name='health-monitor', daemon=True)
+            self.thread.start()
+            logging.info("✅ Health monitor started (interval=%ss, timeout=%ss, probes=%s)", self.interval, self.timeout, list(self.probes))
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def snapshot(self):
+        """The cached status of all dependencies plus current local state. Never blocks on I/O."""
+        with self.lock:
+            results = dict(self.results)
+            last_cycle = self.last_cycle
+        for name in self.probes:
+            results.setdefault(name, {"status": "Pending"})
+        ready = all(result["status"] == "Available" for result in results.values())
+        return {"ready": ready, "dependencies": results, "last_cycle": last_cycle, "local": self.local_state()}
+
+
+# Shared monitor; started from main.py
+health_monitor = HealthMonitor()
+
+
+def start_health_monitor():
+    return health_monitor.start()
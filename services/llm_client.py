@@ -0,0 +1,212 @@
+import os
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+from utilities.metrics_utility import metrics
+
+_in_flight = metrics.gauge('llm_in_flight_requests', "OpenAI requests currently being sent")
+_concurrency_limit = metrics.gauge('llm_concurrency_limit', "Current adaptive concurrency limit for OpenAI requests")
+_throttle_events = metrics.counter('llm_throttle_events_total', "OpenAI responses that signalled overload (429/503)")
+_retries = metrics.counter('llm_retries_total', "OpenAI requests retried after a transient failure")
+_requests_total = metrics.counter('llm_requests_total', "OpenAI requests by operation and outcome")
+
+
+class LLMError(Exception):
+    """An OpenAI call failed for good (non-retryable error, retries exhausted or deadline hit)."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMRateLimited(LLMError):
+    """The provider kept throttling us until the retries or the deadline ran out."""
+
+
+class LLMDeadlineExceeded(LLMError):
+    """The call's deadline passed before a successful response."""
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit for calls to a rate-limited upstream.
+
+    The limit grows by roughly one slot per limit's worth of fast successes
+    (additive increase) and is cut by `decrease_ratio` on a throttle or a
+    response slower than `latency_target` (multiplicative decrease), so the
+    number of calls in flight tracks what the provider will currently accept.
+    """
+
+    def __init__(self, initial, minimum, maximum, latency_target, decrease_ratio=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_ratio = decrease_ratio
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        _concurrency_limit.set(int(self.limit))
+
+    def acquire(self, timeout):
+        """Wait up to `timeout` seconds for a slot; returns False if none freed up in time."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            self.in_flight += 1
+        _in_flight.inc()
+        return True
+
+    def release(self, latency=None, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            if throttled or (latency is not None and latency > self.latency_target):
+                self.limit = max(self.minimum, self.limit * self.decrease_ratio)
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self.condition.notify_all()
+            limit = int(self.limit)
+        _in_flight.dec()
+        _concurrency_limit.set(limit)
+
+
+def _retry_after_seconds(headers):
+    """Parse OpenAI's `retry-after-ms` / `retry-after` headers, if present."""
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+class OpenAIClient:
+    """
+    Shared client for OpenAI chat completions and embeddings.
+
+    All calls go through one pooled HTTP session and one adaptive concurrency
+    limiter. Throttles (429/503), 5xx responses and connection errors are
+    retried with full-jitter exponential backoff, waiting at least as long as
+    the provider's Retry-After; every call carries a deadline that bounds the
+    total time spent including queueing and retries.
+    """
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key=None, api_base=None):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.api_base = (api_base or os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')).rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.LLM_MAX_CONCURRENCY)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=Config.LLM_INITIAL_CONCURRENCY,
+            minimum=1,
+            maximum=Config.LLM_MAX_CONCURRENCY,
+            latency_target=Config.LLM_LATENCY_TARGET_SECONDS
+        )
+
+    def _backoff(self, attempt, retry_after, remaining):
+        delay = random.uniform(0, min(Config.LLM_BACKOFF_MAX_SECONDS, Config.LLM_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return min(delay, max(0.0, remaining))
+
+    def _post(self, operation, path, payload, deadline_seconds=None):
+        deadline = time.monotonic() + (deadline_seconds or Config.LLM_DEADLINE_SECONDS)
+        url = f"{self.api_base}{path}"
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        last_error = None
+
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.limiter.acquire(remaining):
+                break
+
+            started = time.monotonic()
+            throttled = False
+            latency = None
+            retry_after = None
+            try:
+                response = self.session.post(
+                    url, json=payload, headers=headers,
+                    timeout=(min(5.0, remaining), max(0.1, deadline - time.monotonic()))
+                )
+                latency = time.monotonic() - started
+                if response.status_code < 400:
+                    _requests_total.inc(operation=operation, outcome='ok')
+                    return response.json()
+
+                throttled = response.status_code in (429, 503)
+                retry_after = _retry_after_seconds(response.headers)
+                last_error = LLMError(
+                    f"OpenAI {operation} returned {response.status_code}: {response.text[:200]}",
+                    status_code=response.status_code, retry_after=retry_after
+                )
+                if response.status_code not in self.RETRYABLE_STATUS:
+                    _requests_total.inc(operation=operation, outcome='error')
+                    raise last_error
+            except requests.RequestException as e:
+                last_error = LLMError(f"OpenAI {operation} request failed: {e}")
+            finally:
+                self.limiter.release(latency=latency, throttled=throttled)
+
+            if throttled:
+                _throttle_events.inc(operation=operation)
+                logging.warning("⚠️ OpenAI throttled %s (status %s, retry-after %s)", operation, last_error.status_code, retry_after)
+            if attempt == Config.LLM_MAX_RETRIES:
+                break
+            delay = self._backoff(attempt, retry_after, deadline - time.monotonic())
+            if delay <= 0 and deadline - time.monotonic() <= 0:
+                break
+            _retries.inc(operation=operation)
+            time.sleep(delay)
+
+        if last_error is not None and last_error.status_code in (429, 503):
+            _requests_total.inc(operation=operation, outcome='throttled')
+            raise LLMRateLimited(str(last_error), status_code=last_error.status_code, retry_after=last_error.retry_after)
+        if time.monotonic() >= deadline or last_error is None:
+            _requests_total.inc(operation=operation, outcome='deadline')
+            raise LLMDeadlineExceeded(f"OpenAI {operation} did not complete within its deadline")
+        _requests_total.inc(operation=operation, outcome='error')
+        raise last_error
+
+    def chat_completion(self, messages, model=None, max_tokens=None, deadline_seconds=None, **params):
+        """Create a chat completion; returns the decoded response body (dict)."""
+        payload = {"model": model or Config.LLM_CHAT_MODEL, "messages": messages, **params}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        return self._post('chat', '/chat/completions', payload, deadline_seconds)
+
+    def embeddings(self, texts, model=None, deadline_seconds=None):
+        """Embed a list of texts; returns the vectors in input order."""
+        body = self._post('embeddings', '/embeddings', {"model": model or Config.OPENAI_EMBEDDING_MODEL, "input": list(texts)}, deadline_seconds)
+        return [item["embedding"] for item in sorted(body["data"], key=lambda item: item["index"])]
+
+    def stats(self):
+        return {"concurrency_limit": int(self.limiter.limit), "in_flight": self.limiter.in_flight}
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide OpenAI client (one connection pool and limiter shared by every route)."""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = OpenAIClient()
+    return _llm_client
@@ -0,0 +1,516 @@
+"""
+Background re-embedding of a namespace with another embedding model.
+
+A migration re-embeds every chunk of a namespace with the target backend into
+a shadow location, while live traffic keeps using the old vectors. Chunk texts
+come from the document store, and ids and metadata are kept. The shadow
+location is the target backend's Pinecone index, or a sibling folder for a
+local FAISS RAG.
+
+Progress is checkpointed to MIGRATION_STATE_PATH/<namespace>.json after every
+write, so an interrupted or crashed job resumes where it stopped. The
+lifecycle is:
+
+    backfilling -> backfilled   every chunk re-embedded, then a catch-up pass for chunks
+                                ingested or deleted in the meantime
+    verify                      dual read: sample queries against old and new vectors
+    switched                    one atomic registry write moves queries and ingestion over
+    finalized / rolled_back     old vectors dropped, or the registry record restored
+"""
+import os
+import re
+import json
+import time
+import random
+import shutil
+import logging
+import numpy as np
+from config import Config
+from services.namespace_registry import get_namespace_config, update_namespace, resolve_namespace_backend
+from services.pinecone_service import get_pinecone_client, ensure_pinecone_index, index_name_for_backend
+from services.document_store import get_document_store
+from services.projection_service import get_projection, delete_projection, save_projection, projection_path, Projection
+from services.rag_catalog_service import invalidate_rag_catalog
+from services.snapshot_service import pinecone_pages, local_pages
+from utilities.pdf_extraction_utility import section_spans
+
+# Whole-document vectors are pooled over their windows (embed_document); every other id is one chunk
+_DOCUMENT_ID = re.compile(r"-full$")
+
+# Vectors per Pinecone upsert / fetch
+_BATCH = 100
+
+
+class MigrationError(ValueError):
+    """Raised when a migration step is asked for in the wrong state."""
+
+
+# ---- State ----
+
+def _state_path(namespace):
+    return os.path.join(Config.MIGRATION_STATE_PATH, f"{namespace}.json")
+
+
+def load_migration(namespace):
+    """The namespace's migration state, or None if it was never migrated."""
+    try:
+        with open(_state_path(namespace), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_migrations():
+    if not os.path.isdir(Config.MIGRATION_STATE_PATH):
+        return []
+    return [load_migration(name[:-len('.json')]) for name in sorted(os.listdir(Config.MIGRATION_STATE_PATH)) if name.endswith('.json')]
+
+
+def _save(state):
+    os.makedirs(Config.MIGRATION_STATE_PATH, exist_ok=True)
+    state["updated_at"] = time.time()
+    path = _state_path(state["namespace"])
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _require(state, namespace, *statuses):
+    if state is None:
+        raise MigrationError(f"Namespace '{namespace}' has no migration")
+    if state["status"] not in statuses:
+        raise MigrationError(f"Migration of '{namespace}' is {state['status']}; this needs a migration that is {', '.join(statuses)}")
+    return state
+
+
+# ---- Locations ----
+
+def _location_ids(location, namespace):
+    """Every vector id stored at a location."""
+    if location["engine"] == 'faiss':
+        from services.ann_index_service import LocalAnnIndex
+        return set(LocalAnnIndex.open(location["local_path"]).ids_with_prefix('')) if LocalAnnIndex.exists(location["local_path"]) else set()
+    index = get_pinecone_client().Index(location["index_name"])
+    return {vector_id for page in index.list(namespace=namespace) for vector_id in page}
+
+
+def _location_metadata(location, namespace, ids):
+    """(ids, metadatas) of the given ids that exist at a location."""
+    found, metadatas = [], []
+    if location["engine"] == 'faiss':
+        from services.ann_index_service import LocalAnnIndex
+        conn = LocalAnnIndex.open(location["local_path"])._labels()
+        for start in range(0, len(ids), 900):
+            batch = ids[start:start + 900]
+            for vector_id, metadata in conn.execute(
+                    f"SELECT vector_id, metadata FROM labels WHERE deleted = 0 AND vector_id IN ({','.join('?' * len(batch))})", batch):
+                found.append(vector_id)
+                metadatas.append(json.loads(metadata))
+        return found, metadatas
+    index = get_pinecone_client().Index(location["index_name"])
+    for start in range(0, len(ids), _BATCH):
+        fetched = index.fetch(ids=ids[start:start + _BATCH], namespace=namespace).get('vectors', {})
+        for vector_id in ids[start:start + _BATCH]:
+            if vector_id in fetched:
+                found.append(vector_id)
+                metadatas.append(dict(fetched[vector_id].get('metadata') or {}))
+    return found, metadatas
+
+
+def _query_location(location, namespace, vector, top_k):
+    if location["engine"] == 'faiss':
+        from services.ann_index_service import get_local_index
+        return get_local_index(location["local_path"]).query(vector, top_k=top_k, include_metadata=False)['matches']
+    index = get_pinecone_client().Index(location["index_name"])
+    return index.query(vector=[float(x) for x in vector], top_k=top_k, namespace=namespace, include_metadata=False).get('matches', [])
+
+
+class _TargetWriter:
+    """
+    Writes re-embedded vectors to the shadow location.
+
+    Pinecone writes are durable as soon as they are upserted. Local writes are
+    buffered to MIGRATION_LOCAL_WRITE_ROWS vectors, because every FAISS write
+    rewrites the index file. `write` and `flush` return how many vectors became
+    durable, which is what the checkpoint counts.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.target = state["target"]
+        self.namespace = state["namespace"]
+        self.pending_ids, self.pending_vectors, self.pending_metadatas, self.pending_consumed = [], [], [], 0
+        if self.target["engine"] == 'pinecone':
+            self.index = ensure_pinecone_index(self.target["index_name"], self.target["dimension"], state["source"]["metric"])
+
+    def write(self, ids, vectors, metadatas, consumed):
+        """Write vectors; `consumed` is how many source vectors they account for (skipped ones included)."""
+        if self.target["engine"] == 'pinecone':
+            for start in range(0, len(ids), _BATCH):
+                self.index.upsert(vectors=[{"id": vector_id, "values": [float(x) for x in vector], "metadata": metadata}
+                                           for vector_id, vector, metadata in zip(ids[start:start + _BATCH], vectors[start:start + _BATCH],
+                                                                                  metadatas[start:start + _BATCH])], namespace=self.namespace)
+            return consumed
+        self.pending_ids.extend(ids)
+        self.pending_vectors.extend(vectors)
+        self.pending_metadatas.extend(metadatas)
+        self.pending_consumed += consumed
+        return self.flush() if len(self.pending_ids) >= Config.MIGRATION_LOCAL_WRITE_ROWS else 0
+
+    def flush(self):
+        if self.target["engine"] == 'pinecone':
+            return 0
+        from services.ann_index_service import LocalAnnIndex, forget_local_index
+        ids, vectors, metadatas, consumed = self.pending_ids, self.pending_vectors, self.pending_metadatas, self.pending_consumed
+        self.pending_ids, self.pending_vectors, self.pending_metadatas, self.pending_consumed = [], [], [], 0
+        if ids:
+            path = self.target["local_path"]
+            if LocalAnnIndex.exists(path):
+                LocalAnnIndex.open(path, mmap=False).upsert(ids, np.asarray(vectors, dtype=np.float32), metadatas)
+            else:
+                LocalAnnIndex.build(path, ids, np.asarray(vectors, dtype=np.float32), metadatas,
+                                    index_type=self.state["source"].get("index_type"), metric=self.state["source"]["metric"])
+            forget_local_index(path)
+        return consumed
+
+    def delete(self, ids):
+        if not ids:
+            return
+        if self.target["engine"] == 'pinecone':
+            for start in range(0, len(ids), _BATCH):
+                self.index.delete(ids=ids[start:start + _BATCH], namespace=self.namespace)
+        else:
+            from services.ann_index_service import LocalAnnIndex, forget_local_index
+            LocalAnnIndex.open(self.target["local_path"], mmap=False).delete(ids)
+            forget_local_index(self.target["local_path"])
+
+
+# ---- Re-embedding ----
+
+class _Throttle:
+    """Sleeps so that no more than `rate` chunks per second are embedded (0 = unthrottled)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.count = 0
+
+    def account(self, count):
+        self.count += count
+        if self.rate:
+            ahead = self.count / self.rate - (time.monotonic() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def _reembed(backend, namespace, ids, metadatas, headers, throttle):
+    """Re-embed stored chunks; returns (ids, vectors, metadatas) of those whose text is still available."""
+    texts = get_document_store().get_many(namespace, ids)
+    kept_ids, vectors, kept_metadatas = [], [], []
+    chunks = []
+    for vector_id, metadata in zip(ids, metadatas):
+        # Vectors written before the document store existed still carry their text in metadata
+        text = texts.get(vector_id) or metadata.get('content')
+        if not text:
+            continue
+        if _DOCUMENT_ID.search(vector_id):
+            vector, _ = backend.embed_document(text, sections=section_spans(text, headers))
+            kept_ids.append(vector_id)
+            vectors.append(vector)
+            kept_metadatas.append(metadata)
+            throttle.account(1)
+        else:
+            chunks.append((vector_id, text, metadata))
+    for start in range(0, len(chunks), Config.MIGRATION_BATCH_SIZE):
+        batch = chunks[start:start + Config.MIGRATION_BATCH_SIZE]
+        embedded = backend.embed_batch([text for _, text, _ in batch])
+        for (vector_id, _, metadata), vector in zip(batch, embedded):
+            kept_ids.append(vector_id)
+            vectors.append(np.asarray(vector, dtype=np.float32))
+            kept_metadatas.append(metadata)
+        throttle.account(len(batch))
+    return kept_ids, vectors, kept_metadatas
+
+
+# ---- Lifecycle ----
+
+def plan_migration(namespace, backend_name, index_name=None):
+    """
+    Record a new migration of `namespace` to `backend_name` and pick its shadow location.
+
+    The shadow is the target backend's index (or `index_name`), never the
+    index the namespace lives in now, or `<local_path>-<backend>-<dimension>`
+    for local RAGs.
+    """
+    from services.embedding_backends import get_backend
+    state = load_migration(namespace)
+    if state is not None and state["status"] in ('backfilling', 'backfilled', 'switched'):
+        raise MigrationError(f"Namespace '{namespace}' already has a {state['status']} migration")
+    source_backend, source_index, registered = resolve_namespace_backend(namespace)
+    if not registered:
+        raise MigrationError(f"Namespace '{namespace}' is not in the namespace registry")
+    record = get_namespace_config(namespace)
+    target_backend = get_backend(backend_name)
+    suffix = f"{target_backend.name}-{target_backend.dimension}"
+
+    if record.get('local_path'):
+        from services.ann_index_service import LocalAnnIndex
+        params = LocalAnnIndex._read_params(record['local_path'])
+        source = {"engine": 'faiss', "local_path": record['local_path'], "metric": params["metric"], "index_type": params["index_type"]}
+        target_path = f"{record['local_path'].rstrip(os.sep)}-{suffix}"
+        if os.path.exists(target_path):
+            target_path = f"{target_path}-{int(time.time())}"
+        target = {"engine": 'faiss', "local_path": target_path}
+    else:
+        projection = get_projection(namespace)
+        serving_index = projection.index_name if projection is not None else source_index
+        description = get_pinecone_client().describe_index(serving_index)
+        source = {"engine": 'pinecone', "index_name": serving_index, "full_index_name": source_index, "projected": projection is not None,
+                  "metric": description['metric'] if isinstance(description, dict) else description.metric}
+        target_index = index_name or index_name_for_backend(target_backend.name, target_backend.dimension)
+        if target_index in (source_index, serving_index):
+            # Same width as today's index: the shadow copy needs an index of its own
+            target_index = f"{source_index}-{suffix}"
+            if target_index in (source_index, serving_index):
+                target_index = f"{target_index}-{int(time.time())}"
+        target = {"engine": 'pinecone', "index_name": target_index}
+    source.update(backend=source_backend.name, dimension=source_backend.dimension)
+    target.update(backend=target_backend.name, dimension=target_backend.dimension)
+
+    state = {
+        "namespace": namespace,
+        "status": 'backfilling',
+        "source": source,
+        "target": target,
+        "processed": 0,
+        "embedded": 0,
+        "skipped": 0,
+        "started_at": time.time(),
+    }
+    _save(state)
+    logging.info("🚚 Planned migration of '%s' from %s to %s (%s)", namespace, source_backend.name, target_backend.name,
+                 target.get("index_name") or target.get("local_path"))
+    return state
+
+
+def run_migration(namespace, max_rate=None):
+    """
+    Backfill the shadow location from where the checkpoint left off, then catch up.
+
+    `max_rate` caps chunks embedded per second (default MIGRATION_MAX_CHUNKS_PER_SECOND).
+    Safe to interrupt: rerunning resumes after the last durable write.
+    """
+    from services.embedding_backends import get_backend
+    state = _require(load_migration(namespace), namespace, 'backfilling', 'backfilled')
+    backend = get_backend(state["target"]["backend"])
+    headers = (get_namespace_config(namespace) or {}).get('section_headers') or Config.SECTION_HEADERS
+    throttle = _Throttle(Config.MIGRATION_MAX_CHUNKS_PER_SECOND if max_rate is None else max_rate)
+    writer = _TargetWriter(state)
+    source = state["source"]
+
+    if state["status"] == 'backfilling':
+        if state["processed"]:
+            logging.info("🔁 Resuming migration of '%s' after %d vectors", namespace, state["processed"])
+        if source["engine"] == 'faiss':
+            pages = local_pages(source["local_path"], skip=state["processed"])
+        else:
+            pages = pinecone_pages(get_pinecone_client().Index(source["index_name"]), namespace, skip=state["processed"])
+        started = time.perf_counter()
+        for ids, _, metadatas in pages:
+            new_ids, vectors, new_metadatas = _reembed(backend, namespace, ids, metadatas, headers, throttle)
+            state["embedded"] += len(new_ids)
+            state["skipped"] += len(ids) - len(new_ids)
+            durable = writer.write(new_ids, vectors, new_metadatas, len(ids))
+            if durable:
+                state["processed"] += durable
+                _save(state)
+                logging.info("🚚 Migrated %d vectors of '%s' (%.1f/s)", state["processed"], namespace,
+                             state["embedded"] / max(1e-6, time.perf_counter() - started))
+        state["processed"] += writer.flush()
+        state["status"] = 'backfilled'
+        _save(state)
+
+    caught_up = catch_up(state, backend, headers, throttle)
+    logging.info("✅ Backfilled '%s': %d embedded, %d without text, catch-up %s", namespace, state["embedded"], state["skipped"], caught_up)
+    return state
+
+
+def catch_up(state, backend=None, headers=None, throttle=None, drop_stale=True):
+    """
+    Re-embed chunks that are in the source but not the shadow. With `drop_stale`, also delete the reverse.
+
+    Returns:
+        dict: how many chunks were added and removed.
+    """
+    from services.embedding_backends import get_backend
+    namespace = state["namespace"]
+    backend = backend or get_backend(state["target"]["backend"])
+    headers = headers or (get_namespace_config(namespace) or {}).get('section_headers') or Config.SECTION_HEADERS
+    throttle = throttle or _Throttle(0)
+    source_ids = _location_ids(state["source"], namespace)
+    target_ids = _location_ids(state["target"], namespace)
+    missing = sorted(source_ids - target_ids)
+    stale = sorted(target_ids - source_ids) if drop_stale else []
+    writer = _TargetWriter(state)
+    added = 0
+    for start in range(0, len(missing), Config.SNAPSHOT_PAGE_SIZE):
+        ids, metadatas = _location_metadata(state["source"], namespace, missing[start:start + Config.SNAPSHOT_PAGE_SIZE])
+        new_ids, vectors, new_metadatas = _reembed(backend, namespace, ids, metadatas, headers, throttle)
+        writer.write(new_ids, vectors, new_metadatas, len(ids))
+        added += len(new_ids)
+    writer.flush()
+    writer.delete(stale)
+    return {"added": added, "removed": len(stale)}
+
+
+def verify_migration(namespace, queries=None, top_k=10, seed=0):
+    """
+    Dual read: run sample queries against the old and the new vectors and compare the results.
+
+    Queries are the opening words of randomly chosen chunks. Reports the mean
+    overlap of the two top-k lists (`agreement`) and how often each side finds
+    the chunk a query was taken from (`old_hit_rate`, `new_hit_rate`).
+    """
+    from services.embedding_backends import get_backend
+    state = _require(load_migration(namespace), namespace, 'backfilled', 'switched')
+    queries = queries or Config.MIGRATION_VERIFY_QUERIES
+    ids = sorted(_location_ids(state["target"], namespace))
+    sample = random.Random(seed).sample(ids, min(queries, len(ids)))
+    texts = get_document_store().get_many(namespace, sample)
+    sample = [vector_id for vector_id in sample if texts.get(vector_id)]
+    if not sample:
+        raise MigrationError(f"No chunk texts of '{namespace}' to build verification queries from")
+    old_backend, new_backend = get_backend(state["source"]["backend"]), get_backend(state["target"]["backend"])
+    projection = None
+    if state["source"].get("projected"):
+        projection = Projection(*_projection_arrays(namespace, state), state["source"]["index_name"])
+
+    agreement = old_hits = new_hits = 0.0
+    for vector_id in sample:
+        query = ' '.join(texts[vector_id].split()[:Config.MIGRATION_VERIFY_QUERY_WORDS])
+        old_vector = old_backend.embed_query(query)
+        if projection is not None:
+            old_vector = projection.project(old_vector)
+        old = [match.get('id') for match in _query_location(state["source"], namespace, old_vector, top_k)]
+        new = [match.get('id') for match in _query_location(state["target"], namespace, new_backend.embed_query(query), top_k)]
+        agreement += len(set(old) & set(new)) / top_k
+        old_hits += vector_id in old
+        new_hits += vector_id in new
+    state["verification"] = {
+        "queries": len(sample),
+        "top_k": top_k,
+        "agreement": round(agreement / len(sample), 4),
+        "old_hit_rate": round(old_hits / len(sample), 4),
+        "new_hit_rate": round(new_hits / len(sample), 4),
+        "verified_at": time.time(),
+    }
+    _save(state)
+    logging.info("🔬 Verified migration of '%s': %s", namespace, state["verification"])
+    return state["verification"]
+
+
+def _projection_arrays(namespace, state):
+    # Before the switch the projection is live; after it, the migration keeps a copy for rollback
+    path = projection_path(namespace) if state["status"] != 'switched' else f"{_state_path(namespace)[:-len('.json')]}.projection.npz"
+    with np.load(path) as data:
+        return data["mean"], data["components"]
+
+
+def cutover(namespace, min_agreement=None):
+    """
+    Switch the namespace to its re-embedded vectors with one atomic registry write.
+
+    Chunks ingested since the backfill are caught up first, and once more right
+    after the switch for writes that raced with it. With `min_agreement`, the
+    switch is refused unless verification agreement reaches it.
+    """
+    state = _require(load_migration(namespace), namespace, 'backfilled')
+    if min_agreement is not None:
+        verification = state.get("verification") or verify_migration(namespace)
+        if verification["agreement"] < min_agreement:
+            raise MigrationError(f"Agreement {verification['agreement']:.2f} is below {min_agreement:.2f}; not switching '{namespace}'")
+    catch_up(state)
+
+    record = get_namespace_config(namespace) or {}
+    state["previous"] = {key: record.get(key) for key in ('backend', 'dimension', 'index_name', 'local_path')}
+    if state["source"].get("projected"):
+        # The projection maps the old model's vectors; keep it for a rollback
+        shutil.copyfile(projection_path(namespace), f"{_state_path(namespace)[:-len('.json')]}.projection.npz")
+        delete_projection(namespace)
+    target = state["target"]
+    fields = {"backend": target["backend"], "dimension": target["dimension"]}
+    if target["engine"] == 'faiss':
+        fields["local_path"] = target["local_path"]
+    else:
+        fields["index_name"] = target["index_name"]
+    update_namespace(namespace, **fields)
+    state["status"] = 'switched'
+    state["switched_at"] = time.time()
+    _save(state)
+
+    late = catch_up(state, drop_stale=False)
+    _forget(state)
+    logging.info("🔀 '%s' now served by %s (%s); %d late chunks caught up", namespace, target["backend"],
+                 target.get("index_name") or target.get("local_path"), late["added"])
+    return state
+
+
+def _forget(state):
+    """Drop cached catalog entries / index handles for both locations."""
+    from services.ann_index_service import forget_local_index
+    for location in (state["source"], state["target"]):
+        if location["engine"] == 'faiss':
+            forget_local_index(location["local_path"])
+        else:
+            invalidate_rag_catalog(location["index_name"], state["namespace"])
+
+
+def rollback(namespace):
+    """
+    Undo a migration. A switched namespace gets its previous registry record (and projection) back.
+
+    Chunks ingested after the switch only exist in the new vectors and are not
+    carried back. A migration that was never switched is abandoned and its
+    shadow vectors are deleted.
+    """
+    state = _require(load_migration(namespace), namespace, 'backfilling', 'backfilled', 'switched')
+    if state["status"] == 'switched':
+        update_namespace(namespace, **{key: value for key, value in state["previous"].items() if value is not None or key == 'local_path'})
+        backup = f"{_state_path(namespace)[:-len('.json')]}.projection.npz"
+        if state["source"].get("projected") and os.path.exists(backup):
+            with np.load(backup) as data:
+                meta = json.loads(str(data["meta"]))
+                save_projection(namespace, Projection(data["mean"], data["components"], meta["index_name"], meta.get("explained_variance_ratio")))
+    else:
+        _drop_location(state["target"], namespace)
+    state["status"] = 'rolled_back'
+    _save(state)
+    _forget(state)
+    logging.info("↩️ Rolled back migration of '%s'", namespace)
+    return state
+
+
+def finalize(namespace):
+    """Delete the old vectors of a switched namespace; after this the migration can't be rolled back."""
+    state = _require(load_migration(namespace), namespace, 'switched')
+    _drop_location(state["source"], namespace)
+    full_index_name = state["source"].get("full_index_name")
+    if state["source"].get("projected") and full_index_name and full_index_name != state["target"]["index_name"]:
+        # A projected RAG's full-width copy is old-model vectors too
+        _drop_location({"engine": 'pinecone', "index_name": full_index_name}, namespace)
+    state["status"] = 'finalized'
+    _save(state)
+    logging.info("🧹 Dropped the pre-migration vectors of '%s'", namespace)
+    return state
+
+
+def _drop_location(location, namespace):
+    if location["engine"] == 'faiss':
+        from services.ann_index_service import forget_local_index
+        shutil.rmtree(location["local_path"], ignore_errors=True)
+        forget_local_index(location["local_path"])
+        return
+    pc = get_pinecone_client()
+    if location["index_name"] in pc.list_indexes().names():
+        pc.Index(location["index_name"]).delete(delete_all=True, namespace=namespace)
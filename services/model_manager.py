@@ -0,0 +1,336 @@
+"""
+Model manager: loads embedding models on demand and unloads them again.
+
+Each model is registered with a loader and an unloader. Callers borrow a model
+with `model_manager.use(name)`; a model that is in use is never evicted. Models
+are evicted when:
+
+- they have been idle for MODEL_IDLE_TIMEOUT_SECONDS (checked by a background thread),
+- loading another model would exceed MODEL_MEMORY_BUDGET_MB (least recently used first),
+- the machine's available memory drops below MODEL_MIN_AVAILABLE_MB.
+
+Reloads are cheap because weights are memory-mapped (safetensors for
+transformers checkpoints, see `ensure_safetensors`; a .npy matrix for FastText):
+after an eviction the pages usually still sit in the OS page cache.
+"""
+import os
+import gc
+import json
+import time
+import shutil
+import ctypes
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from config import Config
+from utilities.metrics_utility import metrics
+
+_loads = metrics.counter('model_loads_total', "Embedding model loads")
+_evictions = metrics.counter('model_evictions_total', "Embedding model evictions by reason")
+_resident = metrics.gauge('model_resident_bytes', "Weight bytes of loaded embedding models")
+
+
+def _memory_info():
+    """(RssAnon bytes of this process, MemAvailable bytes of the machine); None where /proc is missing."""
+    rss_anon = available = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    rss_anon = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return rss_anon, available
+
+
+def _release_freed_memory():
+    """Hand freed heap pages back to the OS; glibc otherwise keeps them for reuse and RSS doesn't drop."""
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def weight_bytes(*objects):
+    """Bytes of the tensors / arrays held by torch modules and numpy arrays among `objects`."""
+    total = 0
+    for obj in objects:
+        if obj is None:
+            continue
+        if hasattr(obj, 'parameters') and hasattr(obj, 'buffers'):
+            tensors = {id(t): t for t in list(obj.parameters()) + list(obj.buffers())}
+            total += sum(t.numel() * t.element_size() for t in tensors.values())
+        elif hasattr(obj, 'nbytes'):
+            total += int(obj.nbytes)
+        elif hasattr(obj, 'weight_bytes'):
+            total += int(obj.weight_bytes)
+    return total
+
+
+def ensure_safetensors(model_path):
+    """
+    Return a directory holding `model_path` as fp32 safetensors, converting it once if needed.
+
+    transformers memory-maps safetensors weights stored in the dtype they're loaded
+    in, so loading (and reloading after an eviction) doesn't copy them into the
+    heap. Legacy `pytorch_model.bin` checkpoints are converted into
+    MODEL_SAFETENSORS_CACHE_PATH; checkpoints that are already safetensors, and
+    hub ids that aren't local folders, are used as they are.
+    """
+    if not Config.MODEL_CONVERT_TO_SAFETENSORS or not os.path.isdir(model_path):
+        return model_path
+    files = os.listdir(model_path)
+    if any(name.endswith('.safetensors') for name in files) or 'pytorch_model.bin' not in files:
+        return model_path
+
+    target = os.path.join(Config.MODEL_SAFETENSORS_CACHE_PATH, os.path.basename(os.path.normpath(model_path)))
+    marker = os.path.join(target, 'converted_from.json')
+    source_mtime = os.path.getmtime(os.path.join(model_path, 'pytorch_model.bin'))
+    if os.path.isfile(marker):
+        with open(marker) as f:
+            if json.load(f).get('mtime') == source_mtime:
+                return target
+
+    import torch
+    from safetensors.torch import save_file
+    logging.info("📦 Converting %s to safetensors in %s (one-time)", model_path, target)
+    started = time.perf_counter()
+    staging = target + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(model_path, staging, ignore=shutil.ignore_patterns('pytorch_model.bin', '*.pt', '*.h5', '*.msgpack'))
+    state = torch.load(os.path.join(model_path, 'pytorch_model.bin'), map_location='cpu', weights_only=True)
+    # Tied weights share storage, which safetensors refuses; store each tensor contiguously and in fp32
+    state = {key: value.detach().to(torch.float32).contiguous().clone() for key, value in state.items()}
+    save_file(state, os.path.join(staging, 'model.safetensors'), metadata={'format': 'pt'})
+    with open(os.path.join(staging, 'converted_from.json'), 'w') as f:
+        json.dump({'source': os.path.abspath(model_path), 'mtime': source_mtime}, f)
+    del state
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    logging.info("✅ Converted %s in %.1f s", model_path, time.perf_counter() - started)
+    return target
+
+
+class _Model:
+    __slots__ = ('name', 'loader', 'unloader', 'estimate', 'value', 'size', 'in_use', 'last_used',
+                 'loaded_at', 'load_seconds', 'loads', 'evictions', 'lock')
+
+    def __init__(self, name, loader, unloader, estimate):
+        self.name = name
+        self.loader = loader
+        self.unloader = unloader
+        self.estimate = estimate
+        self.value = None
+        self.size = 0
+        self.in_use = 0
+        self.last_used = 0.0
+        self.loaded_at = None
+        self.load_seconds = None
+        self.loads = 0
+        self.evictions = 0
+        # Serializes loading one model; the manager lock is never held while a model loads
+        self.lock = threading.Lock()
+
+
+class ModelManager:
+    """Loads registered models on first use, tracks their size and evicts idle ones."""
+
+    def __init__(self, budget_bytes=0, idle_timeout=0, min_available_bytes=0, history=100):
+        self.budget_bytes = budget_bytes
+        self.idle_timeout = idle_timeout
+        self.min_available_bytes = min_available_bytes
+        self.models = {}
+        self.events = deque(maxlen=history)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def register(self, name, loader, unloader=None, estimate=None):
+        """
+        Register a model; nothing is loaded yet.
+
+        `loader()` returns the model (any object, e.g. a (tokenizer, model) tuple);
+        `unloader(value)` drops any other references to it; `estimate()` guesses
+        its size in bytes before the first load (e.g. from the weight files).
+        """
+        with self.lock:
+            if name not in self.models:
+                self.models[name] = _Model(name, loader, unloader, estimate)
+        return self
+
+    def _record(self, event, model, **fields):
+        entry = {"event": event, "model": model.name, "at": time.time(), **fields}
+        self.events.append(entry)
+        return entry
+
+    def get(self, name):
+        """Return the loaded model, loading it (and evicting others to make room) if needed."""
+        model = self.models[name]
+        value = model.value
+        if value is None:
+            with model.lock:
+                value = model.value
+                if value is None:
+                    value = self._load(model)
+        model.last_used = time.monotonic()
+        return value
+
+    @contextmanager
+    def use(self, name):
+        """Borrow a model for the duration of a `with` block; it can't be evicted meanwhile."""
+        with self.lock:
+            self.models[name].in_use += 1
+        try:
+            yield self.get(name)
+        finally:
+            model = self.models[name]
+            with self.lock:
+                model.in_use -= 1
+            model.last_used = time.monotonic()
+
+    def _load(self, model):
+        """Load one model (caller holds the model's own lock)."""
+        needed = model.size or (model.estimate() if model.estimate else 0)
+        self._make_room(needed, exclude=model.name)
+        rss_before, _ = _memory_info()
+        started = time.perf_counter()
+        value = model.loader()
+        model.load_seconds = time.perf_counter() - started
+        rss_after, _ = _memory_info()
+        model.size = weight_bytes(*(value if isinstance(value, tuple) else (value,)))
+        model.value = value
+        model.loaded_at = time.time()
+        model.loads += 1
+        _loads.inc(model=model.name)
+        _resident.set(model.size, model=model.name)
+        heap_bytes = (rss_after - rss_before) if rss_before is not None and rss_after is not None else None
+        self._record("load", model, seconds=model.load_seconds, weight_bytes=model.size, heap_bytes=heap_bytes)
+        logging.info("🧠 Loaded model '%s' in %.2f s (%.0f MB of weights, %s MB heap)", model.name, model.load_seconds,
+                     model.size / 1e6, f"{heap_bytes / 1e6:.0f}" if heap_bytes is not None else "?")
+        return value
+
+    def evict(self, name, reason='manual'):
+        """Unload a model unless it's in use; returns whether it was unloaded."""
+        model = self.models.get(name)
+        # A model that is loading right now isn't worth waiting for (and waiting could deadlock two loads)
+        if model is None or not model.lock.acquire(blocking=False):
+            return False
+        try:
+            with self.lock:
+                if model.value is None or model.in_use:
+                    return False
+                value, model.value = model.value, None
+            if model.unloader:
+                model.unloader(value)
+            del value
+            model.evictions += 1
+            idle = time.monotonic() - model.last_used
+        finally:
+            model.lock.release()
+        _release_freed_memory()
+        _evictions.inc(model=name, reason=reason)
+        _resident.set(0, model=name)
+        self._record("evict", model, reason=reason, idle_seconds=idle, weight_bytes=model.size)
+        logging.info("♻️ Evicted model '%s' (%s, idle %.0f s, %.0f MB of weights)", name, reason, idle, model.size / 1e6)
+        return True
+
+    def _idle_candidates(self, exclude=None):
+        """Loaded, unused models, least recently used first."""
+        with self.lock:
+            return [model.name for model in sorted(self.models.values(), key=lambda m: m.last_used)
+                    if model.value is not None and not model.in_use and model.name != exclude]
+
+    def resident_bytes(self):
+        return sum(model.size for model in self.models.values() if model.value is not None)
+
+    def _under_pressure(self):
+        if not self.min_available_bytes:
+            return False
+        _, available = _memory_info()
+        return available is not None and available < self.min_available_bytes
+
+    def _make_room(self, needed, exclude=None):
+        """Evict idle models until `needed` more bytes fit the budget and memory isn't short."""
+        for name in self._idle_candidates(exclude):
+            over_budget = self.budget_bytes and self.resident_bytes() + needed > self.budget_bytes
+            if not over_budget and not self._under_pressure():
+                break
+            self.evict(name, 'budget' if over_budget else 'memory_pressure')
+        if self.budget_bytes and self.resident_bytes() + needed > self.budget_bytes:
+            logging.warning("⚠️ Loading a %.0f MB model exceeds the %.0f MB model budget (the other models are in use)",
+                            needed / 1e6, self.budget_bytes / 1e6)
+
+    def sweep(self):
+        """Evict models idle longer than the timeout, then relieve memory pressure (background thread)."""
+        now = time.monotonic()
+        if self.idle_timeout:
+            for name in self._idle_candidates():
+                if now - self.models[name].last_used >= self.idle_timeout:
+                    self.evict(name, 'idle')
+        if self._under_pressure():
+            self._make_room(0)
+
+    def _run(self):
+        while True:
+            time.sleep(Config.MODEL_CHECK_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.error("❌ Model eviction sweep failed: %s", e, exc_info=True)
+
+    def start(self):
+        if self.thread is None and (self.idle_timeout or self.min_available_bytes):
+            self.thread = threading.Thread(target=self._run, name='model-manager', daemon=True)
+            self.thread.start()
+        return self
+
+    def is_loaded(self, name):
+        model = self.models.get(name)
+        return model is not None and model.value is not None
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            models = {
+                model.name: {
+                    "loaded": model.value is not None,
+                    "in_use": model.in_use,
+                    "weight_bytes": model.size if model.value is not None else 0,
+                    "idle_seconds": now - model.last_used if model.value is not None else None,
+                    "last_load_seconds": model.load_seconds,
+                    "loads": model.loads,
+                    "evictions": model.evictions,
+                }
+                for model in self.models.values()
+            }
+        return {
+            "budget_bytes": self.budget_bytes,
+            "resident_bytes": self.resident_bytes(),
+            "idle_timeout_seconds": self.idle_timeout,
+            "models": models,
+            "recent_events": list(self.events)[-20:],
+        }
+
+
+model_manager = ModelManager(
+    budget_bytes=int(Config.MODEL_MEMORY_BUDGET_MB * 1024 * 1024),
+    idle_timeout=Config.MODEL_IDLE_TIMEOUT_SECONDS,
+    min_available_bytes=int(Config.MODEL_MIN_AVAILABLE_MB * 1024 * 1024),
+)
+
+
+def directory_bytes(path, suffixes=('.safetensors', '.bin', '.npy')):
+    """Size of the weight files in a model folder, used as a load-size estimate."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    if not os.path.isdir(path):
+        return 0
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if name.endswith(suffixes))
@@ -2,13 +2,17 @@ import os
 import logging
 from pymongo import MongoClient
 
-def get_mongodb_connection():
+def get_mongodb_connection(server_selection_timeout_ms=None):
     try:
         mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
         if not mongo_uri:
             raise ValueError("❌ MONGO_URI is not set in .env")
 
-        client = MongoClient(mongo_uri)
+        client_options = {}
+        if server_selection_timeout_ms is not None:
+            client_options['serverSelectionTimeoutMS'] = server_selection_timeout_ms
+            client_options['connectTimeoutMS'] = server_selection_timeout_ms
+        client = MongoClient(mongo_uri, **client_options)
         logging.info("✅ Successfully connected to MongoDB.")
 
         database_name = os.getenv('MONGO_DB_NAME', 'rag_db')
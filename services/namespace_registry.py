@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from config import Config
+
+_lock = threading.Lock()
+# (file inode and mtime, records) so every worker process sees registrations made by the others;
+# each save replaces the file, so the inode changes even when two writes share an mtime
+_cache = (None, {})
+
+
+def _load():
+    global _cache
+    try:
+        stat = os.stat(Config.NAMESPACE_REGISTRY_PATH)
+    except OSError:
+        return {}
+    version = (stat.st_ino, stat.st_mtime_ns)
+    if _cache[0] != version:
+        with open(Config.NAMESPACE_REGISTRY_PATH, 'r') as f:
+            _cache = (version, json.load(f))
+    return _cache[1]
+
+
+@contextmanager
+def _write_lock():
+    """Exclusive lock for a read-modify-write of the registry, across threads and processes (web workers and the manage_* scripts)."""
+    os.makedirs(os.path.dirname(Config.NAMESPACE_REGISTRY_PATH), exist_ok=True)
+    with _lock, open(f"{Config.NAMESPACE_REGISTRY_PATH}.lock", 'w') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _save(records):
+    os.makedirs(os.path.dirname(Config.NAMESPACE_REGISTRY_PATH), exist_ok=True)
+    tmp_path = f"{Config.NAMESPACE_REGISTRY_PATH}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(records, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, Config.NAMESPACE_REGISTRY_PATH)
+
+
+def get_namespace_config(namespace):
+    """
+    Return the recorded settings for a namespace, e.g.
+    `{"backend": "fasttext", "dimension": 300, "index_name": "rag-index-fasttext-300"}`,
+    or None for namespaces created before the registry existed.
+    """
+    with _lock:
+        record = _load().get(namespace)
+        return dict(record) if record else None
+
+
+def list_namespaces():
+    with _lock:
+        return {namespace: dict(record) for namespace, record in _load().items()}
+
+
+def update_namespace(namespace, **fields):
+    """Create or update a namespace record; the file is replaced atomically."""
+    with _write_lock():
+        records = dict(_load())
+        record = dict(records.get(namespace) or {"created_at": time.time()})
+        record.update(fields)
+        record["updated_at"] = time.time()
+        records[namespace] = record
+        _save(records)
+        logging.info("📒 Namespace '%s' registry updated: %s", namespace, sorted(fields))
+        return dict(record)
+
+
+def register_namespace(namespace, backend, dimension, index_name):
+    """Record which embedding backend, dimension and index a namespace was built with."""
+    return update_namespace(namespace, backend=backend, dimension=int(dimension), index_name=index_name)
+
+
+def remove_namespace(namespace):
+    with _write_lock():
+        records = dict(_load())
+        if records.pop(namespace, None) is not None:
+            _save(records)
+            return True
+        return False
+
+
+class EmbeddingBackendMismatch(ValueError):
+    """Raised when a request asks for a different embedding backend than the namespace was built with."""
+
+
+def resolve_namespace_backend(namespace, requested_backend=None):
+    """
+    Work out which embedding backend and index serve a namespace.
+
+    Registered namespaces always use the backend they were built with (a
+    conflicting `requested_backend` raises EmbeddingBackendMismatch). New and
+    legacy namespaces use `requested_backend` or Config.EMBEDDING_MODEL, stored
+    in the index matching that backend's dimension.
+
+    Returns:
+        tuple: (EmbeddingBackend, index_name, registered) where `registered`
+        tells whether the namespace already has a registry record.
+    """
+    from services.embedding_backends import get_backend
+    from services.pinecone_service import index_name_for_backend
+
+    record = get_namespace_config(namespace)
+    if record and record.get("backend"):
+        if requested_backend and requested_backend != record["backend"]:
+            raise EmbeddingBackendMismatch(
+                f"Namespace '{namespace}' was built with '{record['backend']}' embeddings; "
+                f"it can't take '{requested_backend}' vectors."
+            )
+        backend = get_backend(record["backend"])
+        return backend, record.get("index_name") or index_name_for_backend(backend.name, backend.dimension), True
+
+    backend = get_backend(requested_backend)
+    return backend, index_name_for_backend(backend.name, backend.dimension), False
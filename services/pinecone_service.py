@@ -2,6 +2,27 @@ import os
 import logging
 from pinecone import Pinecone, ServerlessSpec
 
+
+# index name -> dimension; index dimensions never change, so this is safe to cache
+_index_dimensions = {}
+
+
+def get_pinecone_client():
+    """
+    Create a Pinecone client from the PINECONE_API_KEY environment variable.
+
+    PINECONE_HOST, when set, points the client at another control plane, such
+    as the local stand-in in benchmarks/pinecone_server.py.
+
+    Returns:
+        Pinecone client instance.
+    """
+    api_key = os.getenv('PINECONE_API_KEY')
+    if not api_key:
+        raise ValueError("❌ PINECONE_API_KEY is not set in .env")
+    return Pinecone(api_key=api_key, host=os.getenv('PINECONE_HOST') or None)
+
+
 def get_pinecone_index(index_name=None):
     """
     Connects to Pinecone and returns the index.
@@ -14,29 +35,73 @@ def get_pinecone_index(index_name=None):
         Pinecone Index object if successful, None otherwise.
     """
     try:
-        # Step 1: Load API key from environment variables
-        api_key = os.getenv('PINECONE_API_KEY')
-        if not api_key:
-            raise ValueError("❌ PINECONE_API_KEY is not set in .env")
-
-        # Step 2: Initialize the Pinecone instance
-        pc = Pinecone(api_key=api_key)
-        logging.info("✅ Successfully initialized Pinecone with API key.")
+        # Step 1-2: Load API key from environment variables and initialize the Pinecone instance
+        pc = get_pinecone_client()
+        logging.debug("✅ Successfully initialized Pinecone with API key.")
 
         # Step 3: Check if index name is provided, otherwise use the default from .env
         index_name = index_name or os.getenv('PINECONE_INDEX_NAME', 'rag-index')
-        logging.info(f"📘 Using Pinecone index name: {index_name}")
+        logging.debug("📘 Using Pinecone index name: %s", index_name)
         
         # Step 4: Check if the index exists, if not, raise an error
         if index_name not in pc.list_indexes().names():
-            logging.error(f"❌ Pinecone index '{index_name}' does not exist.")
+            logging.error("❌ Pinecone index '%s' does not exist.", index_name)
             return None
 
         # Step 5: Connect to the Pinecone index
         index = pc.Index(index_name)
-        logging.info(f"✅ Successfully connected to Pinecone index: '{index_name}'")
+        logging.debug("✅ Successfully connected to Pinecone index: '%s'", index_name)
         return index
     
     except Exception as e:
-        logging.error(f"❌ Error initializing Pinecone: {str(e)}", exc_info=True)
-        return None
\ No newline at end of file
+        logging.error("❌ Error initializing Pinecone: %s", e, exc_info=True)
+        return None
+
+
+def ensure_pinecone_index(index_name, dimension, metric='cosine'):
+    """
+    Return the named index, creating it (serverless) with the given dimension if it doesn't exist.
+
+    Args:
+        index_name (str): Name of the index.
+        dimension (int): Vector dimension used if the index has to be created.
+        metric (str): Similarity metric used if the index has to be created.
+
+    Returns:
+        Pinecone Index object.
+    """
+    pc = get_pinecone_client()
+    if index_name not in pc.list_indexes().names():
+        logging.info("📦 Creating Pinecone index '%s' with dimension %d", index_name, dimension)
+        pc.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric=metric,
+            spec=ServerlessSpec(cloud=os.getenv('PINECONE_CLOUD', 'aws'), region=os.getenv('PINECONE_REGION', 'us-east-1'))
+        )
+        _index_dimensions[index_name] = dimension
+    return pc.Index(index_name)
+
+
+def get_index_dimension(index_name):
+    """Return an index's vector dimension, or None if the index doesn't exist."""
+    if index_name not in _index_dimensions:
+        pc = get_pinecone_client()
+        if index_name not in pc.list_indexes().names():
+            return None
+        description = pc.describe_index(index_name)
+        _index_dimensions[index_name] = description['dimension'] if isinstance(description, dict) else description.dimension
+    return _index_dimensions[index_name]
+
+
+def index_name_for_backend(backend_name, dimension):
+    """
+    Pick the index that holds vectors from a given embedding backend.
+
+    The default index is used when its dimension matches; otherwise each
+    backend/dimension pair gets its own index, e.g. 'rag-index-fasttext-300'.
+    """
+    default_index = os.getenv('PINECONE_INDEX_NAME', 'rag-index')
+    if get_index_dimension(default_index) in (None, dimension):
+        return default_index
+    return f"{default_index}-{backend_name}-{dimension}"
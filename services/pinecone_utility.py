@@ -6,6 +6,8 @@ from langchain_community.embeddings import OpenAIEmbeddings  # Corrected import
 from dotenv import load_dotenv
 from halo import Halo  # For spinner animations
 from routes import register_blueprints
+from config import Config
+from utils import setup_logging
 
 # ============================
 # 🔥 Load Environment Variables 🔥
@@ -20,13 +22,7 @@ PINECONE_INDEX_NAME = os.getenv('PINECONE_INDEX_NAME', 'rag-index')
 # ============================
 # 🔥 Logging Configuration 🔥
 # ============================
-logs_path = os.path.join(os.getcwd(), 'logs')
-os.makedirs(logs_path, exist_ok=True)  # Ensure logs directory exists
-logging.basicConfig(
-    filename=os.path.join(logs_path, 'errors.log'), 
-    level=logging.DEBUG, 
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+setup_logging(Config.LOG_FILE_PATH, Config.LOGGING_LEVEL, Config.LOG_MAX_FIELD_CHARS, Config.LOG_QUEUE_SIZE)
 
 # ============================
 # 🔥 Initialize Flask App 🔥
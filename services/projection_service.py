@@ -0,0 +1,184 @@
+import os
+import json
+import random
+import logging
+import threading
+import numpy as np
+from config import Config
+
+
+class Projection:
+    """
+    A learned linear projection (PCA) from full-width embeddings to `dimension` dims.
+
+    Vectors are L2-normalised (as at fit time), centred on the sample mean,
+    projected onto the top principal components and re-normalised, so cosine
+    similarity stays meaningful at the reduced width. `index_name` is the Pinecone index holding the reduced vectors.
+    """
+
+    def __init__(self, mean, components, index_name, explained_variance_ratio=None):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.index_name = index_name
+        self.explained_variance_ratio = explained_variance_ratio
+
+    @property
+    def source_dimension(self):
+        return self.components.shape[1]
+
+    @property
+    def dimension(self):
+        return self.components.shape[0]
+
+    def project(self, vectors):
+        """Project one vector (1-D) or a batch (2-D); returns the same rank as the input."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        single = vectors.ndim == 1
+        reduced = (normalise(np.atleast_2d(vectors)) - self.mean) @ self.components.T
+        reduced = normalise(reduced)
+        return reduced[0] if single else reduced
+
+
+def normalise(vectors):
+    """L2-normalise the rows of a 2-D array; all-zero rows are left as they are."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def fit_projection(vectors, dimension, index_name):
+    """Fit a PCA projection of `dimension` components to a sample of embeddings (rows of `vectors`, normalised first)."""
+    vectors = normalise(np.asarray(vectors, dtype=np.float32))
+    if dimension > min(vectors.shape):
+        raise ValueError(f"Cannot fit {dimension} components from a {vectors.shape[0]}x{vectors.shape[1]} sample")
+
+    mean = vectors.mean(axis=0)
+    centered = vectors - mean
+    # Thin SVD of the sample; rows of vt are the principal directions in decreasing variance order
+    _, singular_values, vt = np.linalg.svd(centered, full_matrices=False)
+    variance = singular_values ** 2
+    explained = float(variance[:dimension].sum() / variance.sum()) if variance.sum() else 0.0
+    return Projection(mean, vt[:dimension], index_name, explained)
+
+
+def projection_path(namespace):
+    return os.path.join(Config.PROJECTIONS_PATH, f"{namespace}.npz")
+
+
+def save_projection(namespace, projection):
+    """Persist a namespace's projection next to the other RAG artefacts (atomic replace)."""
+    os.makedirs(Config.PROJECTIONS_PATH, exist_ok=True)
+    path = projection_path(namespace)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        mean=projection.mean,
+        components=projection.components,
+        meta=np.array(json.dumps({
+            "index_name": projection.index_name,
+            "explained_variance_ratio": projection.explained_variance_ratio
+        }))
+    )
+    os.replace(tmp_path, path)
+    _projection_cache.pop(namespace, None)
+    logging.info("✅ Saved %d-dim projection for namespace '%s' to %s", projection.dimension, namespace, path)
+    return path
+
+
+def delete_projection(namespace):
+    _projection_cache.pop(namespace, None)
+    path = projection_path(namespace)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def upsert_with_projection(index, namespace, vectors):
+    """
+    Upsert full-width `vectors` (Pinecone upsert dicts) into `index`, plus their
+    reduced copies into the projection's index when the namespace has one.
+
+    The full-width index stays complete, so removing or re-fitting a projection
+    never loses vectors ingested after the fit.
+    """
+    index.upsert(vectors=vectors, namespace=namespace)
+    projection = get_projection(namespace)
+    if projection is not None and vectors:
+        from services.pinecone_service import get_pinecone_index
+        reduced = projection.project(np.asarray([vector["values"] for vector in vectors], dtype=np.float32))
+        get_pinecone_index(projection.index_name).upsert(
+            vectors=[{**vector, "values": values.tolist()} for vector, values in zip(vectors, reduced)],
+            namespace=namespace
+        )
+    return projection
+
+
+def delete_with_projection(index, namespace, ids):
+    """Delete `ids` from `index` and, when the namespace has a projection, from the projection's index."""
+    if not ids:
+        return
+    index.delete(ids=ids, namespace=namespace)
+    projection = get_projection(namespace)
+    if projection is not None:
+        from services.pinecone_service import get_pinecone_index
+        get_pinecone_index(projection.index_name).delete(ids=ids, namespace=namespace)
+
+
+# namespace -> (file mtime, Projection or None)
+_projection_cache = {}
+_projection_lock = threading.Lock()
+
+
+def get_projection(namespace):
+    """Return the namespace's projection, or None if it is served at full width. Cached by file mtime."""
+    path = projection_path(namespace)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    cached = _projection_cache.get(namespace)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _projection_lock:
+        projection = None
+        if mtime is not None:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                projection = Projection(data["mean"], data["components"], meta["index_name"], meta.get("explained_variance_ratio"))
+        _projection_cache[namespace] = (mtime, projection)
+        return projection
+
+
+def sample_namespace_vectors(index, namespace, limit=None, batch_size=100, seed=None):
+    """
+    Fetch up to `limit` stored vectors (ids and values) sampled uniformly from a namespace.
+
+    The id listing is walked once with reservoir sampling, so the sample is not
+    biased towards whichever files happen to list first; only the sampled ids
+    are fetched.
+    """
+    limit = limit or Config.PROJECTION_SAMPLE_SIZE
+    rng = random.Random(seed)
+    reservoir, seen = [], 0
+    for page in index.list(namespace=namespace):
+        for vector_id in page:
+            seen += 1
+            if len(reservoir) < limit:
+                reservoir.append(vector_id)
+            else:
+                slot = rng.randrange(seen)
+                if slot < limit:
+                    reservoir[slot] = vector_id
+
+    ids, vectors = [], []
+    for start in range(0, len(reservoir), batch_size):
+        batch = reservoir[start:start + batch_size]
+        fetched = index.fetch(ids=batch, namespace=namespace).get('vectors', {})
+        for vector_id in batch:
+            if vector_id in fetched:
+                ids.append(vector_id)
+                vectors.append(fetched[vector_id]['values'])
+    return ids, np.asarray(vectors, dtype=np.float32)
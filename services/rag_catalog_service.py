@@ -0,0 +1,131 @@
+import re
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from services.pinecone_service import get_pinecone_client
+from utilities.cache_utility import TTLCache
+
+# ('indexes',) -> [index names]; ('stats', index) -> {namespace: vector_count}; ('files', index, namespace) -> (files, truncated)
+_catalog_cache = TTLCache(Config.VIEW_RAGS_CACHE_TTL_SECONDS)
+_executor = ThreadPoolExecutor(max_workers=Config.VIEW_RAGS_MAX_WORKERS, thread_name_prefix='rag-catalog')
+
+# Suffixes ingestion appends to a source name to form vector ids ("cv.pdf-full", "cv.pdf-full-w3", "cv.pdf#12")
+_VECTOR_ID_SUFFIX = re.compile(r"(-full(-w\d+)?|#.*)$")
+
+
+def source_name_for_vector_id(vector_id):
+    """Map a vector id back to the file or URL it was created from."""
+    return _VECTOR_ID_SUFFIX.sub('', vector_id)
+
+
+def invalidate_rag_catalog(index_name=None, namespace=None):
+    """Forget cached listings after ingest or deletion (everything, one index, or one namespace)."""
+    if index_name is None:
+        _catalog_cache.invalidate()
+        return
+    _catalog_cache.invalidate(('indexes',))
+    _catalog_cache.invalidate(('stats', index_name))
+    _catalog_cache.invalidate(('files', index_name) if namespace is None else ('files', index_name, namespace))
+
+
+def _list_indexes():
+    return _catalog_cache.get_or_load(('indexes',), lambda: sorted(get_pinecone_client().list_indexes().names()))
+
+
+def _index_stats(index_name):
+    def load():
+        stats = get_pinecone_client().Index(index_name).describe_index_stats()
+        return {namespace: ns_stats['vector_count'] for namespace, ns_stats in (stats.get('namespaces') or {}).items()}
+    return _catalog_cache.get_or_load(('stats', index_name), load)
+
+
+def _namespace_files(index_name, namespace):
+    """Source files of a namespace, from its vector ids (id listing, no similarity queries or metadata)."""
+    def load():
+        index = get_pinecone_client().Index(index_name)
+        files, seen, truncated = set(), 0, False
+        for page in index.list(namespace=namespace):
+            for vector_id in page:
+                files.add(source_name_for_vector_id(vector_id))
+            seen += len(page)
+            if seen >= Config.VIEW_RAGS_MAX_IDS_PER_NAMESPACE:
+                truncated = True
+                break
+        return sorted(files), truncated
+    return _catalog_cache.get_or_load(('files', index_name, namespace), load)
+
+
+def encode_cursor(index_name, namespace):
+    return base64.urlsafe_b64encode(f"{index_name}\x00{namespace}".encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        index_name, namespace = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('\x00', 1)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return index_name, namespace
+
+
+def list_rags(limit=None, cursor=None):
+    """
+    One page of RAGs (index/namespace pairs) with vector counts and source files.
+
+    Index stats are gathered concurrently for all indexes (they're cheap and
+    needed to order the pages); file listings, the expensive part, are only
+    gathered for the namespaces on the requested page. Everything is cached
+    for VIEW_RAGS_CACHE_TTL_SECONDS and invalidated on ingest.
+
+    Returns:
+        dict: {"available_rags": [...], "next_cursor": str or None}
+    """
+    limit = max(1, min(limit or Config.VIEW_RAGS_PAGE_SIZE, Config.VIEW_RAGS_MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    index_names = _list_indexes()
+    stats_futures = {index_name: _executor.submit(_index_stats, index_name) for index_name in index_names}
+
+    entries, failed = [], []
+    for index_name, future in stats_futures.items():
+        try:
+            for namespace, vector_count in future.result().items():
+                entries.append((index_name, namespace, vector_count))
+        except Exception as e:
+            logging.error("❌ Error retrieving namespace stats for index %s: %s", index_name, e)
+            failed.append(index_name)
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+    if after is not None:
+        entries = [entry for entry in entries if (entry[0], entry[1]) > after]
+    page, has_more = entries[:limit], len(entries) > limit
+
+    file_futures = [_executor.submit(_namespace_files, index_name, namespace) for index_name, namespace, _ in page]
+    rags_info = []
+    for (index_name, namespace, vector_count), future in zip(page, file_futures):
+        try:
+            files, truncated = future.result()
+        except Exception as e:
+            logging.error("❌ Error listing vector ids for %s::%s: %s", index_name, namespace, e)
+            files, truncated = [], True
+        rags_info.append({
+            "rag_name": f"{index_name}::{namespace}" if namespace else index_name,
+            "index_name": index_name,
+            "namespace": namespace if namespace else "default",
+            "total_vectors": vector_count,
+            "files_used": files,
+            "files_truncated": truncated
+        })
+
+    # Failed indexes are reported on the first page only, so they don't repeat on every page
+    if after is None:
+        rags_info.extend({
+            "rag_name": index_name,
+            "index_name": index_name,
+            "error": f"Failed to retrieve stats for {index_name}"
+        } for index_name in failed)
+
+    return {
+        "available_rags": rags_info,
+        "next_cursor": encode_cursor(page[-1][0], page[-1][1]) if has_more else None
+    }
@@ -0,0 +1,373 @@
+"""
+Namespace snapshots: export a RAG's vectors, metadata and chunk texts to a
+local folder, and import them into any namespace, Pinecone or local FAISS,
+without re-extracting or re-embedding anything.
+
+A snapshot folder holds:
+
+    manifest.json        namespace, engine, count, dimension, metric and the registry record
+    vectors.npy          float32 [count, dimension], row i belongs to line i of records.jsonl.gz
+    records.jsonl.gz     one {"id", "metadata", "text"} line per vector
+    projection.npz       only for RAGs served through a projection (vectors.npy holds the reduced vectors)
+
+Both directions stream SNAPSHOT_PAGE_SIZE vectors at a time, so memory stays
+bounded; vectors.npy is written row by row and read back memory-mapped. The
+folder is written under a temporary name and renamed once complete.
+"""
+import os
+import gzip
+import json
+import time
+import shutil
+import struct
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import Config
+from services.namespace_registry import get_namespace_config, register_namespace, update_namespace
+from services.pinecone_service import get_pinecone_client, ensure_pinecone_index, index_name_for_backend
+from services.document_store import get_document_store
+from services.projection_service import Projection, get_projection, save_projection, projection_path
+from services.rag_catalog_service import invalidate_rag_catalog
+
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+VECTORS_FILE = 'vectors.npy'
+RECORDS_FILE = 'records.jsonl.gz'
+PROJECTION_FILE = 'projection.npz'
+
+# Registry fields that describe where a RAG is stored rather than what it holds; set afresh on import
+_LOCATION_FIELDS = ('created_at', 'updated_at', 'index_name', 'local_path', 'engine')
+
+# vectors.npy header size: fixed, so the final shape can be written in place once the row count is known
+_NPY_HEADER_BYTES = 128
+
+
+class _NpyWriter:
+    """Appends float32 rows to a .npy file whose length isn't known in advance."""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(b'\0' * _NPY_HEADER_BYTES)
+        self.rows = 0
+        self.dimension = None
+
+    def append(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype='<f4')
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(f"Vector width changed from {self.dimension} to {vectors.shape[1]} during the export")
+        self.file.write(vectors.tobytes())
+        self.rows += len(vectors)
+
+    def close(self):
+        header = repr({'descr': '<f4', 'fortran_order': False, 'shape': (self.rows, self.dimension or 0)})
+        header = header.encode('latin1').ljust(_NPY_HEADER_BYTES - 10 - 1) + b'\n'
+        self.file.seek(0)
+        self.file.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header)
+        self.file.close()
+
+
+def _ordered_parallel(fn, items, parallelism):
+    """`map(fn, items)` on a thread pool with at most 2 x `parallelism` calls outstanding, results in order."""
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='snapshot') as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= 2 * parallelism:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---- Export ----
+
+def pinecone_pages(index, namespace, skip=0):
+    """(ids, vectors, metadatas) pages of a Pinecone namespace: id listing, then parallel fetches. The first `skip` listed ids are passed over unfetched."""
+    def fetch(ids):
+        fetched = index.fetch(ids=ids, namespace=namespace).get('vectors', {})
+        # Ids deleted between listing and fetching are skipped
+        found = [vector_id for vector_id in ids if vector_id in fetched]
+        return found, [fetched[vector_id]['values'] for vector_id in found], [dict(fetched[vector_id].get('metadata') or {}) for vector_id in found]
+
+    listed = itertools.islice((vector_id for page in index.list(namespace=namespace) for vector_id in page), skip, None)
+    batches = _ordered_parallel(fetch, _chunks(listed, Config.SNAPSHOT_FETCH_BATCH), Config.SNAPSHOT_PARALLELISM)
+    for group in _chunks(batches, max(1, Config.SNAPSHOT_PAGE_SIZE // Config.SNAPSHOT_FETCH_BATCH)):
+        ids = [vector_id for found, _, _ in group for vector_id in found]
+        if ids:
+            yield ids, np.asarray([values for _, vectors, _ in group for values in vectors], dtype=np.float32), \
+                [metadata for _, _, metadatas in group for metadata in metadatas]
+
+
+def local_pages(local_path, skip=0):
+    """(ids, vectors, metadatas) pages of a local FAISS RAG, in label order, starting after the first `skip` vectors."""
+    from services.ann_index_service import LocalAnnIndex, VECTORS_FILE as FULL_VECTORS_FILE
+    index = LocalAnnIndex.open(local_path, mmap=True)
+    dimension = index.params["dimension"]
+    full_vectors = None
+    if index.refines:
+        full_vectors = np.memmap(os.path.join(local_path, FULL_VECTORS_FILE), dtype='<f4', mode='r', shape=(index.params["next_label"], dimension))
+    elif index.params["index_type"] == 'ivfpq':
+        # Without the full vectors only the PQ approximations can be recovered
+        logging.warning("⚠️ %s keeps no full vectors; exporting PQ-decoded approximations", local_path)
+        index.index.make_direct_map()
+    conn = index._labels()
+    last = -1
+    if skip:
+        row = conn.execute("SELECT label FROM labels WHERE deleted = 0 ORDER BY label LIMIT 1 OFFSET ?", (skip - 1,)).fetchone()
+        if row is None:
+            return
+        last = row[0]
+    while True:
+        rows = conn.execute("SELECT label, vector_id, metadata FROM labels WHERE deleted = 0 AND label > ? ORDER BY label LIMIT ?",
+                            (last, Config.SNAPSHOT_PAGE_SIZE)).fetchall()
+        if not rows:
+            return
+        labels = np.asarray([row[0] for row in rows], dtype=np.int64)
+        vectors = np.asarray(full_vectors[labels]) if full_vectors is not None else index.index.reconstruct_batch(labels)
+        yield [row[1] for row in rows], vectors, [json.loads(row[2]) for row in rows]
+        last = int(labels[-1])
+
+
+def export_namespace(namespace, path, overwrite=False):
+    """
+    Write a snapshot of `namespace` to the folder `path`.
+
+    Returns:
+        dict: the snapshot's manifest.
+
+    Raises:
+        FileExistsError: `path` exists and `overwrite` is false.
+        ValueError: the namespace holds no vectors.
+    """
+    if os.path.exists(path) and not overwrite:
+        raise FileExistsError(f"Snapshot folder {path} already exists")
+    record = get_namespace_config(namespace) or {}
+    local_path = record.get('local_path')
+    projection = None
+    if local_path:
+        from services.ann_index_service import LocalAnnIndex
+        pages = local_pages(local_path)
+        engine = 'faiss'
+        metric = LocalAnnIndex._read_params(local_path)["metric"]
+        source = local_path
+    else:
+        projection = get_projection(namespace)
+        index_name = projection.index_name if projection is not None else record.get('index_name') or os.getenv('PINECONE_INDEX_NAME', 'rag-index')
+        pc = get_pinecone_client()
+        description = pc.describe_index(index_name)
+        metric = description['metric'] if isinstance(description, dict) else description.metric
+        pages = pinecone_pages(pc.Index(index_name), namespace)
+        engine = 'pinecone'
+        source = index_name
+
+    started = time.perf_counter()
+    partial = f"{path}.partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    store = get_document_store()
+    writer = _NpyWriter(os.path.join(partial, VECTORS_FILE))
+    missing_texts = 0
+    try:
+        with gzip.open(os.path.join(partial, RECORDS_FILE), 'wt', encoding='utf-8', compresslevel=Config.SNAPSHOT_COMPRESSION_LEVEL) as records:
+            for ids, vectors, metadatas in pages:
+                texts = store.get_many(namespace, ids)
+                writer.append(vectors)
+                for vector_id, metadata in zip(ids, metadatas):
+                    text = texts.get(vector_id)
+                    missing_texts += text is None
+                    records.write(json.dumps({"id": vector_id, "metadata": metadata, "text": text}, ensure_ascii=False) + '\n')
+                logging.info("📦 Exported %d vectors of '%s' (%.0f/s)", writer.rows, namespace, writer.rows / max(1e-6, time.perf_counter() - started))
+    finally:
+        writer.close()
+    if not writer.rows:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise ValueError(f"Namespace '{namespace}' holds no vectors to export")
+    if projection is not None:
+        shutil.copyfile(projection_path(namespace), os.path.join(partial, PROJECTION_FILE))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "namespace": namespace,
+        "engine": engine,
+        "source": source,
+        "count": writer.rows,
+        "dimension": writer.dimension,
+        "metric": metric,
+        "projected": projection is not None,
+        "missing_texts": missing_texts,
+        "registry": {key: value for key, value in record.items() if key not in _LOCATION_FIELDS},
+        "created_at": time.time(),
+    }
+    if local_path:
+        from services.ann_index_service import LocalAnnIndex
+        params = LocalAnnIndex._read_params(local_path)
+        manifest["ann"] = {"index_type": params["index_type"], "params": params["params"]}
+    with open(os.path.join(partial, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(partial, path)
+    logging.info("✅ Exported %d vectors of '%s' to %s in %.1f s", writer.rows, namespace, path, time.perf_counter() - started)
+    return manifest
+
+
+# ---- Import ----
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')} in {path}")
+    return manifest
+
+
+def iter_snapshot(path, page_size=None):
+    """(ids, vectors, metadatas, texts) pages of a snapshot; vectors are slices of the memory-mapped vectors.npy."""
+    page_size = page_size or Config.SNAPSHOT_PAGE_SIZE
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode='r')
+    with gzip.open(os.path.join(path, RECORDS_FILE), 'rt', encoding='utf-8') as records:
+        start = 0
+        for lines in _chunks(records, page_size):
+            rows = [json.loads(line) for line in lines]
+            yield [row["id"] for row in rows], vectors[start:start + len(rows)], [row["metadata"] for row in rows], [row["text"] for row in rows]
+            start += len(rows)
+
+
+def import_snapshot(path, namespace=None, engine=None, index_name=None, local_path=None, index_type=None, overwrite=False):
+    """
+    Load a snapshot into `namespace` (default: the namespace it was exported from).
+
+    `engine` is 'pinecone' or 'faiss' (default: the engine it was exported
+    from). Pinecone upserts run SNAPSHOT_PARALLELISM at a time; a local index is
+    built from the first SNAPSHOT_LOCAL_BUILD_ROWS vectors and extended in pages
+    of that size. With `overwrite`, an existing namespace is deleted first
+    (vectors, texts, projection and registry record), so the result is the
+    snapshot's content only.
+
+    Returns:
+        dict: namespace, engine, target and count of the imported vectors.
+
+    Raises:
+        ValueError: the namespace already exists (without `overwrite`), or the
+        snapshot can't be served by the requested engine.
+    """
+    manifest = read_manifest(path)
+    namespace = namespace or manifest["namespace"]
+    engine = engine or manifest["engine"]
+    if engine not in ('pinecone', 'faiss'):
+        raise ValueError(f"Unknown engine '{engine}' (use 'pinecone' or 'faiss')")
+    if get_namespace_config(namespace) and not overwrite:
+        raise ValueError(f"Namespace '{namespace}' already exists; pass overwrite to import into it anyway")
+    registry = dict(manifest["registry"])
+    projection = None
+    if manifest["projected"]:
+        if engine == 'faiss':
+            raise ValueError("Snapshots of projected RAGs hold reduced vectors and can only be imported into Pinecone")
+        with np.load(os.path.join(path, PROJECTION_FILE)) as data:
+            meta = json.loads(str(data["meta"]))
+            projection = Projection(data["mean"], data["components"], index_name or meta["index_name"], meta.get("explained_variance_ratio"))
+
+    if overwrite and get_namespace_config(namespace):
+        # A restore, not a merge: vectors and texts the snapshot doesn't have must not survive it
+        from services.deletion_service import delete_namespace
+        removed = delete_namespace(namespace)
+        logging.info("🗑️ Cleared namespace '%s' (%d vectors) before importing over it", namespace, removed["deleted"])
+
+    started = time.perf_counter()
+    store = get_document_store()
+    imported = 0
+
+    def pages():
+        for ids, vectors, metadatas, texts in iter_snapshot(path):
+            for metadata in metadatas:
+                if 'rag_name' in metadata:
+                    metadata['rag_name'] = namespace
+            store.put_many(namespace, [(vector_id, text) for vector_id, text in zip(ids, texts) if text is not None])
+            yield ids, vectors, metadatas
+
+    if engine == 'faiss':
+        from services.ann_index_service import LocalAnnIndex, forget_local_index
+        local_path = local_path or os.path.join(Config.FAISS_INDEX_PATH, namespace)
+        ann = manifest.get("ann") or {}
+        index = None
+        for ids, vectors, metadatas in _merge_pages(pages(), Config.SNAPSHOT_LOCAL_BUILD_ROWS):
+            if index is None:
+                index = LocalAnnIndex.build(local_path, ids, vectors, metadatas, index_type=index_type or ann.get("index_type"),
+                                            metric=manifest["metric"], params=ann.get("params") if not index_type or index_type == ann.get("index_type") else None)
+            else:
+                index.upsert(ids, vectors, metadatas)
+            imported += len(ids)
+            logging.info("📥 Imported %d/%d vectors into %s", imported, manifest["count"], local_path)
+        forget_local_index(local_path)
+        target = local_path
+        registry.update(engine='faiss', local_path=local_path, index_type=index.params["index_type"])
+        full_index_name = None
+    else:
+        # A projected RAG is registered against its full-width index but served from the reduced one
+        if registry.get('backend'):
+            full_index_name = index_name_for_backend(registry['backend'], registry.get('dimension') or manifest["dimension"])
+        else:
+            full_index_name = os.getenv('PINECONE_INDEX_NAME', 'rag-index')
+        if projection is None:
+            full_index_name = index_name or full_index_name
+        target = projection.index_name if projection is not None else full_index_name
+        index = ensure_pinecone_index(target, manifest["dimension"], manifest["metric"])
+
+        def upsert(batch):
+            ids, vectors, metadatas = batch
+            index.upsert(vectors=[{"id": vector_id, "values": vector.tolist(), "metadata": metadata}
+                                  for vector_id, vector, metadata in zip(ids, vectors, metadatas)], namespace=namespace)
+            return len(ids)
+
+        def batches():
+            for ids, vectors, metadatas in pages():
+                for start in range(0, len(ids), Config.SNAPSHOT_UPSERT_BATCH):
+                    end = start + Config.SNAPSHOT_UPSERT_BATCH
+                    yield ids[start:end], np.asarray(vectors[start:end], dtype=np.float32), metadatas[start:end]
+
+        for count in _ordered_parallel(upsert, batches(), Config.SNAPSHOT_PARALLELISM):
+            imported += count
+            if imported % Config.SNAPSHOT_PAGE_SIZE < count:
+                logging.info("📥 Imported %d/%d vectors into '%s'", imported, manifest["count"], target)
+
+    # Registering last means /ask only routes to the namespace once its vectors are in place
+    if registry.get('backend'):
+        register_namespace(namespace, registry['backend'], registry.get('dimension') or manifest["dimension"], full_index_name)
+    update_namespace(namespace, **{key: value for key, value in registry.items() if key not in ('backend', 'dimension')})
+    if projection is not None:
+        save_projection(namespace, projection)
+    if engine == 'pinecone':
+        invalidate_rag_catalog(target, namespace)
+
+    elapsed = time.perf_counter() - started
+    logging.info("✅ Imported %d vectors into '%s' (%s) in %.1f s", imported, namespace, target, elapsed)
+    return {"namespace": namespace, "engine": engine, "target": target, "count": imported, "elapsed_s": round(elapsed, 2)}
+
+
+def _merge_pages(pages, rows):
+    """Regroup (ids, vectors, metadatas) pages into pages of about `rows` vectors."""
+    ids, vectors, metadatas = [], [], []
+    for page_ids, page_vectors, page_metadatas in pages:
+        ids += page_ids
+        vectors.append(np.asarray(page_vectors, dtype=np.float32))
+        metadatas += page_metadatas
+        if len(ids) >= rows:
+            yield ids, np.vstack(vectors), metadatas
+            ids, vectors, metadatas = [], [], []
+    if ids:
+        yield ids, np.vstack(vectors), metadatas
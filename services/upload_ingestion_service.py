@@ -0,0 +1,303 @@
+"""
+Streaming ingestion of uploaded files (/add-file).
+
+The upload has already been streamed to a temporary file and hashed by
+utilities/upload_utility.py. From there the text is extracted incrementally
+(a PDF page or a block of text at a time), cut into section-aware windows as
+it arrives, and embedded and upserted in batches, so memory stays bounded
+however large the file is. Uploads whose content hash the namespace has
+already ingested short-circuit, and windows that near-duplicate chunks the
+namespace already holds are skipped or linked (services/dedup_service.py).
+A skipped window's content lives in another file's chunk, so each upload
+records the files it skipped against (`depends_on`); deleting one of them
+re-ingests the upload from DATA_FOLDER (services/deletion_service.py).
+"""
+import os
+import bisect
+import codecs
+import shutil
+import logging
+from config import Config
+from services.namespace_registry import resolve_namespace_backend, register_namespace, update_namespace, get_namespace_config
+from services.pinecone_service import ensure_pinecone_index
+from services.document_store import get_document_store
+from services.rag_catalog_service import invalidate_rag_catalog, source_name_for_vector_id
+from services.projection_service import get_projection, upsert_with_projection, delete_with_projection
+from services.file_index_service import file_index
+from services.dedup_service import ChunkDeduplicator, stored_vectors
+from utilities.pdf_extraction_utility import iter_pdf_pages, section_spans, clean_text
+from utilities.singleflight_utility import SingleFlight
+from utilities.upload_utility import HashingUploadFile, detect_file_type
+
+# Identical uploads (same namespace and content) arriving together are ingested once
+_upload_flight = SingleFlight('upload')
+
+
+class UnsupportedUploadType(ValueError):
+    """Raised for uploads that are neither PDF nor UTF-8 text."""
+
+
+def iter_text_blocks(path, file_type):
+    """Yield (text, page) blocks of an uploaded file: one per PDF page, or UPLOAD_READ_BLOCK_BYTES of text at a time."""
+    if file_type == 'pdf':
+        for page_number, page_text in enumerate(iter_pdf_pages(path), start=1):
+            page_text = clean_text(page_text)
+            if page_text:
+                yield page_text, page_number
+        return
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(Config.UPLOAD_READ_BLOCK_BYTES)
+            text = decoder.decode(data, final=not data)
+            if text:
+                yield text, None
+            if not data:
+                return
+
+
+class StreamingChunker:
+    """
+    Cuts a text that arrives in blocks into the same section-aware windows as `embed_document`.
+
+    Text is buffered until UPLOAD_CHUNK_BUFFER_CHARS have accumulated; the
+    buffer is then split into windows inside each section, every window but the
+    last is emitted, and the buffer restarts at the last window so windows keep
+    their overlap across blocks. Offsets are relative to the whole text.
+    """
+
+    def __init__(self, backend, headers):
+        self.backend = backend
+        self.headers = headers
+        self.buffer = ''
+        self.base = 0
+        self.section = 'Introduction'
+        # (start offset, page number) of every page seen, for tagging windows
+        self.page_starts = []
+        self.emitted = 0
+
+    def feed(self, text, page=None):
+        if page is not None:
+            if self.buffer or self.base:
+                self.buffer += ' '
+            self.page_starts.append((self.base + len(self.buffer), page))
+        self.buffer += text
+        if len(self.buffer) >= Config.UPLOAD_CHUNK_BUFFER_CHARS:
+            yield from self._cut(final=False)
+
+    def finish(self):
+        yield from self._cut(final=True)
+
+    def _page_at(self, offset):
+        if not self.page_starts:
+            return None
+        offsets = [start for start, _ in self.page_starts]
+        return self.page_starts[max(0, bisect.bisect_right(offsets, offset) - 1)][1]
+
+    def _cut(self, final):
+        if not self.buffer.strip():
+            return
+        sections = section_spans(self.buffer, self.headers)
+        if sections[0][0] == 'Introduction' and self.base:
+            # Text before this buffer's first header continues the section the previous buffer ended in
+            sections[0] = (self.section, sections[0][1], sections[0][2])
+        spans = self.backend.split_section_windows(self.buffer, sections)
+        if not spans:
+            return
+        keep = len(spans) if final else len(spans) - 1
+        section_starts = [start for _, start, _ in sections]
+        for start, end in spans[:keep]:
+            section = sections[max(0, bisect.bisect_right(section_starts, start) - 1)][0]
+            yield {
+                "window": self.emitted,
+                "text": self.buffer[start:end],
+                "char_start": self.base + start,
+                "char_end": self.base + end,
+                "section_name": section,
+                "page": self._page_at(self.base + start),
+            }
+            self.emitted += 1
+        if not final:
+            cut = spans[-1][0]
+            self.section = sections[max(0, bisect.bisect_right(section_starts, cut) - 1)][0]
+            self.buffer = self.buffer[cut:]
+            self.base += cut
+
+
+def _find_duplicate(namespace, sha256):
+    """The upload already holding this content, unless part of it was skipped against a file that is gone."""
+    record = get_namespace_config(namespace) or {}
+    present = set(record.get('source_files', [])) | set(record.get('uploads', {}))
+    for name, info in record.get('uploads', {}).items():
+        if info.get('sha256') != sha256:
+            continue
+        depends_on = info.get('depends_on')
+        if info.get('duplicates') and (depends_on is None or not set(depends_on) <= present):
+            continue
+        return name
+    return None
+
+
+def ingest_upload(upload, file_name, namespace, embedding_backend=None):
+    """
+    Ingest a streamed upload (a HashingUploadFile) into `namespace`.
+
+    Returns:
+        dict: what was ingested, with `"duplicate": True` (and the file name
+        that holds the content) when the namespace already has this content.
+
+    Raises:
+        UnsupportedUploadType: the upload is neither a PDF nor UTF-8 text.
+        EmbeddingBackendMismatch: `embedding_backend` conflicts with the namespace's.
+        ValueError: no text could be extracted, or the backend is unknown.
+    """
+    duplicate = _find_duplicate(namespace, upload.sha256)
+    if duplicate is not None:
+        logging.info("♻️ Upload of '%s' to '%s' duplicates '%s' (sha256 %s); skipped", file_name, namespace, duplicate, upload.sha256[:12])
+        return {"duplicate": True, "file_name": duplicate, "sha256": upload.sha256, "bytes": upload.size}
+    return _upload_flight.do((namespace, upload.sha256), _ingest, upload, file_name, namespace, embedding_backend)
+
+
+def _ingest(upload, file_name, namespace, embedding_backend, destination=None):
+    file_type = detect_file_type(upload.head, file_name)
+    if file_type is None:
+        raise UnsupportedUploadType(f"'{file_name}' is not a PDF or UTF-8 text file")
+    upload.file.flush()
+
+    backend, index_name, registered = resolve_namespace_backend(namespace, embedding_backend)
+    record = get_namespace_config(namespace) or {}
+    local_path = record.get('local_path')
+    projection = None
+    if local_path:
+        from services.ann_index_service import LocalAnnIndex
+        index = LocalAnnIndex.open(local_path, mmap=False)
+    else:
+        # Full-width vectors always go to `index_name`; a projection's index gets reduced copies as well
+        index = ensure_pinecone_index(index_name, backend.dimension)
+        projection = get_projection(namespace)
+    store = get_document_store()
+    dedup = ChunkDeduplicator(namespace, [file_name])
+    # Windows dropped as near-duplicates (skip mode); an earlier version of the file may have stored them
+    skipped = []
+    # Files holding the kept copies of the skipped windows
+    depends_on = set()
+
+    def flush(batch):
+        ids = [f"{file_name}-full-w{chunk['window']}" for chunk in batch]
+        # Linked near-duplicates get a copy of the stored vector of the chunk they duplicate instead of an embedding
+        values = stored_vectors(index, namespace, {chunk["duplicate_of"] for chunk in batch if chunk["duplicate_of"]} - set(ids))
+        embed = [i for i, chunk in enumerate(batch) if not chunk["duplicate_of"] or (chunk["duplicate_of"] not in values and chunk["duplicate_of"] not in ids)]
+        if embed:
+            for i, vector in zip(embed, backend.embed_batch([batch[i]["text"] for i in embed])):
+                values[ids[i]] = vector
+        dedup.avoided(len(batch) - len(embed))
+        embedded = set(embed)
+        values = [values[vector_id] if i in embedded else values[batch[i]["duplicate_of"]] for i, vector_id in enumerate(ids)]
+        metadatas = []
+        for chunk in batch:
+            metadata = {key: chunk[key] for key in ("section_name", "window", "char_start", "char_end")}
+            metadata.update({"file_name": file_name, "rag_name": namespace, "source_type": "pdf" if file_type == 'pdf' else "file",
+                             "char_count": chunk["char_end"] - chunk["char_start"], "sha256": upload.sha256})
+            if chunk["page"] is not None:
+                metadata["page"] = chunk["page"]
+            if chunk["duplicate_of"]:
+                metadata["duplicate_of"] = chunk["duplicate_of"]
+            metadatas.append(metadata)
+        store.put_many(namespace, [(vector_id, chunk["text"]) for vector_id, chunk in zip(ids, batch)])
+        if local_path:
+            index.upsert(ids, values, metadatas)
+        else:
+            upsert_with_projection(index, namespace, [{"id": vector_id, "values": [float(x) for x in value], "metadata": metadata}
+                                                      for vector_id, value, metadata in zip(ids, values, metadatas)])
+        dedup.commit()
+
+    chunker = StreamingChunker(backend, record.get('section_headers') or Config.SECTION_HEADERS)
+    chars = 0
+
+    def windows():
+        nonlocal chars
+        for text, page in iter_text_blocks(upload.path, file_type):
+            chars += len(text)
+            yield from chunker.feed(text, page)
+        yield from chunker.finish()
+
+    batch = []
+    for chunk in windows():
+        vector_id = f"{file_name}-full-w{chunk['window']}"
+        chunk["duplicate_of"] = dedup.check(vector_id, file_name, chunk["text"])
+        if chunk["duplicate_of"] and dedup.mode == 'skip':
+            skipped.append(vector_id)
+            depends_on.add(source_name_for_vector_id(chunk["duplicate_of"]))
+            dedup.avoided(1)
+            continue
+        batch.append(chunk)
+        if len(batch) >= Config.UPLOAD_EMBED_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    chunks = chunker.emitted
+    if not chunks:
+        raise ValueError(f"No text could be extracted from '{file_name}'")
+
+    # A re-uploaded file that got shorter leaves windows past its new end; the legacy whole-file vector is replaced too
+    previous = record.get('uploads', {}).get(file_name, {})
+    stale = [f"{file_name}-full-w{window}" for window in range(chunks, previous.get('chunks', 0))] + [file_name] + skipped
+    if local_path:
+        index.delete(stale)
+    else:
+        delete_with_projection(index, namespace, stale)
+    store.delete_many(namespace, stale)
+    dedup.finish()
+
+    # Keep the original next to the other source files
+    destination = destination or os.path.join(Config.DATA_FOLDER, file_name)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    upload.file.close()
+    shutil.move(upload.path, destination)
+    file_index.notify(destination)
+
+    if not registered:
+        register_namespace(namespace, backend.name, backend.dimension, index_name)
+    record = get_namespace_config(namespace) or {}
+    uploads = dict(record.get('uploads', {}))
+    uploads[file_name] = {"sha256": upload.sha256, "bytes": upload.size, "type": file_type, "chunks": chunks,
+                          "duplicates": dedup.duplicates, "depends_on": sorted(depends_on)}
+    source_files = record.get('source_files', [])
+    update_namespace(
+        namespace,
+        uploads=uploads,
+        source_files=source_files + [file_name] if file_name not in source_files else source_files,
+        section_tagged=True  # Every uploaded chunk carries its section_name
+    )
+    if local_path:
+        from services.ann_index_service import forget_local_index
+        forget_local_index(local_path)
+    else:
+        invalidate_rag_catalog(index_name, namespace)
+        if projection is not None:
+            invalidate_rag_catalog(projection.index_name, namespace)
+
+    logging.info("✅ Ingested upload '%s' into '%s': %d bytes (%s), %d chars, %d chunks (%d near-duplicates)",
+                 file_name, namespace, upload.size, file_type, chars, chunks, dedup.duplicates)
+    return {"duplicate": False, "file_name": file_name, "sha256": upload.sha256, "bytes": upload.size,
+            "file_type": file_type, "chunks": chunks, "embedding_backend": backend.name, "dedup": dedup.report()}
+
+
+def reingest_stored_file(namespace, file_name):
+    """
+    Ingest a file again from its stored copy: DATA_FOLDER for uploads, the
+    source folder for local RAGs built by rag_utils_from_files.
+
+    Used when a file it skipped near-duplicates against is deleted: the
+    skipped windows are then embedded and stored with the file itself.
+    """
+    folder = (get_namespace_config(namespace) or {}).get('source_folder') or Config.DATA_FOLDER
+    path = os.path.join(folder, file_name)
+    upload = HashingUploadFile(Config.UPLOAD_TEMP_DIR, 0)
+    try:
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, upload, Config.UPLOAD_READ_BLOCK_BYTES)
+        return _ingest(upload, file_name, namespace, None, destination=path)
+    finally:
+        upload.discard()
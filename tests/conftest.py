@@ -0,0 +1,47 @@
+"""
+Shared fixtures: the app wired to the benchmark stubs (benchmarks/run_benchmarks.py).
+
+The stubs must be installed before `main` is imported, because Config reads the
+environment and route modules create their clients at import time.
+"""
+import os
+import sys
+import argparse
+import tempfile
+import pytest
+from flask.testing import FlaskClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+WORKDIR = tempfile.mkdtemp(prefix='rag-tests-')
+os.environ['DATA_FOLDER'] = os.path.join(WORKDIR, 'data')
+os.environ['UPLOAD_TEMP_DIR'] = os.path.join(WORKDIR, 'uploads_tmp')
+os.environ['PROJECTIONS_PATH'] = os.path.join(WORKDIR, 'projections')
+os.environ['DEDUP_INDEX_PATH'] = os.path.join(WORKDIR, 'doc_store', 'dedup.db')
+
+import run_benchmarks  # noqa: E402
+
+_parser = argparse.ArgumentParser()
+run_benchmarks.add_stub_arguments(_parser)
+run_benchmarks.install_stubs(_parser.parse_args(['--dimension', '64', '--llm-latency-ms', '0']), WORKDIR)
+
+from main import app as flask_app  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return flask_app
+
+
+class BufferedClient(FlaskClient):
+    """Reads and closes each response by default, as a WSGI server would, so admission slots are released."""
+
+    def open(self, *args, buffered=True, **kwargs):
+        return super().open(*args, buffered=buffered, **kwargs)
+
+
+@pytest.fixture
+def client(app):
+    app.test_client_class = BufferedClient
+    return app.test_client()
@@ -0,0 +1,35 @@
+import json
+from utilities.admission_utility import get_admission_stats
+
+
+def _ingestion_in_flight():
+    return get_admission_stats()["classes"]["ingestion"]["in_flight"]
+
+
+def test_streamed_batch_holds_its_slot_until_the_response_closes(client):
+    before = _ingestion_in_flight()
+
+    response = client.post('/ask/batch', json={
+        "namespace": "admission-test",
+        "queries": ["first question", "second question"],
+        "generate": False,
+        "stream": True,
+    }, buffered=False)
+
+    assert response.status_code == 200
+    assert _ingestion_in_flight() == before + 1
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+
+    assert lines[-1]["summary"]["count"] == 2
+    assert _ingestion_in_flight() == before
+
+
+def test_buffered_response_releases_its_slot(client):
+    before = _ingestion_in_flight()
+
+    response = client.post('/ask/batch', json={"namespace": "admission-test", "queries": ["question"], "generate": False}, buffered=True)
+
+    assert response.status_code == 200
+    assert _ingestion_in_flight() == before
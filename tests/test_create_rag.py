@@ -0,0 +1,44 @@
+import os
+import shutil
+import pytest
+import routes.create_new_rag_route as create_new_rag_route
+from conftest import ROOT, WORKDIR
+from services.document_store import get_document_store
+from services.pinecone_service import get_pinecone_index
+
+
+@pytest.fixture
+def pdf_path():
+    path = os.path.join(WORKDIR, 'create-rag-test.pdf')
+    shutil.copyfile(os.path.join(ROOT, 'data', 'Santosh.pdf'), path)
+    return path
+
+
+def _window_ids(namespace):
+    return {vector_id for page in get_pinecone_index('rag-index').list(prefix=f"{namespace}-full-w", namespace=namespace)
+            for vector_id in page}
+
+
+def test_recreating_a_rag_removes_windows_it_no_longer_has(client, pdf_path, monkeypatch):
+    namespace = os.path.basename(pdf_path)
+    body = {"file_path": pdf_path, "rag_name": "cv", "keep_window_vectors": True}
+    assert client.post('/create-new-rag', json=body).status_code == 200
+    before = _window_ids(namespace)
+
+    pages = create_new_rag_route.extract_pages_from_pdf(pdf_path)
+    monkeypatch.setattr(create_new_rag_route, 'extract_pages_from_pdf', lambda path: [pages[0][:1500]])
+    response = client.post('/create-new-rag', json=body)
+
+    assert response.status_code == 200, response.get_json()
+    after = _window_ids(namespace)
+    assert len(after) == response.get_json()["total_vectors"] - 1 < len(before)
+    assert not get_document_store().get_many(namespace, sorted(before - after))
+
+
+def test_default_ingest_stores_section_tagged_windows(client, pdf_path):
+    namespace = os.path.basename(pdf_path)
+    assert client.post('/create-new-rag', json={"file_path": pdf_path, "rag_name": "cv"}).status_code == 200
+
+    assert _window_ids(namespace)
+    response = client.post('/ask', json={"query": "projects", "namespace": namespace, "filter": {"page": 1}})
+    assert response.status_code == 200, response.get_json()
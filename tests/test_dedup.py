@@ -0,0 +1,76 @@
+import io
+import os
+import random
+import pytest
+from config import Config
+from services.document_store import get_document_store
+from services.namespace_registry import get_namespace_config
+
+NAMESPACE = 'dedup-skip-test'
+
+
+def _paragraph(seed, words=900):
+    rng = random.Random(seed)
+    return ' '.join(f"word{rng.randrange(5000)}" for _ in range(words)) + '\n'
+
+
+def _upload(client, name, text):
+    response = client.post('/add-file', data={'namespace': NAMESPACE, 'file': (io.BytesIO(text.encode()), name)})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _stored_windows(name):
+    chunks = get_namespace_config(NAMESPACE)['uploads'][name]['chunks']
+    ids = [f"{name}-full-w{window}" for window in range(chunks)]
+    return len(get_document_store().get_many(NAMESPACE, ids)), chunks
+
+
+@pytest.fixture
+def skip_mode(monkeypatch):
+    monkeypatch.setattr(Config, 'DEDUP_MODE', 'skip')
+
+
+def test_deleting_the_original_reingests_files_that_skipped_against_it(client, skip_mode):
+    shared = _paragraph('shared')
+    _upload(client, 'original.txt', shared)
+    copy = _upload(client, 'copy.txt', shared + _paragraph('own'))
+    assert copy["dedup"]["duplicates"] > 0
+    assert get_namespace_config(NAMESPACE)['uploads']['copy.txt']['depends_on'] == ['original.txt']
+
+    response = client.delete('/remove-file', json={'namespace': NAMESPACE, 'file_name': 'original.txt'})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["reingested"] == ['copy.txt']
+    stored, chunks = _stored_windows('copy.txt')
+    assert stored == chunks
+    assert 'original.txt' not in get_namespace_config(NAMESPACE)['uploads']
+
+    # The deleted file's content is no longer held back as a duplicate upload
+    assert _upload(client, 'original.txt', shared)["duplicate"] is False
+
+
+def test_deleting_from_a_local_rag_reingests_files_that_skipped_against_it(client, skip_mode, tmp_path):
+    from rag_utils_from_files import create_rag_system_from_files
+    from services.ann_index_service import LocalAnnIndex
+
+    folder = tmp_path / 'sources'
+    folder.mkdir()
+    shared = _paragraph('local-shared')
+    (folder / 'a_original.txt').write_text(shared)
+    (folder / 'b_copy.txt').write_text(shared + _paragraph('local-own'))
+    index_path = os.path.join(Config.FAISS_INDEX_PATH, 'dedup-local-test')
+    index, error = create_rag_system_from_files(str(folder), index_path, index_type='flat')
+    assert error is None
+    record = get_namespace_config('dedup-local-test')
+    assert record['uploads']['b_copy.txt']['depends_on'] == ['a_original.txt']
+    assert sorted(record['source_files']) == ['a_original.txt', 'b_copy.txt']
+
+    response = client.delete('/remove-file', json={'namespace': 'dedup-local-test', 'file_name': 'a_original.txt'})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["reingested"] == ['b_copy.txt']
+    chunks = get_namespace_config('dedup-local-test')['uploads']['b_copy.txt']['chunks']
+    stored = LocalAnnIndex.open(index_path).ids_with_prefix('b_copy.txt')
+    assert len(stored) == chunks
+    assert len(get_document_store().get_many('dedup-local-test', stored)) == chunks
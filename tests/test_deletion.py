@@ -0,0 +1,39 @@
+import io
+import pytest
+from benchmarks import stubs
+import routes.delete_rag_route as delete_rag_route
+from services.document_store import get_document_store
+from services.deletion_service import delete_file
+
+NAMESPACE = 'deletion-test'
+
+
+def _add(client, name):
+    response = client.post('/add-file', data={
+        'namespace': NAMESPACE,
+        'file': (io.BytesIO(f'Projects\n{name} indexes contracts for search.\n'.encode() * 30), name),
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["chunks"]
+
+
+def test_failed_vector_delete_keeps_the_texts(client, monkeypatch):
+    chunks = _add(client, 'kept.txt')
+    ids = [f"kept.txt-full-w{window}" for window in range(chunks)]
+
+    def failing_delete(self, ids=None, delete_all=False, namespace='', **kwargs):
+        raise ConnectionError("vector store unavailable")
+    monkeypatch.setattr(stubs.InMemoryVectorStore, 'delete', failing_delete)
+    with pytest.raises(ConnectionError):
+        delete_file(NAMESPACE, 'kept.txt')
+
+    assert len(get_document_store().get_many(NAMESPACE, ids)) == chunks
+
+
+def test_default_rag_name_maps_to_the_default_namespace(client, monkeypatch):
+    looked_up = []
+    monkeypatch.setattr(delete_rag_route, 'index_name_for_namespace', lambda namespace: looked_up.append(namespace) or 'rag-index')
+
+    client.delete('/delete-rag', json={'rag_name': 'default'})
+
+    assert looked_up == ['']
@@ -0,0 +1,16 @@
+import numpy as np
+from services.ann_index_service import LocalAnnIndex
+
+
+def test_stale_handle_skips_rows_tombstoned_by_a_writer(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(100, 16)).astype(np.float32)
+    ids = [f"doc.txt-{number}" for number in range(100)]
+    LocalAnnIndex.build(str(tmp_path), ids, vectors, index_type='hnsw')
+    reader = LocalAnnIndex.open(str(tmp_path))
+
+    LocalAnnIndex.open(str(tmp_path), mmap=False).delete(ids[:1])  # Few enough to tombstone rather than compact
+
+    matches = reader.query(vectors[0], top_k=10)["matches"]
+    assert matches
+    assert not [match["id"] for match in matches if match["id"] not in ids[1:]]
@@ -0,0 +1,21 @@
+import multiprocessing
+from config import Config
+from services import namespace_registry
+
+
+def _register_many(worker, count):
+    for number in range(count):
+        namespace_registry.update_namespace(f"ns-{worker}-{number}", backend='stub')
+
+
+def test_concurrent_processes_keep_every_update(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'NAMESPACE_REGISTRY_PATH', str(tmp_path / 'namespaces.json'))
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_register_many, args=(worker, 25)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    assert len(namespace_registry.list_namespaces()) == 4 * 25
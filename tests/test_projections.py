@@ -0,0 +1,25 @@
+import io
+import numpy as np
+from services.pinecone_service import get_pinecone_index, ensure_pinecone_index
+from services.projection_service import Projection, save_projection, delete_projection
+
+NAMESPACE = 'projection-test'
+
+
+def test_ingest_keeps_full_width_vectors_when_a_projection_is_live(client):
+    rng = np.random.default_rng(0)
+    components = np.linalg.qr(rng.normal(size=(64, 16)))[0].T
+    ensure_pinecone_index('projection-test-16', 16)
+    save_projection(NAMESPACE, Projection(np.zeros(64), components, 'projection-test-16'))
+    try:
+        response = client.post('/add-file', data={
+            'namespace': NAMESPACE,
+            'file': (io.BytesIO(b'Experience\nBuilt a search service for contracts.\n' * 40), 'cv.txt'),
+        })
+        assert response.status_code == 200, response.get_json()
+    finally:
+        delete_projection(NAMESPACE)
+
+    full = {vector_id for page in get_pinecone_index('rag-index').list(namespace=NAMESPACE) for vector_id in page}
+    reduced = {vector_id for page in get_pinecone_index('projection-test-16').list(namespace=NAMESPACE) for vector_id in page}
+    assert reduced and reduced == full
@@ -0,0 +1,29 @@
+import io
+from services.document_store import get_document_store
+from services.namespace_registry import get_namespace_config
+from services.pinecone_service import get_pinecone_client
+from services.snapshot_service import export_namespace, import_snapshot
+
+NAMESPACE = 'snapshot-test'
+
+
+def _add(client, name):
+    response = client.post('/add-file', data={
+        'namespace': NAMESPACE,
+        'file': (io.BytesIO(f'Projects\n{name} indexes contracts for search.\n'.encode() * 30), name),
+    })
+    assert response.status_code == 200, response.get_json()
+    return [f"{name}-full-w{window}" for window in range(response.get_json()["chunks"])]
+
+
+def test_overwrite_import_replaces_the_namespace(client, tmp_path):
+    kept = _add(client, 'kept.txt')
+    export_namespace(NAMESPACE, str(tmp_path / 'snapshot'))
+    added = _add(client, 'added.txt')
+
+    result = import_snapshot(str(tmp_path / 'snapshot'), namespace=NAMESPACE, overwrite=True)
+
+    assert result["count"] == len(kept)
+    index = get_pinecone_client().Index(get_namespace_config(NAMESPACE)["index_name"])
+    assert set(index.fetch(ids=kept + added, namespace=NAMESPACE)["vectors"]) == set(kept)
+    assert get_document_store().get_many(NAMESPACE, added) == {}
@@ -0,0 +1,51 @@
+import io
+import os
+from werkzeug.test import EnvironBuilder
+from config import Config
+
+
+def _temp_files():
+    if not os.path.isdir(Config.UPLOAD_TEMP_DIR):
+        return []
+    return [name for name in os.listdir(Config.UPLOAD_TEMP_DIR) if name.endswith('.part')]
+
+
+def _chunked_environ(path, data):
+    """A multipart request without Content-Length, as the WSGI server passes on a de-chunked upload."""
+    environ = EnvironBuilder(path=path, method='POST', data=data).get_environ()
+    environ.pop('CONTENT_LENGTH', None)
+    environ['wsgi.input_terminated'] = True
+    return environ
+
+
+def test_oversized_chunked_upload_leaves_no_temp_file(client, monkeypatch):
+    monkeypatch.setattr(Config, 'UPLOAD_MAX_BYTES', 1024)
+    before = set(_temp_files())
+    environ = _chunked_environ('/add-file', {
+        'namespace': 'uploads-test',
+        'file': (io.BytesIO(b'x' * 64 * 1024), 'big.txt'),
+    })
+
+    response = client.open(environ)
+
+    assert response.status_code == 413
+    assert set(_temp_files()) == before
+
+
+def test_upload_to_other_route_leaves_no_temp_file(client):
+    before = set(_temp_files())
+
+    client.post('/list-files', data={'file': (io.BytesIO(b'hello'), 'stray.txt')})
+
+    assert set(_temp_files()) == before
+
+
+def test_added_file_is_moved_into_data_folder(client):
+    response = client.post('/add-file', data={
+        'namespace': 'uploads-test',
+        'file': (io.BytesIO(b'Experience\nBuilt a search service.\n' * 20), 'notes.txt'),
+    })
+
+    assert response.status_code == 200, response.get_json()
+    assert os.path.isfile(os.path.join(Config.DATA_FOLDER, 'notes.txt'))
+    assert _temp_files() == []
@@ -0,0 +1,287 @@
+import os
+import math
+import time
+import logging
+import itertools
+import threading
+from utilities.metrics_utility import metrics
+
+_in_flight = metrics.gauge('admission_in_flight', "Admitted requests currently running, by route class")
+_queued = metrics.gauge('admission_queue_length', "Requests waiting for admission, by route class")
+_admitted = metrics.counter('admission_admitted_total', "Requests admitted, by route class")
+_shed = metrics.counter('admission_shed_total', "Requests rejected by admission control, by route class and reason")
+
+# Route template -> route class. Routes not listed here (health, metrics, set-default-rag) are never queued.
+# /ask/batch is bulk work and competes with ingestion rather than with interactive /ask calls.
+ROUTE_CLASSES = {
+    '/ask': 'interactive',
+    '/view-rags': 'listing',
+    '/list-files': 'listing',
+    '/tree-view/': 'listing',
+    '/view-namespace-summary/<namespace>': 'listing',
+    '/get-default-rag': 'listing',
+    '/create-new-rag': 'ingestion',
+    '/add-file': 'ingestion',
+    '/add-url': 'ingestion',
+    '/remove-file': 'ingestion',
+    '/delete-rag': 'ingestion',
+    '/ask/batch': 'ingestion',
+}
+
+# The controller registered with the app, for /health
+_controller = None
+
+
+class AdmissionRejected(Exception):
+    """A request was shed: `status` is 429 (quota) or 503 (overload), `retry_after` in seconds."""
+
+    def __init__(self, message, status, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class RouteClass:
+    """Concurrency limit, queue bound and longest queueing time of one class of routes (lower priority runs first)."""
+
+    def __init__(self, name, priority, limit, queue_size, max_wait):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.queued = 0
+        # Smoothed service time, for Retry-After estimates
+        self.service_time = 1.0
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token; returns 0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ('route_class', 'priority', 'sequence', 'event', 'granted')
+
+    def __init__(self, route_class, sequence):
+        self.route_class = route_class
+        self.priority = route_class.priority
+        self.sequence = sequence
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered admission of requests per route class.
+
+    Each class runs at most `limit` requests at once and queues at most
+    `queue_size` more; all classes together run at most `max_concurrent`
+    (0 = no shared limit). Freed slots go to the waiting request of the
+    highest-priority class, oldest first. A request that cannot be queued, or
+    is not admitted within its class's `max_wait`, is rejected at once with
+    503 instead of piling up until it times out. Per-client and per-namespace
+    token buckets (rate 0 = off) reject requests over quota with 429.
+    """
+
+    def __init__(self, classes, max_concurrent=0, client_rate=0, client_burst=1, namespace_rate=0, namespace_burst=1):
+        self.classes = {route_class.name: route_class for route_class in classes}
+        self.max_concurrent = max_concurrent
+        self.client_rate, self.client_burst = client_rate, client_burst
+        self.namespace_rate, self.namespace_burst = namespace_rate, namespace_burst
+        self.total_in_flight = 0
+        self.waiters = []
+        self.buckets = {}
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+
+    def _can_run(self, route_class):
+        return route_class.in_flight < route_class.limit and (not self.max_concurrent or self.total_in_flight < self.max_concurrent)
+
+    def _grant(self, route_class):
+        route_class.in_flight += 1
+        self.total_in_flight += 1
+        _in_flight.set(route_class.in_flight, route_class=route_class.name)
+
+    def _dispatch(self):
+        # Called with the lock held whenever a slot may have freed up or a request arrived
+        for waiter in sorted(self.waiters, key=lambda waiter: (waiter.priority, waiter.sequence)):
+            if self.max_concurrent and self.total_in_flight >= self.max_concurrent:
+                break
+            if self._can_run(waiter.route_class):
+                self._grant(waiter.route_class)
+                self._dequeue(waiter)
+                waiter.granted = True
+                waiter.event.set()
+
+    def _dequeue(self, waiter):
+        self.waiters.remove(waiter)
+        waiter.route_class.queued -= 1
+        _queued.set(waiter.route_class.queued, route_class=waiter.route_class.name)
+
+    def _retry_after(self, route_class):
+        backlog = route_class.queued + route_class.in_flight + 1
+        return max(1, math.ceil(route_class.service_time * backlog / max(1, route_class.limit)))
+
+    def _reject(self, route_class, status, retry_after, reason, message):
+        _shed.inc(route_class=route_class.name, reason=reason)
+        logging.warning("🚦 Shedding %s request (%s); retry after %ds", route_class.name, reason, retry_after)
+        raise AdmissionRejected(message, status, retry_after, reason)
+
+    def _check_quota(self, route_class, kind, key, rate, burst):
+        if not rate or not key:
+            return
+        with self.lock:
+            bucket = self.buckets.get((kind, key))
+            if bucket is None:
+                if len(self.buckets) >= 10000:
+                    # Forget buckets that have refilled; they behave exactly like new ones
+                    now = time.monotonic()
+                    self.buckets = {k: b for k, b in self.buckets.items() if b.tokens + (now - b.updated) * b.rate < b.burst}
+                bucket = self.buckets[(kind, key)] = TokenBucket(rate, burst)
+            wait = bucket.take()
+        if wait:
+            self._reject(route_class, 429, max(1, math.ceil(wait)), f"{kind}_quota", f"Request quota exceeded for this {kind}.")
+
+    def acquire(self, class_name, client=None, namespace=None):
+        """
+        Block until a request of `class_name` may run; returns a ticket for `release`.
+
+        Raises:
+            AdmissionRejected: over quota (429), queue full or not admitted within `max_wait` (503).
+        """
+        route_class = self.classes[class_name]
+        self._check_quota(route_class, 'client', client, self.client_rate, self.client_burst)
+        self._check_quota(route_class, 'namespace', namespace, self.namespace_rate, self.namespace_burst)
+        with self.lock:
+            if route_class.queued >= route_class.queue_size and not self._can_run(route_class):
+                retry_after = self._retry_after(route_class)
+                queue_full = True
+            else:
+                queue_full = False
+                waiter = _Waiter(route_class, next(self.sequence))
+                self.waiters.append(waiter)
+                route_class.queued += 1
+                _queued.set(route_class.queued, route_class=route_class.name)
+                self._dispatch()
+        if queue_full:
+            self._reject(route_class, 503, retry_after, 'queue_full', "The server is overloaded. Please retry shortly.")
+        if not waiter.event.wait(route_class.max_wait):
+            with self.lock:
+                if not waiter.granted:
+                    self._dequeue(waiter)
+                    retry_after = self._retry_after(route_class)
+            if not waiter.granted:
+                self._reject(route_class, 503, retry_after, 'timeout', "The server is overloaded. Please retry shortly.")
+        _admitted.inc(route_class=route_class.name)
+        return route_class, time.monotonic()
+
+    def release(self, ticket):
+        route_class, started = ticket
+        with self.lock:
+            route_class.in_flight -= 1
+            self.total_in_flight -= 1
+            _in_flight.set(route_class.in_flight, route_class=route_class.name)
+            route_class.service_time = 0.8 * route_class.service_time + 0.2 * (time.monotonic() - started)
+            self._dispatch()
+
+    def stats(self):
+        with self.lock:
+            classes = {
+                name: {
+                    "in_flight": route_class.in_flight,
+                    "queued": route_class.queued,
+                    "limit": route_class.limit,
+                    "queue_size": route_class.queue_size,
+                    "shed": sum(value for labels, value in _shed.samples() if labels.get('route_class') == name),
+                }
+                for name, route_class in self.classes.items()
+            }
+            return {"in_flight": self.total_in_flight, "max_concurrent": self.max_concurrent, "classes": classes}
+
+
+def _request_namespace(request):
+    body = request.get_json(silent=True) if request.is_json else None
+    body = body if isinstance(body, dict) else {}
+    if request.url_rule.rule.startswith('/create-new-rag') and body.get('file_path'):
+        return os.path.basename(str(body['file_path']))
+    # Multipart uploads are not parsed here: that would read the whole file before admission
+    namespace = body.get('namespace') or body.get('rag_name') or request.args.get('namespace') or (request.view_args or {}).get('namespace')
+    return os.path.basename(str(namespace)) if namespace else None
+
+
+def admission_controller_from_config():
+    """An AdmissionController with the route classes and quotas configured in Config."""
+    from config import Config
+    classes = [
+        RouteClass('interactive', 0, Config.ADMISSION_INTERACTIVE_CONCURRENCY, Config.ADMISSION_INTERACTIVE_QUEUE, Config.ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS),
+        RouteClass('listing', 1, Config.ADMISSION_LISTING_CONCURRENCY, Config.ADMISSION_LISTING_QUEUE, Config.ADMISSION_LISTING_MAX_WAIT_SECONDS),
+        RouteClass('ingestion', 2, Config.ADMISSION_INGESTION_CONCURRENCY, Config.ADMISSION_INGESTION_QUEUE, Config.ADMISSION_INGESTION_MAX_WAIT_SECONDS),
+    ]
+    return AdmissionController(classes, Config.ADMISSION_MAX_CONCURRENT,
+                               Config.ADMISSION_CLIENT_RATE, Config.ADMISSION_CLIENT_BURST,
+                               Config.ADMISSION_NAMESPACE_RATE, Config.ADMISSION_NAMESPACE_BURST)
+
+
+def register_admission_control(app, controller, client_header='X-Client-Id'):
+    """Run every classified route of `app` through `controller`; shed requests get a JSON error and Retry-After."""
+    from flask import request, g, jsonify
+    global _controller
+    _controller = controller
+
+    @app.before_request
+    def _admit_request():
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        class_name = ROUTE_CLASSES.get(rule)
+        if class_name is None:
+            return None
+        client = request.headers.get(client_header) or request.remote_addr
+        try:
+            g.admission_ticket = controller.acquire(class_name, client, _request_namespace(request))
+        except AdmissionRejected as e:
+            response = jsonify({"error": str(e), "reason": e.reason})
+            response.status_code = e.status
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        return None
+
+    @app.after_request
+    def _release_on_close(response):
+        # Streamed bodies (/ask/batch with stream) run after teardown, so the slot is held until the response closes
+        ticket = g.pop('admission_ticket', None)
+        if ticket is not None:
+            response.call_on_close(lambda: controller.release(ticket))
+        return response
+
+    @app.teardown_request
+    def _release_request(exc=None):
+        # Only reached with a ticket when no response was produced (after_request did not run)
+        ticket = g.pop('admission_ticket', None)
+        if ticket is not None:
+            controller.release(ticket)
+
+    logging.info("🚦 Admission control enabled: %s", ", ".join(
+        f"{c.name} {c.limit}+{c.queue_size}" for c in sorted(controller.classes.values(), key=lambda c: c.priority)))
+    return app
+
+
+def get_admission_stats():
+    """Queue lengths, in-flight counts and shed counts per route class (None when admission control is off)."""
+    return _controller.stats() if _controller is not None else None
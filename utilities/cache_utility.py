@@ -0,0 +1,50 @@
+import time
+import threading
+
+
+class TTLCache:
+    """
+    Thread-safe map whose entries expire `ttl` seconds after they were stored.
+
+    Keys are tuples so related entries can be dropped together with
+    `invalidate(prefix)`, e.g. every entry of one index.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, calling `loader()` to fill it on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.set(key, loader())
+        return value
+
+    def invalidate(self, prefix=()):
+        """Drop every entry whose key starts with `prefix` (everything when it's empty)."""
+        prefix = tuple(prefix)
+        with self.lock:
+            if not prefix:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if key[:len(prefix)] == prefix]:
+                del self.entries[key]
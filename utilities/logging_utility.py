@@ -0,0 +1,122 @@
+import json
+import time
+import uuid
+import queue
+import random
+import logging
+import logging.handlers
+import contextvars
+
+# Request id of the request being handled by the current thread/context
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is emitted as a field
+_RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the current request id (runs in the calling thread, before enqueueing)."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records that opt in via `extra={"sample_rate": 0.1}`.
+
+    Records without a `sample_rate`, and anything at WARNING or above, always pass.
+    """
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, truncating long string fields."""
+
+    def __init__(self, max_field_chars=1000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def _truncate(self, value):
+        if isinstance(value, str) and len(value) > self.max_field_chars:
+            return f"{value[:self.max_field_chars]}...[truncated {len(value) - self.max_field_chars} chars]"
+        return value
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": self._truncate(record.getMessage()),
+            "request_id": getattr(record, 'request_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_RECORD_ATTRS and key not in entry and key != 'sample_rate':
+                entry[key] = self._truncate(value if isinstance(value, (str, int, float, bool, type(None))) else repr(value))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the request thread.
+
+    When the background writer falls behind and the bounded queue is full,
+    records are dropped and counted instead of stalling the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge args into the message here; JSON rendering happens on the writer thread.
+        # The queue handler is the root logger's only handler, so the record can be updated in place.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def new_request_id(incoming=None):
+    """Use the caller-supplied request id if present, otherwise generate one."""
+    return incoming or uuid.uuid4().hex
+
+
+def register_request_id_hooks(app, header='X-Request-ID'):
+    """Bind a request id to each Flask request's logging context and echo it in the response."""
+    from flask import request
+
+    @app.before_request
+    def _bind_request_id():
+        request_id_var.set(new_request_id(request.headers.get(header)))
+
+    @app.after_request
+    def _echo_request_id(response):
+        request_id = request_id_var.get()
+        if request_id:
+            response.headers[header] = request_id
+        return response
+
+    @app.teardown_request
+    def _clear_request_id(exc=None):
+        request_id_var.set(None)
+
+    return app
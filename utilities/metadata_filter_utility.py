@@ -0,0 +1,116 @@
+import json
+
+# Metadata written on every chunk at ingest, and so the only fields worth filtering on
+FILTERABLE_FIELDS = ('section_name', 'file_name', 'page', 'source_type', 'rag_name', 'window')
+# Only section-tagged chunks carry these; a whole-document vector has none of them
+SECTION_FIELDS = ('section_name', 'page', 'window')
+_OPERATORS = ('$eq', '$ne', '$in', '$nin', '$gt', '$gte', '$lt', '$lte')
+_SCALAR = (str, int, float, bool)
+
+
+def _check_operand(field, operator, operand):
+    if operator in ('$in', '$nin'):
+        if not isinstance(operand, list) or not operand or not all(isinstance(value, _SCALAR) for value in operand):
+            raise ValueError(f"Filter '{field}': {operator} needs a non-empty list of values")
+    elif operator in ('$gt', '$gte', '$lt', '$lte'):
+        if isinstance(operand, bool) or not isinstance(operand, (int, float)):
+            raise ValueError(f"Filter '{field}': {operator} needs a number")
+    elif not isinstance(operand, _SCALAR):
+        raise ValueError(f"Filter '{field}': {operator} needs a single value")
+
+
+def build_metadata_filter(filters):
+    """
+    Validate an /ask `filter` and turn it into a Pinecone metadata filter.
+
+    Accepts `{"section_name": "Projects"}` (equality), `{"section_name": ["Projects", "Experience"]}`
+    (any of), operator objects such as `{"page": {"$lte": 2}}`, and `$and`/`$or`
+    lists of those. Only FILTERABLE_FIELDS may be used.
+
+    Returns:
+        dict or None: the filter to pass to `index.query`, or None for no filter.
+
+    Raises:
+        ValueError: the filter is malformed or uses an unknown field or operator.
+    """
+    if filters is None or filters == {}:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError("Filter must be an object")
+
+    result = {}
+    for field, condition in filters.items():
+        if field in ('$and', '$or'):
+            if not isinstance(condition, list) or not condition:
+                raise ValueError(f"{field} needs a non-empty list of filters")
+            result[field] = [build_metadata_filter(sub) or {} for sub in condition]
+            continue
+        if field not in FILTERABLE_FIELDS:
+            raise ValueError(f"Unknown filter field '{field}' (use one of {', '.join(FILTERABLE_FIELDS)})")
+        if isinstance(condition, list):
+            condition = {'$in': condition}
+        elif not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, operand in condition.items():
+            if operator not in _OPERATORS:
+                raise ValueError(f"Filter '{field}': unsupported operator '{operator}'")
+            _check_operand(field, operator, operand)
+        result[field] = condition
+    return result
+
+
+def filter_fields(metadata_filter):
+    """The set of metadata fields a (validated) filter refers to, including inside `$and`/`$or`."""
+    fields = set()
+    for field, condition in (metadata_filter or {}).items():
+        if field in ('$and', '$or'):
+            for sub in condition:
+                fields |= filter_fields(sub)
+        else:
+            fields.add(field)
+    return fields
+
+
+def filter_key(metadata_filter):
+    """A hashable, order-independent key for a filter (for caches and request coalescing)."""
+    return json.dumps(metadata_filter, sort_keys=True) if metadata_filter else None
+
+
+def matches_filter(metadata, metadata_filter):
+    """Evaluate a Pinecone metadata filter against one vector's metadata (for indexes without server-side filtering)."""
+    if not metadata_filter:
+        return True
+    for key, condition in metadata_filter.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == '$or':
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, operand in condition.items():
+            if operator == '$eq' and value != operand:
+                return False
+            if operator == '$ne' and value == operand:
+                return False
+            if operator == '$in' and value not in operand:
+                return False
+            if operator == '$nin' and value in operand:
+                return False
+            if operator in ('$gt', '$gte', '$lt', '$lte'):
+                if value is None:
+                    return False
+                if operator == '$gt' and not value > operand:
+                    return False
+                if operator == '$gte' and not value >= operand:
+                    return False
+                if operator == '$lt' and not value < operand:
+                    return False
+                if operator == '$lte' and not value <= operand:
+                    return False
+    return True
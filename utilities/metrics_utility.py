@@ -0,0 +1,91 @@
+import threading
+
+
+class _Metric:
+    """A named family of values keyed by label set, e.g. `llm_throttle_events_total{operation="chat"}`."""
+
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self.lock:
+            return [(dict(key), value) for key, value in self.values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class MetricsRegistry:
+    """Process-wide set of counters and gauges, rendered as JSON or Prometheus text by `/metrics`."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation=''):
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name, documentation=''):
+        return self._get_or_create(Gauge, name, documentation)
+
+    def snapshot(self):
+        return {
+            name: [{"labels": labels, "value": value} for labels, value in metric.samples()]
+            for name, metric in sorted(self.metrics.items())
+        }
+
+    def render_prometheus(self):
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in metric.samples():
+                label_text = ','.join(f'{key}="{val}"' for key, val in sorted(labels.items()))
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
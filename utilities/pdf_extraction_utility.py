@@ -96,22 +96,63 @@ def extract_text_from_pdf(file_path):
     except Exception as e:
         logging.error(f'❌ Error extracting text from PDF {file_path}: {str(e)}', exc_info=True)
         return ''
-    
-def split_into_sections(text):
+
+def extract_pages_from_pdf(file_path):
+    """Extract the text of each page of a PDF file (empty strings for pages without text)."""
+    try:
+        pages = [page.extract_text() or '' for page in PdfReader(file_path).pages]
+        if not any(page.strip() for page in pages):
+            logging.warning(f'⚠️ No text extracted from PDF {file_path}. It may be an image-based PDF.')
+        return pages
+    except Exception as e:
+        logging.error(f'❌ Error extracting text from PDF {file_path}: {str(e)}', exc_info=True)
+        return []
+
+def clean_text(text):
+    """Clean unwanted headers, footers, and page numbers from the extracted text."""
+    text = re.sub(r'P\s*a\s*g\s*e\s*\d+\s*\|\s*\d+', '', text)  # Remove page numbers
+    text = re.sub(r'\n+', '\n', text)  # Remove extra newlines
+    text = re.sub(r'\s+', ' ', text)  # Remove excessive whitespace
+    return text.strip()
+
+def iter_pdf_pages(file_path):
     """
-    Split the content into logical sections using headers like Experience, Projects, Education, etc.
+    Yield the text of each page of a PDF, one page at a time.
+
+    The reader works from the open file, seeking to each page as it is
+    extracted, so the PDF is never read into memory whole.
     """
-    headers = ['Experience', 'Projects', 'Education', 'Career Experience', 'Notable Accomplishments']
-    pattern = '|'.join([f"\\b{header}\\b" for header in headers])
-    sections = re.split(pattern, text)
-    section_names = re.findall(pattern, text)
+    with open(file_path, 'rb') as f:
+        for page in PdfReader(f).pages:
+            yield page.extract_text() or ''
 
-    if len(sections) > len(section_names):  # ✅ Fix: Added section_names and colon
-        section_names.insert(0, "Introduction")
+def section_spans(text, headers=None):
+    """
+    Locate logical sections by their headers (Config.SECTION_HEADERS unless `headers` is given).
 
-    result = {}
-    for i, section_name in enumerate(section_names):
-        section_text = sections[i+1] if i+1 < len(sections) else ''
-        result[section_name.strip()] = section_text.strip()
+    Returns a list of `(section_name, start_char, end_char)` covering `text`
+    in order (each span starts at its header); text before the first header is
+    the "Introduction" section.
+    """
+    headers = headers or Config.SECTION_HEADERS
+    # Longest first, so "Career Experience" wins over "Experience" at the same position
+    pattern = re.compile('|'.join(f"\\b{re.escape(header)}\\b" for header in sorted(headers, key=len, reverse=True)))
+    found = list(pattern.finditer(text))
+
+    spans = []
+    if not found or text[:found[0].start()].strip():
+        spans.append(("Introduction", 0, found[0].start() if found else len(text)))
+    for i, match in enumerate(found):
+        end = found[i + 1].start() if i + 1 < len(found) else len(text)
+        spans.append((match.group(0).strip(), match.start(), end))
+    return spans
 
-    return result
\ No newline at end of file
+def split_into_sections(text, headers=None):
+    """
+    Split the content into logical sections using headers like Experience, Projects, Education, etc.
+    """
+    result = {}
+    for name, start, end in section_spans(text, headers):
+        body = text[start:end]
+        result[name] = (body[len(name):] if body.startswith(name) else body).strip()
+    return result
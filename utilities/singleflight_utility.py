@@ -0,0 +1,67 @@
+import re
+import threading
+from utilities.metrics_utility import metrics
+
+_collapsed_calls = metrics.counter('singleflight_collapsed_total', "Calls answered by waiting on an identical in-flight call")
+_leader_calls = metrics.counter('singleflight_calls_total', "Calls that actually ran (not collapsed)")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Key form of a user query: case-folded with runs of whitespace collapsed."""
+    return _WHITESPACE.sub(' ', (text or '').strip()).casefold()
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it and get the same result (or the same exception).
+    Nothing is cached once the call finishes, so a later call runs again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            _collapsed_calls.inc(layer=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        _leader_calls.inc(layer=self.name)
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
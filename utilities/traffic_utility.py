@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import queue
+import random
+import hashlib
+import logging
+import threading
+
+# Body fields that name a namespace (or the file a namespace is named after), per route
+_NAMESPACE_FIELDS = ('namespace', 'rag_name')
+
+
+def namespace_token(namespace, hashed=True):
+    """Stable stand-in for a namespace name, so a log can be shared without revealing file names."""
+    if not namespace:
+        return None
+    namespace = os.path.basename(str(namespace))
+    return 'ns-' + hashlib.sha1(namespace.encode('utf-8')).hexdigest()[:12] if hashed else namespace
+
+
+def describe_request(request, hash_namespaces=True):
+    """
+    Sanitized description of a Flask request: its shape, never its content.
+
+    Keeps the route template, method, sizes, the field names of the JSON body and
+    query string, and the namespace (hashed by default). Query text, file
+    contents, URLs and paths are reduced to lengths and sizes.
+    """
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    entry = {
+        "method": request.method,
+        "route": rule,
+        "request_bytes": request.content_length or 0,
+        "args": sorted(request.args.keys()),
+    }
+    view_args = request.view_args or {}
+    namespace = None
+    if rule and rule.startswith('/create-new-rag'):
+        body = request.get_json(silent=True) or {}
+        # The namespace of a new RAG is the file name, not `rag_name`
+        namespace = body.get('file_path')
+        if body.get('file_path'):
+            try:
+                entry["file_bytes"] = os.path.getsize(body['file_path'])
+            except OSError:
+                entry["file_bytes"] = None
+        entry["fields"] = sorted(body.keys())
+    elif request.is_json:
+        body = request.get_json(silent=True) or {}
+        namespace = next((body[field] for field in _NAMESPACE_FIELDS if body.get(field)), None)
+        entry["fields"] = sorted(body.keys())
+        if isinstance(body.get('query'), str):
+            entry["query_chars"] = len(body['query'])
+        if isinstance(body.get('queries'), list):
+            entry["batch_size"] = len(body['queries'])
+    elif request.files:
+        upload = next(iter(request.files.values()))
+        namespace = request.form.get('namespace')
+        entry["fields"] = sorted(request.form.keys())
+        entry["file_ext"] = os.path.splitext(upload.filename or '')[1].lower()
+    if namespace is None:
+        namespace = next((view_args[key] for key in ('namespace', 'rag_name') if view_args.get(key)), None)
+    entry["namespace"] = namespace_token(namespace, hash_namespaces)
+    return entry
+
+
+class TrafficRecorder:
+    """
+    Appends one sanitized JSON line per request to a traffic log for later replay.
+
+    Requests only build the record and enqueue it; a background thread writes
+    the file. When the writer falls behind, records are dropped and counted
+    rather than slowing requests down (as with the application log).
+    """
+
+    def __init__(self, path, sample_rate=1.0, hash_namespaces=True, queue_size=10000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.hash_namespaces = hash_namespaces
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.recorded = 0
+        self.thread = None
+
+    def record(self, entry):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                entries = [self.queue.get()]
+                while True:
+                    try:
+                        entries.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+                f.flush()
+                self.recorded += len(entries)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+            self.thread.start()
+        return self
+
+    def stats(self):
+        return {"path": self.path, "recorded": self.recorded, "dropped": self.dropped, "queue_depth": self.queue.qsize()}
+
+
+def register_traffic_recorder(app, recorder):
+    """Record every request handled by `app` (subject to the recorder's sample rate)."""
+    from flask import request, g
+
+    recorder.start()
+
+    @app.before_request
+    def _start_traffic_record():
+        if recorder.sample_rate >= 1.0 or random.random() < recorder.sample_rate:
+            g.traffic_started = (time.time(), time.perf_counter())
+
+    @app.after_request
+    def _finish_traffic_record(response):
+        started = g.pop('traffic_started', None)
+        if started is not None:
+            try:
+                entry = describe_request(request, recorder.hash_namespaces)
+                entry.update({
+                    "ts": started[0],
+                    "duration_ms": (time.perf_counter() - started[1]) * 1000.0,
+                    "status": response.status_code,
+                    "response_bytes": response.calculate_content_length() or 0,
+                })
+                recorder.record(entry)
+            except Exception as e:
+                logging.warning("⚠️ Could not record request for the traffic log: %s", e)
+        return response
+
+    logging.info("🎙️ Recording sanitized traffic to %s (sample rate %.2f)", recorder.path, recorder.sample_rate)
+    return app
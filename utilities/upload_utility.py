@@ -0,0 +1,99 @@
+import os
+import codecs
+import hashlib
+import tempfile
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from config import Config
+
+# Bytes kept from the start of an upload to detect its type
+_HEAD_BYTES = 8192
+
+
+class HashingUploadFile:
+    """
+    Temporary file an upload streams into, hashed and size-checked chunk by chunk.
+
+    The multipart parser writes the upload here as it arrives, so it is never
+    held in memory; once parsing finishes `sha256`, `size` and `head` (the
+    first bytes, for type detection) are known without reading the file again.
+    """
+
+    def __init__(self, directory, max_bytes):
+        os.makedirs(directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload-', suffix='.part', delete=False)
+        self.path = self.file.name
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise RequestEntityTooLarge(f"Upload exceeds the {self.max_bytes} byte limit")
+        if len(self.head) < _HEAD_BYTES:
+            self.head += data[:_HEAD_BYTES - len(self.head)]
+        self.hash.update(data)
+        return self.file.write(data)
+
+    @property
+    def sha256(self):
+        return self.hash.hexdigest()
+
+    def discard(self):
+        """Close and remove the temporary file (a no-op once it has been moved away)."""
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __getattr__(self, name):
+        # read / seek / readline / close / flush go straight to the temporary file
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    """Flask request whose file uploads stream into a HashingUploadFile under UPLOAD_TEMP_DIR."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = HashingUploadFile(Config.UPLOAD_TEMP_DIR, Config.UPLOAD_MAX_BYTES)
+        # Kept here as well as in `files`: a part cut off mid-parse never reaches `files`
+        self.__dict__.setdefault('upload_streams', []).append(upload)
+        return upload
+
+    def discard_uploads(self):
+        """Remove every temporary file this request created (files moved into place are left alone)."""
+        for upload in self.__dict__.pop('upload_streams', []):
+            upload.discard()
+
+
+def register_upload_cleanup(app):
+    """Discard the request's upload temp files once it is torn down, whichever route it hit and however parsing ended."""
+    from flask import request
+
+    @app.teardown_request
+    def _discard_uploads(exc=None):
+        if isinstance(request, UploadRequest):
+            request.discard_uploads()
+
+    return app
+
+
+def detect_file_type(head, filename=''):
+    """
+    'pdf' or 'text' from an upload's first bytes, or None for anything else.
+
+    PDFs are recognised by their signature; text must be valid UTF-8 with no
+    NUL bytes (a multi-byte character cut off at the end of `head` is allowed).
+    """
+    if head.lstrip(b'\xef\xbb\xbf\r\n\t ').startswith(b'%PDF-'):
+        return 'pdf'
+    if b'\x00' in head:
+        return None
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return None
+    return 'text'
@@ -1,5 +1,22 @@
 import os
+import queue
+import atexit
 import logging
+import logging.handlers
+from utilities.logging_utility import JsonFormatter, NonBlockingQueueHandler, RequestIdFilter, SamplingFilter
+
+# Background writer state, set up once by setup_logging()
+_log_listener = None
+_log_queue = None
+_queue_handler = None
+
+def _stop_log_listener():
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+atexit.register(_stop_log_listener)
 
 def ensure_directory_exists(path):
     if not os.path.exists(path):
@@ -16,24 +33,68 @@ def get_logging_level(log_level_str):
     }
     return levels.get(log_level_str.upper(), logging.INFO)
 
-def setup_logging(log_file_path, log_level):
+def setup_logging(log_file_path, log_level, max_field_chars=1000, queue_size=10000):
+    """
+    Configure the single application-wide logging pipeline.
+
+    Request threads only stamp the record with the request id, apply sampling and
+    enqueue it; a background QueueListener renders JSON and writes to the log file
+    and the console. Calling this again replaces the previous setup.
+    """
+    global _log_listener, _log_queue, _queue_handler
+
     ensure_directory_exists(os.path.dirname(log_file_path))
     log_level = get_logging_level(log_level)
-    
-    logging.basicConfig(
-        filename=log_file_path,
-        level=log_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        force=True  # Ensure other modules don't reset logging
-    )
-
-    # Add console output for logs
+
+    _stop_log_listener()
+
+    formatter = JsonFormatter(max_field_chars=max_field_chars)
+    file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+    file_handler.setFormatter(formatter)
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(log_level)
-    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    
-    # Attach the console handler to the root logger
+    console_handler.setFormatter(formatter)
+
+    _log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(_log_queue)
+    _queue_handler.addFilter(RequestIdFilter())
+    _queue_handler.addFilter(SamplingFilter())
+
     root_logger = logging.getLogger()
-    root_logger.addHandler(console_handler)
-    
-    logging.info(f'✅ Logging initialized at level: {log_level}, log file: {log_file_path}')
\ No newline at end of file
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+        handler.close()
+    root_logger.addHandler(_queue_handler)
+    root_logger.setLevel(log_level)
+
+    _log_listener = logging.handlers.QueueListener(_log_queue, file_handler, console_handler, respect_handler_level=True)
+    _log_listener.start()
+
+    logging.info('✅ Logging initialized at level: %s, log file: %s', logging.getLevelName(log_level), log_file_path)
+    return _log_listener
+
+def get_logging_stats():
+    """Current depth of the background log queue and the number of records dropped because it was full."""
+    return {
+        "queue_depth": _log_queue.qsize() if _log_queue is not None else 0,
+        "dropped_records": _queue_handler.dropped if _queue_handler is not None else 0,
+    }
+
+def load_yaml_config(path):
+    """Load a YAML config file, expanding ${ENV_VAR} references in string values."""
+    import yaml
+
+    def expand(value):
+        if isinstance(value, dict):
+            return {key: expand(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [expand(item) for item in value]
+        if isinstance(value, str):
+            return os.path.expandvars(value)
+        return value
+
+    try:
+        with open(path, 'r') as f:
+            return expand(yaml.safe_load(f) or {})
+    except FileNotFoundError:
+        logging.warning('⚠️ Config file not found at %s, using defaults.', path)
+        return {}
@@ -13,7 +13,8 @@ else:
     print(f"✅ API Key loaded successfully: {PINECONE_API_KEY[:5]}*****")
 
 try:
-    pc = Pinecone(api_key=PINECONE_API_KEY)
+    # PINECONE_HOST points at another control plane, e.g. the local stand-in (benchmarks/pinecone_server.py)
+    pc = Pinecone(api_key=PINECONE_API_KEY, host=os.getenv('PINECONE_HOST') or None)
     print(f"✅ Successfully connected to Pinecone using API key.")
 
     # Check if the index exists, if not, create it